@@ -1,23 +1,23 @@
-from .parsing_with_criteria import parse_with_criteria
-from .parsing_with_content import embed_events, parse_with_content, embed_event
+# 하위 모듈(NumPy, 벡터 인덱스 등)은 실제로 쓰일 때 import 한다 (PEP 562).
+# `from RAG.index_hooks import ...`처럼 가벼운 모듈만 필요한 쪽이 전체를 끌어오지 않게 한다.
+_LAZY_EXPORTS = {
+    "parse_with_criteria": ".parsing_with_criteria",
+    "embed_events": ".parsing_with_content",
+    "parse_with_content": ".parsing_with_content",
+    "embed_event": ".parsing_with_content",
+    # 사용자별 상태 유지 엔진 (인덱스/캐시 소유): RAG("Database/[user]") 또는 get_engine(user_dir)
+    # (예전 RAG(events)도 DeprecationWarning과 함께 임시 디렉터리 위의 엔진으로 동작)
+    "RAG": ".engine",
+    "get_engine": ".engine",
+}
 
 
-class RAG:
-    def __init__(self, events):
-        self.events = events
-        self.embeddings = embed_events(events)
-        
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
 
-    def _embed_events(self, events):
-        return embed_events(events, vector_dir="Database/[user]")
-
-    def embed_event(self, event: dict) -> dict:
-        """Input: 이벤트, Output: 이벤트 + embedding 필드"""
-        return embed_event(event)
-
-    def parse_with_criteria(self, criteria=None):
-   
-        return parse_with_criteria(vector_dir="Database/[user]", criteria=criteria)
-        
-    def parse_with_content(self, query=None, criteria=None, k=10, vector_dir="Database/[user]"):
-        return parse_with_content(query, criteria, k, vector_dir="Database/[user]")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
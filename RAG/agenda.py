@@ -0,0 +1,281 @@
+"""
+일(day) / ISO 주(week) 단위 일정 버킷 (agenda materialized view).
+
+주간/월간 화면이 매 요청마다 모든 이벤트를 훑지 않도록 "날짜 -> 이벤트 id" 버킷을 유지한다.
+- 여러 날에 걸친 이벤트는 걸친 모든 날짜(와 그 날짜들의 ISO 주) 버킷에 들어간다
+  (자정에 끝나는 이벤트는 끝나는 날에 넣지 않음, 최대 AGENDA_MAX_SPAN_DAYS일)
+- 날짜는 KST 기준, 주 키는 ISO 8601 ("2025-W40")
+- eventmanager 변경(index_hooks)마다 해당 이벤트의 버킷만 갱신
+- `.moro/agenda.json`에 이벤트별 (시작 시각, 날짜 목록)과 파일별 (mtime_ns, size, id) 목록을 저장하고,
+  시작 시 바뀐 파일만 다시 읽는다 (엔진 스냅샷과 같은 방식). 다른 워커가 다시 저장하면 다음 조회 때 따라간다
+- 다른 프로세스가 파일을 바꿨는데(index_hooks.storage_version) 아직 뷰를 저장하지 않았으면 조회 때 바뀐 파일만 다시 읽는다
+"""
+from __future__ import annotations
+
+import os
+import threading
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .index_hooks import register_mutation_listener, storage_version, user_key
+from .parsing_with_criteria import KST, _event_window
+from .snapshot import list_event_files, read_event_file
+from .state import atomic_write_json, read_json, state_dir
+
+
+AGENDA_PERSIST_DELAY = float(os.getenv("AGENDA_PERSIST_DELAY", "2"))
+AGENDA_MAX_SPAN_DAYS = int(os.getenv("AGENDA_MAX_SPAN_DAYS", "62"))
+FORMAT = 1
+
+
+def agenda_path(user_dir: str):
+    return state_dir(user_dir) / "agenda.json"
+
+
+def event_days(event: Dict[str, Any]) -> List[date]:
+    """이벤트가 걸친 날짜들 (KST). 시작 시각을 해석할 수 없으면 ValueError/KeyError."""
+    start, finish = _event_window(event)
+    start, finish = start.astimezone(KST), finish.astimezone(KST)
+    first, last = start.date(), finish.date()
+    if finish > start and finish.time() == dt_time(0) and last > first:
+        last -= timedelta(days=1)
+    span = min(max((last - first).days, 0), AGENDA_MAX_SPAN_DAYS - 1)
+    return [first + timedelta(days=i) for i in range(span + 1)]
+
+
+def week_key(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class AgendaView:
+    def __init__(self, user_dir: str):
+        self.user_dir = user_dir
+        self.key = user_key(user_dir)
+        self.days: Dict[str, Set[int]] = {}
+        self.weeks: Dict[str, Set[int]] = {}
+        # id -> (시작 epoch, 날짜 키들)
+        self.entries: Dict[int, Tuple[float, Tuple[str, ...]]] = {}
+        self._files: Dict[str, list] = {}
+        self._id_file: Dict[int, str] = {}
+        self._persisted_mtime: Optional[int] = None
+        # 버킷이 반영한 디렉터리 상태 (storage_version)
+        self._synced: Optional[Tuple[int, int]] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------ buckets
+    def upsert(self, event: Dict[str, Any]) -> None:
+        doc_id = event.get("id")
+        if doc_id is None:
+            return
+        try:
+            days = event_days(event)
+            start = _event_window(event)[0].timestamp()
+        except Exception:
+            days = []
+        with self._lock:
+            self.remove(doc_id)
+            if not days:
+                return
+            keys = tuple(d.isoformat() for d in days)
+            self.entries[doc_id] = (start, keys)
+            self._add(doc_id, keys)
+
+    def _add(self, doc_id: int, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.days.setdefault(key, set()).add(doc_id)
+            self.weeks.setdefault(week_key(date.fromisoformat(key)), set()).add(doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            entry = self.entries.pop(doc_id, None)
+            if entry is None:
+                return
+            for key in entry[1]:
+                for buckets, bucket in ((self.days, key), (self.weeks, week_key(date.fromisoformat(key)))):
+                    ids = buckets.get(bucket)
+                    if ids is None:
+                        continue
+                    ids.discard(doc_id)
+                    if not ids:
+                        del buckets[bucket]
+
+    def _ordered(self, ids: Iterable[int]) -> List[int]:
+        return sorted(ids, key=lambda doc_id: (self.entries[doc_id][0], doc_id))
+
+    def day_ids(self, day: date) -> List[int]:
+        self.refresh()
+        with self._lock:
+            return self._ordered(self.days.get(day.isoformat(), ()))
+
+    def week_ids(self, year: int, week: int) -> List[int]:
+        """ISO 연도/주 번호의 이벤트 id (시작 시각순). 잘못된 주 번호는 ValueError."""
+        date.fromisocalendar(year, week, 1)
+        self.refresh()
+        with self._lock:
+            return self._ordered(self.weeks.get(f"{year}-W{week:02d}", ()))
+
+    def range_ids(self, start: date, end: date) -> List[int]:
+        """start~end(포함) 날짜 버킷의 합집합 (시작 시각순)."""
+        self.refresh()
+        found: Set[int] = set()
+        with self._lock:
+            day = start
+            while day <= end:
+                found.update(self.days.get(day.isoformat(), ()))
+                day += timedelta(days=1)
+            return self._ordered(found)
+
+    # ------------------------------------------------------------------ persistence
+    def load(self) -> None:
+        """저장된 뷰 + 그 이후 바뀐 파일로 복원 (없거나 형식이 다르면 전체 파일에서 생성)."""
+        with self._lock:
+            self.days, self.weeks, self.entries = {}, {}, {}
+            token = storage_version(self.user_dir)
+            path = agenda_path(self.user_dir)
+            mtime = _mtime(path)
+            saved = read_json(path)
+            if isinstance(saved, dict) and saved.get("format") == FORMAT:
+                self._files = {name: list(entry) for name, entry in saved["files"].items()}
+                for doc_id, (start, keys) in saved["events"].items():
+                    self.entries[int(doc_id)] = (start, tuple(keys))
+                    self._add(int(doc_id), keys)
+            else:
+                self._files = {}
+            self._id_file = {doc_id: name for name, entry in self._files.items() for doc_id in entry[2]}
+            self._persisted_mtime = mtime
+            if self._apply_file_changes():
+                self.persist()
+            self._synced = token
+
+    def _apply_file_changes(self) -> bool:
+        current = {name: (path, st) for name, path, st in list_event_files(self.user_dir)}
+        stale = [name for name in self._files if name not in current]
+        changed = [
+            name for name, (_, st) in current.items()
+            if self._files.get(name, [None, None])[:2] != [st.st_mtime_ns, st.st_size]
+        ]
+        removed: Set[int] = set()
+        for name in stale + changed:
+            entry = self._files.pop(name, None)
+            if entry:
+                removed.update(entry[2])
+        upserts: List[Dict[str, Any]] = []
+        for name in changed:
+            path, st = current[name]
+            try:
+                file_events = [e for e in read_event_file(path) if e.get("id") is not None]
+            except Exception as e:
+                print(f"Failed to load {path}: {e}")
+                continue
+            self._files[name] = [st.st_mtime_ns, st.st_size, [e["id"] for e in file_events]]
+            upserts.extend(file_events)
+        for doc_id in removed - {e["id"] for e in upserts}:
+            self.remove(doc_id)
+        for event in upserts:
+            self.upsert(event)
+        self._id_file = {doc_id: name for name, entry in self._files.items() for doc_id in entry[2]}
+        return bool(stale or changed)
+
+    def refresh(self) -> None:
+        """다른 워커가 뷰를 다시 저장했으면 다시 읽고, 저장 전의 변경이 있으면 바뀐 파일만 다시 읽는다."""
+        if _mtime(agenda_path(self.user_dir)) != self._persisted_mtime:
+            self.load()
+            return
+        if storage_version(self.user_dir) == self._synced:
+            return
+        with self._lock:
+            token = storage_version(self.user_dir)
+            if token != self._synced:
+                if self._apply_file_changes():
+                    self._schedule_persist()
+                self._synced = token
+
+    def persist(self) -> None:
+        with self._lock:
+            data = {
+                "format": FORMAT,
+                "written_at": datetime.now(tz=KST).isoformat(),
+                "files": self._files,
+                "events": {str(doc_id): [start, list(keys)] for doc_id, (start, keys) in self.entries.items()},
+            }
+            path = agenda_path(self.user_dir)
+            atomic_write_json(path, data)
+            self._persisted_mtime = _mtime(path)
+
+    def _schedule_persist(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(AGENDA_PERSIST_DELAY, self._persist_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _persist_in_background(self) -> None:
+        with self._lock:
+            self._timer = None
+        try:
+            self.persist()
+        except Exception as e:
+            print(f"Failed to write agenda view for {self.user_dir}: {e}")
+
+    def apply(self, op: str, event_id: Optional[int], event: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            if op == "delete" and event_id is not None:
+                self.remove(event_id)
+            elif op in ("add", "update") and event is not None:
+                event_id = event.get("id", event_id)
+                self.upsert(event)
+            # 이 이벤트의 파일은 다음 로드 때 다시 확인 (새 파일은 목록에 없으므로 자동으로 읽힘)
+            entry = self._files.get(self._id_file.get(event_id))
+            if entry is not None:
+                entry[0] = entry[1] = -1
+            if self._synced is not None:
+                current = storage_version(self.user_dir)
+                if current[0] == self._synced[0] + 1:
+                    # 이 변경 하나만 있었다: 이미 반영했으므로 파일을 다시 훑지 않는다
+                    self._synced = current
+        self._schedule_persist()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"events": len(self.entries), "days": len(self.days), "weeks": len(self.weeks)}
+
+
+def _mtime(path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+_views: Dict[str, AgendaView] = {}
+_views_lock = threading.Lock()
+
+
+def get_agenda(user_dir: str = "Database/[user]") -> AgendaView:
+    key = user_key(user_dir)
+    with _views_lock:
+        view = _views.get(key)
+        if view is None:
+            view = AgendaView(user_dir)
+            view.load()
+            _views[key] = view
+        return view
+
+
+def _on_mutation(key: str, op: str, event_id: Optional[int], event: Optional[Dict[str, Any]]) -> None:
+    with _views_lock:
+        view = _views.get(key)
+        if view is None:
+            return
+        if op == "reload":
+            del _views[key]
+            return
+    if op not in ("add", "update", "delete"):
+        return
+    view.apply(op, event_id, event)
+
+
+register_mutation_listener(_on_mutation)
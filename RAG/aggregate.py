@@ -0,0 +1,113 @@
+"""
+criteria에 맞는 이벤트를 컬럼형 인덱스(EventIndex) 위에서 NumPy로 집계.
+
+"이번 달 회의에 몇 시간 썼어?", "누구를 가장 자주 만나?" 같은 질문을 LLM이 이벤트 목록을 읽고 세는 대신
+컬럼 연산 몇 번으로 답한다.
+- group_by: week(ISO 주, "2025-W40") / weekday("월"~"일") / month("2025-10") / member / location
+  여러 개를 주면 조합별로 집계한다. member는 참석자마다 한 번씩 센다 (한 이벤트가 여러 그룹에 들어감)
+- metrics: count(이벤트 수) / total_hours(종료 - 시작, 여러 날 일정 포함)
+- 그룹 순서: 시간 축(week/weekday/month)은 시간순, 그 안에서 member/location은 첫 metric 내림차순
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .agenda import week_key
+
+if TYPE_CHECKING:
+    from .event_index import EventIndex
+
+
+GROUP_BY = ("week", "weekday", "month", "member", "location")
+METRICS = ("count", "total_hours")
+_WEEKDAYS = ["월", "화", "수", "목", "금", "토", "일"]
+
+
+def _as_list(value: Union[None, str, Iterable[str]], allowed: Sequence[str], name: str) -> List[str]:
+    values = [value] if isinstance(value, str) else list(value or [])
+    unknown = [v for v in values if v not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown {name}: {', '.join(map(str, unknown))} (supported: {', '.join(allowed)})")
+    return list(dict.fromkeys(values))
+
+
+def _dimension(index: "EventIndex", field: str, arrays: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """(행 위치, 그룹 코드, 그룹 이름). member처럼 한 행이 여러 쌍을 가질 수 있다."""
+    if field in ("member", "location"):
+        return index.tag_pairs(field)
+    rows = np.arange(len(arrays["id"]))
+    if field == "weekday":
+        return rows, arrays["weekday"], _WEEKDAYS
+    if field == "month":
+        uniq, codes = np.unique(arrays["year"] * 12 + arrays["month"] - 1, return_inverse=True)
+        return rows, codes, [f"{v // 12}-{v % 12 + 1:02d}" for v in uniq.tolist()]
+    # week: 날짜별 고유값에만 ISO 주를 계산하고, 같은 주의 날짜들을 한 코드로 합친다
+    uniq, codes = np.unique(arrays["ordinal"], return_inverse=True)
+    label_codes: Dict[str, int] = {}
+    remap = np.array([label_codes.setdefault(week_key(date.fromordinal(o)), len(label_codes)) for o in uniq.tolist()], dtype=np.int64)
+    return rows, remap[codes] if len(remap) else codes, list(label_codes)
+
+
+def aggregate_rows(
+    index: "EventIndex",
+    rows: Optional[np.ndarray],
+    group_by: Union[None, str, Iterable[str]] = None,
+    metrics: Union[None, str, Iterable[str]] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """index의 행 위치 rows(None이면 삭제되지 않은 전체)를 집계. 호출 측이 index 잠금을 잡고 있어야 한다."""
+    group_by = _as_list(group_by, GROUP_BY, "group_by")
+    metrics = _as_list(metrics, METRICS, "metric") or ["count"]
+    arrays = index.columns()
+    if rows is None:
+        rows = index.live_rows()
+    hours = (arrays["finish"] - arrays["epoch"]) / 3600
+
+    def pick(count: int, total_hours: float) -> Dict[str, Any]:
+        values = {"count": count, "total_hours": round(total_hours, 2)}
+        return {metric: values[metric] for metric in metrics}
+
+    result: Dict[str, Any] = {
+        "group_by": group_by,
+        "metrics": metrics,
+        "total": pick(len(rows), float(hours[rows].sum())),
+        "groups": [],
+    }
+    if not group_by:
+        return result
+
+    # 차원마다 (행 위치, 코드) 쌍과 조인해서 조합 코드를 만든다 (여러 값을 가진 행은 값 수만큼 반복)
+    positions, combo = rows, np.zeros(len(rows), dtype=np.int64)
+    dimension_labels: List[List[str]] = []
+    for field in group_by:
+        dim_rows, dim_codes, labels = _dimension(index, field, arrays)
+        order = np.argsort(dim_rows, kind="stable")
+        dim_rows, dim_codes = dim_rows[order], dim_codes[order]
+        starts = np.searchsorted(dim_rows, positions, side="left")
+        counts = np.searchsorted(dim_rows, positions, side="right") - starts
+        offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(int(counts.sum()))
+        positions = np.repeat(positions, counts)
+        combo = np.repeat(combo, counts) * max(len(labels), 1) + dim_codes[offsets]
+        dimension_labels.append(labels)
+
+    codes, inverse = np.unique(combo, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(codes))
+    sums = np.bincount(inverse, weights=hours[positions], minlength=len(codes))
+    ranked = []
+    for code, count, total in zip(codes.tolist(), counts.tolist(), sums.tolist()):
+        key, time_parts = {}, []
+        for field, labels in reversed(list(zip(group_by, dimension_labels))):
+            code, part = divmod(code, len(labels))
+            key[field] = labels[part]
+            if field not in ("member", "location"):
+                time_parts.insert(0, part)
+        group = {**{field: key[field] for field in group_by}, **pick(count, total)}
+        ranked.append(((tuple(time_parts), -group[metrics[0]]), group))
+    ranked.sort(key=lambda item: item[0])
+    groups = [group for _, group in ranked]
+    result["group_count"] = len(groups)
+    result["groups"] = groups[:limit] if limit else groups
+    return result
@@ -0,0 +1,500 @@
+"""
+대규모(공유/팀) 캘린더용 근사 최근접 이웃(ANN) 인덱스: NumPy 기반 IVF-flat.
+
+- k-means 중심(centroid)으로 벡터를 nlist개의 역리스트에 나누고, 검색 시 가까운 nprobe개 리스트만 본다
+- 추가는 가장 가까운 리스트에 append, 삭제는 tombstone 처리 (저장/압축 시 실제로 제거)
+- criteria allow-set 필터를 지원하며, 필터 후 후보가 k개보다 적으면 nprobe를 넓혀 다시 찾는다
+- `.moro/ann/ivf.npz`(베이스) + `.moro/ann/delta.jsonl`(이후 변경 로그)로 디스크에 보존.
+  변경 로그는 모든 프로세스가 같이 쓰고, 베이스에는 반영한 디렉터리 토큰(storage_version)을 적어 둔다
+"""
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .embedding_spec import EmbeddingSpec, active_spec, event_vector
+from .index_hooks import register_mutation_listener, storage_version, user_key
+from .parsing_with_criteria import load_events
+from .state import atomic_write_bytes, state_dir, state_lock
+
+
+def _normalize(vec: Sequence[float]) -> np.ndarray:
+    arr = np.asarray(vec, dtype=np.float32)
+    norm = np.linalg.norm(arr)
+    return arr / norm if norm > 0 else arr
+
+
+def _kmeans(data: np.ndarray, k: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    """구면(spherical) k-means: 내적 기준 할당, 정규화된 평균으로 중심 갱신."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        for c in range(k):
+            members = data[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+            else:
+                # 빈 클러스터는 임의의 점으로 재시작
+                centroids[c] = data[rng.integers(len(data))]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids /= norms
+    return centroids
+
+
+class _InvertedList:
+    """한 클러스터의 (id, 벡터) 배열. 용량을 두 배씩 늘린다."""
+
+    def __init__(self, dim: int):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.size = 0
+
+    def append(self, doc_id: int, vec: np.ndarray) -> None:
+        if self.size >= len(self.ids):
+            capacity = max(8, 2 * len(self.ids))
+            ids = np.zeros(capacity, dtype=np.int64)
+            vectors = np.zeros((capacity, self.vectors.shape[1]), dtype=np.float32)
+            alive = np.zeros(capacity, dtype=bool)
+            ids[: self.size] = self.ids[: self.size]
+            vectors[: self.size] = self.vectors[: self.size]
+            alive[: self.size] = self.alive[: self.size]
+            self.ids, self.vectors, self.alive = ids, vectors, alive
+        self.ids[self.size] = doc_id
+        self.vectors[self.size] = vec
+        self.alive[self.size] = True
+        self.size += 1
+
+
+class IVFFlatIndex:
+    def __init__(self, dim: int, nlist: int = 0, nprobe: int = 8, min_train_size: int = 1024):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[_InvertedList] = [_InvertedList(dim)]
+        self.location: Dict[int, Tuple[int, int]] = {}  # id -> (list, row)
+        self.tombstones = 0  # 삭제/교체되어 죽은 행 수
+        self.spec: Optional[EmbeddingSpec] = None
+        # 이 인덱스가 반영한 디렉터리 상태 (index_hooks.storage_version; 베이스 + 적용한 변경 로그 기준)
+        self.storage: Optional[Tuple[int, int]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.location)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    # ------------------------------------------------------------------ build
+    @classmethod
+    def build(
+        cls,
+        ids: Sequence[int],
+        vectors: np.ndarray,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        min_train_size: int = 1024,
+    ) -> "IVFFlatIndex":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+        index = cls(vectors.shape[1], nlist or 0, nprobe, min_train_size)
+        index._train_and_fill(list(ids), vectors, nlist)
+        return index
+
+    def _train_and_fill(self, ids: List[int], vectors: np.ndarray, nlist: Optional[int] = None) -> None:
+        n = len(ids)
+        self.location = {}
+        self.tombstones = 0
+        if n < self.min_train_size:
+            # 작은 인덱스는 리스트 하나(=flat)로 둔다
+            self.centroids = None
+            self.nlist = 1
+            self.lists = [_InvertedList(self.dim)]
+            for doc_id, vec in zip(ids, vectors):
+                self._append(0, doc_id, vec)
+            return
+        self.nlist = nlist or max(1, int(np.sqrt(n)))
+        sample = vectors
+        if n > self.nlist * 64:
+            sample = vectors[np.random.default_rng(0).choice(n, self.nlist * 64, replace=False)]
+        self.centroids = _kmeans(sample, self.nlist)
+        self.lists = [_InvertedList(self.dim) for _ in range(self.nlist)]
+        assign = np.argmax(vectors @ self.centroids.T, axis=1)
+        for doc_id, vec, c in zip(ids, vectors, assign):
+            self._append(int(c), doc_id, vec)
+
+    def _append(self, list_no: int, doc_id: int, vec: np.ndarray) -> None:
+        inv = self.lists[list_no]
+        self.location[int(doc_id)] = (list_no, inv.size)
+        inv.append(int(doc_id), vec)
+
+    # -------------------------------------------------------------- mutation
+    def add(self, doc_id: int, vector: Sequence[float]) -> bool:
+        if len(vector) != self.dim:
+            return False
+        with self._lock:
+            self.remove(doc_id)
+            vec = _normalize(vector)
+            list_no = 0 if self.centroids is None else int(np.argmax(self.centroids @ vec))
+            self._append(list_no, doc_id, vec)
+            if self.centroids is None and len(self.location) >= self.min_train_size:
+                self.rebuild()
+            return True
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            loc = self.location.pop(doc_id, None)
+            if loc is not None:
+                self.lists[loc[0]].alive[loc[1]] = False
+                self.tombstones += 1
+
+    def _live_items(self) -> Tuple[List[int], np.ndarray]:
+        ids, rows = [], []
+        for doc_id, (list_no, row) in self.location.items():
+            ids.append(doc_id)
+            rows.append(self.lists[list_no].vectors[row])
+        return ids, np.asarray(rows, dtype=np.float32).reshape(len(rows), self.dim)
+
+    def rebuild(self) -> None:
+        """tombstone을 실제로 제거하고 (필요하면) 중심을 다시 학습."""
+        with self._lock:
+            ids, vectors = self._live_items()
+            self._train_and_fill(ids, vectors)
+
+    # ---------------------------------------------------------------- search
+    def _scan(self, list_nos: Iterable[int], q: np.ndarray, allowed: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        all_ids, all_scores = [], []
+        for list_no in list_nos:
+            inv = self.lists[list_no]
+            if inv.size == 0:
+                continue
+            # tombstone 행과 allow-set 밖의 항목 제외
+            keep = inv.alive[: inv.size].copy()
+            if allowed is not None:
+                keep &= np.isin(inv.ids[: inv.size], allowed)
+            all_ids.append(inv.ids[: inv.size][keep])
+            all_scores.append(inv.vectors[: inv.size][keep] @ q)
+        if not all_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return np.concatenate(all_ids), np.concatenate(all_scores)
+
+    def search(
+        self,
+        query: Sequence[float],
+        k: int,
+        allowed_ids: Optional[Set[int]] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        if len(query) != self.dim or k <= 0:
+            return []
+        q = _normalize(query)
+        allowed = None if allowed_ids is None else np.fromiter(allowed_ids, dtype=np.int64, count=len(allowed_ids))
+        with self._lock:
+            if allowed_ids is not None and len(allowed_ids) <= 4 * k:
+                # 허용 집합이 작으면 그 집합만 정확하게 채점
+                rows = [(i, self.location[i]) for i in allowed_ids if i in self.location]
+                if not rows:
+                    return []
+                ids = np.asarray([i for i, _ in rows], dtype=np.int64)
+                vecs = np.asarray([self.lists[l].vectors[r] for _, (l, r) in rows], dtype=np.float32)
+                scores = vecs @ q
+            elif self.centroids is None:
+                ids, scores = self._scan([0], q, allowed)
+            else:
+                order = np.argsort(-(self.centroids @ q))
+                probe = min(self.nlist, nprobe or self.nprobe)
+                ids, scores = self._scan(order[:probe], q, allowed)
+                # 필터 때문에 후보가 부족하면 더 많은 리스트를 탐색
+                while len(ids) < k and probe < self.nlist:
+                    extra = order[probe: probe * 2]
+                    probe += len(extra)
+                    more_ids, more_scores = self._scan(extra, q, allowed)
+                    ids = np.concatenate([ids, more_ids])
+                    scores = np.concatenate([scores, more_scores])
+        if len(ids) == 0:
+            return []
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    # ----------------------------------------------------------- persistence
+    def save(self, path: Path) -> None:
+        with self._lock:
+            ids, vectors = self._live_items()
+            list_nos = np.asarray([self.location[i][0] for i in ids], dtype=np.int32)
+            meta = {
+                "dim": self.dim,
+                "nlist": self.nlist,
+                "nprobe": self.nprobe,
+                "min_train_size": self.min_train_size,
+                "spec": self.spec.to_meta() if self.spec else None,
+                "storage": list(self.storage) if self.storage else None,
+            }
+            import io
+
+            buf = io.BytesIO()
+            np.savez(
+                buf,
+                meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+                centroids=self.centroids if self.centroids is not None else np.zeros((0, self.dim), dtype=np.float32),
+                ids=np.asarray(ids, dtype=np.int64),
+                vectors=vectors,
+                list_nos=list_nos,
+            )
+            atomic_write_bytes(Path(path), buf.getvalue())
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFFlatIndex":
+        with np.load(path) as data:
+            meta = json.loads(bytes(data["meta"]).decode("utf-8"))
+            index = cls(meta["dim"], meta["nlist"], meta["nprobe"], meta["min_train_size"])
+            index.spec = EmbeddingSpec.from_meta(meta.get("spec"))
+            index.storage = tuple(meta["storage"]) if meta.get("storage") else None
+            centroids = data["centroids"]
+            index.centroids = centroids if len(centroids) else None
+            index.lists = [_InvertedList(index.dim) for _ in range(max(1, meta["nlist"]))]
+            for doc_id, vec, list_no in zip(data["ids"], data["vectors"], data["list_nos"]):
+                index._append(int(list_no), int(doc_id), vec)
+        return index
+
+
+# ---------------------------------------------------------------------------
+# 디렉터리별 인덱스 관리 (베이스 스냅샷 + 변경 로그)
+#
+# 변경 로그는 인덱스를 메모리에 올렸는지와 관계없이 모든 프로세스가 notify_mutation마다 한 줄씩 붙인다
+# (`.moro/locks/ann.lock` 안에서). 각 줄에는 그 시점의 storage_version을 적고, 베이스를 읽을 때
+# 베이스 + 변경 로그가 반영한 토큰이 현재 디렉터리 토큰과 다르면(로그 없이 바뀐 파일이 있으면) 새로 만든다.
+# 메모리에 올린 인덱스는 다른 프로세스가 붙인 줄을 다음 요청 때 이어서 적용하고,
+# 베이스가 교체되었으면(압축/재생성) 디스크에서 다시 읽는다.
+
+COMPACT_EVERY = 1000
+_LOCK = "ann"
+
+_indexes: Dict[str, IVFFlatIndex] = {}
+_delta_counts: Dict[str, int] = {}
+# user_key -> (베이스 파일 (inode, mtime_ns, size), 변경 로그에서 적용한 바이트 위치)
+_sources: Dict[str, Tuple[Optional[Tuple[int, int, int]], int]] = {}
+_indexes_lock = threading.Lock()
+
+
+def _paths(user_dir: str) -> Tuple[Path, Path]:
+    base = state_dir(user_dir, "ann")
+    return base / "ivf.npz", base / "delta.jsonl"
+
+
+def _file_sig(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _merge_token(token: Optional[Tuple[int, int]], version: Any, mtime: Any) -> Optional[Tuple[int, int]]:
+    if version is None:
+        return token
+    if token is None:
+        return int(version), int(mtime or 0)
+    return max(token[0], int(version)), max(token[1], int(mtime or 0))
+
+
+def _replay_delta(index: IVFFlatIndex, delta_path: Path, offset: int = 0) -> Tuple[int, int]:
+    """offset 이후의 완전한 줄을 적용. (적용한 줄 수, 다음에 읽을 위치)."""
+    count = 0
+    try:
+        f = open(delta_path, "rb")
+    except FileNotFoundError:
+        return 0, 0
+    with f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                # 쓰다 만 마지막 줄은 다음에 다시 읽는다
+                break
+            offset += len(line)
+            try:
+                op = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if op["op"] == "add":
+                index.add(op["id"], op["vector"])
+            elif op["op"] == "delete":
+                index.remove(op["id"])
+            index.storage = _merge_token(index.storage, op.get("v"), op.get("m"))
+            count += 1
+    return count, offset
+
+
+def _save_base(user_dir: str, index: IVFFlatIndex) -> None:
+    """베이스를 쓰고 변경 로그를 비운다 (ann 잠금 안에서)."""
+    key = user_key(user_dir)
+    base_path, delta_path = _paths(user_dir)
+    index.save(base_path)
+    delta_path.unlink(missing_ok=True)
+    _delta_counts[key] = 0
+    _sources[key] = (_file_sig(base_path), 0)
+
+
+def build_ann_index(user_dir: str = "Database/[user]", **kwargs: Any) -> IVFFlatIndex:
+    """이벤트 파일에서 인덱스를 새로 만들고 베이스로 저장 (변경 로그는 비움)."""
+    with state_lock(user_dir, _LOCK):
+        # 파일을 읽기 전에 잡아 두면, 읽는 도중 바뀐 파일은 다음 로드 때 토큰 불일치로 드러난다
+        storage = storage_version(user_dir)
+        spec = active_spec(user_dir)
+        ids, vectors = [], []
+        for event in load_events(user_dir):
+            vec = event_vector(event, spec)
+            if event.get("id") is not None and vec is not None:
+                ids.append(event["id"])
+                vectors.append(vec)
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), spec.dim)
+        index = IVFFlatIndex.build(ids, matrix, **kwargs)
+        index.spec = spec
+        index.storage = storage
+        _save_base(user_dir, index)
+    return index
+
+
+def _load(user_dir: str) -> IVFFlatIndex:
+    """디스크의 베이스 + 변경 로그를 읽는다. 없거나, 벡터 공간이 다르거나, 로그에 없는 변경이 있었으면 새로 만든다."""
+    key = user_key(user_dir)
+    base_path, delta_path = _paths(user_dir)
+    with state_lock(user_dir, _LOCK):
+        index = None
+        if base_path.exists():
+            try:
+                index = IVFFlatIndex.load(base_path)
+                count, offset = _replay_delta(index, delta_path)
+                current = storage_version(user_dir)
+                if index.spec != active_spec(user_dir):
+                    index = None
+                elif index.storage is None or index.storage[0] != current[0] or index.storage[1] < current[1]:
+                    print(f"ANN index {base_path} is behind {user_dir}; rebuilding")
+                    index = None
+                else:
+                    _delta_counts[key] = count
+                    _sources[key] = (_file_sig(base_path), offset)
+            except Exception as e:
+                print(f"Failed to load ANN index {base_path}: {e}")
+                index = None
+        if index is None:
+            index = build_ann_index(user_dir)
+    return index
+
+
+def get_ann_index(user_dir: str = "Database/[user]") -> IVFFlatIndex:
+    """디렉터리의 공유 인덱스. 다른 프로세스가 그 사이 붙인 변경 로그를 적용하고, 베이스가 바뀌었으면 다시 읽는다."""
+    key = user_key(user_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            base_path, delta_path = _paths(user_dir)
+            sig, offset = _sources.get(key, (None, 0))
+            if _file_sig(base_path) == sig and _file_size(delta_path) == offset:
+                return index
+            with state_lock(user_dir, _LOCK):
+                sig, offset = _sources.get(key, (None, 0))
+                if _file_sig(base_path) == sig:
+                    count, offset = _replay_delta(index, delta_path, offset)
+                    _delta_counts[key] = _delta_counts.get(key, 0) + count
+                    _sources[key] = (sig, offset)
+                    return index
+        index = _indexes[key] = _load(user_dir)
+        return index
+
+
+def install_ann_index(user_dir: str, index: IVFFlatIndex) -> None:
+    """이미 만든 인덱스(재색인 cut-over의 새 공간 인덱스)를 베이스로 저장하고 공유 인덱스로 등록."""
+    key = user_key(user_dir)
+    with _indexes_lock, state_lock(user_dir, _LOCK), index._lock:
+        index.storage = storage_version(user_dir)
+        _save_base(user_dir, index)
+        _indexes[key] = index
+
+
+def compact_ann_index(user_dir: str = "Database/[user]") -> None:
+    """tombstone을 제거하고 베이스를 다시 쓴 뒤 변경 로그를 비운다."""
+    index = get_ann_index(user_dir)
+    with state_lock(user_dir, _LOCK), index._lock:
+        # 다른 프로세스가 붙인 줄까지 반영한 뒤에 비운다
+        key = user_key(user_dir)
+        sig, offset = _sources.get(key, (None, 0))
+        _replay_delta(index, _paths(user_dir)[1], offset)
+        index.rebuild()
+        _save_base(user_dir, index)
+
+
+def _on_mutation(key: str, op: str, event_id: Optional[int], event: Optional[Dict[str, Any]]) -> None:
+    base_path, delta_path = _paths(key)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if op == "reload":
+            # 디렉터리 전체가 바뀌었으므로 (이 프로세스에 올라와 있지 않아도) 다음 요청 때 새로 만든다
+            _indexes.pop(key, None)
+            with state_lock(key, _LOCK):
+                base_path.unlink(missing_ok=True)
+                delta_path.unlink(missing_ok=True)
+            return
+        if op == "spec" and index is not None and index.spec != active_spec(key):
+            # 벡터 공간 전환: 다른 공간의 인덱스는 다음 요청 때 새 공간으로 만든다 (엔진은 새 인덱스를 먼저 설치)
+            del _indexes[key]
+            index = None
+    with state_lock(key, _LOCK):
+        # 베이스를 만드는 중이면 끝날 때까지 기다린다: 그 전에 쓴 파일은 베이스에, 이후 변경은 로그에 들어간다
+        if index is None and not base_path.exists():
+            # 저장된 인덱스가 없으면 처음 만들 때 파일에서 읽는다
+            return
+        spec = index.spec if index is not None else active_spec(key)
+        record: Dict[str, Any] = {"op": "mark"}
+        if op == "delete" and event_id is not None:
+            if index is not None:
+                index.remove(event_id)
+            record = {"op": "delete", "id": event_id}
+        elif op in ("add", "update") and event is not None:
+            doc_id = event.get("id", event_id)
+            vec = event_vector(event, spec) if spec else None
+            if vec is not None and len(vec) == spec.dim:
+                if index is not None:
+                    index.add(doc_id, vec)
+                record = {"op": "add", "id": doc_id, "vector": list(map(float, vec))}
+            else:
+                if index is not None:
+                    index.remove(doc_id)
+                record = {"op": "delete", "id": doc_id}
+        version, mtime = storage_version(key)
+        record.update(v=version, m=mtime)
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        start = _file_size(delta_path)
+        with open(delta_path, "ab") as f:
+            f.write(line)
+        if index is not None:
+            index.storage = _merge_token(index.storage, version, mtime)
+            sig, offset = _sources.get(key, (None, 0))
+            if offset == start and sig == _file_sig(base_path):
+                # 그 사이 다른 프로세스가 붙인 줄이 없으면 방금 쓴 줄은 이미 반영된 것으로 둔다
+                _sources[key] = (sig, start + len(line))
+        count = _delta_counts[key] = _delta_counts.get(key, 0) + 1
+    if index is not None and count >= COMPACT_EVERY:
+        compact_ann_index(key)
+
+
+register_mutation_listener(_on_mutation)
@@ -0,0 +1,481 @@
+"""
+오래된 이벤트 cold tier: 압축 파티션 (`.moro/archive/`).
+
+criteria 스캔, 시작 시 reconcile, `/api/events`가 거의 조회되지 않는 과거 이벤트까지 매번 훑지 않도록
+ARCHIVE_HORIZON_DAYS일보다 전에 끝난 이벤트를 사용자 디렉터리(`*.json`)에서 빼서 압축 파티션으로 옮긴다.
+- 파티션: 시작 월(KST)별 한 파일 (`2024-03.json.zst`, zstandard가 없으면 `.json.gz`), 이벤트 JSON 배열 (벡터 필드 포함)
+- `.moro/archive/index.json`: 파티션별 codec, 시작/종료 범위(epoch), 이벤트 id — 조회는 이 작은 인덱스만 보고 파티션을 고른다
+- 이벤트 로더들은 `<user_dir>/*.json`만 읽으므로 보관된 이벤트는 엔진/인덱스/매니페스트에서 자연히 빠진다
+  (보관 시 id마다 delete를 알린다)
+- 기간이 정해진 criteria(date, year/month, time_window_hours, 그 and/or 조합)의 범위가 파티션과 겹칠 때만
+  해당 파티션을 읽는다 (`criteria_bounds`). 기간이 없는 criteria는 hot 이벤트만 본다
+- 보관된 이벤트의 수정/삭제: eventmanager가 `restore`로 다시 hot 파일로 꺼내거나 `remove`로 파티션에서 지운다
+- 파티션 변경은 `state_lock(user_dir, "archive")`로 프로세스 간 한 번에 하나. hot 파일은 지우기 직전에
+  event_file_lock 안에서 다시 읽어, 그 사이 수정/삭제된 이벤트는 보관하지 않는다 (방금 쓴 보관 사본을 지움)
+- export(`iter_events_in_user`)와 함수형 parse_with_criteria도 보관 이벤트를 합친다 (후자는 기간이 닿을 때만)
+- 파티션을 먼저 쓰고 인덱스를 교체한 뒤 hot 파일을 지우므로, 중간에 멈추면 같은 id가 양쪽에 남을 수 있다
+  (조회는 hot 쪽을 우선하고, 다음 보관 때 정리된다)
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # gzip으로 대체
+    zstandard = None
+
+from .embedding_spec import VECTOR_FIELDS
+from .index_hooks import notify_mutation, user_key
+from .parsing_with_criteria import (
+    KST,
+    _compile_year,
+    _event_window,
+    _matches_month,
+    _matching,
+    _to_datetime,
+)
+from .snapshot import list_event_files, read_event_file
+from .state import atomic_write_bytes, atomic_write_json, event_file_lock, read_json, state_dir, state_lock
+
+
+# 0이면 자동 보관하지 않음 (archive_events에 horizon_days를 직접 주면 실행)
+ARCHIVE_HORIZON_DAYS = int(os.getenv("ARCHIVE_HORIZON_DAYS", "0"))
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "24"))
+ARCHIVE_CODEC = os.getenv("ARCHIVE_CODEC") or ("zstd" if zstandard is not None else "gzip")
+# 최근에 읽은 파티션을 압축 해제된 채로 들고 있는 개수
+ARCHIVE_CACHE_PARTITIONS = int(os.getenv("ARCHIVE_CACHE_PARTITIONS", "12"))
+FORMAT = 1
+
+_SUFFIXES = {"zstd": ".json.zst", "gzip": ".json.gz"}
+
+
+def archive_dir(user_dir: str):
+    return state_dir(user_dir, "archive")
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("ARCHIVE_CODEC=zstd requires the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    raise ValueError(f"Unknown archive codec: {codec}")
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("reading .zst archive partitions requires the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def partition_key(event: Dict[str, Any]) -> str:
+    return _event_window(event)[0].astimezone(KST).strftime("%Y-%m")
+
+
+def _node_bounds(node: Any, reference_time: Any) -> Optional[Tuple[float, float]]:
+    if not isinstance(node, dict):
+        return None
+    reference_time = node.get("reference_time", reference_time)
+    found: List[Tuple[float, float]] = []
+    if node.get("date") is not None:
+        try:
+            day = datetime.strptime(str(node["date"]), "%Y-%m-%d").replace(tzinfo=KST)
+            found.append((day.timestamp(), (day + timedelta(days=1)).timestamp()))
+        except ValueError:
+            pass
+    year = _compile_year(node["year"]) if node.get("year") is not None else None
+    if isinstance(year, int) and 1 <= year < 9999:
+        first, last = 1, 12
+        if node.get("month") is not None:
+            months = [m for m in range(1, 13) if _matches_month(datetime(2000, m, 1), node["month"])]
+            if months:
+                first, last = months[0], months[-1]
+        lo = datetime(year, first, 1, tzinfo=KST)
+        hi = datetime(year + 1, 1, 1, tzinfo=KST) if last == 12 else datetime(year, last + 1, 1, tzinfo=KST)
+        found.append((lo.timestamp(), hi.timestamp()))
+    if node.get("time_window_hours") is not None:
+        ref = _to_datetime(reference_time) if reference_time is not None else datetime.now(tz=KST)
+        span = float(node["time_window_hours"]) * 3600
+        found.append((ref.timestamp() - span, ref.timestamp() + span))
+    for child in node.get("and") or []:
+        bounds = _node_bounds(child, reference_time)
+        if bounds is not None:
+            found.append(bounds)
+    if isinstance(node.get("or"), list) and node["or"]:
+        children = [_node_bounds(child, reference_time) for child in node["or"]]
+        if all(b is not None for b in children):
+            found.append((min(b[0] for b in children), max(b[1] for b in children)))
+    if not found:
+        return None
+    return max(b[0] for b in found), min(b[1] for b in found)
+
+
+def criteria_bounds(criteria: Optional[Dict[str, Any]]) -> Optional[Tuple[float, float]]:
+    """criteria가 허용하는 시작 시각 범위 (epoch, epoch). 기간이 정해지지 않은 criteria는 None.
+
+    `not`은 범위를 좁히지 않으므로 무시한다. 범위가 비면 lo > hi.
+    """
+    if not criteria:
+        return None
+    return _node_bounds(criteria, criteria.get("reference_time"))
+
+
+def merge_archived(events: List[Dict[str, Any]], archived: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """hot 이벤트 목록에 보관 이벤트를 합쳐 시작 시각순으로 (같은 id는 hot 우선, 벡터 필드 제외)."""
+    if not archived:
+        return events
+    seen = {e.get("id") for e in events}
+    extra = [{k: v for k, v in e.items() if k not in VECTOR_FIELDS} for e in archived if e.get("id") not in seen]
+    return sorted(events + extra, key=lambda e: (_event_window(e)[0], str(e.get("id"))))
+
+
+class Archive:
+    """사용자 디렉터리 하나의 보관 파티션 인덱스와 최근 파티션 캐시."""
+
+    def __init__(self, user_dir: str):
+        self.user_dir = user_dir
+        self.key = user_key(user_dir)
+        # 파티션 이름 -> {file, codec, start, end, ids}
+        self.partitions: Dict[str, Dict[str, Any]] = {}
+        self._id_partition: Dict[int, str] = {}
+        self._cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._index_mtime: Optional[int] = None
+        self._lock = threading.RLock()
+        self._counters = {"partition_reads": 0, "cache_hits": 0}
+
+    # ------------------------------------------------------------------ index
+    def _index_path(self):
+        return archive_dir(self.user_dir) / "index.json"
+
+    def refresh(self) -> None:
+        """다른 프로세스가 인덱스를 다시 썼으면 다시 읽는다 (stat 한 번)."""
+        with self._lock:
+            mtime = _mtime(self._index_path())
+            if mtime == self._index_mtime:
+                return
+            saved = read_json(self._index_path())
+            partitions = saved.get("partitions", {}) if isinstance(saved, dict) and saved.get("format") == FORMAT else {}
+            self.partitions = partitions
+            self._id_partition = {doc_id: name for name, meta in partitions.items() for doc_id in meta["ids"]}
+            self._cache.clear()
+            self._index_mtime = mtime
+
+    def _write_index(self) -> None:
+        path = self._index_path()
+        atomic_write_json(path, {
+            "format": FORMAT,
+            "written_at": datetime.now(tz=KST).isoformat(),
+            "partitions": self.partitions,
+        })
+        self._index_mtime = _mtime(path)
+        self._id_partition = {doc_id: name for name, meta in self.partitions.items() for doc_id in meta["ids"]}
+
+    def ids(self) -> set:
+        self.refresh()
+        with self._lock:
+            return set(self._id_partition)
+
+    def __contains__(self, event_id: Any) -> bool:
+        self.refresh()
+        with self._lock:
+            return event_id in self._id_partition
+
+    # ------------------------------------------------------------------ partitions
+    def _read_partition(self, name: str) -> List[Dict[str, Any]]:
+        cached = self._cache.get(name)
+        if cached is not None:
+            self._cache.move_to_end(name)
+            self._counters["cache_hits"] += 1
+            return cached
+        meta = self.partitions[name]
+        with open(archive_dir(self.user_dir) / meta["file"], "rb") as f:
+            events = json.loads(_decompress(f.read(), meta["codec"]).decode("utf-8"))
+        self._counters["partition_reads"] += 1
+        self._cache[name] = events
+        while len(self._cache) > ARCHIVE_CACHE_PARTITIONS:
+            self._cache.popitem(last=False)
+        return events
+
+    def _write_partition(self, name: str, events: List[Dict[str, Any]]) -> None:
+        """파티션을 현재 codec으로 다시 쓴다 (비면 파일과 인덱스 항목을 지움). 인덱스는 호출 측이 쓴다."""
+        old = self.partitions.pop(name, None)
+        self._cache.pop(name, None)
+        if events:
+            events = sorted(events, key=lambda e: (_event_window(e)[0], e["id"]))
+            windows = [_event_window(e) for e in events]
+            meta = {
+                "file": name + _SUFFIXES[ARCHIVE_CODEC],
+                "codec": ARCHIVE_CODEC,
+                "start": min(s.timestamp() for s, _ in windows),
+                "end": max(max(s, f).timestamp() for s, f in windows),
+                "ids": [e["id"] for e in events],
+            }
+            data = json.dumps(events, ensure_ascii=False).encode("utf-8")
+            atomic_write_bytes(archive_dir(self.user_dir) / meta["file"], _compress(data, ARCHIVE_CODEC))
+            self.partitions[name] = meta
+        if old is not None and (not events or old["file"] != self.partitions[name]["file"]):
+            (archive_dir(self.user_dir) / old["file"]).unlink(missing_ok=True)
+
+    def overlapping(self, lo: float, hi: float) -> List[str]:
+        """시작~종료 범위가 [lo, hi]와 겹치는 파티션 이름."""
+        self.refresh()
+        with self._lock:
+            return sorted(name for name, meta in self.partitions.items() if meta["start"] <= hi and meta["end"] >= lo)
+
+    def events_between(self, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """[start, end) 구간에 걸친 보관 이벤트 (시작 시각순)."""
+        lo, hi = start.timestamp(), end.timestamp()
+        found = []
+        with self._lock:
+            for name in self.overlapping(lo, hi):
+                for event in self._read_partition(name):
+                    s, f = _event_window(event)
+                    if s.timestamp() < hi and max(s, f).timestamp() >= lo:
+                        found.append(dict(event))
+        return found
+
+    def days_between(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """start~end(포함, KST 날짜)에 걸친 보관 이벤트."""
+        lo = datetime.combine(start, dt_time(0), tzinfo=KST)
+        return self.events_between(lo, datetime.combine(end, dt_time(0), tzinfo=KST) + timedelta(days=1))
+
+    def match(self, criteria: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """criteria의 기간이 보관 범위에 닿을 때만 해당 파티션을 읽어 매칭 (아니면 빈 목록)."""
+        bounds = criteria_bounds(criteria)
+        if bounds is None or bounds[0] > bounds[1]:
+            return []
+        with self._lock:
+            names = self.overlapping(*bounds)
+            if not names:
+                return []
+            events = [dict(e) for name in names for e in self._read_partition(name)]
+        return _matching(events, criteria)
+
+    def iter_events(self) -> Iterator[Dict[str, Any]]:
+        """모든 보관 이벤트를 파티션 하나씩 (시작 월 순)."""
+        self.refresh()
+        with self._lock:
+            names = sorted(self.partitions)
+        for name in names:
+            with self._lock:
+                events = [dict(e) for e in self._read_partition(name)] if name in self.partitions else []
+            yield from events
+
+    def get(self, event_id: Any) -> Optional[Dict[str, Any]]:
+        self.refresh()
+        with self._lock:
+            name = self._id_partition.get(event_id)
+            if name is None:
+                return None
+            for event in self._read_partition(name):
+                if event.get("id") == event_id:
+                    return dict(event)
+        return None
+
+    # ------------------------------------------------------------------ moves
+    def archive(self, horizon_days: Optional[int] = None, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """horizon_days일 전보다 먼저 끝난 hot 이벤트를 파티션으로 옮긴다."""
+        horizon_days = ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+        summary: Dict[str, Any] = {"archived": 0, "files_removed": 0, "files_rewritten": 0, "partitions": []}
+        if horizon_days <= 0:
+            return summary
+        cutoff = (now or datetime.now(tz=KST)) - timedelta(days=horizon_days)
+        summary["cutoff"] = cutoff.isoformat()
+        # 보관 잠금(프로세스 간)은 끝까지, 메모리 잠금은 파티션을 쓰는 동안만: 알림은 엔진 잠금을 잡으므로
+        # 엔진 -> 보관 조회 순서와 엇갈리지 않게 메모리 잠금 밖에서 보낸다
+        with state_lock(self.user_dir, "archive"):
+            with self._lock:
+                self.refresh()
+                moves: List[Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]]]] = []
+                by_partition: Dict[str, List[Dict[str, Any]]] = {}
+                for _, path, _ in list_event_files(self.user_dir):
+                    try:
+                        events = read_event_file(path)
+                    except Exception as e:
+                        print(f"Failed to load {path}: {e}")
+                        continue
+                    old, keep = [], []
+                    for event in events:
+                        try:
+                            start, finish = _event_window(event)
+                            expired = event.get("id") is not None and max(start, finish) < cutoff
+                        except (KeyError, TypeError, ValueError):
+                            expired = False
+                        (old if expired else keep).append(event)
+                    if not old:
+                        continue
+                    moves.append((path, old, keep))
+                    for event in old:
+                        by_partition.setdefault(partition_key(event), []).append(event)
+                if not moves:
+                    return summary
+
+                # 1) 파티션 + 인덱스를 먼저 쓴다
+                for name, events in sorted(by_partition.items()):
+                    merged = {e["id"]: e for e in (self._read_partition(name) if name in self.partitions else [])}
+                    for event in events:
+                        other = self._id_partition.get(event["id"])
+                        if other is not None and other != name:
+                            # 다른 달로 옮겨진(수정 후 다시 보관된) 이벤트는 예전 파티션에서 뺀다
+                            self._write_partition(other, [e for e in self._read_partition(other) if e["id"] != event["id"]])
+                        merged[event["id"]] = event
+                    self._write_partition(name, list(merged.values()))
+                    summary["partitions"].append(name)
+                self._write_index()
+
+            # 2) hot 파일에서 뺀다: 파일 잠금 안에서 다시 읽어, 읽은 뒤에 수정/삭제된 이벤트는 보관하지 않는다
+            changed = []
+            for path, old, _ in moves:
+                with event_file_lock(path):
+                    try:
+                        current = read_event_file(path)
+                    except FileNotFoundError:
+                        current = []
+                    except Exception as e:
+                        print(f"Failed to load {path}: {e}")
+                        changed.extend(event["id"] for event in old)
+                        continue
+                    archived = {e["id"]: e for e in old}
+                    moved = [e["id"] for e in current if archived.get(e.get("id")) == e]
+                    changed.extend(set(archived) - set(moved))
+                    if not moved:
+                        continue
+                    keep = [e for e in current if e.get("id") not in moved]
+                    if keep:
+                        atomic_write_bytes(path, json.dumps(keep, ensure_ascii=False, indent=2).encode("utf-8"))
+                        summary["files_rewritten"] += 1
+                    else:
+                        os.unlink(path)
+                        summary["files_removed"] += 1
+                    summary["archived"] += len(moved)
+                    for doc_id in moved:
+                        notify_mutation(self.user_dir, "delete", doc_id)
+            if changed:
+                # 최신 내용은 hot 파일(또는 삭제)에 있으므로 방금 쓴 보관 사본을 지운다
+                self.remove(changed)
+                summary["skipped_changed"] = len(changed)
+        return summary
+
+    def remove(self, ids: Iterable[Any]) -> List[Any]:
+        """보관된 이벤트를 지우고 (파티션에서 빠진) id 목록을 반환."""
+        removed = []
+        with state_lock(self.user_dir, "archive"), self._lock:
+            self.refresh()
+            by_partition: Dict[str, set] = {}
+            for doc_id in ids:
+                name = self._id_partition.get(doc_id)
+                if name is not None:
+                    by_partition.setdefault(name, set()).add(doc_id)
+            for name, wanted in by_partition.items():
+                events = self._read_partition(name)
+                removed.extend(e["id"] for e in events if e["id"] in wanted)
+                self._write_partition(name, [e for e in events if e["id"] not in wanted])
+            if by_partition:
+                self._write_index()
+        return removed
+
+    def restore(self, ids: Iterable[Any], zero_pad: int = 4) -> List[Any]:
+        """보관된 이벤트를 다시 `<id>.json` hot 파일로 꺼낸다 (수정하기 전에 호출)."""
+        restored = []
+        with state_lock(self.user_dir, "archive"):
+            with self._lock:
+                self.refresh()
+                found = {}
+                for doc_id in ids:
+                    name = self._id_partition.get(doc_id)
+                    for event in (self._read_partition(name) if name is not None else ()):
+                        if event["id"] == doc_id:
+                            found[doc_id] = event
+            for doc_id, event in found.items():
+                path = os.path.join(self.user_dir, f"{doc_id:0{zero_pad}d}.json")
+                with event_file_lock(path):
+                    atomic_write_bytes(path, json.dumps(event, ensure_ascii=False, indent=2).encode("utf-8"))
+                    notify_mutation(self.user_dir, "add", doc_id, event)
+                restored.append(doc_id)
+            self.remove(restored)
+        return restored
+
+    def stats(self) -> Dict[str, Any]:
+        self.refresh()
+        with self._lock:
+            directory = archive_dir(self.user_dir)
+            return {
+                "partitions": len(self.partitions),
+                "events": len(self._id_partition),
+                "compressed_bytes": sum(_size(directory / meta["file"]) for meta in self.partitions.values()),
+                "codec": ARCHIVE_CODEC,
+                "horizon_days": ARCHIVE_HORIZON_DAYS,
+                "cached_partitions": len(self._cache),
+                **self._counters,
+            }
+
+
+def _mtime(path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _size(path) -> int:
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+_archives: Dict[str, Archive] = {}
+_archives_lock = threading.Lock()
+_archivers: Dict[str, threading.Thread] = {}
+
+
+def get_archive(user_dir: str = "Database/[user]") -> Archive:
+    key = user_key(user_dir)
+    with _archives_lock:
+        archive = _archives.get(key)
+        if archive is None:
+            archive = Archive(user_dir)
+            _archives[key] = archive
+        return archive
+
+
+def archive_events(user_dir: str = "Database/[user]", horizon_days: Optional[int] = None, now: Optional[datetime] = None) -> Dict[str, Any]:
+    summary = get_archive(user_dir).archive(horizon_days, now)
+    if summary["archived"]:
+        print(f"Archived {summary['archived']} events into {len(summary['partitions'])} partitions ({user_dir})")
+    return summary
+
+
+def start_archiver(user_dir: str = "Database/[user]") -> Optional[threading.Thread]:
+    """ARCHIVE_HORIZON_DAYS > 0이면 지금 한 번, 이후 ARCHIVE_INTERVAL_HOURS마다 보관하는 백그라운드 스레드."""
+    if ARCHIVE_HORIZON_DAYS <= 0:
+        return None
+    key = user_key(user_dir)
+
+    def run() -> None:
+        while True:
+            try:
+                archive_events(user_dir)
+            except Exception as e:
+                print(f"Archive job failed for {user_dir}: {e}")
+            time.sleep(ARCHIVE_INTERVAL_HOURS * 3600)
+
+    with _archives_lock:
+        job = _archivers.get(key)
+        if job is not None and job.is_alive():
+            return job
+        job = threading.Thread(target=run, name="archiver", daemon=True)
+        _archivers[key] = job
+        job.start()
+        return job
@@ -0,0 +1,99 @@
+"""
+중첩 boolean criteria (and / or / not)를 값별 bitmap으로 평가.
+
+일반 criteria dict에 다음 키를 더 쓸 수 있다. 같은 dict 안의 필드/연산자는 모두 AND.
+- "and": [criteria, ...]  모두 만족
+- "or": [criteria, ...]   하나라도 만족
+- "not": criteria         만족하지 않음
+- member / location (+ _prefix) 조건은 EventIndex의 역색인에서 값별 bitmap을 만든다
+- title은 제목 trigram 색인(title_index)의 퍼지 매칭 결과로 bitmap을 만든다
+nearest_n / sort_by는 최상위에서만 쓸 수 있다 (최종 결과 집합에 적용).
+
+예) 월요일 또는 수요일 저녁(18~21시), 단 10월 제외
+    {"or": [{"weekday": "월"}, {"weekday": "수"}],
+     "and": [{"or": [{"hour": 18}, {"hour": 19}, {"hour": 20}, {"hour": 21}]}],
+     "not": {"month": 10}}
+
+EventIndex의 행 순서를 비트 위치로 쓰는 Python 정수 bitset으로 계산한다.
+값별 bitmap은 EventIndex가 캐시하고, 조합은 &, |, ^ (C에서 워드 단위 연산)만 사용한다.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Mapping
+
+import numpy as np
+
+from .parsing_with_criteria import _tag_values
+
+if TYPE_CHECKING:
+    from .event_index import EventIndex
+
+
+BOOLEAN_KEYS = ("and", "or", "not")
+TAG_FIELDS = ("member", "location", "member_prefix", "location_prefix")
+TOP_LEVEL_ONLY = ("nearest_n", "sort_by")
+EXPRESSION_KEYS = set(BOOLEAN_KEYS) | set(TAG_FIELDS) | {"title"}
+
+
+def is_expression(criteria: Mapping[str, Any]) -> bool:
+    """boolean 조합이나 member/location/title 조건이 있어 인덱스(bitmap/역색인)로 평가할 criteria인지."""
+    return any(criteria.get(key) is not None for key in EXPRESSION_KEYS)
+
+
+def to_bitmap(mask: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def to_rows(bits: int, n: int) -> np.ndarray:
+    if n == 0 or not bits:
+        return np.zeros(0, dtype=np.int64)
+    raw = np.frombuffer(bits.to_bytes((n + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little", count=n))
+
+
+def popcount(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+def evaluate(index: "EventIndex", node: Dict[str, Any], reference_time: Any = None, top: bool = True) -> int:
+    """criteria 노드를 bitset으로 평가 (호출 측이 index 잠금을 잡고 있어야 한다)."""
+    if not isinstance(node, dict):
+        raise ValueError(f"criteria must be an object: {node!r}")
+    # 삭제(tombstone)된 행을 뺀 전체 집합: not의 여집합도 살아 있는 행 안에서만
+    full = index.live_bitmap()
+    bits = full
+    # 하위 노드의 reference_time은 그 노드와 자식에만 적용
+    reference_time = node.get("reference_time", reference_time)
+    for field, value in node.items():
+        if value is None or field == "reference_time":
+            continue
+        if field in ("and", "or"):
+            if not isinstance(value, list) or not value:
+                raise ValueError(f"'{field}' needs a non-empty list of criteria")
+            if field == "and":
+                for child in value:
+                    bits &= evaluate(index, child, reference_time, top=False)
+            else:
+                any_bits = 0
+                for child in value:
+                    any_bits |= evaluate(index, child, reference_time, top=False)
+                bits &= any_bits
+        elif field == "not":
+            bits &= full ^ evaluate(index, value, reference_time, top=False)
+        elif field == "time_window_hours":
+            bits &= index.window_bitmap(reference_time, float(value))
+        elif field in TAG_FIELDS:
+            for tag in _tag_values(field, value):
+                bits &= index.tag_bitmap(field.split("_")[0], tag, prefix=field.endswith("_prefix"))
+        elif field == "title":
+            if not isinstance(value, str):
+                raise ValueError(f"title must be a string: {value!r}")
+            bits &= index.title_bitmap(value)
+        elif field in index.BITMAP_FIELDS:
+            bits &= index.value_bitmap(field, value)
+        elif field in TOP_LEVEL_ONLY:
+            if not top:
+                raise ValueError(f"'{field}' can only be used at the top level of criteria")
+        else:
+            raise ValueError(f"Unknown criteria field: {field}")
+    return bits
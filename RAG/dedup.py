@@ -0,0 +1,287 @@
+"""
+임베딩 기반 중복 이벤트 탐지/병합 (가져오기 후 단계).
+
+`sync_from_google`은 local_id가 없는 구글 이벤트마다 임의 id를 새로 만들기 때문에 동기화/가져오기를
+반복하면 같은 일정이 여러 번 쌓인다. 중복은 모든 스캔과 검색을 부풀리므로 가져오기 직후 한 번 정리한다.
+
+- blocking: 시작 시각을 DEDUP_WINDOW_MINUTES(기본 15분) 단위 버킷으로 나누고, 버킷 b는 b와 b+1의 이벤트와만 비교
+  (시작 시각 차이가 window 이하인 쌍은 빠짐없이 한 블록에서 만난다)
+- 블록마다 정규화된 임베딩 행렬 곱 한 번으로 코사인 유사도를 구하고 DEDUP_THRESHOLD(기본 0.97) 이상인 쌍을 union-find로 묶는다
+- 벡터는 활성 공간(embedding_spec)의 저장된 벡터를 쓰고, 없거나 낡은 이벤트만 한 번에 임베딩한다
+- 병합: 묶음마다 가장 작은 id를 남기고, 비어 있는 필드는 중복에서 채우고 member는 합친다. 나머지는 파일에서 지운다
+- DEDUP_ON_IMPORT: report(기본) / merge / off — 병합은 파일을 지우므로 명시적으로 켤 때만.
+  dedup_after_import가 가져오기 파이프라인에서 사용
+"""
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .embedding_queue import enqueue_embedding
+from .embedding_spec import (
+    EmbeddingSpec,
+    active_spec,
+    configured_spec,
+    drop_event_vectors,
+    event_vector,
+    vector_is_stale,
+)
+from .index_hooks import notify_mutation
+from .parsing_with_criteria import _event_window
+from .snapshot import list_event_files, read_event_file
+from .state import atomic_write_json, event_file_lock
+
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.97"))
+DEDUP_WINDOW_MINUTES = float(os.getenv("DEDUP_WINDOW_MINUTES", "15"))
+DEDUP_ON_IMPORT = os.getenv("DEDUP_ON_IMPORT", "report")
+
+
+def _event_text(event: Dict[str, Any]) -> str:
+    from .parsing_with_content import _concat_event_fields
+
+    return _concat_event_fields(event)
+
+
+def _vectors(events: List[Dict[str, Any]], spec: EmbeddingSpec) -> np.ndarray:
+    """이벤트별 정규화된 벡터 행렬 (저장된 벡터가 없거나 낡은 이벤트만 배치 임베딩)."""
+    matrix = np.zeros((len(events), spec.dim), dtype=np.float32)
+    missing = []
+    for row, event in enumerate(events):
+        vec = event_vector(event, spec)
+        if vec is not None and not vector_is_stale(event):
+            matrix[row] = vec
+        else:
+            missing.append(row)
+    if missing:
+        from .embedding_pool import get_executor
+
+        embedded = get_executor(spec.backend()).embed_texts([_event_text(events[row]) for row in missing])
+        matrix[missing] = np.asarray(embedded, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1)
+
+
+def find_duplicates(
+    events: List[Dict[str, Any]],
+    threshold: Optional[float] = None,
+    window_minutes: Optional[float] = None,
+    only_ids: Optional[Iterable[Any]] = None,
+    spec: Optional[EmbeddingSpec] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """중복 묶음 목록과 (블록 수, 비교한 쌍 수) 통계.
+
+    only_ids를 주면 그 이벤트가 들어 있는 블록만 비교하고, 그 이벤트가 포함된 쌍만 중복으로 본다
+    (가져오기 직후 새로 들어온 이벤트만 확인할 때).
+    묶음: {"keep": id, "duplicates": [id...], "similarity": 묶음 안 최소 유사도, "title", "date_start"}
+    """
+    threshold = DEDUP_THRESHOLD if threshold is None else threshold
+    window = (DEDUP_WINDOW_MINUTES if window_minutes is None else window_minutes) * 60
+    spec = spec or configured_spec()
+    rows = []
+    for event in events:
+        try:
+            rows.append((_event_window(event)[0].timestamp(), event))
+        except (KeyError, TypeError, ValueError):
+            continue
+    rows = [r for r in rows if r[1].get("id") is not None]
+    rows.sort(key=lambda r: r[0])
+    stats = {"blocks": 0, "compared_pairs": 0}
+    if len(rows) < 2:
+        return [], stats
+    starts = np.array([s for s, _ in rows], dtype=np.float64)
+    buckets = np.floor(starts / max(window, 1)).astype(np.int64)
+    ordered = [e for _, e in rows]
+
+    only = set(only_ids) if only_ids is not None else None
+    if only is not None:
+        touched = {int(b) for b, e in zip(buckets, ordered) if e["id"] in only}
+        blocks = sorted(touched | {b - 1 for b in touched})
+        needed = np.isin(buckets, sorted(touched | {b - 1 for b in touched} | {b + 1 for b in touched}))
+    else:
+        blocks = np.unique(buckets).tolist()
+        needed = np.ones(len(ordered), dtype=bool)
+    if not blocks:
+        return [], stats
+
+    # 필요한 행의 벡터만 만든다
+    positions = np.flatnonzero(needed)
+    matrix = np.zeros((len(ordered), spec.dim), dtype=np.float32)
+    matrix[positions] = _vectors([ordered[p] for p in positions], spec)
+
+    parent = list(range(len(ordered)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    scores: Dict[int, float] = {}
+    for block in blocks:
+        a_lo, a_hi = np.searchsorted(buckets, [block, block + 1])
+        b_hi = np.searchsorted(buckets, block + 2)
+        if a_hi <= a_lo or b_hi - a_lo < 2:
+            continue
+        stats["blocks"] += 1
+        a = np.arange(a_lo, a_hi)
+        b = np.arange(a_lo, b_hi)
+        sims = matrix[a] @ matrix[b].T
+        stats["compared_pairs"] += int(sims.size)
+        hit = (sims >= threshold) & (b[None, :] > a[:, None]) & (np.abs(starts[b][None, :] - starts[a][:, None]) <= window)
+        for i, j in zip(*np.nonzero(hit)):
+            x, y = int(a[i]), int(b[j])
+            if only is not None and ordered[x]["id"] not in only and ordered[y]["id"] not in only:
+                continue
+            root_x, root_y = find(x), find(y)
+            # 묶음 점수 = 묶음 안 쌍들의 최소 유사도
+            score = min(float(sims[i, j]), scores.pop(root_x, 1.0), scores.pop(root_y, 1.0))
+            parent[root_y] = root_x
+            scores[root_x] = score
+
+    groups: Dict[int, List[int]] = {}
+    for row in range(len(ordered)):
+        root = find(row)
+        if root in scores:
+            groups.setdefault(root, []).append(row)
+    clusters = []
+    for root, members in groups.items():
+        events_in = sorted((ordered[m] for m in members), key=lambda e: _id_order(e["id"]))
+        keep = events_in[0]
+        clusters.append({
+            "keep": keep["id"],
+            "duplicates": [e["id"] for e in events_in[1:]],
+            "similarity": round(scores[root], 4),
+            "title": keep.get("title"),
+            "date_start": keep.get("date_start"),
+        })
+    clusters.sort(key=lambda c: (str(c["date_start"]), _id_order(c["keep"])))
+    return clusters, stats
+
+
+def _id_order(doc_id: Any) -> Tuple[int, Any]:
+    # 정수 id를 먼저, 작은 id(로컬에서 만든 이벤트)를 남긴다
+    return (0, doc_id) if isinstance(doc_id, int) else (1, str(doc_id))
+
+
+def _members(value: Any) -> List[Any]:
+    """member 필드를 목록으로 (문자열 하나로 저장된 이벤트도 있다)."""
+    if value in (None, ""):
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def merge_event(keep: Dict[str, Any], duplicates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """keep의 빈 필드를 중복에서 채우고 member를 합친 사본."""
+    merged = dict(keep)
+    for dup in duplicates:
+        for field, value in dup.items():
+            if field == "id" or field.startswith("embedding"):
+                continue
+            if field == "member":
+                members = _members(merged.get("member"))
+                members.extend(m for m in _members(value) if m not in members)
+                merged["member"] = members
+            elif merged.get(field) in (None, "", []) and value not in (None, "", []):
+                merged[field] = value
+    return merged
+
+
+def dedup_events(
+    user_dir: str = "Database/[user]",
+    merge: bool = False,
+    only_ids: Optional[Iterable[Any]] = None,
+    threshold: Optional[float] = None,
+    window_minutes: Optional[float] = None,
+) -> Dict[str, Any]:
+    """user_dir의 중복 이벤트를 찾아 보고하고, merge=True면 병합해서 파일에 반영."""
+    started = time.perf_counter()
+    by_id: Dict[Any, Dict[str, Any]] = {}
+    paths: Dict[Any, str] = {}
+    for _, path, _ in list_event_files(user_dir):
+        try:
+            file_events = read_event_file(path)
+        except Exception as e:
+            print(f"Failed to load {path}: {e}")
+            continue
+        for event in file_events:
+            if event.get("id") is not None:
+                by_id[event["id"]] = event
+                paths[event["id"]] = path
+    spec = active_spec(user_dir)
+    clusters, stats = find_duplicates(list(by_id.values()), threshold, window_minutes, only_ids, spec)
+    report = {
+        "events": len(by_id),
+        "clusters": clusters,
+        "duplicates": sum(len(c["duplicates"]) for c in clusters),
+        "merged": 0,
+        **stats,
+    }
+    if merge and clusters:
+        report["merged"] = _apply_merges(user_dir, clusters, by_id, paths)
+    report["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+
+def _apply_merges(user_dir: str, clusters: List[Dict[str, Any]], by_id: Dict[Any, Dict[str, Any]], paths: Dict[Any, str]) -> int:
+    # 파일별로 (id -> 새 이벤트 또는 None=삭제) 변경을 모아 파일마다 한 번만 쓴다
+    edits: Dict[str, Dict[Any, Optional[Dict[str, Any]]]] = {}
+    reembed, removed = [], []
+    for cluster in clusters:
+        keep = by_id[cluster["keep"]]
+        merged = merge_event(keep, [by_id[d] for d in cluster["duplicates"]])
+        if merged != keep:
+            if _event_text(merged) != _event_text(keep):
+                drop_event_vectors(merged)
+                reembed.append(merged["id"])
+            edits.setdefault(paths[keep["id"]], {})[keep["id"]] = merged
+        for dup in cluster["duplicates"]:
+            edits.setdefault(paths[dup], {})[dup] = None
+            removed.append(dup)
+    applied = set()
+    for path, changes in edits.items():
+        with event_file_lock(path):
+            try:
+                events = read_event_file(path)
+            except FileNotFoundError:
+                continue
+            # 스캔한 뒤 다른 곳에서 수정된 이벤트는 건드리지 않는다
+            changes = {doc_id: new for doc_id, new in changes.items() if any(e == by_id[doc_id] for e in events)}
+            if not changes:
+                continue
+            single = len(events) == 1 and not _is_list_file(path)
+            kept = [changes[e.get("id")] if e.get("id") in changes else e for e in events]
+            kept = [e for e in kept if e is not None]
+            if not kept:
+                os.unlink(path)
+            else:
+                atomic_write_json(path, kept[0] if single else kept)
+            for doc_id, new in changes.items():
+                notify_mutation(user_dir, "update" if new is not None else "delete", doc_id, new)
+            applied.update(changes)
+    for doc_id in reembed:
+        if doc_id in applied:
+            enqueue_embedding(user_dir, doc_id, paths[doc_id])
+    return sum(1 for doc_id in removed if doc_id in applied)
+
+
+def _is_list_file(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(64).lstrip().startswith(b"[")
+
+
+def dedup_after_import(user_dir: str = "Database/[user]", imported_ids: Optional[Iterable[Any]] = None) -> Optional[Dict[str, Any]]:
+    """가져오기 파이프라인의 마지막 단계: 새로 들어온 이벤트가 있는 블록만 비교 (DEDUP_ON_IMPORT에 따라 병합/보고)."""
+    if DEDUP_ON_IMPORT == "off":
+        return None
+    imported_ids = list(imported_ids) if imported_ids is not None else None
+    if imported_ids is not None and not imported_ids:
+        return None
+    report = dedup_events(user_dir, merge=DEDUP_ON_IMPORT == "merge", only_ids=imported_ids)
+    if report["duplicates"]:
+        action = "병합" if report["merged"] else "발견"
+        print(f"🔁 중복 이벤트 {report['duplicates']}개 {action} ({len(report['clusters'])}개 묶음, {report['ms']}ms)")
+    return report
@@ -0,0 +1,213 @@
+"""
+임베딩 백엔드 인터페이스와 구현체.
+
+- OpenAIEmbeddingBackend: langchain_openai.OpenAIEmbeddings 래퍼 (첫 사용 시 클라이언트 생성)
+- HashingEmbeddingBackend: 네트워크 없이 CPU에서 동작하는 문자 n-gram 해싱 벡터
+
+EMBEDDING_BACKEND 환경 변수(openai|local)로 선택하고,
+EMBEDDING_DIMENSIONS로 출력 차원을 줄일 수 있다 (text-embedding-3-* 의 shortened embeddings).
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+DEFAULT_OPENAI_MODEL = "text-embedding-3-small"
+# 모델별 기본(최대) 출력 차원
+NATIVE_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+class EmbeddingBackend:
+    """임베딩 백엔드 공통 인터페이스."""
+
+    name: str = "base"
+    model: str = ""
+    dimensions: int = 0
+    # 원격 API처럼 RPM/TPM 제한이 있는 백엔드인지 여부
+    rate_limited: bool = False
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    name = "openai"
+    rate_limited = True
+
+    def __init__(self, model: str = DEFAULT_OPENAI_MODEL, dimensions: Optional[int] = None):
+        self.model = model
+        self.dimensions = dimensions or NATIVE_DIMENSIONS.get(model, 1536)
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from dotenv import load_dotenv
+                    from langchain_openai import OpenAIEmbeddings
+
+                    load_dotenv()
+                    kwargs = {}
+                    if self.dimensions != NATIVE_DIMENSIONS.get(self.model):
+                        kwargs["dimensions"] = self.dimensions
+                    self._client = OpenAIEmbeddings(model=self.model, **kwargs)
+        return self._client
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed_query(text)
+
+
+def _char_ngrams(text: str, ngram_range: Tuple[int, int]) -> List[str]:
+    text = " ".join(text.lower().split())
+    grams = []
+    lo, hi = ngram_range
+    for n in range(lo, hi + 1):
+        for i in range(len(text) - n + 1):
+            gram = text[i:i + n]
+            if not gram.isspace():
+                grams.append(gram)
+    return grams
+
+
+def _hash_embed(text: str, dim: int, ngram_range: Tuple[int, int]) -> List[float]:
+    """signed feature hashing 후 L2 정규화. crc32를 써서 프로세스/재시작 간에도 결과가 같다."""
+    vec = [0.0] * dim
+    for gram in _char_ngrams(text, ngram_range):
+        h = zlib.crc32(gram.encode("utf-8"))
+        sign = 1.0 if (h >> 31) & 1 else -1.0
+        vec[h % dim] += sign
+    norm = math.sqrt(sum(v * v for v in vec))
+    if norm > 0:
+        vec = [v / norm for v in vec]
+    return vec
+
+
+def _hash_embed_chunk(args: Tuple[Sequence[str], int, Tuple[int, int]]) -> List[List[float]]:
+    texts, dim, ngram_range = args
+    return [_hash_embed(t, dim, ngram_range) for t in texts]
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """문자 n-gram 해싱 임베딩. 대량 색인 시에는 프로세스 풀로 나눠 계산한다 (풀은 처음 필요할 때 만들어 재사용)."""
+
+    name = "local"
+
+    def __init__(
+        self,
+        dim: int = 512,
+        ngram_range: Tuple[int, int] = (1, 3),
+        processes: Optional[int] = None,
+        parallel_threshold: int = 512,
+        chunk_size: int = 256,
+    ):
+        self.dim = dim
+        self.dimensions = dim
+        self.ngram_range = ngram_range
+        self.processes = processes
+        self.parallel_threshold = parallel_threshold
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def model(self) -> str:
+        return f"hash-ngram-{self.ngram_range[0]}-{self.ngram_range[1]}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if len(texts) < self.parallel_threshold:
+            return _hash_embed_chunk((texts, self.dim, self.ngram_range))
+        chunks = [
+            (texts[i:i + self.chunk_size], self.dim, self.ngram_range)
+            for i in range(0, len(texts), self.chunk_size)
+        ]
+        from concurrent.futures.process import BrokenProcessPool
+
+        vectors: List[List[float]] = []
+        try:
+            for part in self._process_pool().map(_hash_embed_chunk, chunks):
+                vectors.extend(part)
+        except BrokenProcessPool:
+            # 워커가 죽어 깨진 풀은 버린다: 다음 호출이 새로 만든다
+            self.close()
+            raise
+        return vectors
+
+    def _process_pool(self):
+        from concurrent.futures import ProcessPoolExecutor
+
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes)
+            return self._pool
+
+    def close(self) -> None:
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+
+_backend: Optional[EmbeddingBackend] = None
+_backend_lock = threading.Lock()
+_spec_backends: Dict[Tuple[str, int], EmbeddingBackend] = {}
+
+
+def create_embedding_backend(name: Optional[str] = None, dimensions: Optional[int] = None) -> EmbeddingBackend:
+    """설정 이름으로 백엔드를 생성. name/dimensions가 없으면 환경 변수를 사용."""
+    name = (name or os.getenv("EMBEDDING_BACKEND", "openai")).strip().lower()
+    if dimensions is None and os.getenv("EMBEDDING_DIMENSIONS"):
+        dimensions = int(os.getenv("EMBEDDING_DIMENSIONS"))
+    if name == "openai":
+        return OpenAIEmbeddingBackend(model=os.getenv("EMBEDDING_MODEL", DEFAULT_OPENAI_MODEL), dimensions=dimensions)
+    if name in ("local", "hash", "hashing"):
+        return HashingEmbeddingBackend(dim=dimensions or int(os.getenv("LOCAL_EMBEDDING_DIM", "512")))
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+def backend_for(model: str, dimensions: int) -> EmbeddingBackend:
+    """저장된 벡터의 (model, dimensions)와 같은 공간의 벡터를 만드는 백엔드."""
+    default = get_embedding_backend()
+    if default.model == model and default.dimensions == dimensions:
+        return default
+    key = (model, dimensions)
+    with _backend_lock:
+        backend = _spec_backends.get(key)
+        if backend is None:
+            if model.startswith("hash-ngram"):
+                backend = HashingEmbeddingBackend(dim=dimensions)
+            else:
+                backend = OpenAIEmbeddingBackend(model=model, dimensions=dimensions)
+            _spec_backends[key] = backend
+        return backend
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """프로세스 단위 공용 백엔드 (첫 호출 시 생성)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_embedding_backend()
+        return _backend
+
+
+def set_embedding_backend(backend: EmbeddingBackend) -> None:
+    """테스트/벤치마크에서 공용 백엔드를 교체할 때 사용."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,189 @@
+"""
+임베딩 요청용 동시성 워커 풀.
+
+- ThreadPoolExecutor 기반의 bounded concurrency
+- OpenAI RPM/TPM 한도에 맞춘 토큰 버킷 리미터
+- 429/5xx 응답에 대한 jittered exponential backoff 재시도
+- 동일 텍스트의 in-flight 요청을 하나로 합치는 singleflight
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _estimate_tokens(text: str) -> int:
+    """TPM 계산용 보수적 토큰 추정치 (한글은 대략 글자당 1토큰 이상)."""
+    return max(1, len(text))
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # 상태 코드가 없는 연결/타임아웃 오류는 재시도
+    name = type(exc).__name__
+    return name in ("APIConnectionError", "APITimeoutError", "Timeout", "ConnectionError", "TimeoutError")
+
+
+class TokenBucket:
+    """분당 한도(per_minute)를 초당 보충량으로 나눠 적용하는 토큰 버킷."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> None:
+        # 버킷 용량보다 큰 요청은 용량만큼만 기다린 뒤 통과시킨다
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class EmbeddingExecutor:
+    """텍스트 리스트를 배치로 나눠 제한된 동시성으로 임베딩한다.
+
+    embed_batch_fn: 텍스트 리스트를 받아 같은 순서의 벡터 리스트를 반환하는 함수
+    """
+
+    def __init__(
+        self,
+        embed_batch_fn: Callable[[List[str]], List[List[float]]],
+        *,
+        max_workers: int = 4,
+        batch_size: int = 64,
+        rpm: Optional[float] = 3000,
+        tpm: Optional[float] = 1_000_000,
+        max_retries: int = 6,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+    ):
+        self.embed_batch_fn = embed_batch_fn
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # rpm/tpm이 None이면 해당 한도는 적용하지 않는다 (로컬 백엔드 등)
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="embed")
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def _call_with_retry(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            if self.requests is not None:
+                self.requests.acquire(1)
+            if self.tokens is not None:
+                self.tokens.acquire(sum(_estimate_tokens(t) for t in texts))
+            try:
+                return self.embed_batch_fn(texts)
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                # full jitter: [0, min(cap, base * 2^attempt)]
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+                attempt += 1
+                time.sleep(delay)
+
+    def _run_batch(self, texts: List[str], futures: List[Future]) -> None:
+        try:
+            vectors = self._call_with_retry(texts)
+            if len(vectors) != len(texts):
+                # zip으로 잘라내면 남은 Future가 영원히 끝나지 않는다
+                raise ValueError(f"embedding backend returned {len(vectors)} vectors for {len(texts)} texts")
+            for fut, vec in zip(futures, vectors):
+                fut.set_result(vec)
+        except Exception as e:
+            for fut in futures:
+                if not fut.done():
+                    fut.set_exception(e)
+        finally:
+            with self._inflight_lock:
+                for text in texts:
+                    self._inflight.pop(text, None)
+
+    def submit_texts(self, texts: Sequence[str]) -> List[Future]:
+        """각 텍스트에 대한 Future 리스트를 반환. 이미 진행 중인 텍스트는 기존 Future를 공유한다."""
+        results: List[Future] = []
+        owned_texts: List[str] = []
+        owned_futures: List[Future] = []
+        with self._inflight_lock:
+            for text in texts:
+                fut = self._inflight.get(text)
+                if fut is None:
+                    fut = Future()
+                    self._inflight[text] = fut
+                    owned_texts.append(text)
+                    owned_futures.append(fut)
+                results.append(fut)
+
+        for i in range(0, len(owned_texts), self.batch_size):
+            self._pool.submit(
+                self._run_batch,
+                owned_texts[i:i + self.batch_size],
+                owned_futures[i:i + self.batch_size],
+            )
+        return results
+
+    def embed_texts(self, texts: Sequence[str]) -> List[List[float]]:
+        """텍스트들을 임베딩하여 입력 순서대로 벡터를 반환 (블로킹)."""
+        return [fut.result() for fut in self.submit_texts(texts)]
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+_executors: Dict[Tuple[str, int], EmbeddingExecutor] = {}
+_executor_lock = threading.Lock()
+
+
+def get_executor(backend=None) -> EmbeddingExecutor:
+    """환경 변수 설정을 반영한 프로세스 단위 공용 executor (백엔드의 model/차원별로 하나)."""
+    from .embedding_backend import get_embedding_backend
+
+    backend = backend or get_embedding_backend()
+    key = (backend.model, backend.dimensions)
+    with _executor_lock:
+        executor = _executors.get(key)
+        if executor is None:
+            limited = backend.rate_limited
+            executor = EmbeddingExecutor(
+                backend.embed_documents,
+                max_workers=int(os.getenv("EMBEDDING_CONCURRENCY", "4")),
+                batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")),
+                rpm=float(os.getenv("OPENAI_EMBEDDING_RPM", "3000")) if limited else None,
+                tpm=float(os.getenv("OPENAI_EMBEDDING_TPM", "1000000")) if limited else None,
+            )
+            _executors[key] = executor
+        return executor
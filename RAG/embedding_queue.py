@@ -0,0 +1,412 @@
+"""
+이벤트 임베딩 백그라운드 작업 큐.
+
+- eventmanager는 이벤트 파일을 쓴 뒤 enqueue_embedding()만 호출한다 (요청 경로에서 임베딩 호출 없음)
+- 작업은 `.moro/embed_queue.json`에 기록되어 프로세스가 재시작돼도 이어서 처리된다
+  - 서버 워커/CLI 여러 프로세스가 같은 파일을 쓴다: 쓸 때마다 `state_lock` 안에서 디스크의 큐를 다시 읽어
+    이 프로세스가 바꾼 작업만 합친다. 작업은 넣은 프로세스(owner)가 처리하고, owner가 없어졌으면 가져온다
+  - 처리 결과(완료/재시도)는 작업마다 쓰지 않고 배치가 끝날 때 한 번에 기록한다
+- 디렉터리당 워커 스레드 1개가 배치로 임베딩하고, 파일을 다시 읽어 텍스트가 그대로일 때만 벡터를 기록한다
+- 실패한 작업은 지수 백오프로 재시도하고, MAX_ATTEMPTS를 넘으면 failed 상태로 남긴다 (retry_failed로 재개)
+- 재색인(RAG/reindex.py) 중에는 target 공간 벡터도 함께 계산해 `embedding_next`에 기록한다 (이중 쓰기)
+
+임베딩이 아직 없는 이벤트는 검색 시 lexical(BM25) 순위로 보완된다 (parsing_with_content._rank 참고).
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .embedding_pool import get_executor
+from .embedding_spec import active_spec, event_vector, set_event_vector, target_spec, vector_is_stale
+from .index_hooks import notify_mutation, user_key
+from .state import atomic_write_json, event_file_lock, read_json, state_dir, state_lock
+
+
+MAX_ATTEMPTS = int(os.getenv("EMBEDDING_JOB_MAX_ATTEMPTS", "8"))
+RETRY_BASE = 2.0
+RETRY_CAP = 300.0
+BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# 일이 없는 워커가 다른 프로세스가 남긴 작업(owner가 종료된 것)을 확인하는 주기
+SYNC_SECONDS = float(os.getenv("EMBEDDING_QUEUE_SYNC_SECONDS", "30"))
+_LOCK = "embed_queue"
+
+
+def _event_path(user_dir: str, event_id: int, zero_pad: int = 4) -> Optional[Path]:
+    base = Path(user_dir)
+    if isinstance(event_id, int):
+        for name in (f"{event_id:0{zero_pad}d}.json", f"{event_id}.json"):
+            if (base / name).exists():
+                return base / name
+    # 월별 배열 파일 등: 전체 파일에서 찾는다
+    for path in sorted(base.glob("*.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            continue
+        if any(isinstance(e, dict) and e.get("id") == event_id for e in (data if isinstance(data, list) else [data])):
+            return path
+    return None
+
+
+def _find(data: Any, event_id: int) -> Optional[Dict[str, Any]]:
+    for event in data if isinstance(data, list) else [data]:
+        if isinstance(event, dict) and event.get("id") == event_id:
+            return event
+    return None
+
+
+def _owner_alive(pid: Any) -> bool:
+    if not isinstance(pid, int):
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # 권한이 없어도 프로세스는 살아 있다
+        return True
+    return True
+
+
+class EmbeddingQueue:
+    """디렉터리 하나의 영속 작업 큐 + 워커 스레드. 작업은 이벤트 id당 하나 (새 작업이 이전 것을 대체)."""
+
+    def __init__(self, user_dir: str):
+        self.user_dir = user_dir
+        self.path = state_dir(user_dir) / "embed_queue.json"
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"processed": 0, "retried": 0, "dropped": 0}
+        self.in_flight: Set[str] = set()
+        # 마지막 동기화 이후 이 프로세스가 바꾼 작업 (key), 지운 작업 (key -> 지운 작업의 seq)
+        self._changed: Set[str] = set()
+        self._removed: Dict[str, int] = {}
+        self._synced_at = 0.0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        with self._cond:
+            self._sync()
+
+    def _sync(self) -> None:
+        """디스크의 큐에 이 프로세스의 변경을 합쳐 쓰고, 합친 결과를 메모리 큐로 삼는다 (self._cond 안에서).
+
+        다른 프로세스가 같은 이벤트에 더 새 작업(seq)을 넣었으면 그쪽을 남긴다.
+        owner 프로세스가 끝난 작업(재시작 전 워커, 끝난 CLI)은 이 프로세스가 가져온다.
+        """
+        with state_lock(self.user_dir, _LOCK):
+            disk: Dict[str, Dict[str, Any]] = (read_json(self.path, default={}) or {}).get("jobs", {})
+            dirty = bool(self._changed or self._removed)
+            for key, seq in self._removed.items():
+                if key in disk and disk[key]["seq"] == seq:
+                    del disk[key]
+            for key in self._changed:
+                job = self.jobs.get(key)
+                if job is not None and (key not in disk or disk[key]["seq"] <= job["seq"]):
+                    disk[key] = job
+            me = os.getpid()
+            for job in disk.values():
+                if job.get("owner") != me and not _owner_alive(job.get("owner")):
+                    job["owner"] = me
+                    dirty = True
+            if dirty:
+                atomic_write_json(self.path, {"jobs": disk})
+        self.jobs = disk
+        self._changed.clear()
+        self._removed.clear()
+        self._synced_at = time.time()
+
+    def _save(self) -> None:
+        self._sync()
+
+    def _set(self, key: str, job: Dict[str, Any]) -> None:
+        self.jobs[key] = job
+        self._changed.add(key)
+
+    def _drop(self, key: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.pop(key, None)
+        if job is not None:
+            self._changed.discard(key)
+            self._removed[key] = job["seq"]
+        return job
+
+    def _touch(self, key: str) -> None:
+        if key in self.jobs:
+            self._changed.add(key)
+
+    def put(self, event_id: int, path: Optional[str] = None) -> None:
+        self.put_many([(event_id, path)])
+
+    def put_many(self, items: List[Tuple[int, Optional[str]]]) -> None:
+        """여러 작업을 한 번의 큐 파일 쓰기로 등록."""
+        if not items:
+            return
+        now = time.time()
+        with self._cond:
+            for event_id, path in items:
+                self._set(str(event_id), {
+                    "id": event_id,
+                    "path": path,
+                    "state": "pending",
+                    "attempts": 0,
+                    "seq": time.time_ns(),
+                    "enqueued_at": now,
+                    "next_attempt_at": now,
+                    "last_error": None,
+                    "owner": os.getpid(),
+                })
+            self._save()
+            self._cond.notify()
+        self.start()
+
+    def discard(self, event_id: int) -> None:
+        with self._cond:
+            if self._drop(str(event_id)) is not None:
+                self._save()
+
+    def retry_failed(self) -> int:
+        with self._cond:
+            failed = [job for job in self.jobs.values() if job["state"] == "failed"]
+            for job in failed:
+                job.update(state="pending", attempts=0, next_attempt_at=time.time(), owner=os.getpid())
+                self._touch(str(job["id"]))
+            if failed:
+                self._save()
+                self._cond.notify()
+        return len(failed)
+
+    def pending_ids(self) -> Set[int]:
+        with self._cond:
+            return {job["id"] for job in self.jobs.values()}
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="embedding-queue", daemon=True)
+            self._thread.start()
+
+    # ------------------------------------------------------------------ worker
+    def _take_due(self) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        """지금 처리할 작업들과, 없으면 다음 작업까지 기다릴 시간."""
+        now = time.time()
+        me = os.getpid()
+        waiting = [
+            job for key, job in self.jobs.items()
+            if job["state"] == "pending" and key not in self.in_flight and job.get("owner") == me
+        ]
+        due = sorted((job for job in waiting if job["next_attempt_at"] <= now), key=lambda job: job["enqueued_at"])[:BATCH_SIZE]
+        if due:
+            return [dict(job) for job in due], None
+        later = [job["next_attempt_at"] - now for job in waiting]
+        return [], min(later) if later else None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if time.time() - self._synced_at >= SYNC_SECONDS:
+                    # 다른 프로세스가 넣고 처리하지 못한 채 끝난 작업을 가져온다
+                    self._sync()
+                batch, wait = self._take_due()
+                if not batch:
+                    self._cond.wait(timeout=SYNC_SECONDS if wait is None else min(wait, SYNC_SECONDS))
+                    continue
+                self.in_flight.update(str(job["id"]) for job in batch)
+            try:
+                self._process(batch)
+            except Exception as e:
+                print(f"Embedding queue: batch failed: {e}")
+                for job in batch:
+                    self._failed(job, e)
+            finally:
+                with self._cond:
+                    self.in_flight.difference_update(str(job["id"]) for job in batch)
+                    # 배치의 완료/재시도 결과를 큐 파일에 한 번에 기록
+                    if self._changed or self._removed:
+                        self._sync()
+
+    def _done(self, job: Dict[str, Any], dropped: bool = False) -> None:
+        with self._cond:
+            current = self.jobs.get(str(job["id"]))
+            # 처리 중에 같은 이벤트가 다시 수정됐으면 새 작업을 남겨 둔다
+            if current is not None and current["seq"] == job["seq"]:
+                self._drop(str(job["id"]))
+            self.stats["dropped" if dropped else "processed"] += 1
+
+    def _failed(self, job: Dict[str, Any], error: BaseException) -> None:
+        with self._cond:
+            current = self.jobs.get(str(job["id"]))
+            if current is None or current["seq"] != job["seq"]:
+                return
+            current["attempts"] += 1
+            current["last_error"] = f"{type(error).__name__}: {error}"
+            if current["attempts"] >= MAX_ATTEMPTS:
+                current["state"] = "failed"
+            else:
+                delay = min(RETRY_CAP, RETRY_BASE * 2 ** current["attempts"])
+                current["next_attempt_at"] = time.time() + random.uniform(delay / 2, delay)
+                self.stats["retried"] += 1
+            self._touch(str(job["id"]))
+
+    def _process(self, batch: List[Dict[str, Any]]) -> None:
+        from .parsing_with_content import _concat_event_fields
+
+        spec = active_spec(self.user_dir)
+        # 재색인 중이면 target 공간에도 같이 쓴다: cut-over 직전에 추가/수정된 이벤트도 새 공간 벡터를 갖도록
+        target = target_spec(self.user_dir)
+        shadow = target if target != spec else None
+        work = []
+        for job in batch:
+            path = Path(job["path"]) if job.get("path") and Path(job["path"]).exists() else _event_path(self.user_dir, job["id"])
+            event = None
+            if path is not None:
+                with open(path, "r", encoding="utf-8") as f:
+                    event = _find(json.load(f), job["id"])
+            if event is None:
+                # 그 사이 삭제된 이벤트
+                self._done(job, dropped=True)
+            elif event_vector(event, spec) is not None and not vector_is_stale(event) and (shadow is None or event_vector(event, shadow) is not None):
+                self._done(job)
+            else:
+                work.append((job, path, _concat_event_fields(event)))
+        if not work:
+            return
+
+        texts = [text for _, _, text in work]
+        futures = get_executor(spec.backend()).submit_texts(texts)
+        shadow_futures = get_executor(shadow.backend()).submit_texts(texts) if shadow is not None else [None] * len(work)
+        for (job, path, text), future, shadow_future in zip(work, futures, shadow_futures):
+            try:
+                vector = future.result()
+            except Exception as e:
+                print(f"Embedding queue: event {job['id']} failed: {e}")
+                self._failed(job, e)
+                continue
+            shadow_vector = None
+            if shadow_future is not None:
+                try:
+                    shadow_vector = shadow_future.result()
+                except Exception as e:
+                    # target 벡터는 재색인 패스가 다시 채운다
+                    print(f"Embedding queue: event {job['id']} failed for {shadow.model}: {e}")
+            try:
+                self._write(job, path, text, vector, spec, shadow_vector, shadow)
+            except Exception as e:
+                self._failed(job, e)
+
+    def _write(self, job: Dict[str, Any], path: Path, text: str, vector: List[float], spec, shadow_vector: Optional[List[float]] = None, shadow=None) -> None:
+        from .parsing_with_content import _concat_event_fields
+
+        # eventmanager/재색인과 같은 파일 잠금: 다시 읽은 뒤 쓰기 전까지 다른 쓰기가 끼어들지 못한다
+        with event_file_lock(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                data = None
+            event = _find(data, job["id"]) if data is not None else None
+            if event is None:
+                self._done(job, dropped=True)
+                return
+            if _concat_event_fields(event) != text:
+                # 임베딩하는 동안 내용이 바뀌었다 (수정 요청이 큐에 넣지 않은 직접 편집일 수도 있음): 바로 다시 처리
+                self._requeue(job)
+                return
+            set_event_vector(event, vector, spec)
+            if shadow_vector is not None:
+                set_event_vector(event, shadow_vector, shadow, field="embedding_next")
+            # 엔진/인덱스가 동시에 읽어도 반쯤 쓰인 파일을 보지 않도록 교체 방식으로 쓴다
+            atomic_write_json(path, data)
+            # 알림도 잠금 안에서: 같은 이벤트의 변경 알림(ANN 변경 로그 등)이 파일에 쓴 순서대로 남는다
+            notify_mutation(self.user_dir, "update", job["id"], event)
+        self._done(job)
+
+    def _requeue(self, job: Dict[str, Any]) -> None:
+        with self._cond:
+            current = self.jobs.get(str(job["id"]))
+            if current is not None and current["seq"] == job["seq"]:
+                current["next_attempt_at"] = time.time()
+                self._touch(str(job["id"]))
+                self._cond.notify()
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            jobs = list(self.jobs.values())
+            now = time.time()
+            me = os.getpid()
+            return {
+                "pending": sum(1 for job in jobs if job["state"] == "pending"),
+                # 이 프로세스가 처리할 대기 작업 (나머지는 다른 워커/CLI가 처리)
+                "pending_here": sum(1 for job in jobs if job["state"] == "pending" and job.get("owner") == me),
+                "failed": sum(1 for job in jobs if job["state"] == "failed"),
+                "in_flight": len(self.in_flight),
+                "oldest_age_s": round(now - min((job["enqueued_at"] for job in jobs), default=now), 1),
+                "worker_alive": bool(self._thread and self._thread.is_alive()),
+                **self.stats,
+                "jobs": sorted(jobs, key=lambda job: job["enqueued_at"])[:50],
+            }
+
+
+_queues: Dict[str, EmbeddingQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_embedding_queue(user_dir: str = "Database/[user]") -> EmbeddingQueue:
+    key = user_key(user_dir)
+    with _queues_lock:
+        queue = _queues.get(key)
+        if queue is None:
+            queue = EmbeddingQueue(user_dir)
+            _queues[key] = queue
+        return queue
+
+
+def enqueue_embedding(user_dir: str, event_id: int, path: Optional[str] = None) -> None:
+    """이벤트 (재)임베딩 작업을 등록하고 즉시 반환."""
+    get_embedding_queue(user_dir).put(event_id, path)
+
+
+def start_embedding_worker(user_dir: str = "Database/[user]") -> EmbeddingQueue:
+    """디스크에 남아 있는 작업이 있으면 처리를 시작 (앱 시작 시 호출)."""
+    queue = get_embedding_queue(user_dir)
+    if queue.jobs:
+        queue.start()
+    return queue
+
+
+def pending_embedding_ids(user_dir: str = "Database/[user]") -> Set[int]:
+    return get_embedding_queue(user_dir).pending_ids()
+
+
+def embedding_queue_status(user_dir: str = "Database/[user]") -> Dict[str, Any]:
+    return get_embedding_queue(user_dir).status()
+
+
+def drain(user_dir: str = "Database/[user]", timeout: float = 60.0) -> bool:
+    """이 프로세스가 처리할 작업이 모두 끝날 때까지 기다린다 (스크립트/벤치마크용). failed 작업은 기다리지 않는다."""
+    queue = get_embedding_queue(user_dir)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with queue._cond:
+            me = os.getpid()
+            if not queue.in_flight and all(job["state"] == "failed" or job.get("owner") != me for job in queue.jobs.values()):
+                return True
+        time.sleep(0.05)
+    return False
+
+
+def enqueue_missing(events: List[Dict[str, Any]], user_dir: str = "Database/[user]") -> int:
+    """검색 결과 중 활성 공간 벡터가 없고 아직 큐에 없는 이벤트를 큐에 넣는다 (블로킹 임베딩 대신)."""
+    spec = active_spec(user_dir)
+    queue = get_embedding_queue(user_dir)
+    queued = queue.pending_ids()
+    missing = [e["id"] for e in events if e.get("id") is not None and e["id"] not in queued and event_vector(e, spec) is None]
+    queue.put_many([(event_id, None) for event_id in missing])
+    return len(missing)
@@ -0,0 +1,147 @@
+"""
+벡터 공간(모델 + 차원 + 버전) 메타데이터와 디렉터리별 "활성" 벡터 공간 관리.
+
+- 이벤트 벡터는 `embedding` + `embedding_meta`({"model", "dim", "version", "text_sha1"})로 저장한다
+  (version은 EMBEDDING_MODEL_VERSION: 같은 모델 이름으로 가중치/입력 텍스트 형식이 바뀌었을 때 올려서 재색인을 일으킨다)
+  (text_sha1은 임베딩한 텍스트의 해시로, 파일을 직접 고쳐 벡터가 낡았는지 판단하는 데 쓴다)
+- 재색인 중에는 새 공간의 벡터를 `embedding_next` + `embedding_next_meta`에 따로 쓴다
+- 검색은 `.moro/embedding_spec.json`의 active 공간 벡터만 읽으므로,
+  active를 바꾸는 순간(os.replace) 전체가 한 번에 전환된다
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from .embedding_backend import DEFAULT_OPENAI_MODEL, NATIVE_DIMENSIONS, EmbeddingBackend, backend_for, get_embedding_backend
+from .state import atomic_write_json, read_json, state_dir
+
+
+# 프론트엔드/LLM 출력에서 숨길 벡터 관련 필드
+VECTOR_FIELDS = ("embedding", "embedding_meta", "embedding_next", "embedding_next_meta")
+# 메타에 version이 없는 기존 벡터/상태 파일은 "1"로 본다
+DEFAULT_VERSION = "1"
+EMBEDDING_MODEL_VERSION = os.getenv("EMBEDDING_MODEL_VERSION", DEFAULT_VERSION)
+# 메타가 없는 기존 벡터를 만든 모델 ("unknown"이면 전부 다시 임베딩)
+UNKNOWN_MODEL = "unknown"
+LEGACY_MODEL = os.getenv("EMBEDDING_LEGACY_MODEL", DEFAULT_OPENAI_MODEL)
+
+
+@dataclass(frozen=True)
+class EmbeddingSpec:
+    model: str
+    dim: int
+    version: str = DEFAULT_VERSION
+
+    @classmethod
+    def from_meta(cls, meta: Optional[Dict[str, Any]]) -> Optional["EmbeddingSpec"]:
+        if not meta or "model" not in meta or "dim" not in meta:
+            return None
+        return cls(model=meta["model"], dim=int(meta["dim"]), version=str(meta.get("version", DEFAULT_VERSION)))
+
+    def to_meta(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def backend(self) -> EmbeddingBackend:
+        return backend_for(self.model, self.dim)
+
+
+def configured_spec() -> EmbeddingSpec:
+    """현재 설정(EMBEDDING_BACKEND / EMBEDDING_MODEL / EMBEDDING_DIMENSIONS / EMBEDDING_MODEL_VERSION)이 만드는 벡터 공간."""
+    backend = get_embedding_backend()
+    return EmbeddingSpec(model=backend.model, dim=backend.dimensions, version=EMBEDDING_MODEL_VERSION)
+
+
+def legacy_spec(dim: int) -> EmbeddingSpec:
+    """메타 없이 저장된 벡터의 공간.
+
+    메타를 기록하기 전에는 OpenAI 백엔드만 있었으므로 그 모델의 기본 차원과 길이가 같으면
+    EMBEDDING_LEGACY_MODEL(기본 text-embedding-3-small) 공간으로 본다. 길이가 다르면(로컬 백엔드 등)
+    어떤 공간인지 알 수 없으므로 UNKNOWN_MODEL로 두어 검색에 쓰지 않고 다시 임베딩되게 한다.
+    """
+    if LEGACY_MODEL != UNKNOWN_MODEL and NATIVE_DIMENSIONS.get(LEGACY_MODEL) == dim:
+        return EmbeddingSpec(model=LEGACY_MODEL, dim=dim)
+    return EmbeddingSpec(model=UNKNOWN_MODEL, dim=dim)
+
+
+def vector_spec(event: Dict[str, Any], field: str = "embedding") -> Optional[EmbeddingSpec]:
+    """저장된 벡터의 공간. 메타가 없는 기존 벡터는 legacy_spec으로 추정한다."""
+    vec = event.get(field)
+    if not vec:
+        return None
+    spec = EmbeddingSpec.from_meta(event.get(f"{field}_meta"))
+    if spec is None and field == "embedding":
+        spec = legacy_spec(len(vec))
+    return spec
+
+
+def has_fresh_vector(event: Dict[str, Any], spec: EmbeddingSpec) -> bool:
+    """spec 공간 벡터가 있고 그 뒤 텍스트가 바뀌지 않았으면 True."""
+    return any(vector_spec(event, field) == spec and not vector_is_stale(event, field) for field in ("embedding", "embedding_next"))
+
+
+def event_vector(event: Dict[str, Any], spec: EmbeddingSpec) -> Optional[List[float]]:
+    """이벤트에서 spec 공간의 벡터를 찾아 반환 (없으면 None)."""
+    for field in ("embedding", "embedding_next"):
+        if vector_spec(event, field) == spec:
+            return event[field]
+    return None
+
+
+def text_hash(event: Dict[str, Any]) -> str:
+    """임베딩 대상 텍스트(title/description/location/member)의 해시."""
+    from .parsing_with_content import _concat_event_fields
+
+    return hashlib.sha1(_concat_event_fields(event).encode("utf-8")).hexdigest()
+
+
+def set_event_vector(event: Dict[str, Any], vector: List[float], spec: EmbeddingSpec, field: str = "embedding") -> Dict[str, Any]:
+    """벡터와 메타를 기록. 호출 시점의 이벤트 텍스트가 벡터를 만든 텍스트여야 한다."""
+    event[field] = vector
+    event[f"{field}_meta"] = dict(spec.to_meta(), text_sha1=text_hash(event))
+    return event
+
+
+def vector_is_stale(event: Dict[str, Any], field: str = "embedding") -> bool:
+    """벡터를 만든 뒤 텍스트가 바뀌었으면 True (해시가 없는 기존 벡터는 판단할 수 없으므로 False)."""
+    recorded = (event.get(f"{field}_meta") or {}).get("text_sha1")
+    return bool(event.get(field)) and recorded is not None and recorded != text_hash(event)
+
+
+def drop_event_vectors(event: Dict[str, Any]) -> Dict[str, Any]:
+    """내용이 바뀐 이벤트의 (이제 맞지 않는) 벡터 필드를 모두 제거."""
+    for field in VECTOR_FIELDS:
+        event.pop(field, None)
+    return event
+
+
+def _spec_path(user_dir: str):
+    return state_dir(user_dir) / "embedding_spec.json"
+
+
+def _load_state(user_dir: str) -> Dict[str, Any]:
+    return read_json(_spec_path(user_dir), default={}) or {}
+
+
+def save_spec_state(user_dir: str, active: EmbeddingSpec, target: Optional[EmbeddingSpec] = None) -> None:
+    state = {"active": active.to_meta(), "target": (target or active).to_meta()}
+    atomic_write_json(_spec_path(user_dir), state)
+
+
+def active_spec(user_dir: str = "Database/[user]") -> EmbeddingSpec:
+    """검색 시 사용할 벡터 공간. 상태 파일이 없으면 저장된 벡터로 추정하고 기록한다."""
+    spec = EmbeddingSpec.from_meta(_load_state(user_dir).get("active"))
+    if spec is not None:
+        return spec
+    from .parsing_with_criteria import load_events
+
+    inferred = (vector_spec(e) for e in load_events(user_dir))
+    spec = next((s for s in inferred if s is not None and s.model != UNKNOWN_MODEL), None) or configured_spec()
+    save_spec_state(user_dir, spec)
+    return spec
+
+
+def target_spec(user_dir: str = "Database/[user]") -> EmbeddingSpec:
+    return EmbeddingSpec.from_meta(_load_state(user_dir).get("target")) or active_spec(user_dir)
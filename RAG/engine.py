@@ -0,0 +1,811 @@
+"""
+사용자 디렉터리별로 오래 살아 있는 RAG 엔진.
+
+이벤트를 한 번 읽어 메모리에 두고, 쿼리마다 디스크를 다시 읽지 않는다.
+- event index: id -> 이벤트 (벡터 필드 제외)
+- time index: RAG/event_index.py의 컬럼형 시작 시각 인덱스 (criteria 평가)
+- vector index: float32 행렬 (QuantizedVectorStore dtype="float32"),
+  이벤트 수가 ENGINE_ANN_MIN_EVENTS 이상이면 IVF-flat 인덱스
+- lexical index: BM25
+- cache: 질의 임베딩 LRU
+
+ARCHIVE_HORIZON_DAYS보다 오래된 이벤트는 RAG/archive.py의 압축 파티션으로 옮겨져 위 인덱스에 없다.
+text 없는 criteria 조회/집계는 criteria의 기간이 보관 범위에 닿을 때만 해당 파티션을 함께 읽는다.
+
+로드한 상태는 주기적으로 `.moro/engine.snap`(RAG/snapshot.py)에 쓰고, 새 프로세스는 이를 mmap으로 연 뒤
+스냅샷 이후 바뀐 파일만 다시 읽는다 (ENGINE_SNAPSHOT=0이면 사용 안 함).
+다른 워커/CLI가 쓴 변경은 쿼리마다 storage_version(공유 쓰기 카운터 + 디렉터리 mtime)을 확인해서,
+바뀌었으면 (mtime, size)가 달라진 파일만 다시 읽어 바로 반영한다 (스냅샷 주기와 무관).
+
+임베딩 모델(벡터 공간)을 바꾸는 재색인(RAG/reindex.py) 중에는 target 공간 벡터를 shadow 저장소에 모으고,
+검색은 cut-over 전까지 로드 시점의 공간(self._spec)만 사용한다. cut-over는 잠금 안에서 저장소/공간을 한 번에 교체한다.
+
+eventmanager의 변경은 index_hooks를 통해 각 인덱스와 엔진(apply_mutation)에 반영된다.
+app.py / ReactAgent / Agent는 get_engine()으로 같은 엔진을 공유한다.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import warnings
+import weakref
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .archive import get_archive
+from .embedding_spec import VECTOR_FIELDS, active_spec, event_vector
+from .event_index import INDEXED_CRITERIA, EventIndex, get_event_index, install_event_index
+from .index_hooks import (
+    data_version,
+    notify_mutation,
+    register_mutation_listener,
+    storage_version,
+    unregister_mutation_listener,
+    user_key,
+)
+from .lexical_index import LexicalIndex, get_lexical_index, install_lexical_index
+from .parsing_with_criteria import (
+    _event_window,
+    _matching,
+    _nearest_key,
+    cached_match_ids,
+    criteria_cache_stats,
+    filter_out_by_criteria,
+)
+from .snapshot import Generation, list_event_files, load_snapshot, read_event_file, write_snapshot
+
+
+ANN_MIN_EVENTS = int(os.getenv("ENGINE_ANN_MIN_EVENTS", "50000"))
+QUERY_CACHE_SIZE = 256
+SNAPSHOT_ENABLED = os.getenv("ENGINE_SNAPSHOT", "1") != "0"
+# 변경 후 스냅샷을 다시 쓰기까지 기다리는 시간(초). 그 사이의 변경은 한 번에 반영된다.
+SNAPSHOT_INTERVAL = float(os.getenv("ENGINE_SNAPSHOT_INTERVAL", "30"))
+MODES = ("vector", "lexical", "hybrid")
+
+
+def _strip_vectors(event: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in event.items() if k not in VECTOR_FIELDS}
+
+
+class RAG:
+    """사용자 한 명의 이벤트/인덱스/캐시를 소유하는 엔진.
+
+    - query(criteria, text, k): criteria만 주면 매칭 이벤트 전체, text를 주면 상위 k개
+    - apply_mutation(op, event_id, event): 저장소 변경을 모든 인덱스에 반영
+    - stats(): 인덱스 크기, 캐시 적중률, 마지막 쿼리 시간 등
+    """
+
+    def __init__(self, user_dir: Union[str, "os.PathLike[str]", Iterable[Dict[str, Any]]] = "Database/[user]", ann_min_events: Optional[int] = None):
+        if not isinstance(user_dir, (str, os.PathLike)):
+            # 예전 호출 방식 RAG(events): 이벤트 목록만 담은 임시 디렉터리 위의 엔진으로 감싼다
+            warnings.warn(
+                "RAG(events) is deprecated; pass the user directory (RAG(user_dir)) or use get_engine(user_dir)",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+            user_dir = _materialize_events(user_dir)
+            weakref.finalize(self, shutil.rmtree, user_dir, True)
+        user_dir = os.fspath(user_dir)
+        self.user_dir = user_dir
+        self.key = user_key(user_dir)
+        self.ann_min_events = ANN_MIN_EVENTS if ann_min_events is None else ann_min_events
+        self.events: Dict[Any, Dict[str, Any]] = {}
+        self._loaded = False
+        self._lock = threading.RLock()
+        self._query_cache: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._counters = {"queries": 0, "mutations": 0, "reloads": 0, "generation_swaps": 0, "refreshes": 0, "query_cache_hits": 0, "query_cache_misses": 0, "cut_overs": 0}
+        self._last_query: Dict[str, Any] = {}
+        # 파일명 -> [mtime_ns, size, [id...]] (스냅샷 이후 바뀐 파일 판별용)
+        self._files: Dict[str, list] = {}
+        self._id_file: Dict[Any, str] = {}
+        # 인덱스가 반영한 디렉터리 상태 (index_hooks.storage_version)
+        self._synced: Tuple[int, int] = (0, 0)
+        # version: 이 엔진이 붙어 있는 스냅샷 세대, published: 이 엔진이 마지막으로 게시한 세대
+        self._snapshot: Dict[str, Any] = {"version": 0, "published": None, "loaded_from": None, "delta_files": 0, "written_at": None}
+        self._generation: Optional[Generation] = None
+        self._snapshot_timer: Optional[threading.Timer] = None
+        self._snapshot_lock = threading.Lock()
+        # 검색에 쓰는 벡터 공간 (active_spec은 cut-over 순간 파일 상태가 먼저 바뀌므로 엔진이 따로 고정)
+        self._spec = None
+        # 재색인 중 target 공간 벡터 저장소, 그리고 그것을 만드는 동안 들어온 변경
+        self._shadow = None
+        self._shadow_pending: Optional[List[Tuple[str, Any, Optional[Dict[str, Any]]]]] = None
+        # 약한 참조로 등록: 버려진 엔진(RAG(events)의 임시 엔진 등)은 수거되면서 리스너에서도 빠진다
+        self._listener = _weak_listener(self)
+        register_mutation_listener(self._listener)
+        weakref.finalize(self, unregister_mutation_listener, self._listener)
+
+    def close(self) -> None:
+        """변경 알림 구독과 예약된 스냅샷을 정리 (get_engine이 공유하는 엔진이면 공유 목록에서도 뺀다)."""
+        unregister_mutation_listener(self._listener)
+        with self._snapshot_lock:
+            timer, self._snapshot_timer = self._snapshot_timer, None
+        if timer is not None:
+            timer.cancel()
+        with _engines_lock:
+            if _engines.get(self.key) is self:
+                del _engines[self.key]
+
+    # ------------------------------------------------------------------ state
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def refresh(self) -> None:
+        """다른 프로세스의 변경/새 스냅샷 세대를 지금 반영 (쿼리 전에 자동으로 하는 것과 같음)."""
+        self._ensure_loaded()
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if self._loaded:
+                generation = self._generation
+                if generation is None or generation.read() <= self._snapshot["version"]:
+                    token = storage_version(self.user_dir)
+                    if token != self._synced:
+                        self._refresh(token)
+                    return
+                # 다른 워커가 새 스냅샷을 게시했다: 공유 행렬/컬럼을 새 세대로 교체
+                self._counters["generation_swaps"] += 1
+            started = time.perf_counter()
+            # 파일을 읽기 전에 잡아 두면, 읽는 도중 들어온 변경은 다음 쿼리 때 다시 맞춘다
+            token = storage_version(self.user_dir)
+            spec = self._spec = active_spec(self.user_dir)
+            changed = self._attach(spec)
+            if changed is None:
+                # 스냅샷이 없으면 한 워커만 파일 전체를 읽어 게시하고, 나머지는 기다렸다가 그 스냅샷에 붙는다
+                with self._generation_lock():
+                    changed = self._attach(spec)
+                    if changed is None:
+                        self._load_files(spec)
+                        changed = True
+                        if self._gen() is not None:
+                            self._write_snapshot(self._capture())
+                            changed = self._attach(spec)
+            self._loaded = True
+            self._synced = token
+            self._counters["reloads"] += 1
+            self._load_ms = round((time.perf_counter() - started) * 1000, 1)
+            if changed:
+                self._schedule_snapshot(0)
+
+    def _attach(self, spec) -> Optional[bool]:
+        """게시된 스냅샷에 붙는다. 스냅샷이 없거나 쓸 수 없으면 None, 이후 바뀐 파일이 있었으면 True."""
+        if self._gen() is None:
+            return None
+        snap = load_snapshot(self.user_dir, spec.to_meta())
+        if snap is None:
+            return None
+        try:
+            return self._load_snapshot(snap, spec)
+        except (KeyError, ValueError, TypeError) as e:
+            print(f"Ignoring engine snapshot for {self.user_dir}: {e}")
+            return None
+
+    def _load_files(self, spec) -> None:
+        """모든 이벤트 파일을 읽어 인덱스를 새로 만든다 (스냅샷이 없을 때)."""
+        events: List[Dict[str, Any]] = []
+        self._files = {}
+        for name, path, st in list_event_files(self.user_dir):
+            # stat을 읽기 전에 잡아 두면, 읽는 도중 바뀐 파일은 다음 로드 때 다시 읽힌다
+            try:
+                file_events = read_event_file(path)
+            except Exception as e:
+                print(f"Failed to load {path}: {e}")
+                continue
+            self._files[name] = [st.st_mtime_ns, st.st_size, [e["id"] for e in file_events if e.get("id") is not None]]
+            events.extend(file_events)
+        install_event_index(self.user_dir, EventIndex.from_events(events))
+        install_lexical_index(self.user_dir, LexicalIndex.from_events(events))
+        if not self._use_ann(len(events)):
+            from .quantized_store import QuantizedVectorStore, install_quantized_store
+
+            install_quantized_store(self.user_dir, QuantizedVectorStore.from_events(events, dtype="float32", spec=spec))
+        self.events = {e["id"]: _strip_vectors(e) for e in events if e.get("id") is not None}
+        self._id_file = {doc_id: name for name, entry in self._files.items() for doc_id in entry[2]}
+        self._snapshot.update(loaded_from="files", delta_files=len(self._files))
+
+    def _load_snapshot(self, snap, spec) -> bool:
+        """mmap한 스냅샷으로 인덱스를 복원하고 그 이후 바뀐 파일만 적용. 변경이 있었으면 True."""
+        events = snap.blob("events")
+        ids = [e["id"] for e in events]
+        use_ann = self._use_ann(len(ids))
+        if not use_ann and "vectors.matrix" not in snap.arrays:
+            # ANN 모드에서 쓴 스냅샷에는 벡터 행렬이 없다
+            self._load_files(spec)
+            return True
+        self.events = dict(zip(ids, events))
+        install_event_index(self.user_dir, EventIndex.from_columns(
+            {name.split(".", 1)[1]: arr for name, arr in snap.arrays.items() if name.startswith("time.")},
+            events,
+        ))
+        install_lexical_index(self.user_dir, LexicalIndex.from_terms(zip(ids, snap.blob("terms"))))
+        if not use_ann:
+            from .quantized_store import QuantizedVectorStore, install_quantized_store
+
+            install_quantized_store(self.user_dir, QuantizedVectorStore.from_matrix(
+                snap.arrays["vectors.id"].tolist(), snap.arrays["vectors.matrix"], dtype="float32", spec=spec,
+            ))
+        self._files = {name: list(entry) for name, entry in snap.files.items()}
+        self._id_file = {doc_id: name for name, entry in self._files.items() for doc_id in entry[2]}
+
+        # 스냅샷 이후 생기거나 바뀐 파일만 다시 읽는다
+        delta = self._sync_files(spec, use_ann)
+        self._snapshot.update(version=snap.version, loaded_from="snapshot", delta_files=delta)
+        return bool(delta)
+
+    def _refresh(self, token: Tuple[int, int]) -> None:
+        """다른 프로세스가 디렉터리를 바꿨다: 바뀐 파일만 다시 읽어 인덱스에 반영 (엔진 잠금 안에서)."""
+        self._counters["refreshes"] += 1
+        if self._sync_files(self._spec, self._use_ann()):
+            self._schedule_snapshot(SNAPSHOT_INTERVAL)
+        self._synced = token
+
+    def _sync_files(self, spec, use_ann: bool) -> int:
+        """self._files와 현재 디렉터리의 (mtime_ns, size)를 비교해 없어지거나 바뀐 파일을 적용. 적용한 파일 수."""
+        current = {name: (path, st) for name, path, st in list_event_files(self.user_dir)}
+        stale = [name for name in self._files if name not in current]
+        changed = [
+            name for name, (_, st) in current.items()
+            if self._files.get(name, [None, None])[:2] != [st.st_mtime_ns, st.st_size]
+        ]
+        removed_ids = set()
+        for name in stale + changed:
+            entry = self._files.pop(name, None)
+            if entry:
+                removed_ids.update(entry[2])
+        upserts: List[Dict[str, Any]] = []
+        for name in changed:
+            path, st = current[name]
+            try:
+                file_events = read_event_file(path)
+            except Exception as e:
+                print(f"Failed to load {path}: {e}")
+                continue
+            self._files[name] = [st.st_mtime_ns, st.st_size, [e["id"] for e in file_events if e.get("id") is not None]]
+            upserts.extend(e for e in file_events if e.get("id") is not None)
+        removed_ids -= {e["id"] for e in upserts}
+        event_index = get_event_index(self.user_dir)
+        lexical = get_lexical_index(self.user_dir)
+        store = None
+        if not use_ann:
+            from .quantized_store import get_quantized_store
+
+            store = get_quantized_store(self.user_dir, "float32")
+        for doc_id in removed_ids:
+            self.events.pop(doc_id, None)
+            self._id_file.pop(doc_id, None)
+            event_index.remove(doc_id)
+            lexical.remove(doc_id)
+            if store is not None:
+                store.remove(doc_id)
+        for event in upserts:
+            self.events[event["id"]] = _strip_vectors(event)
+            event_index.upsert(event)
+            lexical.add(event["id"], _event_text(event))
+            if store is not None:
+                vec = event_vector(event, spec)
+                if vec:
+                    store.add(event["id"], vec)
+                else:
+                    store.remove(event["id"])
+        for name in changed:
+            for doc_id in self._files.get(name, [None, None, []])[2]:
+                self._id_file[doc_id] = name
+        return len(stale) + len(changed)
+
+    # --------------------------------------------------------------- snapshot
+    def _schedule_snapshot(self, delay: float) -> None:
+        if not SNAPSHOT_ENABLED:
+            return
+        with self._snapshot_lock:
+            if self._snapshot_timer is not None:
+                return
+            timer = threading.Timer(delay, self._snapshot_in_background)
+            timer.daemon = True
+            self._snapshot_timer = timer
+        timer.start()
+
+    def _snapshot_in_background(self) -> None:
+        with self._snapshot_lock:
+            self._snapshot_timer = None
+        try:
+            self.snapshot()
+        except Exception as e:
+            print(f"Failed to write engine snapshot for {self.user_dir}: {e}")
+
+    def _gen(self) -> Optional[Generation]:
+        if self._generation is None and SNAPSHOT_ENABLED and os.path.isdir(self.user_dir):
+            self._generation = Generation(self.user_dir)
+        return self._generation
+
+    def _generation_lock(self):
+        generation = self._gen()
+        return generation.lock() if generation is not None else nullcontext()
+
+    def _capture(self) -> Dict[str, Any]:
+        """스냅샷에 쓸 현재 상태 (엔진 잠금 안에서 복사)."""
+        with self._lock:
+            events = list(self.events.values())
+            lexical = get_lexical_index(self.user_dir)
+            with lexical._lock:
+                terms = [dict(lexical.doc_terms.get(e["id"], {})) for e in events]
+            arrays = {f"time.{name}": arr for name, arr in get_event_index(self.user_dir).arrays().items()}
+            if not self._use_ann():
+                from .quantized_store import get_quantized_store
+
+                ids, matrix = get_quantized_store(self.user_dir, "float32").export()
+                arrays["vectors.id"] = np.asarray(ids, dtype=np.int64)
+                arrays["vectors.matrix"] = matrix
+            return {
+                "spec": self._spec.to_meta(),
+                "files": {name: [entry[0], entry[1], list(entry[2])] for name, entry in self._files.items()},
+                "arrays": arrays,
+                "blobs": {"events": events, "terms": terms},
+                "base_version": self._snapshot["version"],
+            }
+
+    def _write_snapshot(self, captured: Dict[str, Any]) -> Dict[str, Any]:
+        """세대 잠금을 잡은 상태에서 새 세대로 쓰고 게시. 다른 워커는 다음 쿼리 때 새 세대에 붙는다."""
+        started = time.perf_counter()
+        generation = self._gen()
+        version = max(generation.read(), captured["base_version"]) + 1
+        size = write_snapshot(self.user_dir, version, captured["spec"], captured["files"], captured["arrays"], captured["blobs"])
+        generation.publish(version)
+        with self._lock:
+            self._snapshot.update(published=version, written_at=time.time(), bytes=size)
+            if self._snapshot["version"] == captured["base_version"]:
+                # 이 엔진이 쓴 세대: 메모리 상태가 이미 그 내용(과 이후 변경)을 갖고 있으므로 다시 붙지 않는다
+                self._snapshot["version"] = version
+        return {"version": version, "bytes": size, "ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """현재 상태를 `.moro/engine.snap`에 쓰고 새 세대로 게시 (새 프로세스/다른 워커의 warm start용).
+
+        다른 워커가 이미 더 새로운 세대를 게시했다면 쓰지 않고 None (다음 쿼리 때 그 세대로 교체된다).
+        """
+        self._ensure_loaded()
+        if self._gen() is None:
+            return None
+        captured = self._capture()
+        with self._generation_lock():
+            if self._generation.read() > captured["base_version"]:
+                return None
+            return self._write_snapshot(captured)
+
+    def _use_ann(self, n: Optional[int] = None) -> bool:
+        return (len(self.events) if n is None else n) >= self.ann_min_events
+
+    def _on_mutation(self, key: str, op: str, event_id: Optional[int], event: Optional[Dict[str, Any]]) -> None:
+        if key != self.key:
+            return
+        with self._lock:
+            if not self._loaded:
+                return
+            self._counters["mutations"] += 1
+            if op == "spec":
+                # 벡터 공간 전환은 cut_over()가 직접 처리한다
+                return
+            if op == "reload":
+                self._loaded = False
+                # 디렉터리 전체가 바뀌었으므로 shadow는 cut-over 때 파일에서 다시 만든다
+                self._shadow, self._shadow_pending = None, None
+                return
+            if self._shadow_pending is not None:
+                self._shadow_pending.append((op, event_id, event))
+            elif self._shadow is not None:
+                _apply_vector_mutation(self._shadow, self._shadow.spec, op, event_id, event)
+            if op == "delete" and event_id is not None:
+                self.events.pop(event_id, None)
+            elif op in ("add", "update") and event is not None:
+                event_id = event.get("id", event_id)
+                self.events[event_id] = _strip_vectors(event)
+            # 이 이벤트의 파일은 다음 로드 때 다시 확인 (새 파일은 스냅샷에 없으므로 자동으로 읽힘)
+            entry = self._files.get(self._id_file.get(event_id))
+            if entry is not None:
+                entry[0] = entry[1] = -1
+        self._schedule_snapshot(SNAPSHOT_INTERVAL)
+
+    def apply_mutation(self, op: str, event_id: Optional[int] = None, event: Optional[Dict[str, Any]] = None) -> None:
+        """저장소에 쓴 변경을 엔진과 모든 인덱스에 반영 (eventmanager가 쓰는 것과 같은 경로)."""
+        notify_mutation(self.user_dir, op, event_id, event)
+
+    # ----------------------------------------------------------- vector space
+    def begin_shadow(self, spec, collect: bool = False) -> Optional[int]:
+        """재색인 시작: 파일에 이미 있는 spec 공간 벡터로 shadow 저장소를 만든다 (검색은 계속 현재 공간).
+
+        파일은 잠금 밖에서 읽고, 그동안 들어온 변경은 모아 두었다가 설치할 때 적용한다.
+        collect=True면 shadow를 설치한 그 잠금 안에서 변경 모으기를 다시 시작한다 (cut_over가 잠금 밖에서
+        shadow를 내보내는 동안의 변경이 빠지지 않도록).
+        엔진이 아직 로드되지 않았으면 None (나중에 로드할 때 그 시점의 active 공간으로 읽는다).
+        """
+        from .quantized_store import QuantizedVectorStore
+
+        with self._lock:
+            if not self._loaded:
+                return None
+            if self._shadow is not None and self._shadow.spec == spec:
+                if collect:
+                    self._shadow_pending = []
+                return len(self._shadow)
+            self._shadow, self._shadow_pending = None, []
+        try:
+            store = QuantizedVectorStore.from_events(self._iter_file_events(), dtype="float32", spec=spec)
+        except Exception:
+            with self._lock:
+                self._shadow_pending = None
+            raise
+        with self._lock:
+            for op, event_id, event in self._shadow_pending or []:
+                _apply_vector_mutation(store, spec, op, event_id, event)
+            self._shadow, self._shadow_pending = store, [] if collect else None
+            return len(store)
+
+    def _iter_file_events(self) -> Iterable[Dict[str, Any]]:
+        for _, path, _ in list_event_files(self.user_dir):
+            try:
+                yield from read_event_file(path)
+            except Exception as e:
+                print(f"Failed to load {path}: {e}")
+
+    def add_shadow_vectors(self, spec, vectors: Dict[Any, List[float]]) -> int:
+        """재색인이 파일에 쓴 target 벡터를 shadow 저장소에도 반영."""
+        with self._lock:
+            if self._shadow is None or self._shadow.spec != spec:
+                return 0
+            return sum(1 for doc_id, vec in vectors.items() if doc_id in self.events and self._shadow.add(doc_id, vec))
+
+    def cut_over(self, spec) -> bool:
+        """shadow 저장소를 검색용 벡터 인덱스로 교체하고 검색 공간을 spec으로 바꾼다.
+
+        교체는 엔진 잠금 안에서 한 번에 일어나므로 검색 중단이나 섞인 공간의 결과가 없다.
+        shadow가 없으면(재색인 도중 재로드 등) 여기서 파일로 만든다. 로드되지 않은 엔진이면 False.
+        """
+        with self._lock:
+            if not self._loaded:
+                return False
+            if self._spec == spec:
+                return True
+        use_ann = self._use_ann()
+        if self.begin_shadow(spec, collect=use_ann) is None:
+            return False
+        index = None
+        if use_ann:
+            # IVF 학습은 잠금 밖에서, 그동안의 변경은 설치할 때 적용
+            from .ann_index import IVFFlatIndex
+
+            with self._lock:
+                shadow = self._shadow
+            if shadow is None:
+                return False
+            ids, matrix = shadow.export()
+            index = IVFFlatIndex.build(ids, matrix)
+            index.spec = spec
+        with self._lock:
+            if self._shadow is None:
+                # 설치 직전에 재로드됨: 다음 로드가 새 active 공간으로 읽는다
+                return False
+            for op, event_id, event in self._shadow_pending or []:
+                _apply_vector_mutation(self._shadow, spec, op, event_id, event)
+                if index is not None:
+                    _apply_vector_mutation(index, spec, op, event_id, event)
+            if index is not None:
+                from .ann_index import install_ann_index
+
+                install_ann_index(self.user_dir, index)
+            else:
+                from .quantized_store import install_quantized_store
+
+                install_quantized_store(self.user_dir, self._shadow)
+            self._spec = spec
+            self._shadow, self._shadow_pending = None, None
+            self._query_cache.clear()
+            self._counters["cut_overs"] += 1
+        # 새 공간으로 스냅샷을 게시: 다른 워커도 다음 쿼리 때 세대 교체로 넘어온다
+        self._schedule_snapshot(0)
+        return True
+
+    # ------------------------------------------------------------------ query
+    def _embed_query(self, text: str):
+        """(질의 벡터, 그 벡터의 공간). 공간은 엔진이 검색에 쓰는 self._spec."""
+        import numpy as np
+
+        spec = self._spec
+        key = (spec.model, spec.dim, spec.version, text)
+        with self._lock:
+            vec = self._query_cache.get(key)
+            if vec is not None:
+                self._query_cache.move_to_end(key)
+                self._counters["query_cache_hits"] += 1
+                return vec, spec
+            self._counters["query_cache_misses"] += 1
+        vec = np.asarray(spec.backend().embed_query(text), dtype=np.float32)
+        with self._lock:
+            self._query_cache[key] = vec
+            if len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return vec, spec
+
+    def _match_ids(self, criteria: Dict[str, Any]) -> Tuple[Optional[List[Any]], Dict[str, Any]]:
+        """(criteria에 맞는 id, reference_time이 확정된 criteria). criteria가 없으면 id는 None = 전체."""
+        if not criteria:
+            return None, criteria
+
+        def compute(resolved: Dict[str, Any]) -> List[Any]:
+            if set(resolved) <= INDEXED_CRITERIA:
+                return get_event_index(self.user_dir).match(resolved)
+            # 컬럼 인덱스가 모르는 기준은 메모리의 이벤트로 기존 필터를 그대로 적용
+            events = list(self.events.values())
+            excluded = set(map(id, filter_out_by_criteria(events, **resolved)))
+            return [e["id"] for e in events if id(e) not in excluded]
+
+        # 같은 criteria를 반복하는 대화/화면을 위해 id 목록을 (사용자, 정규화된 criteria, 디렉터리 버전)으로 캐시
+        # 인덱스가 반영한 상태(로드 횟수, 동기화한 토큰)를 namespace에 넣어, 캐시 키의 버전보다 뒤처진 인덱스로
+        # 계산한 결과가 최신 버전 키로 남지 않게 한다
+        namespace = f"engine:{self._counters['reloads']}:{self._synced[0]}:{self._synced[1]}"
+        ids, resolved, _ = cached_match_ids(self.user_dir, criteria, compute, namespace=namespace)
+        return ids, resolved
+
+    def _vector_hits(self, text: str, query_vec, k: int, allowed: Optional[set]) -> List[Any]:
+        if self._use_ann():
+            from .ann_index import get_ann_index
+
+            index = get_ann_index(self.user_dir)
+            hits = index.search(query_vec, k, allowed_ids=allowed)
+            embedded = index.location
+        else:
+            from .quantized_store import get_quantized_store
+
+            store = get_quantized_store(self.user_dir, "float32")
+            hits = store.coarse_search(query_vec, k, allowed_ids=allowed)
+            embedded = store.id_to_row
+        ranked = [doc_id for doc_id, _ in hits]
+        # 아직 임베딩되지 않은 이벤트는 lexical 순위로 보완
+        if len(embedded) < len(self.events):
+            pending = {i for i in (allowed if allowed is not None else self.events) if i not in embedded}
+            if pending:
+                lexical = [doc_id for doc_id, _ in get_lexical_index(self.user_dir).search(text, k=k, allowed_ids=pending)]
+                ranked = _fuse([ranked, lexical], k)
+        return ranked
+
+    def query(
+        self,
+        criteria: Optional[Dict[str, Any]] = None,
+        text: Optional[str] = None,
+        k: int = 10,
+        mode: str = "vector",
+    ) -> List[Dict[str, Any]]:
+        """criteria로 거르고 text가 있으면 mode(vector|lexical|hybrid)로 상위 k개를 반환.
+
+        text가 없으면 criteria에 맞는 이벤트 전체를 반환한다 (sort_by 지원, k 미적용).
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        self._ensure_loaded()
+        started = time.perf_counter()
+        criteria = dict(criteria or {})
+        # 질의 임베딩(원격 호출일 수 있음)은 엔진 잠금 밖에서
+        query_vec, query_spec = self._embed_query(text) if text and mode != "lexical" else (None, None)
+        while True:
+            with self._lock:
+                if query_vec is None or query_spec == self._spec:
+                    results = self._query_locked(criteria, text, k, mode, query_vec, started)
+                    break
+            # 질의를 임베딩하는 사이 cut-over가 끝났다: 잠금을 놓은 채 새 공간으로 다시 임베딩하고 다시 시도
+            query_vec, query_spec = self._embed_query(text)
+        return [dict(e) for e in results]
+
+    def _query_locked(self, criteria: Dict[str, Any], text: Optional[str], k: int, mode: str, query_vec, started: float) -> List[Dict[str, Any]]:
+        """query의 본문 (self._lock 안에서, query_vec은 self._spec 공간)."""
+        ids, criteria = self._match_ids(criteria)
+        if not text:
+            results = [self.events[i] for i in (ids if ids is not None else self.events) if i in self.events]
+            archived = self._archived_matches(criteria)
+            if archived:
+                # nearest_n / 제목 순위는 hot + 보관 이벤트 전체에서 다시 적용
+                results = _matching(results + archived, criteria)
+            results = _sort(results, criteria)
+        else:
+            allowed = set(ids) if ids is not None else None
+            depth = k if mode != "hybrid" else max(k * 3, 30)
+            rankings = []
+            if mode in ("vector", "hybrid"):
+                rankings.append(self._vector_hits(text, query_vec, depth, allowed))
+            if mode in ("lexical", "hybrid"):
+                rankings.append([doc_id for doc_id, _ in get_lexical_index(self.user_dir).search(text, k=depth, allowed_ids=allowed)])
+            ranked = rankings[0][:k] if len(rankings) == 1 else _fuse(rankings, k)
+            results = [self.events[i] for i in ranked if i in self.events]
+        self._counters["queries"] += 1
+        self._last_query = {
+            "mode": mode if text else "criteria",
+            "matched": len(self.events) if ids is None else len(ids),
+            "archived": len(archived) if not text else 0,
+            "returned": len(results),
+            "ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+        return results
+
+    def aggregate(
+        self,
+        criteria: Optional[Dict[str, Any]] = None,
+        group_by: Any = None,
+        metrics: Any = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """criteria에 맞는 이벤트를 group_by(week|weekday|month|member|location)별로 metrics(count|total_hours) 집계."""
+        self._ensure_loaded()
+        with self._lock:
+            ids, resolved = self._match_ids(dict(criteria or {}))
+            archived = self._archived_matches(resolved)
+            if not archived:
+                return get_event_index(self.user_dir).aggregate(ids, group_by, metrics, limit)
+            # 기간이 보관 범위에 닿는 드문 경우: 매칭된 hot + 보관 이벤트만으로 임시 인덱스를 만들어 집계
+            matched = [self.events[i] for i in (ids if ids is not None else self.events) if i in self.events]
+            return EventIndex.from_events(matched + archived).aggregate(None, group_by, metrics, limit)
+
+    def _archived_matches(self, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """criteria 기간이 보관 파티션에 닿으면 그 매칭 이벤트 (hot에 같은 id가 있으면 hot 우선)."""
+        if not criteria:
+            return []
+        return [_strip_vectors(e) for e in get_archive(self.user_dir).match(criteria) if e.get("id") not in self.events]
+
+    def all_events(self) -> List[Dict[str, Any]]:
+        self._ensure_loaded()
+        with self._lock:
+            return [dict(e) for e in self.events.values()]
+
+    def get_events(self, ids: Iterable[Any]) -> List[Dict[str, Any]]:
+        """id 순서대로 이벤트 (없는 id는 건너뜀)."""
+        self._ensure_loaded()
+        with self._lock:
+            return [dict(self.events[i]) for i in ids if i in self.events]
+
+    def get_event(self, event_id: Any) -> Optional[Dict[str, Any]]:
+        self._ensure_loaded()
+        with self._lock:
+            event = self.events.get(event_id)
+            return dict(event) if event is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        self._ensure_loaded()
+        with self._lock:
+            hits, misses = self._counters["query_cache_hits"], self._counters["query_cache_misses"]
+            stats = {
+                "user_dir": self.user_dir,
+                "data_version": data_version(self.user_dir),
+                "events": len(self.events),
+                "time_index": len(get_event_index(self.user_dir)),
+                "lexical_docs": len(get_lexical_index(self.user_dir).doc_len),
+                "vector_index": "ivf" if self._use_ann() else "float32",
+                "spec": self._spec.to_meta(),
+                "shadow": {"spec": self._shadow.spec.to_meta(), "vectors": len(self._shadow)} if self._shadow is not None else None,
+                "load_ms": self._load_ms,
+                "snapshot": dict(self._snapshot, generation=self._generation.read() if self._generation else None),
+                "query_cache": {"size": len(self._query_cache), "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None},
+                "criteria_cache": criteria_cache_stats(),
+                "archive": get_archive(self.user_dir).stats(),
+                "last_query": dict(self._last_query),
+                **self._counters,
+            }
+        if not self._use_ann():
+            from .quantized_store import get_quantized_store
+
+            store = get_quantized_store(self.user_dir, "float32")
+            stats["vectors"] = len(store)
+            stats["vector_bytes"] = store.nbytes
+            # 스냅샷 mmap을 통해 다른 워커와 공유되는 부분 (나머지는 이 프로세스의 private overlay)
+            stats["vector_shared_bytes"] = store.shared_nbytes
+        return stats
+
+    # ------------------------------------------------- 기존 RAG 클래스 API 호환
+    def parse_with_criteria(self, criteria: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Dict[str, Any]]:
+        return self.query({**(criteria or {}), **kwargs})
+
+    def parse_with_content(self, query: Optional[str] = None, criteria: Optional[Dict[str, Any]] = None, k: int = 10, mode: str = "vector", **_: Any) -> List[Dict[str, Any]]:
+        if not query:
+            return []
+        return self.query(criteria, query, k, mode)
+
+    def embed_event(self, event: dict) -> dict:
+        """Input: 이벤트, Output: 이벤트 + embedding 필드"""
+        from .parsing_with_content import embed_event
+
+        return embed_event(event, self.user_dir)
+
+
+def _weak_listener(engine: "RAG"):
+    """engine._on_mutation을 약하게 참조하는 변경 리스너 (엔진이 수거됐으면 스스로 등록을 푼다)."""
+    method = weakref.WeakMethod(engine._on_mutation)
+
+    def listener(key: str, op: str, event_id: Optional[int], event: Optional[Dict[str, Any]]) -> None:
+        on_mutation = method()
+        if on_mutation is None:
+            unregister_mutation_listener(listener)
+            return
+        on_mutation(key, op, event_id, event)
+
+    return listener
+
+
+def _materialize_events(events: Iterable[Dict[str, Any]]) -> str:
+    """이벤트 목록을 임시 디렉터리의 이벤트별 파일로 쓰고, 활성 공간 벡터가 없는 이벤트는 임베딩한다 (RAG(events) 호환)."""
+    from .parsing_with_content import embed_events
+    from .state import atomic_write_json
+
+    user_dir = tempfile.mkdtemp(prefix="moro-events-")
+    events = [dict(e) for e in events if isinstance(e, dict)]
+    used = {e["id"] for e in events if isinstance(e.get("id"), int)}
+    next_id = max(used, default=0) + 1
+    seen = set()
+    for event in events:
+        if not isinstance(event.get("id"), int) or event["id"] in seen:
+            # id가 없거나 겹치면 파일 이름으로 쓸 수 없으므로 새 id
+            event["id"] = next_id
+            next_id += 1
+        seen.add(event["id"])
+        atomic_write_json(os.path.join(user_dir, f"{event['id']:04d}.json"), event)
+    if events:
+        embed_events(events, vector_dir=user_dir)
+    return user_dir
+
+
+def _event_text(event: Dict[str, Any]) -> str:
+    from .parsing_with_content import _concat_event_fields
+
+    return _concat_event_fields(event)
+
+
+def _apply_vector_mutation(index: Any, spec, op: str, event_id: Any, event: Optional[Dict[str, Any]]) -> None:
+    """add/remove를 가진 벡터 인덱스(QuantizedVectorStore, IVFFlatIndex)에 변경 하나를 반영."""
+    if op == "delete" and event_id is not None:
+        index.remove(event_id)
+    elif op in ("add", "update") and event is not None:
+        doc_id = event.get("id", event_id)
+        vec = event_vector(event, spec)
+        if vec is None or not index.add(doc_id, vec):
+            index.remove(doc_id)
+
+
+def _fuse(rankings: List[List[Any]], k: int, rrf_k: int = 60) -> List[Any]:
+    """id 순위 목록들의 reciprocal-rank fusion."""
+    scores: Dict[Any, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=lambda doc_id: -scores[doc_id])[:k]
+
+
+def _sort(events: List[Dict[str, Any]], criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+    sort_by = criteria.get("sort_by")
+    if sort_by == "start":
+        return sorted(events, key=lambda e: _event_window(e)[0])
+    if sort_by == "nearest":
+        ref = criteria.get("reference_time")
+        return sorted(events, key=lambda e: _nearest_key(_event_window(e)[0], ref))
+    return events
+
+
+_engines: Dict[str, RAG] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(user_dir: str = "Database/[user]") -> RAG:
+    """디렉터리별로 하나의 엔진을 만들어 공유."""
+    key = user_key(user_dir)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = RAG(user_dir)
+            _engines[key] = engine
+        return engine
+
+
+def peek_engine(user_dir: str = "Database/[user]") -> Optional[RAG]:
+    """이미 만들어진 엔진 (없으면 만들지 않고 None)."""
+    with _engines_lock:
+        return _engines.get(user_key(user_dir))
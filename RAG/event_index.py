@@ -0,0 +1,651 @@
+"""
+시작 시각 기반 컬럼형 이벤트 인덱스 (time index).
+
+이벤트마다 시작 시각에서 파생한 컬럼(epoch, 날짜, 요일, 시/분, 월, 연도)과 종료 시각을 NumPy 배열로 유지한다.
+- match(criteria): 지원하는 기준을 파일을 읽지 않고 컬럼 연산으로 평가해 매칭 ID를 반환
+- estimate(criteria): 값별 히스토그램(독립 가정)으로 선택도(selectivity)를 추정
+- aggregate(ids, group_by, metrics): 주/요일/월/멤버/장소별 개수, 시간 합계 (RAG/aggregate.py)
+- and/or/not, member/location이 들어간 criteria는 값별 bitmap(criteria_expr)으로 평가하고
+  선택도도 bitmap popcount로 정확히 계산한다
+- member/location은 값 -> id 역색인으로 유지 (정확 일치는 dict 조회, 접두어는 정렬된 키에서 이분 탐색).
+  이 조건만 있는 질의는 매칭 수에 비례하는 시간에 답한다
+- title은 제목 trigram 색인(title_index.TitleIndex)으로 퍼지 매칭하고, 결과를 유사도 순으로 반환한다
+- 변경은 행 단위로 반영한다: upsert는 그 행의 컬럼/히스토그램/캐시된 bitmap 비트만 고치거나 끝에 덧붙이고,
+  remove는 행을 tombstone으로 표시한다. tombstone이 쌓이면 압축(_compact)하면서 행 위치 캐시를 다시 만든다
+
+기준 해석은 parsing_with_criteria의 _matches_* 함수를 컬럼의 "고유값"에 적용해서 얻으므로
+parse_with_criteria와 의미가 같다.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from bisect import bisect_left
+from collections import Counter
+from datetime import date as date_cls, datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .criteria_expr import evaluate, is_expression, popcount, to_bitmap, to_rows
+from .title_index import TitleIndex
+from .index_hooks import register_mutation_listener, storage_version, user_key
+from .parsing_with_criteria import (
+    KST,
+    _compile_hour,
+    _event_window,
+    _matches_hour,
+    _matches_month,
+    _matches_weekday,
+    _matches_year,
+    _tag_values,
+    event_location,
+    event_members,
+    load_events,
+    tag_key,
+)
+
+
+# 컬럼 인덱스로 평가할 수 있는 기준 (그 외 기준이 있으면 호출 측이 일반 경로로 처리)
+INDEXED_CRITERIA = {
+    "date", "weekday", "hour", "year", "month", "time_window_hours", "reference_time", "nearest_n", "sort_by",
+    "and", "or", "not", "member", "location", "member_prefix", "location_prefix", "title",
+}
+_TAG_CRITERIA = {"member", "location", "member_prefix", "location_prefix", "title"}
+
+_COLUMNS = ("epoch", "ordinal", "weekday", "minute_of_day", "month", "year", "finish")
+# 초 단위 timestamp 컬럼 (나머지는 정수)
+_EPOCH_COLUMNS = ("epoch", "finish")
+_MIN_CAPACITY = 64
+# tombstone이 이 수와 살아 있는 행의 1/4을 넘으면 압축한다
+COMPACT_MIN_DEAD = int(os.getenv("EVENT_INDEX_COMPACT_MIN_DEAD", "256"))
+
+
+def _empty_store(capacity: int) -> Dict[str, np.ndarray]:
+    store = {"id": np.zeros(capacity, dtype=np.int64)}
+    for name in _COLUMNS:
+        store[name] = np.zeros(capacity, dtype=np.float64 if name in _EPOCH_COLUMNS else np.int64)
+    return store
+
+
+def _row(event: Dict[str, Any]) -> Optional[tuple]:
+    try:
+        start, finish = _event_window(event)
+    except Exception:
+        return None
+    return (
+        start.timestamp(),
+        start.toordinal(),
+        start.weekday(),
+        start.hour * 60 + start.minute,
+        start.month,
+        start.year,
+        max(finish, start).timestamp(),
+    )
+
+
+def _reference_epoch(reference_time: Any) -> float:
+    if reference_time is None:
+        ref = datetime.now(tz=KST)
+    elif isinstance(reference_time, str):
+        ref = datetime.fromisoformat(reference_time)
+    else:
+        ref = reference_time
+    if ref.tzinfo is None:
+        ref = ref.replace(tzinfo=KST)
+    return ref.timestamp()
+
+
+def _tags(event: Dict[str, Any]) -> Dict[str, Set[str]]:
+    """member/location 역색인 키 (parsing_with_criteria.tag_key로 정규화)."""
+    location = event_location(event)
+    return {"member": set(event_members(event)), "location": {location} if location else set()}
+
+
+class EventIndex:
+    def __init__(self) -> None:
+        # 행 위치 기준 컬럼 저장소 (여유 용량 포함, 앞의 _size 행만 사용). from_columns의 공유 배열은 첫 변경 때 복사
+        self._store: Dict[str, np.ndarray] = _empty_store(0)
+        self._size = 0
+        self._shared = False
+        # 삭제는 행을 지우지 않고 tombstone으로 표시 (None이면 모든 행이 살아 있음). 쌓이면 _compact
+        self._alive: Optional[np.ndarray] = None
+        self._dead = 0
+        self._histograms: Optional[Dict[str, Counter]] = None
+        # member/location 값 -> id 집합, id -> 등록된 값 (삭제/갱신 시 역색인 정리용)
+        self._tag_ids: Dict[str, Dict[str, Set[int]]] = {"member": {}, "location": {}}
+        self._doc_tags: Dict[int, Dict[str, Set[str]]] = {}
+        # 접두어 검색용 정렬된 키 (키가 추가/삭제될 때만 다시 정렬)
+        self._tag_keys: Dict[str, Optional[List[str]]] = {"member": None, "location": None}
+        self.titles = TitleIndex()
+        # (컬럼, 값) -> bitset, id -> 행 위치. 변경된 행의 비트만 고치고, 압축(_compact) 때만 버린다
+        self._bitmaps: Dict[tuple, int] = {}
+        self._live_bits: Optional[int] = None
+        self._positions: Optional[Dict[int, int]] = None
+        self._pairs: Dict[str, tuple] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_events(cls, events: Iterable[Dict[str, Any]]) -> "EventIndex":
+        index = cls()
+        for event in events:
+            index.upsert(event)
+        return index
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], events: Iterable[Dict[str, Any]] = ()) -> "EventIndex":
+        """arrays()와 같은 모양의 컬럼(스냅샷의 읽기 전용 mmap 뷰 등)에서 복원.
+
+        배열은 복사 없이 그대로 쓰고, 첫 변경 때 쓸 수 있는 저장소로 복사한다.
+        events는 member/location 역색인용 (컬럼에는 없음).
+        """
+        missing = {"id", *_COLUMNS} - set(columns)
+        if missing:
+            # 이전 형식의 스냅샷: 호출 측이 파일에서 다시 만든다
+            raise KeyError(f"missing time columns: {', '.join(sorted(missing))}")
+        index = cls()
+        index._store = {name: columns[name] for name in ("id", *_COLUMNS)}
+        index._size = len(columns["id"])
+        index._shared = True
+        # 시간 컬럼에 행이 있는(시작 시각이 유효한) 이벤트만 역색인에 넣는다 (upsert와 같은 규칙)
+        indexed = set(columns["id"].tolist())
+        for event in events:
+            if event.get("id") in indexed:
+                index._index_tags(event["id"], event)
+        return index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size - self._dead
+
+    def upsert(self, event: Dict[str, Any]) -> None:
+        doc_id = event.get("id")
+        if doc_id is None:
+            return
+        row = _row(event)
+        with self._lock:
+            if row is None:
+                self._remove(doc_id)
+                return
+            old_title = self.titles.doc_grams.get(doc_id)
+            old_tags = self._doc_tags.get(doc_id)
+            self._unindex_tags(doc_id)
+            self._index_tags(doc_id, event)
+            position = self._position_map().get(doc_id)
+            if position is None:
+                position = self._append(doc_id, row)
+            else:
+                self._patch(position, row)
+            if self.titles.doc_grams.get(doc_id) != old_title:
+                # 제목 bitmap은 퍼지 검색 결과라 행 하나로 고칠 수 없다: 제목 질의 것만 버린다
+                self._bitmaps = {key: bits for key, bits in self._bitmaps.items() if key[0] != "title"}
+            if self._doc_tags.get(doc_id) != old_tags:
+                self._pairs = {}
+            self._set_bits(position, doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: int) -> None:
+        if doc_id in self._doc_tags:
+            self._pairs = {}
+        self._unindex_tags(doc_id)
+        position = self._position_map().pop(doc_id, None)
+        if position is None:
+            return
+        if self._alive is None:
+            self._alive = np.ones(len(self._store["id"]), dtype=bool)
+        self._alive[position] = False
+        self._dead += 1
+        self._count(self._row_at(position), -1)
+        bit = 1 << position
+        self._bitmaps = {key: bits & ~bit for key, bits in self._bitmaps.items()}
+        if self._live_bits is not None:
+            self._live_bits &= ~bit
+        if self._dead > max(COMPACT_MIN_DEAD, self._size // 4):
+            self._compact()
+
+    def _writable(self, extra: int = 0) -> Dict[str, np.ndarray]:
+        """제자리에서 고칠 수 있는 저장소 (공유 배열이면 복사, 자리가 모자라면 용량을 두 배로)."""
+        capacity = len(self._store["id"])
+        needed = self._size + extra
+        if self._shared or needed > capacity:
+            if needed > capacity:
+                capacity = max(_MIN_CAPACITY, needed, capacity * 2)
+            grown = _empty_store(capacity)
+            for name, arr in self._store.items():
+                grown[name][: self._size] = arr[: self._size]
+            if self._alive is not None:
+                alive = np.zeros(capacity, dtype=bool)
+                alive[: self._size] = self._alive[: self._size]
+                self._alive = alive
+            self._store = grown
+            self._shared = False
+        return self._store
+
+    def _append(self, doc_id: int, row: tuple) -> int:
+        store = self._writable(1)
+        position = self._size
+        store["id"][position] = doc_id
+        for name, value in zip(_COLUMNS, row):
+            store[name][position] = value
+        if self._alive is not None:
+            self._alive[position] = True
+        self._size += 1
+        self._positions[doc_id] = position
+        if self._live_bits is not None:
+            self._live_bits |= 1 << position
+        self._count(row, 1)
+        return position
+
+    def _patch(self, position: int, row: tuple) -> None:
+        self._count(self._row_at(position), -1)
+        store = self._writable()
+        for name, value in zip(_COLUMNS, row):
+            store[name][position] = value
+        self._count(row, 1)
+
+    def _row_at(self, position: int) -> tuple:
+        return tuple(self._store[name][position].item() for name in _COLUMNS)
+
+    def _count(self, row: tuple, delta: int) -> None:
+        """만들어 둔 히스토그램에 행 하나를 더하거나 뺀다."""
+        if self._histograms is None:
+            return
+        for name, value in zip(_COLUMNS, row):
+            if name in _EPOCH_COLUMNS:
+                continue
+            counter = self._histograms[name]
+            counter[int(value)] += delta
+            if counter[int(value)] <= 0:
+                del counter[int(value)]
+
+    def _set_bits(self, position: int, doc_id: int) -> None:
+        """캐시된 bitmap마다 갱신된 행 하나의 비트를 다시 계산."""
+        tags = self._doc_tags.get(doc_id, {})
+        bit = 1 << position
+        for key, bits in self._bitmaps.items():
+            if key[0] == "title":
+                continue
+            if len(key) == 3:
+                field, prefix, value = key
+                member = any(tag.startswith(value) if prefix else tag == value for tag in tags.get(field, ()))
+            elif key[0] == "hour":
+                member = int(self._store["minute_of_day"][position]) // 60 == key[1]
+            else:
+                member = self._store[key[0]][position] == key[1]
+            self._bitmaps[key] = bits | bit if member else bits & ~bit
+
+    def _compact(self) -> None:
+        """tombstone 행을 빼고 저장소를 다시 채운다. 행 위치가 바뀌므로 bitmap/위치 캐시만 버린다 (히스토그램은 그대로)."""
+        live = self._alive[: self._size]
+        self._store = {name: arr[: self._size][live] for name, arr in self._store.items()}
+        self._size = len(self._store["id"])
+        self._alive = None
+        self._dead = 0
+        self._shared = False
+        self._bitmaps = {}
+        self._live_bits = None
+        self._positions = None
+        self._pairs = {}
+
+    def _position_map(self) -> Dict[int, int]:
+        if self._positions is None:
+            ids = self._store["id"][: self._size].tolist()
+            live = self._live_mask()
+            self._positions = {
+                doc_id: i for i, doc_id in enumerate(ids) if live is None or live[i]
+            }
+        return self._positions
+
+    def _live_mask(self) -> Optional[np.ndarray]:
+        return None if self._alive is None else self._alive[: self._size]
+
+    def _index_tags(self, doc_id: int, event: Dict[str, Any]) -> None:
+        self.titles.add(doc_id, event.get("title"))
+        tags = _tags(event)
+        self._doc_tags[doc_id] = tags
+        for field, values in tags.items():
+            for value in values:
+                ids = self._tag_ids[field].get(value)
+                if ids is None:
+                    ids = self._tag_ids[field][value] = set()
+                    self._tag_keys[field] = None
+                ids.add(doc_id)
+
+    def _unindex_tags(self, doc_id: int) -> None:
+        self.titles.remove(doc_id)
+        tags = self._doc_tags.pop(doc_id, None)
+        if tags is None:
+            return
+        for field, values in tags.items():
+            for value in values:
+                ids = self._tag_ids[field].get(value)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del self._tag_ids[field][value]
+                        self._tag_keys[field] = None
+
+    def tag_ids(self, field: str, value: str, prefix: bool = False) -> Set[int]:
+        """member/location 값(또는 접두어)을 가진 이벤트 id. 반환 집합을 수정하지 말 것."""
+        key = tag_key(value)
+        postings = self._tag_ids[field]
+        if not prefix:
+            return postings.get(key, set())
+        with self._lock:
+            keys = self._tag_keys[field]
+            if keys is None:
+                keys = self._tag_keys[field] = sorted(postings)
+            found: Set[int] = set()
+            for name in keys[bisect_left(keys, key):]:
+                if not name.startswith(key):
+                    break
+                found |= postings[name]
+            return found
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """행 위치 기준 컬럼 뷰 (tombstone 행 포함, live_rows()로 거른다). 제자리에서 바뀌므로 잠금 안에서만 쓸 것."""
+        with self._lock:
+            return {name: arr[: self._size] for name, arr in self._store.items()}
+
+    def live_rows(self) -> np.ndarray:
+        with self._lock:
+            live = self._live_mask()
+            return np.arange(self._size) if live is None else np.flatnonzero(live)
+
+    def live_bitmap(self) -> int:
+        with self._lock:
+            if self._live_bits is None:
+                live = self._live_mask()
+                self._live_bits = (1 << self._size) - 1 if live is None else to_bitmap(live)
+            return self._live_bits
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """살아 있는 행만 담은 컬럼 사본 (스냅샷 저장용, from_columns로 복원)."""
+        with self._lock:
+            live = self._live_mask()
+            return {name: arr.copy() if live is None else arr[live] for name, arr in self.columns().items()}
+
+    def histograms(self) -> Dict[str, Counter]:
+        # 처음 한 번만 세고, 이후에는 upsert/remove가 바뀐 행만 더하고 뺀다
+        with self._lock:
+            if self._histograms is None:
+                columns = self.columns()
+                live = self._live_mask()
+                self._histograms = {
+                    name: Counter((columns[name] if live is None else columns[name][live]).tolist())
+                    for name in _COLUMNS
+                    if name not in _EPOCH_COLUMNS
+                }
+            return self._histograms
+
+    # 기준 값 -> 컬럼에서 허용되는 값 집합 (기존 _matches_* 의미를 그대로 사용)
+    def _allowed_values(self, field: str, value: Any) -> Set[int]:
+        hist = self.histograms()
+        if field == "date":
+            return {o for o in hist["ordinal"] if date_cls.fromordinal(o).strftime("%Y-%m-%d") == value}
+        if field == "weekday":
+            return {w for w in range(7) if _matches_weekday(datetime(2024, 1, 1 + w), value)}
+        if field == "hour":
+            return {m for m in hist["minute_of_day"] if _matches_hour(datetime(2000, 1, 1, m // 60, m % 60), value)}
+        if field == "month":
+            return {m for m in range(1, 13) if _matches_month(datetime(2000, m, 1), value)}
+        if field == "year":
+            return {y for y in hist["year"] if _matches_year(datetime(y, 1, 1), value)}
+        raise KeyError(field)
+
+    _FIELD_COLUMN = {"date": "ordinal", "weekday": "weekday", "hour": "minute_of_day", "month": "month", "year": "year"}
+    BITMAP_FIELDS = frozenset(_FIELD_COLUMN)
+
+    # --- 값별 bitmap (criteria_expr.evaluate가 사용, 잠금은 호출 측) ---
+
+    def _column_bitmap(self, column: str, value: int) -> int:
+        key = (column, value)
+        bits = self._bitmaps.get(key)
+        if bits is None:
+            columns = self.columns()
+            values = columns["minute_of_day"] // 60 if column == "hour" else columns[column]
+            bits = self._bitmaps[key] = to_bitmap(self._only_live(values == value))
+        return bits
+
+    def value_bitmap(self, field: str, value: Any) -> int:
+        """date/weekday/hour/month/year 기준 하나의 bitset (허용 값별 bitmap의 OR)."""
+        if field == "hour":
+            compiled = _compile_hour(value)
+            if compiled[0] == "h":
+                return self._column_bitmap("hour", compiled[1])
+            if compiled[0] == "hm":
+                return self._column_bitmap("minute_of_day", compiled[1] * 60 + compiled[2])
+        bits = 0
+        for allowed in self._allowed_values(field, value):
+            bits |= self._column_bitmap(self._FIELD_COLUMN[field], allowed)
+        return bits
+
+    def window_bitmap(self, reference_time: Any, hours: float) -> int:
+        epochs = self.columns()["epoch"]
+        return to_bitmap(self._only_live(np.abs(epochs - _reference_epoch(reference_time)) / 3600 <= hours))
+
+    def tag_bitmap(self, field: str, value: str, prefix: bool = False) -> int:
+        """member/location 값(또는 접두어) 하나의 bitset (역색인 id 집합 -> 행 위치)."""
+        key = (field, prefix, tag_key(value))
+        bits = self._bitmaps.get(key)
+        if bits is None:
+            bits = self._bitmaps[key] = self._ids_bitmap(self.tag_ids(field, value, prefix))
+        return bits
+
+    def title_bitmap(self, title: str) -> int:
+        key = ("title", title)
+        bits = self._bitmaps.get(key)
+        if bits is None:
+            bits = self._bitmaps[key] = self._ids_bitmap(doc_id for doc_id, _ in self.titles.search(title))
+        return bits
+
+    def _ids_bitmap(self, ids: Iterable[int]) -> int:
+        mask = np.zeros(self._size, dtype=bool)
+        mask[self.positions(ids)] = True
+        return to_bitmap(mask)
+
+    def positions(self, ids: Iterable[int]) -> np.ndarray:
+        """id -> columns() 행 위치 (행이 없거나 삭제된 id는 건너뜀)."""
+        with self._lock:
+            positions = self._position_map()
+            return np.fromiter((positions[i] for i in ids if i in positions), dtype=np.int64)
+
+    def _only_live(self, mask: np.ndarray) -> np.ndarray:
+        live = self._live_mask()
+        return mask if live is None else mask & live
+
+    def tag_pairs(self, field: str) -> tuple:
+        """member/location 역색인을 (행 위치 배열, 값 코드 배열, 값 목록)으로 펼친 것 (집계용, 변경 시 다시 만듦)."""
+        with self._lock:
+            pairs = self._pairs.get(field)
+            if pairs is None:
+                labels = sorted(self._tag_ids[field])
+                rows: List[np.ndarray] = []
+                codes: List[np.ndarray] = []
+                for code, label in enumerate(labels):
+                    found = self.positions(self._tag_ids[field][label])
+                    rows.append(found)
+                    codes.append(np.full(len(found), code, dtype=np.int64))
+                empty = np.zeros(0, dtype=np.int64)
+                pairs = self._pairs[field] = (
+                    np.concatenate(rows) if rows else empty,
+                    np.concatenate(codes) if codes else empty,
+                    labels,
+                )
+            return pairs
+
+    def _tag_only_ids(self, criteria: Dict[str, Any]) -> Optional[Set[int]]:
+        """member/location/title 조건만 있으면 역색인 교집합 (O(매칭 수)), 아니면 None."""
+        fields = {k for k, v in criteria.items() if v is not None and k not in ("sort_by", "reference_time")}
+        if not fields or not fields <= _TAG_CRITERIA:
+            return None
+        found: Optional[Set[int]] = None
+        for field in sorted(fields):
+            if field == "title":
+                ids = {doc_id for doc_id, _ in self.titles.search(criteria["title"])}
+                found = ids if found is None else found & ids
+                continue
+            for value in _tag_values(field, criteria[field]):
+                ids = self.tag_ids(field.split("_")[0], value, prefix=field.endswith("_prefix"))
+                found = set(ids) if found is None else found & ids
+        return found
+
+    def _expression_rows(self, criteria: Dict[str, Any]) -> np.ndarray:
+        return to_rows(evaluate(self, criteria, criteria.get("reference_time")), self._size)
+
+    def _rank_by_title(self, criteria: Dict[str, Any], ids: Iterable[int]) -> List[int]:
+        if criteria.get("title") is None:
+            return list(ids)
+        if not any(v is not None for k, v in criteria.items() if k not in ("title", "sort_by", "reference_time")):
+            # title만 있으면 trigram 검색 결과 순서 그대로
+            return [doc_id for doc_id, _ in self.titles.search(criteria["title"])]
+        rank = {doc_id: i for i, (doc_id, _) in enumerate(self.titles.search(criteria["title"]))}
+        return sorted(ids, key=lambda doc_id: rank.get(doc_id, len(rank)))
+
+    def match(self, criteria: Optional[Dict[str, Any]] = None) -> List[int]:
+        """criteria(INDEXED_CRITERIA 범위)에 맞는 이벤트 ID (sort_by는 무시, title이 있으면 제목 유사도순)."""
+        criteria = criteria or {}
+        with self._lock:
+            tagged = self._tag_only_ids(criteria)
+            if tagged is not None:
+                return self._rank_by_title(criteria, sorted(tagged))
+            arrays = self.columns()
+            ref = _reference_epoch(criteria.get("reference_time"))
+            if is_expression(criteria):
+                rows = self._expression_rows(criteria)
+            else:
+                mask = np.ones(len(arrays["id"]), dtype=bool)
+                for field, column in self._FIELD_COLUMN.items():
+                    if criteria.get(field) is not None:
+                        allowed = np.fromiter(self._allowed_values(field, criteria[field]), dtype=np.int64)
+                        mask &= np.isin(arrays[column], allowed)
+                if criteria.get("time_window_hours") is not None:
+                    mask &= np.abs(arrays["epoch"] - ref) / 3600 <= float(criteria["time_window_hours"])
+                rows = np.flatnonzero(self._only_live(mask))
+            if criteria.get("nearest_n") is not None:
+                distance = np.abs(arrays["epoch"][rows] - ref)
+                rows = rows[np.argsort(distance, kind="stable")[: max(0, int(criteria["nearest_n"]))]]
+            return self._rank_by_title(criteria, arrays["id"][rows].tolist())
+
+    def aggregate(
+        self,
+        ids: Optional[Iterable[int]] = None,
+        group_by: Any = None,
+        metrics: Any = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """ids(None이면 전체) 이벤트를 group_by별로 집계 (RAG/aggregate.py)."""
+        from .aggregate import aggregate_rows
+
+        with self._lock:
+            return aggregate_rows(self, self.live_rows() if ids is None else self.positions(ids), group_by, metrics, limit)
+
+    def estimate(self, criteria: Optional[Dict[str, Any]] = None) -> float:
+        """히스토그램 기반 선택도 추정치 (0~1). 필드 간 독립을 가정한다."""
+        criteria = criteria or {}
+        with self._lock:
+            total = len(self)
+            if total == 0:
+                return 0.0
+            tagged = self._tag_only_ids(criteria)
+            if tagged is not None:
+                return len(tagged) / total
+            if is_expression(criteria):
+                # bitmap이 있으므로 추정 대신 정확한 개수
+                selectivity = popcount(evaluate(self, criteria, criteria.get("reference_time"))) / total
+                if criteria.get("nearest_n") is not None:
+                    selectivity = min(selectivity, int(criteria["nearest_n"]) / total)
+                return selectivity
+            hist = self.histograms()
+            selectivity = 1.0
+            for field, column in self._FIELD_COLUMN.items():
+                if criteria.get(field) is None:
+                    continue
+                allowed = self._allowed_values(field, criteria[field])
+                selectivity *= sum(hist[column].get(v, 0) for v in allowed) / total
+            if criteria.get("time_window_hours") is not None:
+                # 정렬된 epoch에서 이분 탐색 (정확한 개수)
+                epochs = np.sort(self.columns()["epoch"][self.live_rows()])
+                ref = _reference_epoch(criteria.get("reference_time"))
+                window = float(criteria["time_window_hours"]) * 3600
+                inside = np.searchsorted(epochs, ref + window, side="right") - np.searchsorted(epochs, ref - window, side="left")
+                selectivity *= inside / total
+            if criteria.get("nearest_n") is not None:
+                selectivity = min(selectivity, int(criteria["nearest_n"]) / total)
+            return selectivity
+
+
+_indexes: Dict[str, EventIndex] = {}
+# 엔진 없이 파일에서 만든 인덱스가 반영한 디렉터리 상태 (엔진이 설치한 인덱스는 엔진이 맞추므로 없음)
+_built_at: Dict[str, Tuple[int, int]] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_event_index(user_dir: str = "Database/[user]", events: Optional[List[Dict[str, Any]]] = None) -> EventIndex:
+    key = user_key(user_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            token = storage_version(user_dir)
+            index = EventIndex.from_events(events if events is not None else load_events(user_dir))
+            _indexes[key] = index
+            _built_at[key] = token
+        return index
+
+
+def fresh_event_index(user_dir: str = "Database/[user]") -> EventIndex:
+    """함수형 API용: 다른 프로세스의 변경까지 반영한 공유 인덱스.
+
+    엔진이 로드되어 있으면 엔진이 바뀐 파일을 다시 읽게 하고, 아니면 storage_version이
+    만들 때와 다르면 파일에서 다시 만든다.
+    """
+    from .engine import peek_engine
+
+    engine = peek_engine(user_dir)
+    if engine is not None and engine.loaded:
+        engine.refresh()
+        return get_event_index(user_dir)
+    key = user_key(user_dir)
+    token = storage_version(user_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or _built_at.get(key, token) != token:
+            index = _indexes[key] = EventIndex.from_events(load_events(user_dir))
+            _built_at[key] = token
+        return index
+
+
+def install_event_index(user_dir: str, index: EventIndex) -> None:
+    """이미 만든 인덱스(엔진 로드/스냅샷 복원)를 디렉터리의 공유 인덱스로 등록."""
+    key = user_key(user_dir)
+    with _indexes_lock:
+        _indexes[key] = index
+        _built_at.pop(key, None)
+
+
+def _on_mutation(key: str, op: str, event_id: Optional[int], event: Optional[Dict[str, Any]]) -> None:
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            return
+        if op == "reload":
+            del _indexes[key]
+            _built_at.pop(key, None)
+            return
+    if op == "delete" and event_id is not None:
+        index.remove(event_id)
+    elif op in ("add", "update") and event is not None:
+        index.upsert(event)
+    with _indexes_lock:
+        built = _built_at.get(key)
+        if built is not None:
+            current = storage_version(key)
+            if current[0] == built[0] + 1:
+                # 이 변경 하나만 있었다: 이미 반영했으므로 다시 만들지 않는다
+                _built_at[key] = current
+
+
+register_mutation_listener(_on_mutation)
@@ -0,0 +1,261 @@
+"""
+iCalendar(.ics, RFC 5545) 스트리밍 파서/작성기.
+
+큰 파일도 한 번에 메모리에 올리지 않도록 줄 단위 generator로 처리한다.
+- iter_ics_events(lines): 줄 iterable(열린 파일 등) -> 이벤트 dict generator (VEVENT 하나씩)
+  - 접힌 줄(공백/탭으로 시작) 펼치기, 텍스트 이스케이프(\\n \\, \\; \\\\) 해제
+  - DTSTART/DTEND: UTC(Z), TZID(zoneinfo), 날짜만(VALUE=DATE, 종일) 지원. DTEND가 없으면 DURATION, 그것도 없으면 시작과 같음(종일은 +1일)
+  - ATTENDEE의 CN(없으면 mailto 주소)과 X-MORO-MEMBER -> member, UID -> ics_uid, RECURRENCE-ID -> ics_recurrence_id (같은 UID의 예외 일정 구분), RRULE은 원문 그대로 rrule에 보존 (반복 전개는 하지 않음)
+  - VALARM 등 VEVENT 안의 하위 컴포넌트는 무시
+- iter_ics_lines(events): 이벤트 iterable -> CRLF로 끝나는 줄 generator (75옥텟 접기, UTC 시각)
+  - 이메일이 아닌 member는 X-MORO-MEMBER로 쓴다 (ATTENDEE는 cal-address가 필요)
+날짜는 저장소 형식(KST, +09:00 ISO 8601)으로 변환한다.
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from .parsing_with_criteria import KST, _event_window
+
+
+PRODID = "-//Moro//Calendar//KO"
+_FOLD_OCTETS = 75
+_DURATION_RE = re.compile(r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+_UNESCAPE_RE = re.compile(r"\\([\\;,nN])")
+
+
+def _unfold(lines: Iterable[str]) -> Iterator[str]:
+    current: Optional[str] = None
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _split_outside_quotes(text: str, sep: str) -> List[str]:
+    parts, start, quoted = [], 0, False
+    for i, ch in enumerate(text):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == sep and not quoted:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def parse_content_line(line: str) -> Tuple[str, Dict[str, str], str]:
+    """`NAME;PARAM=value:값` -> (NAME, {PARAM: value}, 값)."""
+    quoted = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == ":" and not quoted:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        head, value = line, ""
+    name, *raw_params = _split_outside_quotes(head, ";")
+    params = {}
+    for param in raw_params:
+        key, _, val = param.partition("=")
+        params[key.upper()] = val.strip('"')
+    return name.upper(), params, value
+
+
+def unescape_text(value: str) -> str:
+    return _UNESCAPE_RE.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def escape_text(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+@lru_cache(maxsize=64)
+def _zone(tzid: Optional[str]):
+    if not tzid:
+        return KST
+    try:
+        from zoneinfo import ZoneInfo
+
+        return ZoneInfo(tzid)
+    except Exception:
+        return KST
+
+
+def parse_ics_time(value: str, params: Dict[str, str]) -> Tuple[datetime, bool]:
+    """(KST datetime, 종일 여부). 형식이 잘못되면 ValueError."""
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value, "%Y%m%d").replace(tzinfo=KST), True
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc).astimezone(KST), False
+    naive = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    return naive.replace(tzinfo=_zone(params.get("TZID"))).astimezone(KST), False
+
+
+def parse_duration(value: str) -> timedelta:
+    m = _DURATION_RE.match(value.strip())
+    if not m:
+        raise ValueError(f"Invalid DURATION: {value}")
+    sign, weeks, days, hours, minutes, seconds = m.groups()
+    delta = timedelta(
+        weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0), minutes=int(minutes or 0), seconds=int(seconds or 0),
+    )
+    return -delta if sign == "-" else delta
+
+
+def _to_event(props: List[Tuple[str, Dict[str, str], str]]) -> Optional[Dict[str, Any]]:
+    start = finish = None
+    all_day = False
+    duration = None
+    event: Dict[str, Any] = {"title": "", "description": "", "location": "", "member": []}
+    for name, params, value in props:
+        if name == "DTSTART":
+            start, all_day = parse_ics_time(value, params)
+        elif name == "DTEND":
+            finish, _ = parse_ics_time(value, params)
+        elif name == "DURATION":
+            duration = parse_duration(value)
+        elif name == "SUMMARY":
+            event["title"] = unescape_text(value)
+        elif name == "DESCRIPTION":
+            event["description"] = unescape_text(value)
+        elif name == "LOCATION":
+            event["location"] = unescape_text(value)
+        elif name == "ATTENDEE":
+            member = params.get("CN") or re.sub(r"^mailto:", "", value, flags=re.I)
+            if member and member not in event["member"]:
+                event["member"].append(member)
+        elif name == "X-MORO-MEMBER":
+            member = unescape_text(value)
+            if member and member not in event["member"]:
+                event["member"].append(member)
+        elif name == "UID":
+            event["ics_uid"] = value
+        elif name == "RECURRENCE-ID":
+            event["ics_recurrence_id"] = parse_ics_time(value, params)[0].isoformat()
+        elif name == "RRULE":
+            event["rrule"] = value
+    if start is None:
+        return None
+    if finish is None:
+        finish = start + (duration if duration is not None else timedelta(days=1) if all_day else timedelta(0))
+    event["date_start"] = start.isoformat()
+    event["date_finish"] = finish.isoformat()
+    return event
+
+
+def iter_ics_events(lines: Iterable[str], errors: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """VEVENT를 하나씩 이벤트 dict(id 없음)로. DTSTART가 없거나 해석할 수 없는 VEVENT는 건너뛰고 errors에 기록."""
+    props: Optional[List[Tuple[str, Dict[str, str], str]]] = None
+    depth = 0  # VEVENT 안의 하위 컴포넌트(VALARM 등) 깊이
+    for line in _unfold(lines):
+        name, params, value = parse_content_line(line)
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and props is None:
+                props, depth = [], 0
+            elif props is not None:
+                depth += 1
+            continue
+        if name == "END":
+            if props is not None and depth:
+                depth -= 1
+            elif props is not None and value.upper() == "VEVENT":
+                uid = next((v for n, _, v in props if n == "UID"), None)
+                try:
+                    event = _to_event(props)
+                except ValueError as e:
+                    event = None
+                    if errors is not None:
+                        errors.append(f"{uid or 'VEVENT'}: {e}")
+                else:
+                    if event is None and errors is not None:
+                        errors.append(f"{uid or 'VEVENT'}: DTSTART 없음")
+                props = None
+                if event is not None:
+                    yield event
+            continue
+        if props is not None and not depth:
+            props.append((name, params, value))
+
+
+def _fold(line: str) -> Iterator[str]:
+    data = line.encode("utf-8")
+    limit = _FOLD_OCTETS
+    prefix = ""
+    while len(data) > limit:
+        cut = limit
+        # UTF-8 문자 중간에서 자르지 않는다
+        while cut > 0 and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        yield prefix + data[:cut].decode("utf-8") + "\r\n"
+        data = data[cut:]
+        prefix, limit = " ", _FOLD_OCTETS - 1
+    yield prefix + data.decode("utf-8") + "\r\n"
+
+
+def _utc(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _event_lines(event: Dict[str, Any], stamp: str) -> Iterator[str]:
+    start, finish = _event_window(event)
+    uid = event.get("ics_uid") or f"moro-{event.get('id')}@moro"
+    yield "BEGIN:VEVENT"
+    yield f"UID:{uid}"
+    yield f"DTSTAMP:{stamp}"
+    yield f"DTSTART:{_utc(start)}"
+    yield f"DTEND:{_utc(max(start, finish))}"
+    for field, prop in (("title", "SUMMARY"), ("description", "DESCRIPTION"), ("location", "LOCATION")):
+        if event.get(field):
+            yield f"{prop}:{escape_text(str(event[field]))}"
+    for member in event.get("member") or []:
+        member = str(member)
+        if "@" in member:
+            yield f"ATTENDEE;CN=\"{member}\":mailto:{member}"
+        else:
+            yield f"X-MORO-MEMBER:{escape_text(member)}"
+    if event.get("ics_recurrence_id"):
+        yield f"RECURRENCE-ID:{_utc(datetime.fromisoformat(event['ics_recurrence_id']))}"
+    if event.get("rrule"):
+        yield f"RRULE:{event['rrule']}"
+    if event.get("id") is not None:
+        yield f"X-MORO-ID:{event['id']}"
+    yield "END:VEVENT"
+
+
+def iter_ics_lines(events: Iterable[Dict[str, Any]], skipped: Optional[List[Any]] = None) -> Iterator[str]:
+    """VCALENDAR 전체를 CRLF 줄 단위로. 날짜를 해석할 수 없는 이벤트는 건너뛰고 skipped에 id를 기록."""
+    stamp = _utc(datetime.now(tz=timezone.utc))
+    for line in ("BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN"):
+        yield line + "\r\n"
+    for event in events:
+        try:
+            lines = list(_event_lines(event, stamp))
+        except (KeyError, TypeError, ValueError):
+            if skipped is not None:
+                skipped.append(event.get("id"))
+            continue
+        for line in lines:
+            yield from _fold(line)
+    yield "END:VCALENDAR\r\n"
+
+
+def write_ics(events: Iterable[Dict[str, Any]], out: TextIO) -> int:
+    """이벤트를 out(텍스트 모드, newline=''로 연 파일)에 쓰고 쓴 VEVENT 수를 반환."""
+    count = 0
+    for line in iter_ics_lines(events):
+        if line == "END:VEVENT\r\n":
+            count += 1
+        out.write(line)
+    return count
@@ -0,0 +1,102 @@
+"""
+eventmanager 변경(add/update/delete)을 인메모리 인덱스들에 전달하는 훅.
+
+eventmanager는 파일을 쓴 뒤 notify_mutation을 호출하고,
+각 인덱스 모듈은 register_mutation_listener로 자신을 등록해 증분 갱신한다.
+
+리스너는 같은 프로세스의 변경만 받는다. notify_mutation은 `.moro/writes`의 공유 카운터도 올리므로,
+다른 워커/CLI의 변경은 storage_version(공유 카운터 + 디렉터리 mtime)이 바뀐 것으로 알아챈다.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from importlib import import_module
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .state import SharedCounter, state_dir
+
+
+# listener(user_key, op, event_id, event)
+# op: "add" | "update" | "delete" | "reload" | "spec"
+#   reload: 디렉터리 전체를 다시 읽어야 함, spec: active 벡터 공간이 바뀜 (벡터 인덱스만 해당, RAG/reindex.py)
+MutationListener = Callable[[str, str, Optional[int], Optional[Dict[str, Any]]], None]
+
+_listeners: List[MutationListener] = []
+# 디스크에 변경 로그를 남기는 리스너 모듈 (상태 파일 경로 -> 모듈). 그 상태 파일이 있는 디렉터리가 바뀌면
+# 이 프로세스가 아직 import하지 않았어도 불러서 등록한다 (eventmanager만 쓰는 CLI/워커의 변경도 로그에 남도록)
+_PERSISTENT_LISTENERS = {"ann/ivf.npz": "RAG.ann_index"}
+_versions: Dict[str, int] = {}
+_write_counters: Dict[str, SharedCounter] = {}
+_lock = threading.Lock()
+
+
+def user_key(user_dir: str) -> str:
+    """같은 디렉터리를 가리키는 서로 다른 경로 표기를 하나의 키로 정규화."""
+    return str(Path(user_dir).resolve())
+
+
+def register_mutation_listener(listener: MutationListener) -> MutationListener:
+    with _lock:
+        if listener not in _listeners:
+            _listeners.append(listener)
+    return listener
+
+
+def unregister_mutation_listener(listener: MutationListener) -> None:
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def data_version(user_dir: str) -> int:
+    """해당 디렉터리에 대해 이 프로세스에서 관측된 변경 횟수."""
+    return _versions.get(user_key(user_dir), 0)
+
+
+def _write_counter(key: str) -> SharedCounter:
+    counter = _write_counters.get(key)
+    if counter is None:
+        with _lock:
+            counter = _write_counters.get(key)
+            if counter is None:
+                counter = _write_counters[key] = SharedCounter(state_dir(key) / "writes")
+    return counter
+
+
+def storage_version(user_dir: str) -> Tuple[int, int]:
+    """디렉터리 변경 토큰: (모든 프로세스의 notify_mutation 횟수, 디렉터리 mtime_ns).
+
+    다른 프로세스가 eventmanager로 쓴 변경은 카운터로, 파일을 직접 만들거나 지운 변경은 mtime으로 바뀐다.
+    프로세스 안의 캐시/인덱스는 이 값이 만들 때와 다르면 디스크에서 다시 맞춘다.
+    """
+    if not os.path.isdir(user_dir):
+        return 0, 0
+    key = user_key(user_dir)
+    return _write_counter(key).read(), os.stat(key).st_mtime_ns
+
+
+def notify_mutation(
+    user_dir: str,
+    op: str,
+    event_id: Optional[int] = None,
+    event: Optional[Dict[str, Any]] = None,
+) -> None:
+    key = user_key(user_dir)
+    if os.path.isdir(key):
+        # 리스너보다 먼저 올려야 리스너가 기록하는 토큰에 이 변경이 포함된다
+        _write_counter(key).bump()
+        for relpath, module in _PERSISTENT_LISTENERS.items():
+            if module not in sys.modules and os.path.exists(os.path.join(key, ".moro", relpath)):
+                import_module(module)
+    with _lock:
+        _versions[key] = _versions.get(key, 0) + 1
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(key, op, event_id, event)
+        except Exception as e:
+            # 인덱스 갱신 실패가 원본 쓰기를 실패시키지 않도록 한다
+            print(f"Index listener failed for {op} {event_id}: {e}")
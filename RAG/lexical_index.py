@@ -0,0 +1,168 @@
+"""
+BM25 기반 어휘(lexical) 역색인.
+
+"풋살" 같은 제목이나 멤버 이름처럼 정확한 토큰이 중요한 질의를
+네트워크(임베딩) 호출 없이 처리한다. 한글은 형태소 분석 대신 문자 bigram으로 토큰화한다.
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .index_hooks import register_mutation_listener, user_key
+from .parsing_with_criteria import load_events
+
+
+_WORD_RE = re.compile(r"[0-9A-Za-z]+|[가-힣ㄱ-ㆎ]+")
+
+
+def _is_hangul(word: str) -> bool:
+    return any("가" <= ch <= "힣" or "ㄱ" <= ch <= "ㆎ" for ch in word)
+
+
+def tokenize(text: str, n: int = 2) -> List[str]:
+    """한글 단어는 문자 n-gram, 영문/숫자 단어는 소문자 단어 그대로 토큰화."""
+    tokens: List[str] = []
+    for word in _WORD_RE.findall(text.lower()):
+        if _is_hangul(word) and len(word) > n:
+            tokens.extend(word[i:i + n] for i in range(len(word) - n + 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def _event_text(event: Dict[str, Any]) -> str:
+    from .parsing_with_content import _concat_event_fields
+
+    return _concat_event_fields(event)
+
+
+class LexicalIndex:
+    """문서 단위 증분 추가/삭제를 지원하는 BM25 역색인."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_terms: Dict[int, Counter] = {}
+        self.doc_len: Dict[int, int] = {}
+        self.total_len = 0
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_events(cls, events: Iterable[Dict[str, Any]]) -> "LexicalIndex":
+        return cls.from_texts((event["id"], _event_text(event)) for event in events if event.get("id") is not None)
+
+    @classmethod
+    def from_texts(cls, docs: Iterable[Tuple[int, str]]) -> "LexicalIndex":
+        index = cls()
+        for doc_id, text in docs:
+            index.add(doc_id, text)
+        return index
+
+    @classmethod
+    def from_terms(cls, docs: Iterable[Tuple[int, Dict[str, int]]]) -> "LexicalIndex":
+        """이미 토큰화된 문서별 term 빈도(스냅샷)에서 복원. 토큰화를 다시 하지 않는다."""
+        index = cls()
+        for doc_id, terms in docs:
+            for term, tf in terms.items():
+                index.postings.setdefault(term, {})[doc_id] = tf
+            index.doc_terms[doc_id] = Counter(terms)
+            index.doc_len[doc_id] = sum(terms.values())
+            index.total_len += index.doc_len[doc_id]
+        return index
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def add(self, doc_id: int, text: str) -> None:
+        with self._lock:
+            if doc_id in self.doc_len:
+                self.remove(doc_id)
+            terms = Counter(tokenize(text))
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            self.doc_terms[doc_id] = terms
+            self.doc_len[doc_id] = sum(terms.values())
+            self.total_len += self.doc_len[doc_id]
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            terms = self.doc_terms.pop(doc_id, None)
+            if terms is None:
+                return
+            for term in terms:
+                posting = self.postings.get(term)
+                if posting is not None:
+                    posting.pop(doc_id, None)
+                    if not posting:
+                        del self.postings[term]
+            self.total_len -= self.doc_len.pop(doc_id, 0)
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        allowed_ids: Optional[Set[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """BM25 점수 내림차순 (doc_id, score) 리스트. allowed_ids가 있으면 그 안에서만 검색."""
+        with self._lock:
+            n_docs = len(self.doc_len)
+            if n_docs == 0:
+                return []
+            avg_len = self.total_len / n_docs
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                df = len(posting)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in posting.items():
+                    if allowed_ids is not None and doc_id not in allowed_ids:
+                        continue
+                    denom = tf + self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / denom
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+        return ranked[:k]
+
+
+_indexes: Dict[str, LexicalIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(user_dir: str = "Database/[user]", events: Optional[List[Dict[str, Any]]] = None) -> LexicalIndex:
+    """디렉터리별 인덱스를 처음 요청 시 디스크(또는 이미 읽은 events)에서 만들고 이후에는 증분 갱신된 것을 재사용."""
+    key = user_key(user_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = LexicalIndex.from_events(events if events is not None else load_events(user_dir))
+            _indexes[key] = index
+        return index
+
+
+def install_lexical_index(user_dir: str, index: LexicalIndex) -> None:
+    """이미 만든 인덱스(엔진 로드/스냅샷 복원)를 디렉터리의 공유 인덱스로 등록."""
+    with _indexes_lock:
+        _indexes[user_key(user_dir)] = index
+
+
+def _on_mutation(key: str, op: str, event_id: Optional[int], event: Optional[Dict[str, Any]]) -> None:
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            return
+        if op == "reload":
+            del _indexes[key]
+            return
+    if op == "delete" and event_id is not None:
+        index.remove(event_id)
+    elif op in ("add", "update") and event is not None:
+        index.add(event.get("id", event_id), _event_text(event))
+
+
+register_mutation_listener(_on_mutation)
@@ -0,0 +1,117 @@
+"""
+시작 시 임베딩 상태 점검용 매니페스트.
+
+`.moro/manifest.json`에 파일별 (mtime, size, 이벤트 id, 텍스트 해시, embedded 여부)를 저장한다.
+reconcile_embeddings()는 파일을 stat만 해서 바뀌지 않은 파일은 열지 않고,
+새로 생기거나 바뀐 파일만 읽어서 임베딩이 없는(또는 텍스트가 바뀐) 이벤트를 임베딩 큐에 넘긴다.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .embedding_queue import get_embedding_queue
+from .embedding_spec import active_spec, event_vector, text_hash, vector_is_stale
+from .state import atomic_write_json, read_json, state_dir
+
+
+MANIFEST_VERSION = 1
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _manifest_path(user_dir: str):
+    return state_dir(user_dir) / "manifest.json"
+
+
+def load_manifest(user_dir: str) -> Dict[str, Any]:
+    manifest = read_json(_manifest_path(user_dir), default=None)
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "spec": None, "files": {}}
+    return manifest
+
+
+def _scan_file(path: str, spec) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    entries = []
+    for event in data if isinstance(data, list) else [data]:
+        if isinstance(event, dict) and event.get("id") is not None:
+            entries.append({
+                "id": event["id"],
+                "hash": text_hash(event),
+                # 텍스트가 직접 수정돼 낡은 벡터는 embedded로 보지 않는다
+                "embedded": event_vector(event, spec) is not None and not vector_is_stale(event),
+            })
+    return entries
+
+
+def reconcile_embeddings(user_dir: str = "Database/[user]", verbose: bool = True) -> Dict[str, Any]:
+    """매니페스트와 디렉터리를 비교해 바뀐 파일만 읽고, 임베딩이 필요한 이벤트를 큐에 넣는다."""
+    from .reindex import ensure_embedding_spec
+
+    started = time.perf_counter()
+    summary = {"files": 0, "unchanged": 0, "scanned": 0, "removed": 0, "queued": 0, "errors": 0}
+    if not os.path.isdir(user_dir):
+        return summary
+    with _locks_guard:
+        lock = _locks.setdefault(os.path.realpath(user_dir), threading.Lock())
+    with lock:
+        # 설정된 모델/차원이 저장된 벡터와 다르면 백그라운드 재색인 (검색은 전환 전까지 기존 벡터 사용)
+        ensure_embedding_spec(user_dir)
+        spec = active_spec(user_dir)
+        manifest = load_manifest(user_dir)
+        if manifest.get("spec") != spec.to_meta():
+            # 활성 벡터 공간이 바뀌면 embedded 플래그를 다시 확인해야 한다
+            manifest = {"version": MANIFEST_VERSION, "spec": spec.to_meta(), "files": {}}
+        old_files: Dict[str, Any] = manifest["files"]
+        files: Dict[str, Any] = {}
+        queue = get_embedding_queue(user_dir)
+        queued = queue.pending_ids()
+        to_queue = []
+        changed = False
+
+        with os.scandir(user_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                summary["files"] += 1
+                st = entry.stat()
+                previous = old_files.get(entry.name)
+                if previous and previous["mtime_ns"] == st.st_mtime_ns and previous["size"] == st.st_size:
+                    files[entry.name] = previous
+                    summary["unchanged"] += 1
+                    # 큐 파일이 지워졌어도 매니페스트에 embedded=False로 남은 이벤트는 다시 넣는다
+                    to_queue.extend((e["id"], entry.path) for e in previous["events"] if not e["embedded"] and e["id"] not in queued)
+                    continue
+                try:
+                    events = _scan_file(entry.path, spec)
+                except Exception as e:
+                    print(f"❌ {entry.name}: 파일 읽기 오류 - {e}")
+                    summary["errors"] += 1
+                    continue
+                summary["scanned"] += 1
+                changed = True
+                to_queue.extend((e["id"], entry.path) for e in events if not e["embedded"] and e["id"] not in queued)
+                files[entry.name] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "events": events}
+
+        summary["removed"] = len(set(old_files) - set(files))
+        if changed or summary["removed"]:
+            manifest["files"] = files
+            atomic_write_json(_manifest_path(user_dir), manifest)
+        # 빠진 임베딩은 배치 임베더(작업 큐)로 넘긴다
+        queue.put_many(to_queue)
+        summary["queued"] = len(to_queue)
+        if queue.jobs:
+            queue.start()
+    summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    if verbose:
+        print(
+            f"📁 {summary['files']}개 파일 확인: 변경 {summary['scanned']}개, "
+            f"임베딩 대기열 추가 {summary['queued']}개 ({summary['elapsed_ms']}ms)"
+        )
+    return summary
@@ -1,13 +1,10 @@
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
 from .parsing_with_criteria import parse_with_criteria
+from .embedding_spec import active_spec, event_vector, set_event_vector
+from .index_hooks import notify_mutation
+from .lexical_index import get_lexical_index
+from .state import atomic_write_json, event_file_lock
 from pathlib import Path
-import numpy as np
 import json
-from dotenv import load_dotenv
-
-load_dotenv()
-embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
 
 
 def _concat_event_fields(event):
@@ -24,54 +21,68 @@ def _concat_event_fields(event):
     return " ".join(parts)
 
 
-def embed_event(event: dict) -> dict:
-    """단일 이벤트를 임베딩하여 embedding 필드에 저장"""
+def embed_event(event: dict, user_dir: str = "Database/[user]") -> dict:
+    """단일 이벤트를 user_dir의 활성 벡터 공간으로 임베딩하여 embedding(+embedding_meta) 필드에 저장"""
+    spec = active_spec(user_dir)
     text = _concat_event_fields(event)
-    embedding = embedding_model.embed_query(text)
-    event['embedding'] = embedding
-    return event
+    embedding = spec.backend().embed_query(text)
+    return set_event_vector(event, embedding, spec)
 
 def embed_events(events: list, vector_dir: str = "Database/[user]") -> str:
-    """embedding 필드가 없는 이벤트들만 embed_event로 임베딩하고 원본 파일에 저장"""
+    """embedding 필드가 없는 이벤트들만 워커 풀로 배치 임베딩하고 원본 파일에 저장"""
+    from .embedding_pool import get_executor
 
     # Create directory if it doesn't exist
     vector_dir = Path(vector_dir)
     vector_dir.mkdir(parents=True, exist_ok=True)
     
-    # Process only events without embedding
+    # Process only events without a vector in the active embedding space
+    spec = active_spec(str(vector_dir))
     events_to_embed = []
     for event in events:
-        if 'embedding' not in event:
+        if event_vector(event, spec) is None:
             events_to_embed.append(event)
-    # Embed only events without embedding
-    for event in events_to_embed:
-        event = embed_event(event)
+    # Embed only events without embedding (batched, rate-limited, concurrent)
+    if events_to_embed:
+        texts = [_concat_event_fields(event) for event in events_to_embed]
+        vectors = get_executor(spec.backend()).embed_texts(texts)
+        for event, vector in zip(events_to_embed, vectors):
+            set_event_vector(event, vector, spec)
+    embedded_by_id = {event.get('id'): event for event in events_to_embed}
     
     # Load all JSON files, update events, and save back
-    json_files = list(vector_dir.glob("*.json"))
+    json_files = list(vector_dir.glob("*.json")) if embedded_by_id else []
     
     for json_file in json_files:
         try:
-            # Load the file
-            with open(json_file, 'r', encoding='utf-8') as f:
-                file_events = json.load(f)
-            
-            # Update events with embeddings
-            updated = False
-            for file_event in file_events:
-                # Find matching event in our events list
-                for event in events_to_embed:
-                    if event.get('id') == file_event.get('id'):
-                        if 'embedding' in event and 'embedding' not in file_event:
-                            file_event['embedding'] = event['embedding']
-                            updated = True
-                        break
-            
-            # Save back if updated
-            if updated:
-                with open(json_file, 'w', encoding='utf-8') as f:
-                    json.dump(file_events, f, ensure_ascii=False, indent=2)
-                print(f"Updated: {json_file.name}")
+            # eventmanager/임베딩 큐와 같은 파일 잠금 안에서 다시 읽고, 교체 방식으로 쓰고, 알린다
+            with event_file_lock(json_file):
+                # Load the file (array of events or single event object)
+                try:
+                    with open(json_file, 'r', encoding='utf-8') as f:
+                        file_events = json.load(f)
+                except FileNotFoundError:
+                    continue
+                file_list = file_events if isinstance(file_events, list) else [file_events]
+                
+                # Update events with embeddings (skip ones edited since they were embedded)
+                updated = []
+                for file_event in file_list:
+                    event = embedded_by_id.get(file_event.get('id'))
+                    if (
+                        event is not None
+                        and event_vector(file_event, spec) is None
+                        and _concat_event_fields(file_event) == _concat_event_fields(event)
+                    ):
+                        set_event_vector(file_event, event_vector(event, spec), spec)
+                        updated.append(file_event)
+                
+                # Save back if updated
+                if updated:
+                    atomic_write_json(json_file, file_events)
+                    for file_event in updated:
+                        notify_mutation(str(vector_dir), "update", file_event.get('id'), file_event)
+                    print(f"Updated: {json_file.name}")
                 
         except Exception as e:
             print(f"Error processing {json_file.name}: {e}")
@@ -80,41 +91,125 @@ def embed_events(events: list, vector_dir: str = "Database/[user]") -> str:
     return str(vector_dir)
 
 
-def parse_with_content(query: str, criteria=None, k: int = 10, vector_dir="Database/[user]") -> list:
-    """Load matching events with pre-computed embeddings, create Chroma index, and search"""
+def _vector_rank(query: str, events: list, k: int, vector_dir=None, quantization=None, ann=False) -> list:
+    """Rank events by cosine similarity between the query and their pre-computed embeddings"""
+    # NumPy and the vector indexes are only needed once a vector search actually runs
+    import numpy as np
+    from .ann_index import get_ann_index
+    from .quantized_store import get_quantized_store
 
-    if not query:
-        return []
-    # Filter events by criteria (use parse_with_criteria which returns matching events)
-    matched_events = parse_with_criteria(vector_dir, criteria=criteria or {})
-    matched_ids = set(event['id'] for event in matched_events)
-    # Filter events that match criteria
-    matching_events = [event for event in matched_events if event['id'] in matched_ids]
+    # Embed the query in the same space as the stored vectors being served
+    spec = active_spec(vector_dir)
+    query_vec = np.asarray(spec.backend().embed_query(query), dtype=np.float32)
     
-    if not matching_events:
-        return []
+    if ann:
+        # Approximate search on the persistent IVF index, restricted to the criteria allow-set
+        by_id = {event.get("id"): event for event in events}
+        hits = get_ann_index(vector_dir).search(query_vec, k, allowed_ids=set(by_id))
+        return [by_id[doc_id] for doc_id, _ in hits if doc_id in by_id]
+    
+    if quantization:
+        # Coarse top-k on the quantized matrix, then exact rescoring of the candidates
+        by_id = {event.get("id"): event for event in events}
+        store = get_quantized_store(vector_dir, dtype=quantization)
+        hits = store.search(
+            query_vec,
+            k,
+            full_vectors=lambda ids: {i: event_vector(by_id[i], spec) for i in ids if i in by_id},
+            allowed_ids=set(by_id),
+        )
+        return [by_id[doc_id] for doc_id, _ in hits]
     
-    # Create Chroma index using pre-computed embeddings
-    texts = [_concat_event_fields(event) for event in matching_events]
-    embeddings = [event["embedding"] for event in matching_events]
-    metadatas = [{"event_json": json.dumps(event, ensure_ascii=False)} for event in matching_events]
+    # Only events embedded in the active vector space can be compared
+    candidates = []
+    vectors = []
+    for event in events:
+        vec = event_vector(event, spec)
+        if vec is not None:
+            candidates.append(event)
+            vectors.append(vec)
+    if not candidates:
+        return []
     
-    # Create Chroma index with pre-computed embeddings
-    temp_index = Chroma(embedding_function=embedding_model)
-    temp_index.add_texts(texts, metadatas=metadatas, embeddings=embeddings)
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query_vec) or 1.0)
+    norms[norms == 0] = 1.0
+    scores = (matrix @ query_vec) / norms
     
-    # Search in the index
-    docs = temp_index.similarity_search(query, k=k)
+    # Top-k by similarity (descending)
+    top = np.argsort(-scores, kind="stable")[:k]
+    return [candidates[i] for i in top]
+
+
+def _lexical_rank(query: str, events: list, k: int, vector_dir) -> list:
+    """Rank events with the BM25 inverted index (no network call)"""
+    by_id = {event.get("id"): event for event in events}
+    hits = get_lexical_index(vector_dir).search(query, k=k, allowed_ids=set(by_id))
+    return [by_id[doc_id] for doc_id, _ in hits]
+
+
+def _reciprocal_rank_fusion(rankings: list, k: int, rrf_k: int = 60) -> list:
+    """Fuse ranked event lists: score(d) = sum(1 / (rrf_k + rank))"""
+    scores = {}
+    events = {}
+    for ranking in rankings:
+        for rank, event in enumerate(ranking, 1):
+            key = event.get("id")
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            events.setdefault(key, event)
+    ordered = sorted(scores, key=lambda key: -scores[key])
+    return [events[key] for key in ordered[:k]]
+
+
+def _rank(query: str, events: list, k: int, vector_dir, mode: str, quantization=None, ann: bool = False) -> list:
+    """Rank already-filtered events with the requested mode"""
+    if mode == "lexical":
+        return _lexical_rank(query, events, k, vector_dir)
+    if mode == "vector":
+        ranked = _vector_rank(query, events, k, vector_dir, quantization, ann)
+        # Events still waiting in the embedding queue are ranked lexically and fused in
+        spec = active_spec(vector_dir)
+        unembedded = [event for event in events if event_vector(event, spec) is None]
+        if unembedded:
+            ranked = _reciprocal_rank_fusion([ranked, _lexical_rank(query, unembedded, k, vector_dir)], k)
+        return ranked
     
-    # Extract results
-    results = []
-    for doc in docs:
-        meta = getattr(doc, "metadata", {}) or {}
-        ev_json = meta.get("event_json")
-        if ev_json:
-            try:
-                results.append(json.loads(ev_json))
-            except Exception:
-                continue
+    # Over-fetch each list so fusion has enough overlap to work with
+    depth = max(k * 3, 30)
+    return _reciprocal_rank_fusion(
+        [_vector_rank(query, events, depth, vector_dir, quantization, ann), _lexical_rank(query, events, depth, vector_dir)],
+        k,
+    )
+
+
+def parse_with_content(query: str, criteria=None, k: int = 10, vector_dir="Database/[user]", mode: str = "vector", quantization=None, ann: bool = False, plan: str = "auto") -> list:
+    """Search events matching criteria by content.
+
+    mode:
+    - "vector": cosine similarity over pre-computed embeddings
+    - "lexical": BM25 over Korean character n-grams (no embedding call)
+    - "hybrid": reciprocal-rank fusion of both
+
+    quantization: None (exact float32) or "int8"/"float16" to rank on the
+    quantized store and rescore the top candidates at full precision.
+    ann: use the approximate IVF-flat index (large calendars).
+    plan: "auto" picks filter-first or vector-first from criteria selectivity
+    (see RAG.query_planner; use planned_search() for the explain output),
+    "scan" keeps the full-scan path.
+    """
+
+    if not query:
+        return []
+    if mode not in ("vector", "lexical", "hybrid"):
+        raise ValueError(f"Unknown search mode: {mode}")
+    if plan != "scan":
+        from .query_planner import planned_search
+
+        results, _ = planned_search(query, criteria, k, vector_dir, mode, quantization, ann, plan)
+        return results
+    # Filter events by criteria (use parse_with_criteria which returns matching events)
+    matched_events = parse_with_criteria(vector_dir, criteria=criteria or {})
     
-    return results
\ No newline at end of file
+    if not matched_events:
+        return []
+    return _rank(query, matched_events, k, vector_dir, mode, quantization, ann)
@@ -1,14 +1,26 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from pathlib import Path
 import json
+import os
+import threading
+import time
+
+from .index_hooks import storage_version, user_key
+from .title_index import TITLE_MATCH_THRESHOLD, normalize as normalize_title, title_similarity
 
 
 KST = timezone(timedelta(hours=9))
 
+# 결과 캐시 (id 목록) 최대 항목 수
+CRITERIA_CACHE_SIZE = int(os.getenv("CRITERIA_CACHE_SIZE", "256"))
+# reference_time 없이 "지금" 기준인 상대 조건(time_window_hours/nearest_n)은 now를 이 간격(초)으로 내림해서 평가
+NOW_BUCKET_SECONDS = int(os.getenv("CRITERIA_NOW_BUCKET_SECONDS", "60"))
+
 
 def _parse_dt(dt_str: str) -> datetime:
     """Parse ISO 8601 datetime strings like '2025-09-30T21:00:00+09:00'.
@@ -116,6 +128,47 @@ def _matches_month(d: datetime, month: Any) -> bool:
     return False
 
 
+def tag_key(value: Any) -> str:
+    # member/location 비교용 정규화 (앞뒤 공백 제거, 대소문자 무시)
+    return str(value).strip().casefold()
+
+
+def event_members(event: Dict[str, Any]) -> List[str]:
+    members = event.get("member") or []
+    if isinstance(members, str):
+        members = [members]
+    return [key for key in (tag_key(m) for m in members) if key]
+
+
+def event_location(event: Dict[str, Any]) -> str:
+    location = event.get("location")
+    return tag_key(location) if isinstance(location, str) else ""
+
+
+def _tag_values(field: str, value: Any) -> List[str]:
+    # member는 이름 하나 또는 목록(모두 만족), location은 문자열 하나
+    if field.startswith("member") and isinstance(value, (list, tuple)):
+        values = list(value)
+    else:
+        values = [value]
+    if not all(isinstance(v, str) for v in values):
+        raise ValueError(f"{field} must be a string{' or a list of strings' if field.startswith('member') else ''}: {value!r}")
+    return [tag_key(v) for v in values]
+
+
+def _matches_member(event: Dict[str, Any], member: Any, prefix: bool = False) -> bool:
+    names = event_members(event)
+    if prefix:
+        return all(any(n.startswith(w) for n in names) for w in _tag_values("member_prefix", member))
+    return all(w in names for w in _tag_values("member", member))
+
+
+def _matches_location(event: Dict[str, Any], location: Any, prefix: bool = False) -> bool:
+    loc = event_location(event)
+    want = _tag_values("location", location)[0]
+    return bool(loc) and (loc.startswith(want) if prefix else loc == want)
+
+
 def _nearest_key(d: datetime, now: Optional[datetime]) -> timedelta:
     if now is None:
         now = datetime.now(tz=KST)
@@ -132,6 +185,11 @@ def filter_out_by_criteria(
     hour: Optional[Any] = None,  # HH or HH:MM
     year: Optional[Any] = None,  # 2025 or "2025"
     month: Optional[Any] = None,  # 1-12 or "1월", "January", etc.
+    member: Optional[Any] = None,  # "정우" or ["정우", "지수"] (all present)
+    location: Optional[str] = None,  # exact location name
+    member_prefix: Optional[Any] = None,  # "정" matches "정우"
+    location_prefix: Optional[str] = None,  # "본사" matches "본사 3층 회의실 A"
+    title: Optional[str] = None,  # fuzzy (trigram) title match, "스터드" matches "알고리즘 스터디"
     time_window_hours: Optional[float] = None,  # ±N hours from reference_time
     reference_time: Optional[datetime] = None,  # reference point for time filtering
     nearest_n: Optional[int] = None,  # exclude N nearest to reference_time
@@ -145,6 +203,11 @@ def filter_out_by_criteria(
     - hour: keep only events starting at given hour ('HH' or 'HH:MM'). Others excluded.
     - year: keep only events in given year (e.g., 2025 or "2025"). Others excluded.
     - month: keep only events in given month (1-12, "1월", "January", etc.). Others excluded.
+    - member / member_prefix: keep only events whose members include the name (or a name starting
+      with the prefix); a list requires every entry. Case-insensitive, surrounding spaces ignored.
+    - location / location_prefix: keep only events whose location equals (or starts with) the value.
+    - title: keep only events whose title is similar to the value (trigram score >= TITLE_MATCH_THRESHOLD,
+      see title_index). Typo tolerant; 2-3 syllable queries also accept one jamo edit ("풋쌀" -> "풋살").
     - time_window_hours: keep only events within N hours of 'reference_time' (both before and after). Others excluded.
     - reference_time: reference point for time-based filtering (defaults to current time if not provided)
     - nearest_n: keep only the N nearest to 'reference_time'. Others excluded.
@@ -177,6 +240,16 @@ def filter_out_by_criteria(
             ok = ok and _matches_year(start, year)
         if month is not None:
             ok = ok and _matches_month(start, month)
+        if member is not None:
+            ok = ok and _matches_member(ev, member)
+        if member_prefix is not None:
+            ok = ok and _matches_member(ev, member_prefix, prefix=True)
+        if location is not None:
+            ok = ok and _matches_location(ev, location)
+        if location_prefix is not None:
+            ok = ok and _matches_location(ev, location_prefix, prefix=True)
+        if title is not None:
+            ok = ok and title_similarity(title, ev.get("title") or "") >= TITLE_MATCH_THRESHOLD
         if time_window_hours is not None:
             # Event starts within N hours of reference_time (both before and after)
             time_diff = abs((start - ref_time).total_seconds()) / 3600  # hours
@@ -208,12 +281,12 @@ def filter_out_by_criteria(
     return result
 
 
-def parse_with_criteria(
-    vector_dir: str = "Database/[user]",
-    criteria: Optional[Dict[str, Any]] = None,
-    **kwargs: Any,
-) -> List[Dict[str, Any]]:
-    """Public API: return events that match given criteria.
+def load_events(vector_dir: str = "Database/[user]") -> List[Dict[str, Any]]:
+    """Load every event stored under vector_dir.
+
+    Supports both schemas:
+    - Array of events per file
+    - Single event object per file (e.g., Database/[user]/0001.json)
     """
     vector_dir = Path(vector_dir)
     if not vector_dir.exists():
@@ -221,13 +294,7 @@ def parse_with_criteria(
     
     # Find all JSON files (monthly files, not event_*.json)
     json_files = list(vector_dir.glob("*.json"))
-    if not json_files:
-        return []
-    # Load all events from JSON files
-    # Support both schemas:
-    # - Array of events per file
-    # - Single event object per file (e.g., Database/[user]/0001.json)
-    events_list = []
+    events_list: List[Dict[str, Any]] = []
     for json_file in sorted(json_files):
         try:
             with open(json_file, 'r', encoding='utf-8') as f:
@@ -242,11 +309,351 @@ def parse_with_criteria(
         except Exception as e:
             print(f"Failed to load {json_file}: {e}")
             continue
-    
-    if not events_list:
-        return []
-    merged = {**(criteria or {}), **kwargs}
-    excluded = filter_out_by_criteria(events_list, **merged)
+    return events_list
+
+
+def load_events_by_id(vector_dir: str, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Load only the given events, reading per-id files (0001.json / 1.json) directly.
+
+    Events not found under an id-named file (e.g. legacy monthly array files)
+    fall back to one full load_events() scan.
+    """
+    base = Path(vector_dir)
+    found: Dict[int, Dict[str, Any]] = {}
+    missing = []
+    for event_id in ids:
+        names = (f"{event_id:04d}.json", f"{event_id}.json") if isinstance(event_id, int) else ()
+        for name in names:
+            path = base / name
+            if not path.exists():
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    event = json.load(f)
+                if isinstance(event, dict) and event.get("id") == event_id:
+                    found[event_id] = event
+                    break
+            except Exception as e:
+                print(f"Failed to load {path}: {e}")
+        else:
+            missing.append(event_id)
+    if missing:
+        wanted = set(missing)
+        for event in load_events(vector_dir):
+            if event.get("id") in wanted:
+                found[event["id"]] = event
+    return found
+
+
+_CRITERIA_FIELDS = (
+    "date", "weekday", "hour", "year", "month", "time_window_hours", "reference_time", "nearest_n", "sort_by",
+    "member", "location", "member_prefix", "location_prefix", "title",
+)
+
+
+def _compile_hour(hour: Any) -> Any:
+    # _matches_hour와 같은 해석: 시만 비교 ("h", HH) / 시:분 비교 ("hm", HH, MM) / 매칭 없음
+    if isinstance(hour, int):
+        return ("h", hour)
+    if isinstance(hour, str):
+        h = hour.strip()
+        try:
+            if ":" in h:
+                hh, mm = h.split(":")
+                return ("hm", int(hh), int(mm))
+            return ("h", int(h))
+        except Exception:
+            pass
+    return ("none",)
+
+
+def _compile_year(year: Any) -> Any:
+    if isinstance(year, int):
+        return year
+    if isinstance(year, str):
+        try:
+            return int(year.strip())
+        except Exception:
+            pass
+    return ("none",)
+
+
+def _to_datetime(value: Any) -> datetime:
+    dt = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return dt.replace(tzinfo=KST) if dt.tzinfo is None else dt
+
+
+def _uses_reference(node: Any) -> bool:
+    """Whether a (possibly nested) criteria node has a filter relative to reference_time."""
+    if not isinstance(node, dict):
+        return False
+    if node.get("time_window_hours") is not None or node.get("nearest_n") is not None or node.get("sort_by") == "nearest":
+        return True
+    children = [c for op in ("and", "or") if isinstance(node.get(op), list) for c in node[op]]
+    if node.get("not") is not None:
+        children.append(node["not"])
+    return any(_uses_reference(child) for child in children)
+
+
+def _compile_node(node: Any, relative: bool, top: bool) -> tuple:
+    if not isinstance(node, dict):
+        raise TypeError(f"criteria must be an object: {node!r}")
+    key = []
+    for field, value in sorted(node.items()):
+        if value is None:
+            continue
+        if field in ("and", "or"):
+            if not isinstance(value, list):
+                raise TypeError(f"'{field}' must be a list")
+            # 순서/중복과 무관한 연산이므로 집합으로
+            value = frozenset(_compile_node(child, relative, False) for child in value)
+        elif field == "not":
+            value = _compile_node(value, relative, False)
+        elif field in ("member", "member_prefix", "location", "location_prefix"):
+            value = frozenset(_tag_values(field, value))
+        elif field == "title":
+            value = normalize_title(value)
+        elif field == "weekday":
+            value = frozenset(w for w in range(7) if _matches_weekday(datetime(2024, 1, 1 + w), value))
+        elif field == "month":
+            value = frozenset(m for m in range(1, 13) if _matches_month(datetime(2000, m, 1), value))
+        elif field == "hour":
+            value = _compile_hour(value)
+        elif field == "year":
+            value = _compile_year(value)
+        elif field == "time_window_hours":
+            value = float(value)
+        elif field == "nearest_n":
+            value = int(value)
+        elif field == "reference_time":
+            if top and not relative:
+                continue
+            value = _to_datetime(value).timestamp()
+        elif field not in _CRITERIA_FIELDS:
+            raise ValueError(f"Unknown criteria field: {field}")
+        hash(value)
+        key.append((field, value))
+    return tuple(key)
+
+
+def compile_criteria(criteria: Optional[Dict[str, Any]]) -> Tuple[Optional[tuple], Dict[str, Any]]:
+    """Normalize criteria into (cache key, criteria to evaluate).
+
+    Equivalent spellings share one key ('금' / 'fri' / 4, '10월' / 'October' / 10, '2025' / 2025),
+    also inside nested and/or/not expressions (see criteria_expr).
+    reference_time only enters the key when a relative filter uses it; without an explicit
+    reference_time, "now" is floored to NOW_BUCKET_SECONDS and that bucketed instant is also
+    what gets evaluated, so a cached result is exactly what a fresh evaluation would return.
+    The key is None (not cacheable) for unknown fields or values that cannot be normalized.
+    """
+    criteria = {k: v for k, v in (criteria or {}).items() if v is not None}
+    resolved = dict(criteria)
+    relative = _uses_reference(criteria)
+    if criteria.get("reference_time") is not None:
+        resolved["reference_time"] = _to_datetime(criteria["reference_time"])
+    elif relative:
+        now = int(time.time()) // NOW_BUCKET_SECONDS * NOW_BUCKET_SECONDS
+        resolved["reference_time"] = datetime.fromtimestamp(now, tz=KST)
+    try:
+        return _compile_node(resolved, relative, top=True), resolved
+    except (AttributeError, TypeError, ValueError):
+        return None, resolved
+
+
+class CriteriaCache:
+    """Bounded LRU of (user, compiled criteria, storage version) -> matching event ids.
+
+    Stores id tuples, not event copies; callers materialize events from their own store.
+    The storage version (index_hooks.storage_version) moves on writes from any process and on
+    files created/removed by hand, so entries for older directory states are never hit again
+    and age out of the LRU.
+    """
+
+    def __init__(self, maxsize: int = CRITERIA_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, Tuple[Any, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "uncacheable": 0, "evictions": 0}
+
+    def get(self, key: tuple) -> Optional[Tuple[Any, ...]]:
+        with self._lock:
+            ids = self._entries.get(key)
+            if ids is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return ids
+
+    def put(self, key: tuple, ids: Iterable[Any]) -> None:
+        with self._lock:
+            self._entries[key] = tuple(ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def note_uncacheable(self) -> None:
+        with self._lock:
+            self.counters["uncacheable"] += 1
+
+    def discard(self, key: tuple) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                **self.counters,
+                "hit_ratio": round(self.counters["hits"] / lookups, 3) if lookups else None,
+            }
+
+
+_cache = CriteriaCache()
+# parse_with_criteria가 캐시 hit 때 파일을 다시 읽지 않도록 마지막으로 읽은 이벤트를 디렉터리 버전과 함께 보관
+# (user -> (storage_version, id -> event)). 버전이 바뀌면 캐시 키도 바뀌므로 이전 버전 행은 다시 쓰이지 않는다
+_rows: Dict[str, Tuple[Tuple[int, int], Dict[Any, Dict[str, Any]]]] = {}
+_rows_lock = threading.Lock()
+
+
+def criteria_cache_stats() -> Dict[str, Any]:
+    return _cache.stats()
+
+
+def cached_match_ids(
+    vector_dir: str,
+    criteria: Optional[Dict[str, Any]],
+    compute: Callable[[Dict[str, Any]], Optional[List[Any]]],
+    namespace: str = "events",
+) -> Tuple[Optional[List[Any]], Dict[str, Any], Optional[tuple]]:
+    """Return (matching ids, resolved criteria, cache key), calling compute(resolved) on a miss.
+
+    compute may return None for results that cannot be cached as ids.
+    namespace separates callers whose id order differs for the same criteria.
+    The storage version is read before compute runs, so a result computed while another
+    process writes is filed under the older version and is not served after the write.
+    """
+    compiled, resolved = compile_criteria(criteria)
+    if compiled is None:
+        _cache.note_uncacheable()
+        ids = compute(resolved)
+        return (list(ids) if ids is not None else None), resolved, None
+    key = (namespace, user_key(vector_dir), compiled, storage_version(vector_dir))
+    ids = _cache.get(key)
+    if ids is None:
+        ids = compute(resolved)
+        if ids is None:
+            return None, resolved, key
+        _cache.put(key, ids)
+    return list(ids), resolved, key
+
+
+def _matching(events_list: List[Dict[str, Any]], criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+    from .criteria_expr import is_expression
+
+    if is_expression(criteria):
+        from .event_index import EventIndex
+
+        by_id = {ev.get("id"): ev for ev in events_list}
+        ids = EventIndex.from_events(events_list).match(criteria)
+        if criteria.get("title") is None:
+            ids = sorted(ids)
+        return [by_id[i] for i in ids if i in by_id]
+    excluded = filter_out_by_criteria(events_list, **criteria)
     excluded_ids = set(map(id, excluded))
-    included = [ev for ev in events_list if id(ev) not in excluded_ids]
-    return included
+    return [ev for ev in events_list if id(ev) not in excluded_ids]
+
+
+def parse_with_criteria(
+    vector_dir: str = "Database/[user]",
+    criteria: Optional[Dict[str, Any]] = None,
+    **kwargs: Any,
+) -> List[Dict[str, Any]]:
+    """Public API: return events that match given criteria.
+
+    criteria may nest "and" / "or" / "not" and use "member" / "location" / "title" (see criteria_expr);
+    such expressions are evaluated with the bitmaps of the shared EventIndex.
+    A top-level "title" ranks the results by title similarity (best first).
+    Results are cached as id lists (see CriteriaCache) together with the events read for that
+    storage version, so a hit returns them without touching the files. Writers must go through
+    notify_mutation (or replace files atomically) for the version, and with it the key, to move.
+    Archived events (RAG/archive.py) are added when the criteria's period reaches the archive,
+    as in RAG.query; criteria without a period see only the hot files.
+    """
+    from .criteria_expr import is_expression
+
+    merged = {**(criteria or {}), **kwargs}
+    expression = is_expression(merged)
+    loaded: Dict[str, List[Dict[str, Any]]] = {}
+
+    def compute(resolved: Dict[str, Any]) -> Optional[List[Any]]:
+        if expression:
+            from .event_index import fresh_event_index
+
+            ids = fresh_event_index(vector_dir).match(resolved)
+            return ids if resolved.get("title") is not None else sorted(ids)
+        loaded["events"] = load_events(vector_dir)
+        loaded["included"] = _matching(loaded["events"], resolved)
+        ids = [ev.get("id") for ev in loaded["included"]]
+        # id 없는 이벤트나 중복 id가 있으면 id 목록으로 되살릴 수 없으므로 캐시하지 않는다
+        if None in ids or len(set(ids)) != len(ids):
+            return None
+        return ids
+
+    ids, resolved, key = cached_match_ids(vector_dir, merged, compute)
+    if "included" in loaded:
+        events_list = loaded["included"]
+        if key is not None:
+            _remember_rows(vector_dir, key[3], loaded["events"], replace=True)
+    else:
+        # 캐시 키에 storage_version이 들어 있으므로 hit이면 그 버전의 행을 그대로 쓴다 (파일/조건을 다시 확인하지 않음)
+        rows = _cached_rows(vector_dir, key[3]) if key is not None else {}
+        missing = [i for i in ids if i not in rows]
+        if missing:
+            found = load_events_by_id(vector_dir, missing)
+            if key is not None:
+                _remember_rows(vector_dir, key[3], found.values())
+            rows = {**rows, **found}
+        events_list = [rows[i] for i in ids if i in rows]
+    # 캐시에 보관한 행을 호출 측이 고치지 않도록 얕은 사본을 돌려준다 (엔진 query와 같음)
+    events_list = [dict(ev) for ev in events_list]
+    archived = _archived_matches(vector_dir, resolved, events_list)
+    if archived:
+        # nearest_n / 제목 순위는 hot + 보관 이벤트 전체에서 다시 적용 (엔진 query와 같은 규칙)
+        return _matching(events_list + archived, resolved)
+    return events_list
+
+
+def _cached_rows(vector_dir: str, version: Tuple[int, int]) -> Dict[Any, Dict[str, Any]]:
+    with _rows_lock:
+        entry = _rows.get(user_key(vector_dir))
+        return entry[1] if entry is not None and entry[0] == version else {}
+
+
+def _remember_rows(vector_dir: str, version: Tuple[int, int], events: Iterable[Dict[str, Any]], replace: bool = False) -> None:
+    key = user_key(vector_dir)
+    with _rows_lock:
+        entry = _rows.get(key)
+        if replace or entry is None or entry[0] != version:
+            entry = _rows[key] = (version, {})
+        entry[1].update((ev.get("id"), ev) for ev in events if ev.get("id") is not None)
+
+
+def _archived_matches(vector_dir: str, criteria: Dict[str, Any], hot: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """criteria 기간이 보관 파티션에 닿으면 그 매칭 이벤트 (hot에 같은 id가 있으면 hot 우선).
+
+    보관 이벤트는 캐시된 id 목록에 들어가지 않는다: 기간이 없는 criteria는 hot 이벤트만 본다.
+    """
+    if not criteria:
+        return []
+    from .archive import get_archive
+
+    seen = {ev.get("id") for ev in hot}
+    return [ev for ev in get_archive(vector_dir).match(criteria) if ev.get("id") not in seen]
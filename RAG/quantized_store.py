@@ -0,0 +1,277 @@
+"""
+양자화(float16 / int8) 벡터 저장소. float32는 양자화 없이 같은 인터페이스로 정확 검색용 행렬을 제공한다.
+
+- 벡터는 L2 정규화 후 양자화해서 보관한다 (int8은 벡터별 scale 사용)
+- 검색은 양자화 행렬로 coarse top-k 후보를 뽑고, 후보만 원본(full precision) 벡터로 재채점한다
+- from_matrix()로 공유(읽기 전용 mmap) 행렬을 base로 붙이면, 이후 추가/수정은 작은 private overlay 행에만 쓰고
+  base는 복사하지 않는다 (여러 워커가 같은 스냅샷 페이지를 공유)
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .embedding_spec import EmbeddingSpec, active_spec, event_vector
+from .index_hooks import register_mutation_listener, user_key
+from .parsing_with_criteria import load_events
+
+
+SUPPORTED_DTYPES = ("int8", "float16", "float32")
+_NP_DTYPES = {"int8": np.int8, "float16": np.float16, "float32": np.float32}
+
+
+def _normalize(vec: Sequence[float]) -> np.ndarray:
+    arr = np.asarray(vec, dtype=np.float32)
+    norm = np.linalg.norm(arr)
+    return arr / norm if norm > 0 else arr
+
+
+class QuantizedVectorStore:
+    """ID -> 양자화 벡터. 삭제는 tombstone 처리 후 절반 이상 비면 압축한다."""
+
+    def __init__(self, dtype: str = "int8", dim: Optional[int] = None):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported quantization dtype: {dtype}")
+        self.dtype = dtype
+        self.dim = dim
+        self.ids: List[Optional[int]] = []
+        self.id_to_row: Dict[int, int] = {}
+        # _base: 공유 읽기 전용 행렬 (행 0..len(_base)-1), _matrix: 그 뒤에 이어지는 private 행
+        self._base: Optional[np.ndarray] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self.spec: Optional[EmbeddingSpec] = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_events(cls, events: Iterable[Dict[str, Any]], dtype: str = "int8", spec: Optional[EmbeddingSpec] = None) -> "QuantizedVectorStore":
+        store = cls(dtype=dtype, dim=spec.dim if spec else None)
+        store.spec = spec
+        for event in events:
+            vec = event_vector(event, spec) if spec else event.get("embedding")
+            if event.get("id") is not None and vec:
+                store.add(event["id"], vec)
+        return store
+
+    @classmethod
+    def from_matrix(cls, ids: Sequence[int], matrix: np.ndarray, dtype: str = "float32", spec: Optional[EmbeddingSpec] = None) -> "QuantizedVectorStore":
+        """이미 정규화/양자화된 행렬(스냅샷의 읽기 전용 mmap 뷰 등)을 base로 복사 없이 사용."""
+        store = cls(dtype=dtype, dim=int(matrix.shape[1]) if matrix.ndim == 2 else (spec.dim if spec else None))
+        store.spec = spec
+        store.ids = list(ids)
+        store.id_to_row = {doc_id: row for row, doc_id in enumerate(store.ids)}
+        store._base = matrix
+        store._size = len(store.ids)
+        store._scales = np.ones(store._size, dtype=np.float32)
+        store._alive = np.ones(store._size, dtype=bool)
+        return store
+
+    def __len__(self) -> int:
+        return len(self.id_to_row)
+
+    @property
+    def _base_rows(self) -> int:
+        return 0 if self._base is None else len(self._base)
+
+    @property
+    def nbytes(self) -> int:
+        """양자화 행렬 + scale 배열이 차지하는 바이트 수 (공유 base 포함)."""
+        private = 0 if self._matrix is None else self._matrix[: self._size - self._base_rows].nbytes
+        return int(self.shared_nbytes + private + self._scales[: self._size].nbytes)
+
+    @property
+    def shared_nbytes(self) -> int:
+        """프로세스 간에 공유되는 base 행렬의 바이트 수."""
+        return 0 if self._base is None else int(self._base.nbytes)
+
+    def _quantize(self, vec: np.ndarray) -> Tuple[np.ndarray, float]:
+        if self.dtype != "int8":
+            return vec.astype(_NP_DTYPES[self.dtype]), 1.0
+        scale = float(np.abs(vec).max()) / 127.0 or 1.0
+        return np.round(vec / scale).astype(np.int8), scale
+
+    def _grow(self) -> None:
+        nb = self._base_rows
+        capacity = max(16, 2 * (len(self._alive) - nb))
+        matrix = np.zeros((capacity, self.dim), dtype=_NP_DTYPES[self.dtype])
+        scales = np.zeros(nb + capacity, dtype=np.float32)
+        alive = np.zeros(nb + capacity, dtype=bool)
+        if self._matrix is not None:
+            matrix[: self._size - nb] = self._matrix[: self._size - nb]
+        scales[: self._size] = self._scales[: self._size]
+        alive[: self._size] = self._alive[: self._size]
+        self._matrix, self._scales, self._alive = matrix, scales, alive
+
+    def add(self, doc_id: int, vector: Sequence[float]) -> bool:
+        """벡터를 추가(또는 교체). 차원이 저장소와 다르면 무시하고 False 반환."""
+        with self._lock:
+            if self.dim is None:
+                self.dim = len(vector)
+            if len(vector) != self.dim:
+                return False
+            self.remove(doc_id)
+            if self._size >= len(self._alive):
+                self._grow()
+            q, scale = self._quantize(_normalize(vector))
+            row = self._size
+            self._matrix[row - self._base_rows] = q
+            self._scales[row] = scale
+            self._alive[row] = True
+            self.ids.append(doc_id)
+            self.id_to_row[doc_id] = row
+            self._size += 1
+            return True
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            row = self.id_to_row.pop(doc_id, None)
+            if row is None:
+                return
+            self._alive[row] = False
+            self.ids[row] = None
+            if len(self.id_to_row) * 2 < self._size:
+                self._compact()
+
+    def _rows(self) -> np.ndarray:
+        """base + private 행을 이어 붙인 (size, dim) 행렬 (base만 있으면 복사 없이 base)."""
+        nb = self._base_rows
+        private = self._matrix[: self._size - nb] if self._matrix is not None else None
+        if self._base is None:
+            return private
+        if private is None or len(private) == 0:
+            return self._base
+        return np.concatenate([self._base, private])
+
+    def _compact(self) -> None:
+        rows = np.flatnonzero(self._alive[: self._size])
+        if self._base is not None:
+            # 공유 base는 건드리지 않고 살아 있는 행만 private 행렬로 옮긴다
+            matrix = np.zeros((len(self._alive), self.dim), dtype=_NP_DTYPES[self.dtype])
+            matrix[: len(rows)] = self._rows()[rows]
+            self._matrix, self._base = matrix, None
+        else:
+            self._matrix[: len(rows)] = self._matrix[rows]
+        self._scales[: len(rows)] = self._scales[rows]
+        self._alive[:] = False
+        self._alive[: len(rows)] = True
+        self.ids = [self.ids[r] for r in rows]
+        self.id_to_row = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self._size = len(rows)
+
+    def coarse_search(
+        self,
+        query: Sequence[float],
+        k: int,
+        allowed_ids: Optional[Set[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """양자화 행렬 기반 근사 코사인 점수로 top-k (id, score)."""
+        with self._lock:
+            if len(query) != self.dim or not self.id_to_row:
+                return []
+            q = _normalize(query)
+            size = self._size
+            nb = self._base_rows
+            parts = [self._base.astype(np.float32, copy=False) @ q] if nb else []
+            if size > nb:
+                parts.append(self._matrix[: size - nb].astype(np.float32, copy=False) @ q)
+            scores = (np.concatenate(parts) if len(parts) > 1 else parts[0]) * self._scales[:size]
+            mask = self._alive[:size].copy()
+            if allowed_ids is not None:
+                allowed_rows = [self.id_to_row[i] for i in allowed_ids if i in self.id_to_row]
+                allowed_mask = np.zeros(size, dtype=bool)
+                allowed_mask[allowed_rows] = True
+                mask &= allowed_mask
+            candidates = np.flatnonzero(mask)
+            if len(candidates) == 0:
+                return []
+            k = min(k, len(candidates))
+            cand_scores = scores[candidates]
+            top = np.argpartition(-cand_scores, k - 1)[:k]
+            top = top[np.argsort(-cand_scores[top], kind="stable")]
+            return [(self.ids[candidates[i]], float(cand_scores[i])) for i in top]
+
+    def export(self) -> Tuple[List[int], np.ndarray]:
+        """살아 있는 행의 (id 목록, float32 행렬). 스냅샷 저장용."""
+        with self._lock:
+            if not self.id_to_row:
+                return [], np.zeros((0, self.dim or 0), dtype=np.float32)
+            rows = np.flatnonzero(self._alive[: self._size])
+            matrix = self._rows()[rows].astype(np.float32) * self._scales[rows, None]
+            return [self.ids[r] for r in rows], matrix
+
+    def search(
+        self,
+        query: Sequence[float],
+        k: int,
+        full_vectors: Callable[[List[int]], Dict[int, Sequence[float]]],
+        allowed_ids: Optional[Set[int]] = None,
+        rescore_factor: int = 4,
+    ) -> List[Tuple[int, float]]:
+        """coarse top-(k*rescore_factor) 후보를 full precision 벡터로 재채점한 top-k."""
+        coarse = self.coarse_search(query, k * max(1, rescore_factor), allowed_ids)
+        if not coarse:
+            return []
+        q = _normalize(query)
+        full = full_vectors([doc_id for doc_id, _ in coarse])
+        rescored = []
+        for doc_id, approx in coarse:
+            vec = full.get(doc_id)
+            score = float(_normalize(vec) @ q) if vec is not None and len(vec) == len(q) else approx
+            rescored.append((doc_id, score))
+        rescored.sort(key=lambda x: -x[1])
+        return rescored[:k]
+
+
+_stores: Dict[Tuple[str, str], QuantizedVectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_quantized_store(user_dir: str = "Database/[user]", dtype: str = "int8", events: Optional[List[Dict[str, Any]]] = None) -> QuantizedVectorStore:
+    """디렉터리/타입별 저장소를 처음 요청 시 만들고 이후에는 증분 갱신된 것을 재사용."""
+    key = (user_key(user_dir), dtype)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            events = events if events is not None else load_events(user_dir)
+            store = QuantizedVectorStore.from_events(events, dtype=dtype, spec=active_spec(user_dir))
+            _stores[key] = store
+        return store
+
+
+def install_quantized_store(user_dir: str, store: QuantizedVectorStore) -> None:
+    """이미 만든 저장소(엔진 로드/스냅샷 복원)를 디렉터리/타입의 공유 저장소로 등록."""
+    with _stores_lock:
+        _stores[(user_key(user_dir), store.dtype)] = store
+
+
+def _on_mutation(key: str, op: str, event_id: Optional[int], event: Optional[Dict[str, Any]]) -> None:
+    with _stores_lock:
+        stores = [(k, s) for k, s in _stores.items() if k[0] == key]
+        if op == "reload":
+            for k, _ in stores:
+                del _stores[k]
+            return
+        if op == "spec":
+            # 벡터 공간 전환: 다른 공간의 저장소는 다음 요청 때 새 공간으로 만든다 (엔진 저장소는 cut-over가 먼저 교체)
+            spec = active_spec(key)
+            for k, store in stores:
+                if store.spec is not None and store.spec != spec:
+                    del _stores[k]
+            return
+    for _, store in stores:
+        if op == "delete" and event_id is not None:
+            store.remove(event_id)
+        elif op in ("add", "update") and event is not None:
+            doc_id = event.get("id", event_id)
+            vec = event_vector(event, store.spec) if store.spec else event.get("embedding")
+            if vec:
+                store.add(doc_id, vec)
+            else:
+                store.remove(doc_id)
+
+
+register_mutation_listener(_on_mutation)
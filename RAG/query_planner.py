@@ -0,0 +1,184 @@
+"""
+criteria + content 검색의 선택도 기반 실행 계획.
+
+- filter_first: 기준이 선택적이면(예상 매칭 수가 적으면) 컬럼 인덱스로 매칭 ID를 구하고
+  해당 이벤트만 읽어서 정확하게 채점한다
+- vector_first: 기준이 넓으면 벡터 인덱스(양자화 저장소 / IVF)에서 먼저 over-fetch 하고
+  기준에 맞지 않는 후보를 걸러낸다. 부족하면 fetch 크기를 늘려 다시 찾는다
+- scan: 컬럼 인덱스가 해석할 수 없는 기준이 있으면 기존 전체 스캔 경로
+
+planned_search()는 (결과, explain) 을 반환하며 explain에는 선택된 계획과 단계별 시간이 들어 있다.
+"""
+from __future__ import annotations
+
+import math
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .ann_index import get_ann_index
+from .embedding_queue import pending_embedding_ids
+from .embedding_spec import active_spec, event_vector
+from .event_index import INDEXED_CRITERIA, fresh_event_index, get_event_index
+from .lexical_index import get_lexical_index
+from .parsing_with_criteria import load_events_by_id, parse_with_criteria
+from .quantized_store import get_quantized_store
+
+
+PLANS = ("auto", "filter_first", "vector_first", "scan")
+
+# 예상 매칭 수가 이 값 이하이면 filter_first
+FILTER_FIRST_MAX_ROWS = int(os.getenv("PLANNER_FILTER_FIRST_ROWS", "500"))
+OVERFETCH_MARGIN = 2.0
+MAX_ROUNDS = 4
+
+
+@contextmanager
+def _stage(timings: Dict[str, float], name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        timings[name] = round(timings.get(name, 0.0) + elapsed, 3)
+
+
+def choose_plan(criteria: Optional[Dict[str, Any]], k: int, vector_dir: str, mode: str = "vector") -> Dict[str, Any]:
+    """인덱스 통계로 선택도를 추정하고 실행 계획을 고른다 (explain의 앞부분)."""
+    criteria = criteria or {}
+    unsupported = sorted(set(criteria) - INDEXED_CRITERIA)
+    if unsupported:
+        return {"plan": "scan", "reason": f"criteria not indexed: {', '.join(unsupported)}"}
+    # 계획마다 처음 한 번 다른 프로세스의 변경을 반영 (이후 단계는 같은 인덱스를 쓴다)
+    index = fresh_event_index(vector_dir)
+    total = len(index)
+    selectivity = index.estimate(criteria) if criteria else 1.0
+    estimated = selectivity * total
+    explain = {
+        "total_events": total,
+        "estimated_selectivity": round(selectivity, 6),
+        "estimated_matches": int(round(estimated)),
+    }
+    if mode != "vector":
+        explain.update(plan="filter_first", reason=f"{mode} ranking scores the matched set")
+    elif estimated <= max(FILTER_FIRST_MAX_ROWS, k):
+        explain.update(plan="filter_first", reason=f"estimated matches <= {max(FILTER_FIRST_MAX_ROWS, k)}")
+    else:
+        explain.update(plan="vector_first", reason=f"estimated matches > {max(FILTER_FIRST_MAX_ROWS, k)}")
+    return explain
+
+
+def _filter_first(query, criteria, k, vector_dir, mode, quantization, ann, timings, explain) -> List[Dict[str, Any]]:
+    from .parsing_with_content import _rank
+
+    with _stage(timings, "filter"):
+        ids = get_event_index(vector_dir).match(criteria)
+        by_id = load_events_by_id(vector_dir, ids)
+        events = [by_id[i] for i in ids if i in by_id]
+    explain["matched"] = len(events)
+    if not events:
+        return []
+    with _stage(timings, "score"):
+        return _rank(query, events, k, vector_dir, mode, quantization, ann)
+
+
+def _vector_first(query, criteria, k, vector_dir, quantization, ann, timings, explain) -> List[Dict[str, Any]]:
+    from .parsing_with_content import _reciprocal_rank_fusion
+
+    spec = active_spec(vector_dir)
+    with _stage(timings, "filter"):
+        index = get_event_index(vector_dir)
+        allowed = set(index.match(criteria)) if criteria else None
+        total = len(index)
+    with _stage(timings, "embed"):
+        query_vec = np.asarray(spec.backend().embed_query(query), dtype=np.float32)
+
+    selectivity = max(explain.get("estimated_selectivity") or 0.0, 1.0 / max(total, 1))
+    # ANN 점수는 정규화된 float32 기준으로 이미 정확하므로 재채점 후보는 k개면 충분하다
+    rescore = k if ann else k * 4
+    fetch = min(total, math.ceil(rescore / selectivity * OVERFETCH_MARGIN))
+    with _stage(timings, "vector_search"):
+        source = get_ann_index(vector_dir) if ann else get_quantized_store(vector_dir, quantization or "float16")
+        hits: List[Tuple[int, float]] = []
+        for rounds in range(1, MAX_ROUNDS + 1):
+            raw = source.search(query_vec, fetch) if ann else source.coarse_search(query_vec, fetch)
+            hits = [(doc_id, score) for doc_id, score in raw if allowed is None or doc_id in allowed]
+            if len(hits) >= rescore or fetch >= total:
+                break
+            fetch = min(total, fetch * 2)
+    explain.update(fetch=fetch, rounds=rounds, candidates_scored=len(hits))
+
+    with _stage(timings, "rescore"):
+        candidates = hits[:rescore]
+        by_id = load_events_by_id(vector_dir, [doc_id for doc_id, _ in candidates])
+        q = query_vec / (np.linalg.norm(query_vec) or 1.0)
+        scored = []
+        for doc_id, approx in candidates:
+            event = by_id.get(doc_id)
+            if event is None:
+                continue
+            vec = event_vector(event, spec)
+            if vec is not None and not ann:
+                arr = np.asarray(vec, dtype=np.float32)
+                approx = float(arr @ q / (np.linalg.norm(arr) or 1.0))
+            scored.append((approx, event))
+        scored.sort(key=lambda x: -x[0])
+    results = [event for _, event in scored[:k]]
+
+    # 아직 임베딩되지 않은(큐 대기) 이벤트는 벡터 인덱스에 없으므로 lexical 순위로 보완
+    pending = pending_embedding_ids(vector_dir)
+    if allowed is not None:
+        pending &= allowed
+    if pending:
+        with _stage(timings, "lexical_fallback"):
+            hits = get_lexical_index(vector_dir).search(query, k=k, allowed_ids=pending)
+            by_id = load_events_by_id(vector_dir, [doc_id for doc_id, _ in hits])
+            fallback = [by_id[doc_id] for doc_id, _ in hits if doc_id in by_id]
+        explain["lexical_fallback"] = len(fallback)
+        if fallback:
+            results = _reciprocal_rank_fusion([results, fallback], k)
+    return results
+
+
+def planned_search(
+    query: str,
+    criteria: Optional[Dict[str, Any]] = None,
+    k: int = 10,
+    vector_dir: str = "Database/[user]",
+    mode: str = "vector",
+    quantization: Optional[str] = None,
+    ann: bool = False,
+    plan: str = "auto",
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """계획을 골라 실행하고 (결과, explain)을 반환."""
+    from .parsing_with_content import _rank
+
+    if plan not in PLANS:
+        raise ValueError(f"Unknown query plan: {plan}")
+    criteria = criteria or {}
+    timings: Dict[str, float] = {}
+    with _stage(timings, "plan"):
+        explain = choose_plan(criteria, k, vector_dir, mode)
+    if plan != "auto" and explain["plan"] != "scan":
+        explain.update(plan=plan, reason="forced")
+    if explain["plan"] == "vector_first" and mode != "vector":
+        explain.update(plan="filter_first", reason=f"vector_first requires vector mode, got {mode}")
+
+    if explain["plan"] == "filter_first":
+        results = _filter_first(query, criteria, k, vector_dir, mode, quantization, ann, timings, explain)
+    elif explain["plan"] == "vector_first":
+        results = _vector_first(query, criteria, k, vector_dir, quantization, ann, timings, explain)
+    else:
+        with _stage(timings, "filter"):
+            events = parse_with_criteria(vector_dir, criteria=criteria)
+        explain["matched"] = len(events)
+        results = []
+        if events:
+            with _stage(timings, "score"):
+                results = _rank(query, events, k, vector_dir, mode, quantization, ann)
+    explain["returned"] = len(results)
+    explain["timings_ms"] = dict(timings, total=round(sum(timings.values()), 3))
+    return results, explain
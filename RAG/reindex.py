@@ -0,0 +1,226 @@
+"""
+벡터 공간(모델/차원) 변경 시 백그라운드 재색인.
+
+1. 상태 파일에 target 공간을 기록한다 (검색은 계속 active 공간 벡터를 사용)
+   - 그동안 추가/수정되는 이벤트는 임베딩 큐가 두 공간 모두에 쓴다 (embedding_queue 이중 쓰기)
+2. target 벡터가 없는 이벤트를 배치 임베딩(embedding_pool)해서 `embedding_next`에 기록한다
+   - 로드된 엔진은 같은 벡터를 shadow 저장소에 모은다 (RAG.begin_shadow / add_shadow_vectors)
+3. 전체 패스에서 더 이상 남은 이벤트가 없으면 active를 target으로 원자적으로 교체하고(os.replace),
+   엔진은 shadow를 검색 인덱스로 바꿔 끼운다 (RAG.cut_over). 다른 벡터 인덱스는 "spec" 변경 알림으로 새 공간에서 다시 만든다
+4. 이후 `embedding_next`를 `embedding`으로 승격하고 이전 벡터를 지운다
+검색은 전환 전 내내 기존 공간 인덱스를 쓰므로 중단되거나 전체를 다시 임베딩할 때까지 막히지 않는다.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .embedding_pool import get_executor
+from .embedding_spec import (
+    EmbeddingSpec,
+    active_spec,
+    configured_spec,
+    has_fresh_vector,
+    save_spec_state,
+    set_event_vector,
+    target_spec,
+    vector_spec,
+)
+from .index_hooks import notify_mutation, user_key
+from .state import atomic_write_json, event_file_lock, try_state_lock
+
+
+_jobs: Dict[str, threading.Thread] = {}
+_progress: Dict[str, Dict[str, Any]] = {}
+_jobs_lock = threading.Lock()
+
+
+def _event_files(user_dir: str) -> List[Path]:
+    return sorted(Path(user_dir).glob("*.json"))
+
+
+def _read(path: Path) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write(path: Path, data: Any) -> None:
+    # 검색 쪽이 재색인 도중 파일을 읽을 수 있으므로 임시 파일 + os.replace
+    atomic_write_json(path, data)
+
+
+def _as_list(data: Any) -> List[Dict[str, Any]]:
+    return data if isinstance(data, list) else [data]
+
+
+def _pending(user_dir: str, target: EmbeddingSpec) -> List[Tuple[Path, Any, str]]:
+    """target 공간 벡터가 없거나 텍스트가 바뀌어 낡은 (파일, 이벤트 id, 텍스트) 목록."""
+    from .parsing_with_content import _concat_event_fields
+
+    pending = []
+    for path in _event_files(user_dir):
+        try:
+            for event in _as_list(_read(path)):
+                if isinstance(event, dict) and not has_fresh_vector(event, target):
+                    pending.append((path, event.get("id"), _concat_event_fields(event)))
+        except Exception as e:
+            print(f"Reindex: failed to read {path.name}: {e}")
+    return pending
+
+
+def _write_next_vectors(path: Path, vectors: Dict[Any, Tuple[str, List[float]]], target: EmbeddingSpec) -> List[Any]:
+    """파일을 다시 읽어서, 그 사이 내용이 바뀌지 않은 이벤트에만 target 벡터를 기록. 기록한 id 목록을 반환."""
+    from .parsing_with_content import _concat_event_fields
+
+    with event_file_lock(path):
+        data = _read(path)
+        written = []
+        for event in _as_list(data):
+            item = vectors.get(event.get("id"))
+            if item is None or _concat_event_fields(event) != item[0]:
+                continue
+            field = "embedding" if vector_spec(event) == target or not event.get("embedding") else "embedding_next"
+            set_event_vector(event, item[1], target, field=field)
+            written.append(event.get("id"))
+        if written:
+            _write(path, data)
+    return written
+
+
+def _promote(user_dir: str, spec: EmbeddingSpec) -> int:
+    """cut-over 후 embedding_next(spec)를 embedding으로 승격."""
+    promoted = 0
+    for path in _event_files(user_dir):
+        try:
+            with event_file_lock(path):
+                data = _read(path)
+                changed = False
+                for event in _as_list(data):
+                    if vector_spec(event, "embedding_next") == spec:
+                        # text_sha1은 embedding_next를 만든 텍스트 기준 그대로 옮긴다 (그 사이 바뀌었으면 낡은 벡터로 남음)
+                        event["embedding"] = event.pop("embedding_next")
+                        event["embedding_meta"] = event.pop("embedding_next_meta")
+                        changed = True
+                        promoted += 1
+                if changed:
+                    _write(path, data)
+        except Exception as e:
+            print(f"Reindex: failed to promote {path.name}: {e}")
+    return promoted
+
+
+def reindex(user_dir: str = "Database/[user]", target: Optional[EmbeddingSpec] = None, max_passes: int = 5) -> Dict[str, Any]:
+    """target 공간으로 재색인 후 cut-over까지 동기적으로 수행.
+
+    디렉터리당 한 프로세스만 재색인한다: 다른 워커/CLI가 `.moro/locks/reindex.lock`을 잡고 있으면
+    기다리지 않고 state "running_elsewhere"로 돌아온다 (그쪽이 끝낸 전환은 상태 파일로 보인다).
+    """
+    key = user_key(user_dir)
+    with try_state_lock(user_dir, "reindex") as acquired:
+        if not acquired:
+            progress = _progress.setdefault(key, {})
+            progress["state"] = "running_elsewhere"
+            return dict(progress)
+        return _reindex(user_dir, target, max_passes)
+
+
+def _reindex(user_dir: str, target: Optional[EmbeddingSpec], max_passes: int) -> Dict[str, Any]:
+    # 잠금을 잡은 뒤에 읽는다: 먼저 잡았던 프로세스가 이미 전환을 끝냈으면 할 일이 없다
+    active = active_spec(user_dir)
+    target = target or configured_spec()
+    key = user_key(user_dir)
+    progress = _progress.setdefault(key, {})
+    progress.update({"active": active.to_meta(), "target": target.to_meta(), "embedded": 0, "state": "running"})
+    if active == target:
+        # 이전에 중단된 다른 target 기록이 남아 있으면 정리
+        save_spec_state(user_dir, active)
+        progress["state"] = "done"
+        return dict(progress)
+
+    save_spec_state(user_dir, active, target)
+    engine = _loaded_engine(user_dir)
+    if engine is not None:
+        try:
+            progress["shadow"] = engine.begin_shadow(target)
+        except Exception as e:
+            print(f"Reindex: failed to build shadow index: {e}")
+    executor = get_executor(target.backend())
+    for _ in range(max_passes):
+        pending = _pending(user_dir, target)
+        progress["pending"] = len(pending)
+        if not pending:
+            break
+        futures = executor.submit_texts([text for _, _, text in pending])
+        by_file: Dict[Path, Dict[Any, Tuple[str, List[float]]]] = {}
+        for (path, event_id, text), future in zip(pending, futures):
+            try:
+                by_file.setdefault(path, {})[event_id] = (text, future.result())
+            except Exception as e:
+                print(f"Reindex: embedding failed for {event_id}: {e}")
+        engine = _loaded_engine(user_dir)
+        for path, vectors in by_file.items():
+            try:
+                written = _write_next_vectors(path, vectors, target)
+            except Exception as e:
+                print(f"Reindex: failed to write {path.name}: {e}")
+                continue
+            progress["embedded"] += len(written)
+            if engine is not None:
+                engine.add_shadow_vectors(target, {event_id: vectors[event_id][1] for event_id in written})
+    else:
+        progress["state"] = "incomplete"
+        return dict(progress)
+
+    # 모든 이벤트가 target 벡터를 가졌으므로 원자적으로 전환
+    save_spec_state(user_dir, target)
+    engine = _loaded_engine(user_dir)
+    if engine is not None:
+        try:
+            progress["cut_over"] = engine.cut_over(target)
+        except Exception as e:
+            # 엔진은 이전 공간으로 계속 검색하다가 다음 로드 때 새 공간으로 읽는다
+            print(f"Reindex: engine cut-over failed: {e}")
+            notify_mutation(user_dir, "reload")
+    notify_mutation(user_dir, "spec")
+    progress["promoted"] = _promote(user_dir, target)
+    progress["state"] = "done"
+    return dict(progress)
+
+
+def _loaded_engine(user_dir: str):
+    from .engine import peek_engine
+
+    return peek_engine(user_dir)
+
+
+def start_reindex(user_dir: str = "Database/[user]", target: Optional[EmbeddingSpec] = None) -> threading.Thread:
+    """디렉터리별로 하나의 백그라운드 재색인 스레드를 시작 (이미 실행 중이면 그 스레드를 반환).
+
+    다른 프로세스가 재색인 중이면 시작한 스레드는 바로 끝난다 (reindex 참고).
+    """
+    key = user_key(user_dir)
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is not None and job.is_alive():
+            return job
+        job = threading.Thread(target=reindex, args=(user_dir, target), name="reindex", daemon=True)
+        _jobs[key] = job
+        job.start()
+        return job
+
+
+def ensure_embedding_spec(user_dir: str = "Database/[user]") -> Optional[threading.Thread]:
+    """설정된 벡터 공간이 active(또는 진행 중인 target)와 다르면 백그라운드 재색인을 시작."""
+    desired = configured_spec()
+    if active_spec(user_dir) == desired and target_spec(user_dir) == desired:
+        return None
+    return start_reindex(user_dir, desired)
+
+
+def reindex_status(user_dir: str = "Database/[user]") -> Dict[str, Any]:
+    status = dict(_progress.get(user_key(user_dir), {}))
+    status.setdefault("active", active_spec(user_dir).to_meta())
+    status.setdefault("target", target_spec(user_dir).to_meta())
+    return status
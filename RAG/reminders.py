@@ -0,0 +1,344 @@
+"""
+일정 알림(reminder) 스케줄러.
+
+- 이벤트의 `reminders`: 시작 몇 분 전에 알릴지 목록 (예: [10, 60]). 필드가 없으면 REMINDER_DEFAULT_MINUTES
+  (기본 "10", 쉼표로 여러 개, 빈 값이면 알림 없음), []이면 알림 없음. REMINDER_MAX_OFFSET_MINUTES(기본 1주)보다 큰 값은 무시
+- 다가오는 알림을 (알림 시각, seq, id, 분, 세대, 시작 시각) min-heap으로 유지하고, 워커 스레드는
+  가장 이른 알림 시각까지 Condition으로 잠든다 → 디렉터리를 훑는 폴링 없이, 깨어날 때 하는 일은 만기 알림 수에 비례
+- heap에는 시작 시각이 "지금 + 최대 offset + REMINDER_LOOKAHEAD_HOURS" 전인 이벤트만 넣고,
+  창은 agenda 날짜 버킷(RAG/agenda.py)에서 새로 닿는 날짜만 읽어 넓힌다 (날짜 버킷 → heap의 2단계 타이밍 휠)
+- eventmanager 변경(index_hooks)은 그 이벤트의 알림만 다시 넣는다. 이전 항목은 이벤트별 세대 번호로 무효화 (lazy deletion)
+- 다른 프로세스의 변경은 알림이 오지 않으므로, 워커가 REMINDER_SYNC_SECONDS마다 storage_version을 보고
+  창을 읽은 뒤 다른 곳에서 바뀌었으면 창 전체를 다시 읽는다 (이미 보낸 알림은 다시 보내지 않음)
+- 발송한 알림은 구독자 큐(app.py의 SSE `GET /api/reminders/stream`)로 보내고 최근 REMINDER_BACKLOG개를 보관
+  (재접속한 클라이언트는 Last-Event-ID 이후 알림을 다시 받는다)
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .index_hooks import register_mutation_listener, storage_version, user_key
+from .parsing_with_criteria import KST, _event_window
+
+
+def _parse_minutes(value: str) -> List[int]:
+    return [int(part) for part in value.replace(" ", "").split(",") if part]
+
+
+REMINDER_DEFAULT_MINUTES = _parse_minutes(os.getenv("REMINDER_DEFAULT_MINUTES", "10"))
+REMINDER_MAX_OFFSET_MINUTES = int(os.getenv("REMINDER_MAX_OFFSET_MINUTES", str(7 * 24 * 60)))
+REMINDER_LOOKAHEAD_HOURS = float(os.getenv("REMINDER_LOOKAHEAD_HOURS", "24"))
+# 재시작 등으로 놓친 알림도 이벤트가 시작하기 전이고 이 시간 안이면 보낸다
+REMINDER_GRACE_SECONDS = float(os.getenv("REMINDER_GRACE_SECONDS", "300"))
+REMINDER_BACKLOG = int(os.getenv("REMINDER_BACKLOG", "100"))
+# 다른 프로세스의 변경을 확인하는 간격(초)
+REMINDER_SYNC_SECONDS = float(os.getenv("REMINDER_SYNC_SECONDS", "30"))
+# 창을 넓히기 위해 적어도 이 간격으로 깨어난다 (만기 알림이 없어도)
+_WINDOW_REFRESH_SECONDS = 3600.0
+_SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def event_offsets(event: Dict[str, Any]) -> List[int]:
+    """이벤트의 알림 offset(분, 오름차순). 잘못된 값은 건너뛴다."""
+    value = event.get("reminders")
+    if value is None:
+        value = REMINDER_DEFAULT_MINUTES
+    elif isinstance(value, (int, float, str)):
+        value = [value]
+    offsets: Set[int] = set()
+    for item in value or []:
+        try:
+            minutes = int(item)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= minutes <= REMINDER_MAX_OFFSET_MINUTES:
+            offsets.add(minutes)
+    return sorted(offsets)
+
+
+class ReminderScheduler:
+    def __init__(self, user_dir: str):
+        self.user_dir = user_dir
+        self.key = user_key(user_dir)
+        # (알림 시각, seq, 이벤트 id, 분, 세대, 시작 시각)
+        self._heap: List[Tuple[float, int, Any, int, int, float]] = []
+        # 이벤트 id -> [현재 세대, heap에 남은 유효 항목 수]
+        self._live: Dict[Any, List[int]] = {}
+        # 보낸 알림 (id, 분, 시작 시각) -> 시작 시각 (창을 다시 읽어도 두 번 보내지 않도록, 시작이 지나면 정리)
+        self._fired: Dict[Tuple[Any, int, float], float] = {}
+        self._seq = itertools.count()
+        # 시작 시각이 이 값보다 이른 이벤트는 heap에 반영되어 있다 (None이면 아직 읽지 않음)
+        self._window_end: Optional[float] = None
+        # 창이 반영한 디렉터리 상태 (storage_version)
+        self._synced: Optional[Tuple[int, int]] = None
+        # 창을 넓히는 동안 변경된 이벤트 (읽어 온 이전 상태로 덮어쓰지 않도록)
+        self._touched: Optional[Set[Any]] = None
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._subscribers: List[queue.Queue] = []
+        self._backlog: deque = deque(maxlen=REMINDER_BACKLOG)
+        self._message_ids = itertools.count(1)
+        self.stats = {"scheduled": 0, "fired": 0, "stale": 0, "window_loads": 0, "window_events": 0, "resyncs": 0, "dropped": 0}
+
+    # ------------------------------------------------------------------ heap
+    def _schedule(self, event: Dict[str, Any], now: float) -> None:
+        """이벤트의 알림을 다시 넣는다 (잠금 안에서). 이전 항목은 세대가 바뀌어 무효가 된다."""
+        doc_id = event.get("id")
+        if doc_id is None:
+            return
+        self._live.pop(doc_id, None)
+        try:
+            start = _event_window(event)[0].timestamp()
+        except (KeyError, TypeError, ValueError):
+            return
+        if self._window_end is None or start >= self._window_end or start <= now:
+            return
+        generation = next(self._seq)
+        count = 0
+        for minutes in event_offsets(event):
+            fire_at = start - minutes * 60
+            if fire_at < now - REMINDER_GRACE_SECONDS or (doc_id, minutes, start) in self._fired:
+                continue
+            heapq.heappush(self._heap, (fire_at, next(self._seq), doc_id, minutes, generation, start))
+            count += 1
+        if count:
+            self._live[doc_id] = [generation, count]
+            self.stats["scheduled"] += count
+
+    def _unschedule(self, doc_id: Any) -> None:
+        self._live.pop(doc_id, None)
+
+    def _pop_due(self, now: float) -> List[Tuple[Any, int, float]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, doc_id, minutes, generation, start = heapq.heappop(self._heap)
+            live = self._live.get(doc_id)
+            if live is None or live[0] != generation:
+                self.stats["stale"] += 1
+                continue
+            live[1] -= 1
+            if not live[1]:
+                del self._live[doc_id]
+            self._fired[(doc_id, minutes, start)] = start
+            due.append((doc_id, minutes, start))
+        return due
+
+    def _compact(self) -> None:
+        """무효 항목이 유효 항목보다 많아지면 heap을 다시 만든다."""
+        live = sum(entry[1] for entry in self._live.values())
+        if len(self._heap) > 2 * live + 64:
+            self._heap = [item for item in self._heap if self._live.get(item[2], (None,))[0] == item[4]]
+            heapq.heapify(self._heap)
+
+    # ---------------------------------------------------------------- window
+    def _extend_window(self, now: float) -> None:
+        """창 끝을 지금 + 최대 offset + lookahead까지 넓히고, 새로 닿은 날짜 버킷의 이벤트만 읽어 넣는다."""
+        target = now + REMINDER_MAX_OFFSET_MINUTES * 60 + REMINDER_LOOKAHEAD_HOURS * 3600
+        with self._cond:
+            if self._window_end is not None and self._window_end >= target - _WINDOW_REFRESH_SECONDS:
+                return
+            if self._window_end is None:
+                # 읽기 전에 잡아 두면, 읽는 도중 다른 곳에서 바뀐 것은 다음 확인 때 다시 읽는다
+                self._synced = storage_version(self.user_dir)
+            begin = now if self._window_end is None else self._window_end
+            self._window_end = target
+            self._touched = set()
+        from .agenda import get_agenda
+        from .engine import get_engine
+
+        try:
+            ids = get_agenda(self.user_dir).range_ids(
+                datetime.fromtimestamp(begin, KST).date(), datetime.fromtimestamp(target, KST).date(),
+            )
+            events = get_engine(self.user_dir).get_events(ids)
+        except Exception:
+            with self._cond:
+                self._window_end = None if begin == now else begin
+                self._touched = None
+            raise
+        with self._cond:
+            for event in events:
+                try:
+                    start = _event_window(event)[0].timestamp()
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if begin <= start < target and event.get("id") not in self._touched:
+                    self._schedule(event, now)
+                    self.stats["window_events"] += 1
+            self._touched = None
+            self.stats["window_loads"] += 1
+            # 시작이 지난 이벤트의 발송 기록은 더 이상 필요 없다
+            self._fired = {k: start for k, start in self._fired.items() if start > now}
+            self._cond.notify_all()
+
+    def _resync(self) -> None:
+        """창을 읽은 뒤 다른 프로세스가 저장소를 바꿨으면 창을 비워 다음 _extend_window가 전부 다시 읽게 한다."""
+        with self._cond:
+            if self._window_end is None or self._touched is not None:
+                return
+            if storage_version(self.user_dir) != self._synced:
+                self._heap, self._live, self._window_end = [], {}, None
+                self.stats["resyncs"] += 1
+
+    # ------------------------------------------------------------- mutation
+    def apply(self, op: str, event_id: Any, event: Optional[Dict[str, Any]]) -> None:
+        with self._cond:
+            if op == "reload":
+                self._heap, self._live, self._window_end = [], {}, None
+            elif op == "delete" and event_id is not None:
+                self._unschedule(event_id)
+            elif op in ("add", "update") and event is not None:
+                event_id = event.get("id", event_id)
+                self._schedule(event, time.time())
+            else:
+                return
+            if self._touched is not None and event_id is not None:
+                self._touched.add(event_id)
+            if self._synced is not None:
+                current = storage_version(self.user_dir)
+                if current[0] == self._synced[0] + 1:
+                    # 이 변경 하나만 있었다: 이미 반영했으므로 창을 다시 읽지 않는다
+                    self._synced = current
+            self._compact()
+            self._cond.notify_all()
+
+    # --------------------------------------------------------------- worker
+    def start(self) -> "ReminderScheduler":
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, name="reminders", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self._resync()
+                self._extend_window(time.time())
+            except Exception as e:
+                print(f"Reminders: failed to load upcoming events for {self.user_dir}: {e}")
+            with self._cond:
+                if self._stopped:
+                    return
+                now = time.time()
+                due = self._pop_due(now)
+                if not due:
+                    # 창을 아직 못 읽었으면(엔진 로드 실패 등) 잠시 뒤 다시 시도
+                    timeout = min(_WINDOW_REFRESH_SECONDS if self._window_end is not None else 60.0, REMINDER_SYNC_SECONDS)
+                    if self._heap:
+                        timeout = min(timeout, max(0.0, self._heap[0][0] - now))
+                    self._cond.wait(timeout)
+                    continue
+            self._deliver(due)
+
+    def _deliver(self, due: List[Tuple[Any, int, float]]) -> None:
+        from .engine import get_engine
+
+        events = {e["id"]: e for e in get_engine(self.user_dir).get_events([doc_id for doc_id, _, _ in due])}
+        fired_at = datetime.now(KST).isoformat(timespec="seconds")
+        for doc_id, minutes, start in due:
+            event = events.get(doc_id)
+            if event is None:
+                continue
+            message = {
+                "id": next(self._message_ids),
+                "event_id": doc_id,
+                "title": event.get("title", ""),
+                "location": event.get("location", ""),
+                "date_start": event.get("date_start"),
+                "minutes_before": minutes,
+                "fired_at": fired_at,
+            }
+            with self._cond:
+                self._backlog.append(message)
+                subscribers = list(self._subscribers)
+                self.stats["fired"] += 1
+            for channel in subscribers:
+                try:
+                    channel.put_nowait(message)
+                except queue.Full:
+                    self.stats["dropped"] += 1
+
+    # ----------------------------------------------------------- subscribers
+    def subscribe(self, last_id: Optional[int] = None) -> Tuple[queue.Queue, List[Dict[str, Any]]]:
+        """(새 알림을 받을 큐, last_id 이후 놓친 알림)."""
+        channel: queue.Queue = queue.Queue(maxsize=_SUBSCRIBER_QUEUE_SIZE)
+        with self._cond:
+            self._subscribers.append(channel)
+            missed = [m for m in self._backlog if last_id is not None and m["id"] > last_id]
+        return channel, missed
+
+    def unsubscribe(self, channel: queue.Queue) -> None:
+        with self._cond:
+            if channel in self._subscribers:
+                self._subscribers.remove(channel)
+
+    def upcoming(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """아직 보내지 않은 알림 (알림 시각순)."""
+        with self._cond:
+            items = sorted(item for item in self._heap if self._live.get(item[2], (None,))[0] == item[4])[:limit]
+        return [
+            {
+                "event_id": doc_id,
+                "minutes_before": minutes,
+                "fire_at": datetime.fromtimestamp(fire_at, KST).isoformat(timespec="seconds"),
+                "date_start": datetime.fromtimestamp(start, KST).isoformat(timespec="seconds"),
+            }
+            for fire_at, _, doc_id, minutes, _, start in items
+        ]
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "heap": len(self._heap),
+                "pending": sum(entry[1] for entry in self._live.values()),
+                "window_end": datetime.fromtimestamp(self._window_end, KST).isoformat(timespec="seconds") if self._window_end else None,
+                "next_at": datetime.fromtimestamp(self._heap[0][0], KST).isoformat(timespec="seconds") if self._heap else None,
+                "subscribers": len(self._subscribers),
+                "worker_alive": bool(self._thread and self._thread.is_alive()),
+                **self.stats,
+            }
+
+
+_schedulers: Dict[str, ReminderScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_reminder_scheduler(user_dir: str = "Database/[user]") -> ReminderScheduler:
+    key = user_key(user_dir)
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = ReminderScheduler(user_dir)
+            _schedulers[key] = scheduler
+        return scheduler
+
+
+def start_reminders(user_dir: str = "Database/[user]") -> ReminderScheduler:
+    """디렉터리별 알림 워커 스레드를 시작 (이미 실행 중이면 그대로)."""
+    return get_reminder_scheduler(user_dir).start()
+
+
+def _on_mutation(key: str, op: str, event_id: Optional[int], event: Optional[Dict[str, Any]]) -> None:
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+    if scheduler is not None:
+        scheduler.apply(op, event_id, event)
+
+
+register_mutation_listener(_on_mutation)
@@ -0,0 +1,173 @@
+"""
+RAG 엔진 warm-start 스냅샷 (`.moro/engine.snap`, 단일 파일).
+
+새 프로세스가 JSON 파일을 전부 다시 파싱하지 않도록 엔진 상태를 한 파일에 저장하고
+시작 시 mmap으로 연다. 배열은 복사 없이 mmap 위의 NumPy 뷰로 쓴다.
+
+형식:
+    MAGIC(8) | header 길이(u64, little endian) | header(JSON) | 64바이트 정렬 | 섹션들
+- header: format, version(쓸 때마다 +1), spec, files({파일명: [mtime_ns, size, [id...]]}),
+  sections({이름: {dtype, shape, offset}}; offset은 데이터 시작 기준)
+- 섹션: 시간 컬럼(time.*), 벡터 id/정규화 행렬(vectors.*),
+  이벤트와 BM25 문서별 term 빈도(토큰화된 텍스트) JSON blob(uint8)
+
+스냅샷 이후의 변경은 header의 files와 현재 디렉터리의 (mtime_ns, size)를 비교해서
+바뀐 파일만 다시 읽어 적용한다.
+
+여러 워커 프로세스(gunicorn 등)는 같은 스냅샷 파일을 mmap하므로 벡터 행렬/시간 컬럼 페이지를
+OS 페이지 캐시에서 공유한다. `.moro/engine.gen`의 세대 번호(u64)를 모든 워커가 mmap해서 읽고,
+새 스냅샷을 게시한 워커가 번호를 올리면 다른 워커는 다음 쿼리 때 새 스냅샷에 다시 붙는다.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .parsing_with_criteria import KST
+from .state import SharedCounter, atomic_open, state_dir
+
+
+MAGIC = b"MOROSNP1"
+FORMAT = 1
+_ALIGN = 64
+_PREFIX = struct.Struct("<8sQ")
+
+
+def snapshot_path(user_dir: str):
+    return state_dir(user_dir) / "engine.snap"
+
+
+class Generation(SharedCounter):
+    """`.moro/engine.gen`: 게시된 스냅샷의 세대 번호. 워커마다 MAP_SHARED로 mmap해서 syscall 없이 읽는다."""
+
+    def __init__(self, user_dir: str):
+        super().__init__(state_dir(user_dir) / "engine.gen")
+
+    def publish(self, value: int) -> None:
+        self.write(value)
+        self._mm.flush()
+
+
+def _align(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def list_event_files(user_dir: str) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """(파일명, 경로, stat) — load_events와 같은 `*.json` 파일을 이름순으로."""
+    if not os.path.isdir(user_dir):
+        return
+    with os.scandir(user_dir) as it:
+        entries = sorted((e for e in it if e.name.endswith(".json") and e.is_file()), key=lambda e: e.name)
+    for entry in entries:
+        try:
+            yield entry.name, entry.path, entry.stat()
+        except FileNotFoundError:
+            continue
+
+
+def read_event_file(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return [e for e in data if isinstance(e, dict)]
+    return [data] if isinstance(data, dict) else []
+
+
+def write_snapshot(
+    user_dir: str,
+    version: int,
+    spec_meta: Dict[str, Any],
+    files: Dict[str, list],
+    arrays: Dict[str, np.ndarray],
+    blobs: Dict[str, Any],
+) -> int:
+    """arrays(NumPy)와 blobs(JSON 직렬화 가능한 값)를 한 파일로 원자적으로 쓴다. 파일 크기 반환."""
+    payloads: Dict[str, np.ndarray] = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+    for name, value in blobs.items():
+        payloads[name] = np.frombuffer(json.dumps(value, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+    sections: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, arr in payloads.items():
+        sections[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset = _align(offset + arr.nbytes)
+    header = json.dumps({
+        "format": FORMAT,
+        "version": version,
+        "created_at": datetime.now(tz=KST).isoformat(),
+        "spec": spec_meta,
+        "files": files,
+        "sections": sections,
+        "blobs": sorted(blobs),
+    }, ensure_ascii=False).encode("utf-8")
+    data_start = _align(_PREFIX.size + len(header))
+    with atomic_open(snapshot_path(user_dir)) as f:
+        f.write(_PREFIX.pack(MAGIC, len(header)))
+        f.write(header)
+        f.write(b"\0" * (data_start - _PREFIX.size - len(header)))
+        written = 0
+        for name, arr in payloads.items():
+            f.write(b"\0" * (sections[name]["offset"] - written))
+            f.write(arr.tobytes())
+            written = sections[name]["offset"] + arr.nbytes
+        f.flush()
+        os.fsync(f.fileno())
+        size = data_start + written
+    return size
+
+
+class Snapshot:
+    """mmap으로 연 스냅샷. arrays는 읽기 전용 뷰이며 mmap은 배열이 살아 있는 동안 유지된다."""
+
+    def __init__(self, header: Dict[str, Any], buffer: mmap.mmap, data_start: int, size: int):
+        self.header = header
+        self.size = size
+        self.arrays: Dict[str, np.ndarray] = {}
+        for name, info in header["sections"].items():
+            dtype = np.dtype(info["dtype"])
+            count = int(np.prod(info["shape"])) if info["shape"] else 1
+            if count == 0:
+                self.arrays[name] = np.empty(info["shape"], dtype=dtype)
+                continue
+            arr = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + info["offset"])
+            self.arrays[name] = arr.reshape(info["shape"])
+
+    @property
+    def version(self) -> int:
+        return self.header["version"]
+
+    @property
+    def files(self) -> Dict[str, list]:
+        return self.header["files"]
+
+    def blob(self, name: str) -> Any:
+        return json.loads(self.arrays[name].tobytes().decode("utf-8"))
+
+
+def load_snapshot(user_dir: str, spec_meta: Optional[Dict[str, Any]] = None) -> Optional[Snapshot]:
+    """스냅샷을 mmap으로 연다. 없거나 형식/임베딩 spec이 다르면 None."""
+    path = snapshot_path(user_dir)
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _PREFIX.size:
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+    try:
+        magic, header_len = _PREFIX.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            return None
+        header = json.loads(buffer[_PREFIX.size:_PREFIX.size + header_len].decode("utf-8"))
+        if header.get("format") != FORMAT or (spec_meta is not None and header.get("spec") != spec_meta):
+            return None
+        return Snapshot(header, buffer, _align(_PREFIX.size + header_len), size)
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
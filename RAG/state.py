@@ -0,0 +1,205 @@
+"""
+사용자 디렉터리 옆에 두는 보조 상태 파일(인덱스/매니페스트/작업 큐 등) 경로와 원자적 쓰기 유틸.
+
+상태 파일은 `<user_dir>/.moro/` 아래에 둔다. 이벤트 로더들은 `<user_dir>/*.json`만 읽으므로
+하위 디렉터리의 파일과 섞이지 않는다.
+이벤트 파일을 고치는 쪽은 모두 event_file_lock으로 프로세스 간에 직렬화한다.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: 단일 프로세스 실행만 가정
+    fcntl = None
+
+
+STATE_DIRNAME = ".moro"
+# 이벤트 파일 잠금은 파일명 해시로 나눈 고정 개수의 잠금 파일(`.moro/locks/NN.lock`)을 쓴다
+LOCK_STRIPES = 64
+_COUNTER = struct.Struct("<Q")
+
+
+def state_dir(user_dir: str, *parts: str) -> Path:
+    path = Path(user_dir) / STATE_DIRNAME
+    for part in parts:
+        path = path / part
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@contextmanager
+def atomic_open(path: Path) -> Iterator[BinaryIO]:
+    """임시 파일에 쓴 뒤 os.replace로 교체해서 읽는 쪽이 반쯤 쓰인 파일을 보지 않게 한다."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    with atomic_open(path) as f:
+        f.write(data)
+
+
+def atomic_write_json(path: Path, data: Any) -> None:
+    atomic_write_bytes(path, json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def read_json(path: Path, default: Any = None) -> Any:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+class SharedCounter:
+    """파일 하나에 든 u64 카운터. 프로세스마다 MAP_SHARED로 mmap해서 syscall 없이 읽는다."""
+
+    def __init__(self, path: Path):
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < _COUNTER.size:
+            os.ftruncate(self._fd, _COUNTER.size)
+        self._mm = mmap.mmap(self._fd, _COUNTER.size)
+        # flock은 같은 프로세스의 스레드끼리는 막아 주지 않는다
+        self._thread_lock = threading.Lock()
+
+    def read(self) -> int:
+        return _COUNTER.unpack_from(self._mm, 0)[0]
+
+    def write(self, value: int) -> None:
+        # 파일을 교체하지 않고 제자리에 써야 다른 프로세스의 mmap에 바로 보인다
+        _COUNTER.pack_into(self._mm, 0, value)
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """읽고-올리고-쓰기를 프로세스 간에 직렬화 (flock)."""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def bump(self) -> int:
+        with self.lock():
+            value = self.read() + 1
+            self.write(value)
+            return value
+
+
+class _StripeLock:
+    """잠금 파일 하나: 같은 프로세스 안에서는 재진입 가능한 스레드 잠금, 프로세스 간에는 flock."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self._rlock.acquire(blocking):
+            return False
+        if self._depth == 0 and fcntl is not None:
+            fd = None
+            try:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                self._rlock.release()
+                return False
+            except BaseException:
+                if fd is not None:
+                    os.close(fd)
+                self._rlock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fd, self._fd = self._fd, None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self._rlock.release()
+
+
+_stripes: Dict[Tuple[str, str], _StripeLock] = {}
+_stripes_lock = threading.Lock()
+
+
+def _lock_for(user_dir: str, name: str) -> _StripeLock:
+    key = (str(Path(user_dir).resolve()), name)
+    with _stripes_lock:
+        lock = _stripes.get(key)
+        if lock is None:
+            lock = _stripes[key] = _StripeLock(state_dir(user_dir, "locks") / f"{name}.lock")
+        return lock
+
+
+@contextmanager
+def state_lock(user_dir: str, name: str) -> Iterator[None]:
+    """이름 붙은 상태(예: ANN 베이스 + 변경 로그)를 고치는 동안 잡는 프로세스 간 잠금 (재진입 가능)."""
+    lock = _lock_for(user_dir, name)
+    lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+@contextmanager
+def try_state_lock(user_dir: str, name: str) -> Iterator[bool]:
+    """state_lock을 기다리지 않고 시도한다. 다른 스레드/프로세스가 잡고 있으면 False를 내준다 (한 곳에서만 돌 작업용)."""
+    lock = _lock_for(user_dir, name)
+    acquired = lock.acquire(blocking=False)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
+
+
+@contextmanager
+def event_file_lock(*paths: Union[str, Path]) -> Iterator[None]:
+    """이벤트 파일을 읽고-고치고-쓰는 동안 같은 파일을 고치는 다른 스레드/프로세스를 막는다.
+
+    eventmanager, 임베딩 큐, 재색인, 보관, 관리 CLI가 모두 이 잠금 안에서 파일을 다시 읽고 쓴다.
+    파일명 해시로 나눈 LOCK_STRIPES개의 잠금 파일을 쓰며, 여러 파일을 한 번에 잡을 때는
+    잠금 파일 순서대로 잡아 교착을 피한다 (같은 잠금은 한 번만).
+    """
+    stripes = {}
+    for path in paths:
+        path = Path(path)
+        stripe = f"{zlib.crc32(path.name.encode('utf-8')) % LOCK_STRIPES:02d}"
+        stripes[(str(path.parent.resolve()), stripe)] = path.parent
+    with ExitStack() as stack:
+        for key in sorted(stripes):
+            lock = _lock_for(str(stripes[key]), key[1])
+            lock.acquire()
+            stack.callback(lock.release)
+        yield
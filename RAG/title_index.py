@@ -0,0 +1,201 @@
+"""
+제목 퍼지 검색용 문자 trigram 역색인.
+
+"풋살 일정 삭제해줘"처럼 제목으로 이벤트를 찾는 흐름(삭제/수정)이 임베딩 호출 없이 ID를 얻도록
+criteria의 `title`을 오타에 강한 trigram 유사도로 평가한다.
+
+- 단어마다 앞 공백 2개, 뒤 공백 1개를 붙여 trigram을 만든다 (pg_trgm 방식, "풋살" -> "  풋", " 풋살", "풋살 ")
+- 점수: 질의 trigram 중 제목에 있는 비율 (긴 제목 안의 한 단어도 1.0), 동점은 Jaccard로 정렬
+- TITLE_MATCH_THRESHOLD(기본 0.3) 이상이면 매칭. 단, 단어 첫 글자만 담은 trigram("  회")만 겹치면 매칭하지 않는다
+  (두 글자 질의 "회의"는 trigram이 3개뿐이라 첫 글자만 같은 "회식", "회계 마감"도 0.33이 된다)
+- 2~3글자 한 단어 질의는 trigram이 너무 적어 한 글자 오타("풋쌀")로 겹치는 trigram이 사라진다.
+  이때는 한글을 자모로 풀어 제목 단어(또는 같은 길이의 앞부분)와 편집 거리를 재고, 자모 하나 차이면
+  1 - 거리/자모 수를 점수로 쓴다 ("풋쌀" -> "풋살" 0.83, "회의" -> "회식"은 자모 3개 차이라 매칭 안 됨)
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+
+TITLE_MATCH_THRESHOLD = float(os.getenv("TITLE_MATCH_THRESHOLD", "0.3"))
+# 질의별 결과 캐시 (변경 시 비움)
+_SEARCH_CACHE_SIZE = 512
+
+_WORD_RE = re.compile(r"\w+")
+# 자모 편집 거리 fallback을 쓰는 짧은 질의 (글자 수 범위, 자모 4개 이상: "gym" 같은 짧은 영단어는 제외)
+_TYPO_CHARS = (2, 3)
+_TYPO_MIN_JAMO = 4
+_TYPO_MAX_EDITS = 1
+
+
+def normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.casefold()))
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    grams = set()
+    for word in _WORD_RE.findall(text.casefold()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def _leading(gram: str) -> bool:
+    """단어 첫 글자 하나만 담은 trigram ("  회"): 같은 글자로 시작하는 모든 단어와 겹친다."""
+    return gram.startswith("  ")
+
+
+def jamo(text: str) -> str:
+    """한글 음절을 초성/중성/종성 자모로 풀어 쓴 문자열 (그 외 문자는 그대로)."""
+    out = []
+    for char in text:
+        code = ord(char) - 0xAC00
+        if 0 <= code < 11172:
+            out.append(chr(0x1100 + code // 588))
+            out.append(chr(0x1161 + code % 588 // 28))
+            if code % 28:
+                out.append(chr(0x11A7 + code % 28))
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein 거리 (limit을 넘으면 limit + 1)."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _typo_word(query: str) -> Optional[str]:
+    """자모 편집 거리 fallback 대상인 짧은 한 단어 질의면 그 단어, 아니면 None."""
+    words = _WORD_RE.findall(query.casefold())
+    if len(words) != 1 or not _TYPO_CHARS[0] <= len(words[0]) <= _TYPO_CHARS[1]:
+        return None
+    return words[0] if len(jamo(words[0])) >= _TYPO_MIN_JAMO else None
+
+
+def _typo_score(word: str, title_words: Iterable[str]) -> float:
+    """짧은 질의 단어와 가장 가까운 제목 단어(또는 같은 글자 수의 앞부분)의 자모 편집 거리 점수."""
+    q = jamo(word)
+    best = _TYPO_MAX_EDITS + 1
+    for title_word in title_words:
+        for candidate in {title_word, title_word[: len(word)]}:
+            best = min(best, _edit_distance(q, jamo(candidate), _TYPO_MAX_EDITS))
+    return 1.0 - best / len(q) if best <= _TYPO_MAX_EDITS else 0.0
+
+
+def title_similarity(query: str, title: str) -> float:
+    """질의 trigram 중 제목에 포함된 비율 (0~1). TitleIndex.search와 같은 점수.
+
+    겹치는 trigram이 단어 첫 글자 trigram뿐이면 0. 짧은 질의는 자모 편집 거리 점수와 큰 쪽.
+    """
+    q = trigrams(query)
+    if not q:
+        return 0.0
+    shared = q & trigrams(title)
+    score = 0.0 if all(_leading(gram) for gram in shared) else len(shared) / len(q)
+    word = _typo_word(query)
+    if word is not None:
+        score = max(score, _typo_score(word, _WORD_RE.findall(title.casefold())))
+    return score
+
+
+class TitleIndex:
+    """이벤트 제목의 trigram -> id 역색인 (증분 추가/삭제)."""
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, set] = {}
+        self.doc_grams: Dict[int, FrozenSet[str]] = {}
+        # 짧은 질의의 오타 fallback용: 글자 -> id, id -> 제목 단어
+        self.chars: Dict[str, set] = {}
+        self.doc_words: Dict[int, Tuple[str, ...]] = {}
+        self._cache: Dict[Tuple[str, float], List[Tuple[int, float]]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.doc_grams)
+
+    def add(self, doc_id: int, title: Optional[str]) -> None:
+        with self._lock:
+            self.remove(doc_id)
+            grams = trigrams(title) if isinstance(title, str) else frozenset()
+            if not grams:
+                return
+            for gram in grams:
+                self.postings.setdefault(gram, set()).add(doc_id)
+            self.doc_grams[doc_id] = grams
+            words = tuple(_WORD_RE.findall(title.casefold()))
+            for char in set("".join(words)):
+                self.chars.setdefault(char, set()).add(doc_id)
+            self.doc_words[doc_id] = words
+            self._cache.clear()
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            grams = self.doc_grams.pop(doc_id, None)
+            if grams is None:
+                return
+            for gram in grams:
+                posting = self.postings.get(gram)
+                if posting is not None:
+                    posting.discard(doc_id)
+                    if not posting:
+                        del self.postings[gram]
+            for char in set("".join(self.doc_words.pop(doc_id, ()))):
+                posting = self.chars.get(char)
+                if posting is not None:
+                    posting.discard(doc_id)
+                    if not posting:
+                        del self.chars[char]
+            self._cache.clear()
+
+    def search(self, query: str, threshold: Optional[float] = None) -> List[Tuple[int, float]]:
+        """점수 내림차순 (id, score). 질의 trigram의 posting만 훑으므로 매칭 후보 수에 비례."""
+        threshold = TITLE_MATCH_THRESHOLD if threshold is None else threshold
+        key = (normalize(query), threshold)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+            q = trigrams(query)
+            counts: Counter = Counter()
+            # 단어 첫 글자가 아닌 trigram이 하나라도 겹친 제목만 후보 (title_similarity와 같은 규칙)
+            informative = set()
+            for gram in q:
+                posting = self.postings.get(gram, ())
+                counts.update(posting)
+                if not _leading(gram):
+                    informative.update(posting)
+            scores = {doc_id: shared / len(q) for doc_id, shared in counts.items() if doc_id in informative}
+            word = _typo_word(query)
+            if word is not None:
+                # 오타 하나면 나머지 글자 중 하나는 그대로다: 질의 글자를 가진 제목만 편집 거리를 잰다
+                candidates = set().union(*(self.chars.get(char, ()) for char in set(word)))
+                for doc_id in candidates:
+                    typo = _typo_score(word, self.doc_words[doc_id])
+                    if typo > scores.get(doc_id, 0.0):
+                        scores[doc_id] = typo
+            scored = []
+            for doc_id, score in scores.items():
+                if score >= threshold:
+                    shared = counts.get(doc_id, 0)
+                    jaccard = shared / (len(q) + len(self.doc_grams[doc_id]) - shared)
+                    scored.append((-score, -jaccard, doc_id))
+            ranked = [(doc_id, -score) for score, _, doc_id in sorted(scored)]
+            if len(self._cache) >= _SEARCH_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = ranked
+            return ranked
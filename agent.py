@@ -1,7 +1,6 @@
-from RAG.parsing_with_criteria import parse_with_criteria
-from RAG.parsing_with_content import parse_with_content, embed_event
+from RAG.embedding_spec import VECTOR_FIELDS
+from RAG.manifest import reconcile_embeddings
 from eventmanager import delete_event_in_user, update_event_in_user, add_event_in_user
-from openai import OpenAI
 import os
 import json
 import uuid
@@ -12,77 +11,20 @@ load_dotenv()
 
 class Agent:
     def __init__(self):
+        # openai SDK는 import 비용이 커서 에이전트를 만들 때 불러온다
+        from openai import OpenAI
+
         self.tools = json.load(open("tools.json", encoding="utf-8"))
         self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.plans = {}  # 계획 저장소
         self.history = []  # 대화 히스토리 (system/user/assistant/tool 메시지 누적)
         
-        # Database 폴더의 모든 파일에 대해 embedding 필드 생성
-        self._update_all_embeddings()
+        # 매니페스트로 바뀐 파일만 확인하고, 빠진 embedding은 백그라운드 임베딩 큐에 맡긴다
+        reconcile_embeddings("Database/[user]")
+        # 이벤트/인덱스/캐시를 app.py, ReactAgent와 공유하는 사용자별 엔진
+        from RAG.engine import get_engine
 
-    def _update_all_embeddings(self, user_dir="Database/[user]"):
-        """Database 폴더의 모든 JSON 파일에 대해 embedding 필드를 생성합니다."""
-        
-        if not os.path.exists(user_dir):
-            print(f"❌ {user_dir} 폴더가 존재하지 않습니다.")
-            return
-        
-        # 모든 JSON 파일 확인
-        json_files = [f for f in os.listdir(user_dir) if f.endswith('.json')]
-        print(f"📁 {len(json_files)}개의 JSON 파일을 확인합니다...")
-        
-        updated_files = []
-        error_files = []
-        
-        for filename in json_files:
-            filepath = os.path.join(user_dir, filename)
-            
-            try:
-                # JSON 파일 읽기
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    event = json.load(f)
-                
-                # embedding 필드가 있는지 확인
-                if 'embedding' not in event or not event['embedding']:
-                    print(f"🔄 {filename}: embedding 생성 중...")
-                    
-                    # 임베딩 생성
-                    try:
-                        event_with_embedding = embed_event(event)
-                        
-                        # 파일에 저장
-                        with open(filepath, 'w', encoding='utf-8') as f:
-                            json.dump(event_with_embedding, f, ensure_ascii=False, indent=2)
-                        
-                        updated_files.append(filename)
-                        print(f"✅ {filename}: embedding 생성 완료")
-                        
-                    except Exception as e:
-                        print(f"❌ {filename}: embedding 생성 실패 - {str(e)}")
-                        error_files.append((filename, str(e)))
-                else:
-                    print(f"✓ {filename}: embedding 이미 존재")
-                    
-            except Exception as e:
-                print(f"❌ {filename}: 파일 읽기/쓰기 오류 - {str(e)}")
-                error_files.append((filename, str(e)))
-        
-        # 결과 요약
-        if updated_files or error_files:
-            print("\n" + "="*50)
-            print("📊 Database Embedding 업데이트 결과")
-            print("="*50)
-            print(f"✅ 성공적으로 업데이트된 파일: {len(updated_files)}개")
-            if updated_files:
-                for filename in updated_files:
-                    print(f"   - {filename}")
-            
-            print(f"❌ 오류가 발생한 파일: {len(error_files)}개")
-            if error_files:
-                for filename, error in error_files:
-                    print(f"   - {filename}: {error}")
-            
-            print(f"📁 총 처리된 파일: {len(json_files)}개")
+        self.rag = get_engine("Database/[user]")
 
     def __call__(self, query: str):
         # 시스템 프롬프트
@@ -127,13 +69,15 @@ class Agent:
                 elif fn_name == "execute_plan":
                     result = self._execute_plan(args)
                 elif fn_name == "parse_with_criteria":
-                    result = parse_with_criteria(**args)
+                    result = self.rag.parse_with_criteria(**args)
                     if result:
-                        result = "".join([f"{k}: {v}\n" for k, v in result[0].items() if k != "embedding"])
+                        result = "".join([f"{k}: {v}\n" for k, v in result[0].items() if k not in VECTOR_FIELDS])
                 elif fn_name == "parse_with_content":
-                    result = parse_with_content(**args)
+                    result = self.rag.parse_with_content(**args)
                     if result:
-                        result = "".join([f"{k}: {v}\n" for k, v in result[0].items() if k != "embedding"])
+                        result = "".join([f"{k}: {v}\n" for k, v in result[0].items() if k not in VECTOR_FIELDS])
+                elif fn_name == "aggregate_events":
+                    result = self.rag.aggregate(**args)
                 elif fn_name == "delete_event_in_user":
                     result = delete_event_in_user(**args)
                     if result:
@@ -218,26 +162,12 @@ class Agent:
         try:
             # 함수 실행
             if function_name == "parse_with_criteria":
-                result = parse_with_criteria(**parameters)
+                result = self.rag.parse_with_criteria(**parameters)
                 if result:
-                    # embedding 필드가 없으면 생성
-                    for event in result:
-                        if 'embedding' not in event:
-                            try:
-                                event = embed_event(event)
-                            except:
-                                pass  # embedding 생성 실패해도 계속 진행
                     result = self._format_events(result)
             elif function_name == "parse_with_content":
-                result = parse_with_content(**parameters)
+                result = self.rag.parse_with_content(**parameters)
                 if result:
-                    # embedding 필드가 없으면 생성
-                    for event in result:
-                        if 'embedding' not in event:
-                            try:
-                                event = embed_event(event)
-                            except:
-                                pass  # embedding 생성 실패해도 계속 진행
                     result = self._format_events(result)
             elif function_name == "delete_event_in_user":
                 result = delete_event_in_user(**parameters)
@@ -356,11 +286,11 @@ class Agent:
             elif fn_name == "execute_plan":
                 result = self._execute_plan(args)
             elif fn_name == "parse_with_criteria":
-                result = parse_with_criteria(**args)
+                result = self.rag.parse_with_criteria(**args)
                 if result:
                     result = self._format_events_with_ids(result)
             elif fn_name == "parse_with_content":
-                result = parse_with_content(**args)
+                result = self.rag.parse_with_content(**args)
                 if result:
                     result = self._format_events_with_ids(result)
             elif fn_name == "delete_event_in_user":
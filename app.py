@@ -2,15 +2,92 @@ from flask import Flask, render_template, request, jsonify
 from flask_cors import CORS
 import json
 import os
-from datetime import datetime, timedelta
-from react_agent import ReactAgent
+import threading
+from datetime import date, datetime, timedelta
 from eventmanager import delete_event_in_user, update_event_in_user, add_event_in_user
+from RAG.embedding_queue import embedding_queue_status
+from RAG.manifest import reconcile_embeddings
+from RAG.reindex import reindex_status
 
 app = Flask(__name__)
 CORS(app)
 
-# ReAct AI 에이전트 초기화
-agent = ReactAgent()
+# ReAct AI 에이전트는 첫 채팅 요청 때 생성 (langchain import / LLM 클라이언트 생성이 워커 시작을 늦추지 않도록)
+_agent = None
+_agent_lock = threading.Lock()
+
+
+def get_agent():
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                from react_agent import ReactAgent
+
+                _agent = ReactAgent()
+    return _agent
+
+
+def get_rag():
+    """app / 에이전트가 공유하는 사용자별 RAG 엔진 (NumPy 등은 첫 사용 때 import)"""
+    from RAG.engine import get_engine
+
+    return get_engine("Database/[user]")
+
+def _startup_maintenance(user_dir):
+    # 매니페스트로 바뀐 파일만 확인하고 빠진 embedding / 재시작 전에 남은 작업을 백그라운드 큐로 처리
+    reconcile_embeddings(user_dir)
+    # 다가오는 일정 알림 (heap 스케줄러, SSE로 전달 — RAG/reminders.py)
+    from RAG.reminders import start_reminders
+
+    start_reminders(user_dir)
+    # ARCHIVE_HORIZON_DAYS > 0이면 오래된 이벤트를 압축 파티션으로 옮기는 주기 작업 시작 (RAG/archive.py)
+    from RAG.archive import start_archiver
+
+    start_archiver(user_dir)
+
+
+def _with_archived(events, start, end):
+    """조회 날짜 범위가 보관 파티션에 닿으면 보관된 이벤트도 합친다 (인덱스만 확인하고 겹치는 파티션만 읽음)"""
+    from RAG.archive import get_archive, merge_archived
+
+    return merge_archived(events, get_archive("Database/[user]").days_between(start, end))
+
+def _events_by_ids(ids):
+    """agenda 버킷 id 순서대로 이벤트. 엔진이 아직 반영하지 못한 id(다른 워커의 변경 등)는 파일에서 직접 읽는다"""
+    from RAG.embedding_spec import VECTOR_FIELDS
+    from RAG.parsing_with_criteria import load_events_by_id
+
+    found = {event['id']: event for event in get_rag().get_events(ids)}
+    missing = [event_id for event_id in ids if event_id not in found]
+    if missing:
+        for event_id, event in load_events_by_id("Database/[user]", missing).items():
+            found[event_id] = {k: v for k, v in event.items() if k not in VECTOR_FIELDS}
+    return [found[event_id] for event_id in ids if event_id in found]
+
+# 백그라운드 작업(재조정/알림/보관)은 import가 아니라 서버 프로세스가 요청을 받기 시작할 때 프로세스당 한 번 시작한다
+# (테스트/CLI의 import나 fork 전 gunicorn master에서 스레드를 만들지 않도록; fork 후 워커에는 스레드가 따라오지 않는다)
+_started_pid = None
+_started_lock = threading.Lock()
+
+
+def start_background_tasks(user_dir="Database/[user]"):
+    """이 프로세스에서 아직 시작하지 않았으면 시작 작업 스레드를 띄운다. 시작했으면 True"""
+    global _started_pid
+    if _started_pid == os.getpid():
+        return False
+    with _started_lock:
+        if _started_pid == os.getpid():
+            return False
+        _started_pid = os.getpid()
+    threading.Thread(target=_startup_maintenance, args=(user_dir,), name="startup-maintenance", daemon=True).start()
+    return True
+
+
+@app.before_request
+def _ensure_background_tasks():
+    # gunicorn 워커는 fork 후 첫 요청 때 시작 (gunicorn.conf.py의 post_fork에서 start_background_tasks()를 불러도 된다)
+    start_background_tasks()
 
 @app.route('/')
 def index():
@@ -20,20 +97,8 @@ def index():
 def get_events():
     """모든 이벤트 조회"""
     try:
-        events = []
-        user_dir = "Database/[user]"
-        if os.path.exists(user_dir):
-            for filename in os.listdir(user_dir):
-                if filename.endswith('.json'):
-                    filepath = os.path.join(user_dir, filename)
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        event = json.load(f)
-                        # embedding 필드 제거 (AI 검색용이므로 프론트엔드에서는 숨김)
-                        # embedding 필드 제거 (AI 검색용이므로 프론트엔드에서는 숨김)
-                        if 'embedding' in event:
-                            del event['embedding']
-                        events.append(event)
-        return jsonify(events)
+        # 엔진이 메모리에 들고 있는 이벤트 (embedding 관련 필드는 이미 제외됨)
+        return jsonify(get_rag().all_events())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -51,7 +116,7 @@ def update_event(event_id):
     """이벤트 수정"""
     try:
         updates = request.json
-        success = update_event_in_user(event_id, updates, recompute_embedding=False)
+        success = update_event_in_user(event_id, updates)
         return jsonify({'success': success})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -61,11 +126,44 @@ def create_event():
     """이벤트 생성"""
     try:
         event_data = request.json
-        new_id = add_event_in_user(event_data, recompute_embedding=False)
+        new_id = add_event_in_user(event_data)
         return jsonify({'success': True, 'id': new_id})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/embeddings/status')
+def embeddings_status():
+    """임베딩 작업 큐 backlog / 재색인 진행 상태"""
+    try:
+        user_dir = "Database/[user]"
+        return jsonify({
+            'queue': embedding_queue_status(user_dir),
+            'reindex': reindex_status(user_dir),
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/rag/stats')
+def rag_stats():
+    """RAG 엔진 상태 (인덱스 크기, 캐시 적중률, 마지막 쿼리 시간)"""
+    try:
+        return jsonify(get_rag().stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/events/aggregate', methods=['POST'])
+def aggregate_events():
+    """criteria에 맞는 이벤트 집계: {"criteria": {...}, "group_by": ["week"|"weekday"|"month"|"member"|"location"], "metrics": ["count"|"total_hours"], "limit": N}"""
+    body = request.get_json(silent=True) or {}
+    try:
+        return jsonify(get_rag().aggregate(
+            body.get('criteria'), body.get('group_by'), body.get('metrics'), body.get('limit'),
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """AI 채팅"""
@@ -74,7 +172,7 @@ def chat():
         if not user_message:
             return jsonify({'error': '메시지가 비어있습니다.'}), 400
         
-        response = agent(user_message)
+        response = get_agent()(user_message)
         return jsonify({'response': response})
     except Exception as e:
         print(f"Chat error: {str(e)}")  # 디버깅용
@@ -84,7 +182,7 @@ def chat():
 def clear_chat():
     """채팅 메모리 초기화"""
     try:
-        agent.clear_memory()
+        get_agent().clear_memory()
         return jsonify({'success': True, 'message': '채팅 기록이 초기화되었습니다.'})
     except Exception as e:
         return jsonify({'error': f'메모리 초기화 중 오류가 발생했습니다: {str(e)}'}), 500
@@ -93,7 +191,7 @@ def clear_chat():
 def get_chat_history():
     """채팅 기록 조회"""
     try:
-        history = agent.get_memory()
+        history = get_agent().get_memory()
         return jsonify({'history': history})
     except Exception as e:
         return jsonify({'error': f'채팅 기록 조회 중 오류가 발생했습니다: {str(e)}'}), 500
@@ -222,36 +320,155 @@ def process_mixed_content():
 
 @app.route('/api/events/week/<int:year>/<int:week>')
 def get_week_events(year, week):
-    """특정 주의 이벤트 조회"""
+    """특정 ISO 주(월~일)의 이벤트 조회 — 주 버킷 조회 (RAG/agenda.py)"""
     try:
-        # 주의 시작일 계산
-        jan_1 = datetime(year, 1, 1)
-        week_start = jan_1 + timedelta(weeks=week-1)
-        
-        events = []
-        user_dir = "Database/[user]"
-        if os.path.exists(user_dir):
-            for filename in os.listdir(user_dir):
-                if filename.endswith('.json'):
-                    filepath = os.path.join(user_dir, filename)
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        event = json.load(f)
-                        # embedding 필드 제거 (AI 검색용이므로 프론트엔드에서는 숨김)
-                        if 'embedding' in event:
-                            del event['embedding']
-                        
-                        # 날짜 확인
-                        if 'date_start' in event and event['date_start']:
-                            try:
-                                event_date = datetime.fromisoformat(event['date_start'].replace('Z', '+00:00'))
-                                if week_start <= event_date < week_start + timedelta(weeks=1):
-                                    events.append(event)
-                            except:
-                                continue
-        
-        return jsonify(events)
+        from RAG.agenda import get_agenda
+
+        ids = get_agenda("Database/[user]").week_ids(year, week)
+        monday = date.fromisocalendar(year, week, 1)
+    except ValueError as e:
+        return jsonify({'error': f'잘못된 주 번호입니다: {e}'}), 400
+    try:
+        return jsonify(_with_archived(_events_by_ids(ids), monday, monday + timedelta(days=6)))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/events/range')
+def get_range_events():
+    """start~end(YYYY-MM-DD, 포함) 날짜 버킷의 이벤트 조회 (달력 화면용)"""
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return jsonify({'error': 'start, end는 YYYY-MM-DD 형식이어야 합니다.'}), 400
+    if end < start or (end - start).days > 400:
+        return jsonify({'error': '조회 범위가 올바르지 않습니다 (최대 400일).'}), 400
+    try:
+        from RAG.agenda import get_agenda
+
+        events = _events_by_ids(get_agenda("Database/[user]").range_ids(start, end))
+        return jsonify(_with_archived(events, start, end))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/events/dedup', methods=['POST'])
+def dedup_events():
+    """임베딩 기반 중복 이벤트 탐지: {"merge": false} 면 보고만, true면 병합 (RAG/dedup.py)"""
+    body = request.get_json(silent=True) or {}
+    try:
+        from RAG.dedup import dedup_events as run_dedup
+
+        return jsonify(run_dedup("Database/[user]", merge=bool(body.get('merge')), threshold=body.get('threshold')))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/events/import', methods=['POST'])
+def import_events():
+    """.ics 가져오기: multipart 'file' 또는 text/calendar 본문을 스트리밍으로 읽어 배치 저장 (처리량 events_per_sec 포함)"""
+    try:
+        import io
+        from eventmanager import import_ics_in_user
+
+        if 'file' in request.files:
+            stream = request.files['file'].stream
+        elif request.content_length:
+            stream = request.stream
+        else:
+            return jsonify({'error': '.ics 파일이 필요합니다.'}), 400
+        lines = io.TextIOWrapper(stream, encoding='utf-8', errors='replace', newline='')
+        return jsonify({'success': True, **import_ics_in_user(lines, "Database/[user]")})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/events/export.ics')
+def export_events():
+    """.ics 내보내기 (스트리밍). ?criteria=<JSON> 으로 범위를 줄일 수 있음"""
+    from flask import Response, stream_with_context
+    from eventmanager import iter_events_in_user
+    from RAG.ics import iter_ics_lines
+
+    try:
+        criteria = json.loads(request.args['criteria']) if request.args.get('criteria') else None
+    except ValueError:
+        return jsonify({'error': 'criteria는 JSON이어야 합니다.'}), 400
+    events = get_rag().query(criteria) if criteria else iter_events_in_user("Database/[user]")
+    return Response(
+        stream_with_context(iter_ics_lines(events)),
+        mimetype='text/calendar',
+        headers={'Content-Disposition': 'attachment; filename="moro.ics"'},
+    )
+
+@app.route('/api/reminders')
+def reminders_status():
+    """알림 스케줄러 상태와 다가오는 알림"""
+    try:
+        from RAG.reminders import get_reminder_scheduler
+
+        scheduler = get_reminder_scheduler("Database/[user]")
+        return jsonify({'status': scheduler.status(), 'upcoming': scheduler.upcoming(request.args.get('limit', 20, type=int))})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reminders/stream')
+def reminders_stream():
+    """일정 알림 push 채널 (Server-Sent Events). 재접속 시 Last-Event-ID 이후 알림을 다시 보냄"""
+    import queue
+    from flask import Response, stream_with_context
+    from RAG.reminders import get_reminder_scheduler
+
+    scheduler = get_reminder_scheduler("Database/[user]")
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    channel, missed = scheduler.subscribe(last_id)
+
+    def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            for message in missed:
+                yield f"id: {message['id']}\nevent: reminder\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
+            while True:
+                try:
+                    message = channel.get(timeout=15)
+                except queue.Empty:
+                    # 프록시가 유휴 연결을 끊지 않도록
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f"id: {message['id']}\nevent: reminder\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
+        finally:
+            scheduler.unsubscribe(channel)
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/api/archive')
+def archive_status():
+    """보관(cold tier) 파티션 상태"""
+    try:
+        from RAG.archive import get_archive
+
+        return jsonify(get_archive("Database/[user]").stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/archive', methods=['POST'])
+def run_archive():
+    """horizon_days일 전보다 먼저 끝난 이벤트를 압축 파티션으로 보관 (기본: ARCHIVE_HORIZON_DAYS)"""
+    body = request.get_json(silent=True) or {}
+    try:
+        horizon_days = int(body['horizon_days']) if body.get('horizon_days') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'horizon_days는 정수여야 합니다.'}), 400
+    try:
+        from RAG.archive import archive_events
+
+        return jsonify(archive_events("Database/[user]", horizon_days))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
+    # debug 리로더의 감시 프로세스가 아니라 실제로 요청을 받는 자식 프로세스에서만 미리 시작
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_tasks()
     app.run(debug=True, host='0.0.0.0', port=5000)
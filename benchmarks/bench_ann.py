@@ -0,0 +1,69 @@
+"""
+IVF-flat ANN 인덱스 벤치마크: 정확 검색 대비 recall@k / 지연시간 / 빌드 시간.
+
+    python -m benchmarks.bench_ann --n 100000 --dim 256 --k 10
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from RAG.ann_index import IVFFlatIndex
+from benchmarks.synthetic import exact_topk, make_embeddings, make_queries
+
+
+def run(n: int, dim: int, k: int, n_queries: int, nprobes, filter_ratio: float) -> None:
+    vectors = make_embeddings(n, dim, topics=max(16, n // 500))
+    queries = make_queries(vectors, n_queries)
+    ids = np.arange(1, n + 1)
+
+    t = time.perf_counter()
+    index = IVFFlatIndex.build(ids, vectors)
+    build_s = time.perf_counter() - t
+    print(f"N={n} dim={dim} k={k} nlist={index.nlist} build={build_s:.1f}s")
+
+    rng = np.random.default_rng(7)
+    allowed = None
+    if filter_ratio < 1.0:
+        allowed = set(int(i) for i in ids[rng.random(n) < filter_ratio])
+        print(f"allow-set filter: {len(allowed)} ids ({filter_ratio:.0%})")
+
+    t = time.perf_counter()
+    truths = []
+    for q in queries:
+        if allowed is None:
+            truths.append(set((exact_topk(vectors, q, k)[0] + 1).tolist()))
+        else:
+            rows = np.fromiter(allowed, dtype=np.int64) - 1
+            top, _ = exact_topk(vectors[rows], q, k)
+            truths.append(set((rows[top] + 1).tolist()))
+    exact_ms = (time.perf_counter() - t) * 1000 / n_queries
+    print(f"{'method':<12}{'recall@k':>10}{'ms/query':>10}")
+    print(f"{'exact':<12}{1.0:>10.3f}{exact_ms:>10.2f}")
+
+    for nprobe in nprobes:
+        recalls = []
+        t = time.perf_counter()
+        for q, truth in zip(queries, truths):
+            hits = index.search(q, k, allowed_ids=allowed, nprobe=nprobe)
+            recalls.append(len({i for i, _ in hits} & truth) / k)
+        ms = (time.perf_counter() - t) * 1000 / n_queries
+        print(f"{'nprobe=' + str(nprobe):<12}{np.mean(recalls):>10.3f}{ms:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--filter-ratio", type=float, default=1.0, help="allow-set에 포함될 이벤트 비율 (1.0=필터 없음)")
+    args = parser.parse_args()
+    run(args.n, args.dim, args.k, args.queries, args.nprobe, args.filter_ratio)
+
+
+if __name__ == "__main__":
+    main()
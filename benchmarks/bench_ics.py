@@ -0,0 +1,61 @@
+"""
+.ics 가져오기/내보내기 처리량 벤치마크 (events/sec).
+
+합성 이벤트를 임시 디렉터리에 만들고 `export_ics_in_user`로 .ics를 쓴 뒤, 빈 디렉터리에
+`import_ics_in_user`로 다시 가져온다. 임베딩은 로컬 해싱 백엔드(네트워크 없음)를 쓴다.
+
+    python -m benchmarks.bench_ics --n 20000
+    python -m benchmarks.bench_ics --n 20000 --batch-size 64 128 512
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault("EMBEDDING_BACKEND", "local")
+os.environ.setdefault("ENGINE_SNAPSHOT", "0")
+
+from eventmanager import export_ics_in_user, import_ics_in_user  # noqa: E402
+from benchmarks.synthetic import make_events  # noqa: E402
+
+
+def _write_calendar(user_dir: Path, n: int) -> None:
+    for event in make_events(n):
+        with open(user_dir / f"{event['id']:04d}.json", "w", encoding="utf-8") as f:
+            json.dump(event, f, ensure_ascii=False)
+
+
+def run(n: int, batch_sizes: List[int]) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "source"
+        source.mkdir()
+        _write_calendar(source, n)
+        ics_path = Path(tmp) / "calendar.ics"
+        t = time.perf_counter()
+        count = export_ics_in_user(str(ics_path), str(source))
+        seconds = time.perf_counter() - t
+        print(f"N={n} export: {count} events, {ics_path.stat().st_size / 1e6:.1f}MB, {seconds:.2f}s ({count / seconds:,.0f} events/sec)")
+
+        print(f"{'batch':>8}{'imported':>10}{'embedded':>10}{'seconds':>10}{'events/sec':>12}")
+        for batch_size in batch_sizes:
+            target = Path(tmp) / f"import_{batch_size}"
+            target.mkdir()
+            report = import_ics_in_user(str(ics_path), str(target), batch_size=batch_size, dedup=False)
+            print(f"{batch_size:>8}{report['imported']:>10}{report['embedded']:>10}{report['seconds']:>10.2f}{report['events_per_sec']:>12,.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[256])
+    args = parser.parse_args()
+    run(args.n, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
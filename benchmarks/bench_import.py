@@ -0,0 +1,79 @@
+"""
+import 시간 벤치마크 (`python -X importtime` 기반).
+
+모듈마다 새 인터프리터에서 `python -X importtime -c "import <module>"`을 실행해
+누적 import 시간과 가장 느린 하위 import들을 출력한다. --save 로 결과를
+benchmarks/importtime.json 에 기록해 변화를 추적한다.
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --save
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+
+MODULES = ["RAG", "eventmanager", "RAG.parsing_with_content", "agent", "react_agent", "app"]
+RESULTS_PATH = Path(__file__).with_name("importtime.json")
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _importtime(module: str, startup: Set[str] = frozenset()) -> Tuple[float, List[Tuple[str, float]], str]:
+    """(누적 ms, [(하위 모듈, 누적 ms)], 오류 메시지). startup: 인터프리터 시작 시 import되는 모듈 (제외)."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(cumulative_us) / 1000))
+    total = next((ms for name, ms in reversed(rows) if name == module), 0.0)
+    error = proc.stderr.strip().splitlines()[-1] if proc.returncode != 0 else ""
+    # 대상 모듈 자신과 상위 패키지는 느린 하위 import 목록에서 제외
+    rows = [(name, ms) for name, ms in rows if name != module and not module.startswith(name + ".") and name not in startup]
+    return total, sorted(rows, key=lambda r: -r[1]), error
+
+
+def run(modules: List[str], repeat: int, top: int, save: bool) -> None:
+    results: Dict[str, Dict] = {}
+    startup = {name for name, _ in _importtime("")[1]}
+    print(f"{'module':<28}{'best ms':>10}")
+    for module in modules:
+        best, offenders, error = None, [], ""
+        for _ in range(repeat):
+            total, rows, error = _importtime(module, startup)
+            if best is None or total < best:
+                best, offenders = total, rows
+        results[module] = {"ms": round(best or 0.0, 1), "top": [[n, round(ms, 1)] for n, ms in offenders[:top]]}
+        if error:
+            results[module]["error"] = error
+        print(f"{module:<28}{best:>10.1f}" + (f"  (error: {error[:60]})" if error else ""))
+        for name, ms in offenders[:top]:
+            print(f"    {name:<40}{ms:>8.1f}")
+    if save:
+        RESULTS_PATH.write_text(json.dumps({"python": sys.version.split()[0], "modules": results}, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"saved {RESULTS_PATH}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=3, help="모듈별 반복 횟수 (최솟값 사용)")
+    parser.add_argument("--top", type=int, default=5, help="출력할 느린 하위 import 수")
+    parser.add_argument("--save", action="store_true", help="benchmarks/importtime.json에 기록")
+    args = parser.parse_args()
+    run(args.modules, args.repeat, args.top, args.save)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+선택도 기반 query planner 벤치마크: 전체 스캔(scan) 대비 auto 계획의 결과 일치율 / 지연시간.
+
+임시 디렉터리에 합성 이벤트 파일을 만들고 로컬 해싱 임베딩(네트워크 없음)으로 검색한다.
+
+    python -m benchmarks.bench_planner --n 20000 --k 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("EMBEDDING_BACKEND", "local")
+
+from RAG.embedding_spec import configured_spec, save_spec_state, set_event_vector  # noqa: E402
+from RAG.parsing_with_content import _concat_event_fields  # noqa: E402
+from RAG.query_planner import planned_search  # noqa: E402
+from benchmarks.synthetic import make_events  # noqa: E402
+
+
+CASES = [
+    ("selective: date", {"date": "2024-03-15"}),
+    ("selective: month+weekday+hour", {"year": 2024, "month": 5, "weekday": "금", "hour": 19}),
+    ("broad: year", {"year": 2024}),
+    ("broad: weekday", {"weekday": "월"}),
+    ("none", {}),
+]
+QUERIES = ["회의", "촬영 스튜디오", "팬사인회 일정", "풋살", "디자인 검토 미팅"]
+
+
+def _write_calendar(user_dir: Path, n: int) -> None:
+    spec = configured_spec()
+    events = make_events(n)
+    vectors = spec.backend().embed_documents([_concat_event_fields(e) for e in events])
+    for event, vec in zip(events, vectors):
+        set_event_vector(event, vec, spec)
+        with open(user_dir / f"{event['id']:04d}.json", "w", encoding="utf-8") as f:
+            json.dump(event, f, ensure_ascii=False)
+    save_spec_state(str(user_dir), spec)
+
+
+def run(n: int, k: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        user_dir = Path(tmp)
+        t = time.perf_counter()
+        _write_calendar(user_dir, n)
+        print(f"N={n} k={k} setup={time.perf_counter() - t:.1f}s")
+        # 인덱스 워밍업 (첫 호출에서 컬럼 인덱스 / 양자화 저장소를 만든다)
+        planned_search(QUERIES[0], {"year": 2024}, k, str(user_dir), plan="vector_first")
+
+        print(f"{'criteria':<32}{'plan':<14}{'est':>8}{'overlap':>9}{'scan ms':>10}{'auto ms':>10}")
+        for name, criteria in CASES:
+            overlaps, scan_ms, auto_ms = [], 0.0, 0.0
+            for query in QUERIES:
+                t = time.perf_counter()
+                truth, _ = planned_search(query, criteria, k, str(user_dir), plan="scan")
+                scan_ms += (time.perf_counter() - t) * 1000
+                t = time.perf_counter()
+                got, explain = planned_search(query, criteria, k, str(user_dir))
+                auto_ms += (time.perf_counter() - t) * 1000
+                truth_ids = {e["id"] for e in truth}
+                overlaps.append(len(truth_ids & {e["id"] for e in got}) / max(1, len(truth_ids)))
+            print(
+                f"{name:<32}{explain['plan']:<14}{explain['estimated_matches']:>8}"
+                f"{sum(overlaps) / len(overlaps):>9.3f}{scan_ms / len(QUERIES):>10.1f}{auto_ms / len(QUERIES):>10.1f}"
+            )
+        print("explain:", json.dumps(explain, ensure_ascii=False))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    run(args.n, args.k)
+
+
+if __name__ == "__main__":
+    main()
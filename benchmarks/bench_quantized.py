@@ -0,0 +1,71 @@
+"""
+양자화 벡터 저장소 벤치마크: recall@k / 메모리 / 지연시간.
+
+    python -m benchmarks.bench_quantized --n 20000 --dim 1536 --k 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from RAG.quantized_store import QuantizedVectorStore
+from benchmarks.synthetic import exact_topk, make_embeddings, make_queries
+
+
+def _recall(found, truth) -> float:
+    return len(set(found) & set(truth)) / len(truth)
+
+
+def run(n: int, dim: int, k: int, n_queries: int, rescore_factor: int) -> None:
+    vectors = make_embeddings(n, dim)
+    queries = make_queries(vectors, n_queries)
+    ids = list(range(1, n + 1))
+
+    # 현재 저장 형식: JSON 안의 float64 리스트
+    sample = json.dumps(vectors[0].astype(np.float64).tolist())
+    json_bytes = len(sample) * n
+    pyobj_bytes = (sys.getsizeof(vectors[0].tolist()) + 24 * dim) * n
+
+    print(f"N={n} dim={dim} k={k} queries={n_queries} rescore_factor={rescore_factor}")
+    print(f"{'format':<10}{'memory(MB)':>12}{'recall@k':>11}{'recall@k(rescored)':>20}{'ms/query':>10}")
+    print(f"{'json':<10}{json_bytes / 1e6:>12.1f}{'':>11}{'':>20}{'':>10}")
+    print(f"{'pylist':<10}{pyobj_bytes / 1e6:>12.1f}{'':>11}{'':>20}{'':>10}")
+
+    t = time.perf_counter()
+    truths = [exact_topk(vectors, q, k)[0] + 1 for q in queries]
+    exact_ms = (time.perf_counter() - t) * 1000 / n_queries
+    print(f"{'float32':<10}{vectors.nbytes / 1e6:>12.1f}{1.0:>11.3f}{1.0:>20.3f}{exact_ms:>10.2f}")
+
+    full = dict(zip(ids, vectors))
+    for dtype in ("float16", "int8"):
+        store = QuantizedVectorStore(dtype=dtype)
+        for doc_id, vec in zip(ids, vectors):
+            store.add(doc_id, vec)
+        coarse_recall, rescored_recall = [], []
+        t = time.perf_counter()
+        for q, truth in zip(queries, truths):
+            hits = store.search(q, k, full_vectors=lambda keys: {i: full[i] for i in keys}, rescore_factor=rescore_factor)
+            rescored_recall.append(_recall([i for i, _ in hits], truth))
+        ms = (time.perf_counter() - t) * 1000 / n_queries
+        for q, truth in zip(queries, truths):
+            coarse_recall.append(_recall([i for i, _ in store.coarse_search(q, k)], truth))
+        print(f"{dtype:<10}{store.nbytes / 1e6:>12.1f}{np.mean(coarse_recall):>11.3f}{np.mean(rescored_recall):>20.3f}{ms:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    args = parser.parse_args()
+    run(args.n, args.dim, args.k, args.queries, args.rescore_factor)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+벤치마크용 합성 캘린더 생성기.
+
+이벤트 텍스트는 실제 데이터와 비슷한 제목/장소/멤버 조합으로 만들고,
+임베딩은 주제(topic)별 중심 벡터 + 잡음으로 만들어 실제 임베딩처럼 군집을 이루게 한다.
+"""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+
+KST = timezone(timedelta(hours=9))
+
+TITLES = [
+    "아침 회의", "콘텐츠 기획 회의", "촬영 준비", "뮤직비디오 촬영", "디자인 검토",
+    "풋살", "과외", "드라마 OST 녹음", "화보 촬영", "팬사인회", "라디오 출연",
+    "주간 보고", "점심 약속", "헬스", "치과 예약", "코드 리뷰", "고객 미팅",
+]
+LOCATIONS = ["본사 3층 회의실 A", "본사 5층 스튜디오", "강남 연습실", "홍대 카페", "온라인", "상암 방송국"]
+MEMBERS = ["정우", "민성", "운영진", "콘텐츠팀", "디자인팀", "매니저", "작가", "감독"]
+
+
+def make_events(n: int, seed: int = 0, start: datetime = datetime(2023, 1, 1, tzinfo=KST)) -> List[Dict[str, Any]]:
+    """id 1..n의 합성 이벤트 (embedding 없음)."""
+    rng = random.Random(seed)
+    events = []
+    for i in range(1, n + 1):
+        begin = start + timedelta(days=rng.randrange(0, 3 * 365), hours=rng.randrange(7, 22), minutes=rng.choice([0, 30]))
+        title = rng.choice(TITLES)
+        events.append({
+            "id": i,
+            "date_start": begin.isoformat(),
+            "date_finish": (begin + timedelta(minutes=rng.choice([30, 60, 90, 120, 180]))).isoformat(),
+            "title": title,
+            "description": f"{title} 관련 일정 #{rng.randrange(1000)}",
+            "location": rng.choice(LOCATIONS),
+            "member": rng.sample(MEMBERS, rng.randrange(1, 4)),
+        })
+    return events
+
+
+def make_embeddings(n: int, dim: int = 1536, topics: int = 64, noise: float = 0.6, seed: int = 0) -> np.ndarray:
+    """(n, dim) float32, L2 정규화된 군집형 벡터."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, size=n)
+    vectors = centers[labels] + noise * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def make_queries(vectors: np.ndarray, n_queries: int = 100, noise: float = 0.3, seed: int = 1) -> np.ndarray:
+    """기존 벡터 근처의 질의 벡터."""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(vectors), size=n_queries)
+    queries = vectors[picks] + noise * rng.standard_normal((n_queries, vectors.shape[1])).astype(np.float32) / np.sqrt(vectors.shape[1])
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries
+
+
+def exact_topk(vectors: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    scores = vectors @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return top, scores[top]
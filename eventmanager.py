@@ -1,9 +1,14 @@
 import os
 import json
 import re
+import time
 from pathlib import Path
-from typing import Dict, List, Any, Set, Tuple
-from RAG import embed_event
+from typing import Dict, List, Any, Iterable, Iterator, Set, Tuple
+from RAG.index_hooks import notify_mutation
+from RAG.embedding_queue import enqueue_embedding
+from RAG.embedding_spec import drop_event_vectors
+from RAG.parsing_with_content import _concat_event_fields
+from RAG.state import atomic_write_json, event_file_lock
 
 def delete_event(event_id: int, file_path: str) -> bool:
     """
@@ -19,18 +24,18 @@ def delete_event(event_id: int, file_path: str) -> bool:
     if not os.path.exists(file_path):
         return False
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        events = json.load(f)
-    
-    # Find and remove the event with the specified ID
-    original_count = len(events)
-    events = [event for event in events if event.get('id') != event_id]
+    with event_file_lock(file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            events = json.load(f)
     
-    if len(events) < original_count:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(events, f, ensure_ascii=False, indent=2)
-        return True
-    return False
+        # Find and remove the event with the specified ID
+        original_count = len(events)
+        events = [event for event in events if event.get('id') != event_id]
+        if len(events) == original_count:
+            return False
+        atomic_write_json(file_path, events)
+        notify_mutation(os.path.dirname(file_path), "delete", event_id)
+    return True
 
 def add_event(event_data: Dict[str, Any], file_path: str) -> int:
     """
@@ -43,30 +48,32 @@ def add_event(event_data: Dict[str, Any], file_path: str) -> int:
     Returns:
         int: The ID of the newly created event
     """
-    # Load existing events or create empty list
-    if os.path.exists(file_path):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            events = json.load(f)
-    else:
-        events = []
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-    # Generate new ID
-    if not events:
-        new_id = 1
-    else:
-        new_id = max(event.get('id', 0) for event in events) + 1
-    
-    # Create new event with the generated ID
-    new_event = event_data.copy()
-    new_event['id'] = new_id
-    new_event = embed_event(new_event)
-    # Add the new event to the list
-    events.append(new_event)
-    
-    # Save the updated events
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(events, f, ensure_ascii=False, indent=2)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with event_file_lock(file_path):
+        # Load existing events or create empty list
+        if os.path.exists(file_path):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                events = json.load(f)
+        else:
+            events = []
+
+        # Generate new ID
+        if not events:
+            new_id = 1
+        else:
+            new_id = max(event.get('id', 0) for event in events) + 1
+
+        # Create new event with the generated ID
+        new_event = event_data.copy()
+        new_event['id'] = new_id
+        # Add the new event to the list
+        events.append(new_event)
+
+        # Save the updated events
+        atomic_write_json(file_path, events)
+        notify_mutation(os.path.dirname(file_path), "add", new_id, new_event)
+    # Embedding is computed by the background queue
+    enqueue_embedding(os.path.dirname(file_path), new_id, file_path)
     
     return new_id
 
@@ -86,7 +93,9 @@ def _parse_id_from_filename(filename: str) -> int | None:
 
 
 def list_existing_ids(user_dir: str) -> Set[int]:
-    """`Database/[user]` 폴더 내 개별 이벤트 파일명에서 존재하는 정수 ID 집합 반환."""
+    """`Database/[user]` 폴더 내 개별 이벤트 파일명에서 존재하는 정수 ID 집합 반환.
+    보관(archive)된 이벤트의 ID도 포함 (새 이벤트가 보관된 ID를 재사용하지 않도록).
+    """
     base = Path(user_dir)
     if not base.exists():
         return set()
@@ -95,7 +104,15 @@ def list_existing_ids(user_dir: str) -> Set[int]:
         event_id = _parse_id_from_filename(p.name)
         if event_id is not None:
             ids.add(event_id)
-    return ids
+    return ids | _archived_ids(user_dir)
+
+
+def _archived_ids(user_dir: str) -> Set[int]:
+    if not (Path(user_dir) / ".moro" / "archive").exists():
+        return set()
+    from RAG.archive import get_archive
+
+    return {i for i in get_archive(user_dir).ids() if isinstance(i, int)}
 
 
 def find_missing_ids(user_dir: str, start_id: int | None = None, end_id: int | None = None) -> List[int]:
@@ -146,82 +163,100 @@ def add_missing_event_files(user_dir: str = "Database/[user]", zero_pad: int = 4
     created: List[Tuple[int, str]] = []
     for event_id in missing:
         event = _make_placeholder_event(event_id)
-        # 필요 시 임베딩 필드 생성
-        try:
-            event = embed_event(event)
-        except Exception:
-            # 임베딩 실패해도 파일은 생성
-            pass
         out_path = base / _format_id_filename(event_id, pad=zero_pad)
-        with out_path.open("w", encoding="utf-8") as f:
-            json.dump(event, f, ensure_ascii=False, indent=2)
+        with event_file_lock(out_path):
+            # 그 사이 다른 요청이 같은 id로 만든 파일은 덮어쓰지 않는다
+            if out_path.exists():
+                continue
+            atomic_write_json(out_path, event)
+            notify_mutation(user_dir, "add", event_id, event)
+        # 임베딩은 백그라운드 큐에서 생성
+        enqueue_embedding(user_dir, event_id, str(out_path))
         created.append((event_id, str(out_path)))
+    return created
 
 
+def _needs_embedding(event: Dict[str, Any], text_before: str) -> bool:
+    """수정으로 임베딩 대상 텍스트가 바뀌었으면 기존 벡터를 지우고 True (벡터가 없던 이벤트도 True)."""
+    if _concat_event_fields(event) != text_before:
+        drop_event_vectors(event)
+        return True
+    return not event.get("embedding")
+
 
 def update_event(event_id: int, updates: Dict[str, Any], file_path: str, recompute_embedding: bool = True) -> bool:
     """
     월별 JSON 배열 파일(file_path)에서 id가 event_id인 이벤트의 필드를 수정합니다.
     - updates에 있는 키만 갱신합니다.
-    - recompute_embedding=True이면 수정 후 임베딩을 재계산합니다.
+    - recompute_embedding=True이고 임베딩 대상 텍스트가 바뀌었으면 기존 벡터를 지우고 재임베딩 작업을 큐에 넣습니다.
     반환: 수정 성공 시 True, 대상이 없으면 False.
     """
     if not os.path.exists(file_path):
         return False
-    with open(file_path, 'r', encoding='utf-8') as f:
-        events = json.load(f)
-
-    found = False
-    for idx, ev in enumerate(events):
-        if ev.get('id') == event_id:
-            # 필드 업데이트
-            for k, v in updates.items():
-                ev[k] = v
-            if recompute_embedding:
-                try:
-                    ev = embed_event(ev)
-                except Exception:
-                    pass
-            events[idx] = ev
-            found = True
-            break
-
-    if not found:
-        return False
+    with event_file_lock(file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            events = json.load(f)
 
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(events, f, ensure_ascii=False, indent=2)
+        found = False
+        for idx, ev in enumerate(events):
+            if ev.get('id') == event_id:
+                # 필드 업데이트
+                text_before = _concat_event_fields(ev)
+                for k, v in updates.items():
+                    ev[k] = v
+                reembed = recompute_embedding and _needs_embedding(ev, text_before)
+                events[idx] = ev
+                found = True
+                break
+
+        if not found:
+            return False
+
+        atomic_write_json(file_path, events)
+        notify_mutation(os.path.dirname(file_path), "update", event_id, events[idx])
+    if reembed:
+        enqueue_embedding(os.path.dirname(file_path), event_id, file_path)
     return True
 
 
 def update_event_file(user_dir: str, event_id: int, updates: Dict[str, Any], zero_pad: int = 4, recompute_embedding: bool = True) -> bool:
     """
     개별 이벤트 파일(Database/[user]/<id>.json 또는 zero-pad 파일)을 찾아 수정합니다.
-    - updates 반영 후 필요 시 임베딩 재계산.
+    - updates 반영 후 임베딩 대상 텍스트가 바뀌었으면 재임베딩 작업을 큐에 넣음 (요청은 바로 반환).
+    - 보관(archive)된 이벤트는 먼저 hot 파일로 꺼낸 뒤 수정.
     반환: 수정 성공 시 True, 파일이 없으면 False.
     """
     base = Path(user_dir)
     padded = base / f"{event_id:0{zero_pad}d}.json"
     plain = base / f"{event_id}.json"
-    target = padded if padded.exists() else plain
-    if not target.exists():
-        return False
-
-    with target.open('r', encoding='utf-8') as f:
-        event = json.load(f)
-
-    for k, v in updates.items():
-        event[k] = v
-
-    if recompute_embedding:
-        try:
-            event = embed_event(event)
-        except Exception:
-            pass
-
-    with target.open('w', encoding='utf-8') as f:
-        json.dump(event, f, ensure_ascii=False, indent=2)
-    return True
+    # 잠금을 기다리는 동안 보관(archive)되었으면 한 번 더: 다시 꺼내서 수정
+    for _ in range(2):
+        target = padded if padded.exists() else plain
+        if not target.exists() and event_id in _archived_ids(user_dir):
+            # 보관된 이벤트는 hot 파일로 꺼낸 뒤 수정
+            from RAG.archive import get_archive
+
+            get_archive(user_dir).restore([event_id], zero_pad=zero_pad)
+            target = padded
+        with event_file_lock(target):
+            # 잠금을 기다리는 동안 삭제/보관되었을 수 있다
+            if not target.exists():
+                continue
+            with target.open('r', encoding='utf-8') as f:
+                event = json.load(f)
+
+            text_before = _concat_event_fields(event)
+            for k, v in updates.items():
+                event[k] = v
+            reembed = recompute_embedding and _needs_embedding(event, text_before)
+
+            atomic_write_json(target, event)
+            # 알림도 잠금 안에서: 같은 파일의 변경 알림이 쓴 순서대로 인덱스/변경 로그에 반영된다
+            notify_mutation(user_dir, "update", event_id, event)
+        if reembed:
+            enqueue_embedding(user_dir, event_id, str(target))
+        return True
+    return False
 
 
 # =============== [user] 폴더용 단일 파일 기반 편의 함수 3종 ===============
@@ -229,6 +264,7 @@ def delete_event_in_user(event_id: int, user_dir: str = "Database/[user]", zero_
     """
     Database/[user] 폴더에서 해당 ID의 이벤트 파일을 삭제합니다.
     - zero-pad 파일(예: 0016.json) 우선, 없으면 16.json 시도
+    - 둘 다 없으면 보관(archive) 파티션에서 삭제
     반환: 삭제 성공 시 True
     """
     base = Path(user_dir)
@@ -236,12 +272,18 @@ def delete_event_in_user(event_id: int, user_dir: str = "Database/[user]", zero_
     plain = base / f"{event_id}.json"
     target = padded if padded.exists() else plain
     if not target.exists():
-        return False
+        if event_id not in _archived_ids(user_dir):
+            return False
+        from RAG.archive import get_archive
+
+        return bool(get_archive(user_dir).remove([event_id]))
     try:
-        target.unlink()
-        return True
+        with event_file_lock(target):
+            target.unlink()
+            notify_mutation(user_dir, "delete", event_id)
     except Exception:
         return False
+    return True
 
 
 def update_event_in_user(event_id: int, updates: Dict[str, Any], user_dir: str = "Database/[user]", zero_pad: int = 4, recompute_embedding: bool = True) -> bool:
@@ -273,22 +315,238 @@ def add_event_in_user(event_data: Dict[str, Any], recompute_embedding: bool = Tr
     base.mkdir(parents=True, exist_ok=True)
 
     existing_ids = list_existing_ids(user_dir)
-    new_id = _smallest_missing_positive(existing_ids)
+    while True:
+        new_id = _smallest_missing_positive(existing_ids)
+        out_path = base / f"{new_id:0{zero_pad}d}.json"
+        with event_file_lock(out_path):
+            # 목록을 읽은 뒤 다른 요청이 같은 id를 가져갔으면 다음 id로
+            if out_path.exists():
+                existing_ids.add(new_id)
+                continue
+            new_event = event_data.copy()
+            new_event['id'] = new_id
+            atomic_write_json(out_path, new_event)
+            notify_mutation(user_dir, "add", new_id, new_event)
+        break
+    if recompute_embedding:
+        # 임베딩은 백그라운드 큐에서 계산 (요청은 바로 반환)
+        enqueue_embedding(user_dir, new_id, str(out_path))
 
-    new_event = event_data.copy()
-    new_event['id'] = new_id
+    return new_id
 
-    if recompute_embedding:
+
+# =============== 대량 가져오기 / 내보내기 (.ics) ===============
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "256"))
+
+
+def _id_allocator(existing: Set[int], base: Path, zero_pad: int = 4) -> Iterator[int]:
+    """기존 ID 집합을 한 번만 읽고 가장 작은 누락 양의 정수부터 차례로 배정 (add_event_in_user와 같은 규칙).
+    그 사이 다른 요청이 만든 파일은 건너뜀."""
+    candidate = 0
+    while True:
+        candidate += 1
+        if candidate not in existing and not (base / f"{candidate:0{zero_pad}d}.json").exists():
+            yield candidate
+
+
+def _ics_key(event: Dict[str, Any]) -> Tuple[str, str] | None:
+    """가져오기 upsert 키: (UID, RECURRENCE-ID). 같은 UID의 예외 일정은 RECURRENCE-ID로 구분."""
+    uid = event.get("ics_uid")
+    return (uid, event.get("ics_recurrence_id") or "") if uid else None
+
+
+def _ics_targets(user_dir: str) -> Dict[Tuple[str, str], Tuple[int, Path | None]]:
+    """ics_uid가 있는 기존 이벤트: 키 -> (id, hot 단일 이벤트 파일 경로, 보관된 이벤트면 None)."""
+    from RAG.archive import get_archive
+    from RAG.snapshot import list_event_files, read_event_file
+
+    targets: Dict[Tuple[str, str], Tuple[int, Path | None]] = {}
+    for event in get_archive(user_dir).iter_events():
+        key = _ics_key(event)
+        if key is not None and isinstance(event.get("id"), int):
+            targets[key] = (event["id"], None)
+    for _, path, _ in list_event_files(user_dir):
         try:
-            new_event = embed_event(new_event)
+            file_events = read_event_file(path)
         except Exception:
-            pass
+            continue
+        # 여러 이벤트가 든 배열 파일은 덮어쓸 수 없으므로 건너뛴다
+        if len(file_events) == 1 and isinstance(file_events[0].get("id"), int) and _ics_key(file_events[0]) is not None:
+            targets[_ics_key(file_events[0])] = (file_events[0]["id"], Path(path))
+    return targets
 
-    out_path = base / f"{new_id:0{zero_pad}d}.json"
-    with out_path.open('w', encoding='utf-8') as f:
-        json.dump(new_event, f, ensure_ascii=False, indent=2)
 
-    return new_id
+def add_events_in_user(events: Iterable[Dict[str, Any]], recompute_embedding: bool = True, user_dir: str = "Database/[user]", zero_pad: int = 4, batch_size: int | None = None) -> Dict[str, Any]:
+    """
+    여러 이벤트를 배치 단위로 저장합니다 (대량 가져오기용, events는 generator여도 됨).
+    - ID는 처음에 한 번 읽은 기존 ID 집합에서 일괄 배정
+    - ics_uid(+ics_recurrence_id)가 같은 기존 이벤트가 있으면 그 id/파일을 덮어씀 (같은 .ics를 다시 가져와도 중복이 쌓이지 않음,
+      보관된 이벤트는 hot 파일로 다시 씀). 키 목록은 ics_uid가 있는 첫 이벤트에서 한 번 읽음
+    - 파일은 event_file_lock 안에서 원자적으로 쓰고, 변경 알림도 잠금 안에서
+    - 배치마다 텍스트를 배치 임베더(워커 풀)에 한 번에 넘기고, 다음 배치를 읽는 동안 계산된 벡터를 넣어 파일을 한 번만 씀
+    - 임베딩에 실패한 이벤트는 백그라운드 큐로 (recompute_embedding=False면 전부 큐로)
+    반환: {"ids", "imported", "updated", "batches", "embedded", "queued", "seconds", "events_per_sec"}
+    """
+    from RAG.archive import get_archive
+    from RAG.embedding_pool import get_executor
+    from RAG.embedding_queue import get_embedding_queue
+    from RAG.embedding_spec import active_spec, set_event_vector
+
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    base = Path(user_dir)
+    base.mkdir(parents=True, exist_ok=True)
+    allocate = _id_allocator(list_existing_ids(user_dir), base, zero_pad)
+    spec = active_spec(user_dir)
+    executor = get_executor(spec.backend()) if recompute_embedding else None
+    report: Dict[str, Any] = {"ids": [], "imported": 0, "updated": 0, "batches": 0, "embedded": 0, "queued": 0}
+    started = time.perf_counter()
+    targets: Dict[Tuple[str, str], Tuple[int, Path | None]] | None = None
+    paths: Dict[int, Path] = {}  # 덮어쓸 기존 파일 (zero-pad 되지 않은 파일명 등)
+    unarchive: Set[int] = set()
+
+    def place(event):
+        nonlocal targets
+        key = _ics_key(event)
+        if key is not None:
+            if targets is None:
+                targets = _ics_targets(user_dir)
+            if key in targets:
+                event['id'], path = targets[key]
+                if path is not None:
+                    paths[event['id']] = path
+                else:
+                    unarchive.add(event['id'])
+                report["updated"] += 1
+                return
+        event['id'] = next(allocate)
+        if key is not None:
+            # 같은 파일 안에서 같은 UID가 다시 나오면 방금 만든 이벤트를 덮어쓴다
+            targets[key] = (event['id'], base / f"{event['id']:0{zero_pad}d}.json")
+
+    def submit(batch):
+        if executor is None:
+            return [None] * len(batch)
+        return executor.submit_texts([_concat_event_fields(event) for event in batch])
+
+    def out_path(event):
+        return paths.get(event['id']) or base / f"{event['id']:0{zero_pad}d}.json"
+
+    def flush(batch, futures):
+        to_queue = []
+        for event, future in zip(batch, futures):
+            try:
+                if future is None:
+                    raise LookupError
+                set_event_vector(event, future.result(), spec)
+                report["embedded"] += 1
+            except Exception:
+                to_queue.append(event)
+        with event_file_lock(*(out_path(event) for event in batch)):
+            for event in batch:
+                path = out_path(event)
+                op = "update" if path.exists() else "add"
+                atomic_write_json(path, event)
+                notify_mutation(user_dir, op, event['id'], event)
+        restored = unarchive.intersection(event['id'] for event in batch)
+        if restored:
+            # hot 파일을 먼저 썼으므로 그 사이 조회는 hot 쪽을 본다
+            get_archive(user_dir).remove(restored)
+            unarchive.difference_update(restored)
+        if to_queue:
+            get_embedding_queue(user_dir).put_many([(e['id'], str(out_path(e))) for e in to_queue])
+            report["queued"] += len(to_queue)
+        report["ids"].extend(event['id'] for event in batch)
+        report["imported"] += len(batch)
+        report["batches"] += 1
+
+    pending = None  # 임베딩 중인 직전 배치
+    batch: List[Dict[str, Any]] = []
+    for event_data in events:
+        event = event_data.copy()
+        place(event)
+        batch.append(event)
+        if len(batch) >= batch_size:
+            futures = submit(batch)
+            if pending is not None:
+                flush(*pending)
+            pending, batch = (batch, futures), []
+    if batch:
+        futures = submit(batch)
+        if pending is not None:
+            flush(*pending)
+        pending = (batch, futures)
+    if pending is not None:
+        flush(*pending)
+
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    report["events_per_sec"] = round(report["imported"] / report["seconds"], 1) if report["seconds"] else None
+    return report
+
+
+def import_ics_in_user(source: Any, user_dir: str = "Database/[user]", recompute_embedding: bool = True, batch_size: int | None = None, dedup: bool = True) -> Dict[str, Any]:
+    """
+    .ics 파일(경로 또는 줄 단위 텍스트 스트림)을 스트리밍으로 읽어 add_events_in_user로 저장합니다.
+    - 해석할 수 없는 VEVENT는 건너뛰고 errors에 기록 (최대 50개)
+    - 가져오기 후 단계로 새 이벤트의 중복을 확인/병합 (RAG/dedup.py, DEDUP_ON_IMPORT)
+    반환: 가져온 개수, 배치 수, 임베딩/큐 개수, 처리량(events_per_sec), skipped, errors, dedup
+    """
+    from RAG.ics import iter_ics_events
+
+    errors: List[str] = []
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', encoding='utf-8', newline='') as f:
+            report = add_events_in_user(iter_ics_events(f, errors), recompute_embedding, user_dir, batch_size=batch_size)
+    else:
+        report = add_events_in_user(iter_ics_events(source, errors), recompute_embedding, user_dir, batch_size=batch_size)
+    ids = report.pop("ids")
+    report["skipped"] = len(errors)
+    report["errors"] = errors[:50]
+    if dedup:
+        from RAG.dedup import dedup_after_import
+
+        report["dedup"] = dedup_after_import(user_dir, ids)
+    return report
+
+
+def iter_events_in_user(user_dir: str = "Database/[user]", include_archived: bool = True) -> Iterator[Dict[str, Any]]:
+    """사용자 폴더의 이벤트를 파일 하나씩 읽어 차례로 (벡터 필드 제외).
+    include_archived면 이어서 보관(archive) 파티션의 이벤트도 (hot 파일에 같은 id가 있으면 hot 우선).
+    """
+    from RAG.archive import get_archive
+    from RAG.embedding_spec import VECTOR_FIELDS
+    from RAG.snapshot import list_event_files, read_event_file
+
+    seen = set()
+    for _, path, _ in list_event_files(user_dir):
+        try:
+            file_events = read_event_file(path)
+        except Exception as e:
+            print(f"파일 로드 실패 {path}: {e}")
+            continue
+        for event in file_events:
+            seen.add(event.get("id"))
+            yield {k: v for k, v in event.items() if k not in VECTOR_FIELDS}
+    if include_archived:
+        for event in get_archive(user_dir).iter_events():
+            if event.get("id") not in seen:
+                yield {k: v for k, v in event.items() if k not in VECTOR_FIELDS}
+
+
+def export_ics_in_user(out_path: str, user_dir: str = "Database/[user]", criteria: Dict[str, Any] | None = None) -> int:
+    """
+    이벤트를 .ics 파일로 스트리밍 저장하고 쓴 이벤트 수를 반환합니다.
+    - criteria가 없으면 파일(이어서 보관 파티션)을 하나씩 읽어 바로 씀, 있으면 RAG 엔진 조회 결과 (기간이 보관 범위에 닿으면 보관 이벤트 포함)
+    """
+    from RAG.ics import write_ics
+
+    if criteria:
+        from RAG.engine import get_engine
+
+        events = get_engine(user_dir).query(criteria)
+    else:
+        events = iter_events_in_user(user_dir)
+    with open(out_path, 'w', encoding='utf-8', newline='') as f:
+        return write_ics(events, f)
 
 
 def sync_with_google_calendar(user_dir: str = "Database/[user]", sync_direction: str = "both") -> Dict[str, Any]:
@@ -334,12 +592,18 @@ def sync_with_google_calendar(user_dir: str = "Database/[user]", sync_direction:
         
         if sync_direction in ["from_google", "both"]:
             # 구글 → 로컬 동기화
+            ids_before = {event.get('id') for event in local_events}
             from_google_result = sync.sync_from_google(local_events)
             results["details"]["from_google"] = from_google_result
             
             # 업데이트된 로컬 이벤트 저장
             if from_google_result["created"] > 0 or from_google_result["updated"] > 0:
                 _save_local_events(local_events, user_dir)
+                # 가져오기 후 단계: 새로 들어온 이벤트가 기존 일정과 중복인지 보고, DEDUP_ON_IMPORT=merge면 병합
+                from RAG.dedup import dedup_after_import
+
+                imported_ids = [event.get('id') for event in local_events if event.get('id') not in ids_before]
+                results["details"]["dedup"] = dedup_after_import(user_dir, imported_ids)
         
         return results
         
@@ -351,16 +615,19 @@ def _save_local_events(events: List[Dict[str, Any]], user_dir: str = "Database/[
     """로컬 이벤트를 JSON 파일로 저장"""
     base = Path(user_dir)
     base.mkdir(parents=True, exist_ok=True)
-    
-    # 기존 파일들 삭제
-    for json_file in base.glob("*.json"):
-        json_file.unlink()
-    
-    # 이벤트를 개별 파일로 저장
+
+    # 이벤트를 개별 파일로 (원자적으로) 먼저 저장한 뒤, 목록에 없는 기존 파일을 지운다
+    written = set()
     for event in events:
         if event.get('id'):
             file_path = base / f"{event['id']:04d}.json"
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(event, f, ensure_ascii=False, indent=2)
+            with event_file_lock(file_path):
+                atomic_write_json(file_path, event)
+            written.add(file_path.name)
+    for json_file in base.glob("*.json"):
+        if json_file.name not in written:
+            with event_file_lock(json_file):
+                json_file.unlink(missing_ok=True)
+    notify_mutation(user_dir, "reload")
 
 
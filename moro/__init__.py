@@ -0,0 +1,10 @@
+"""
+Moro 관리용 CLI (`python -m moro <command>`).
+
+- reindex: 설정된 벡터 공간으로 재색인(shadow 인덱스 + cut-over) 후 빠지거나 낡은 임베딩 채우기
+- verify: 이벤트 파일 무결성(JSON, id/파일명, 날짜, 중복 id, 벡터) 점검과 ID 공백 보고
+- compact: 이전 공간 벡터 정리, ANN 변경 로그 압축, 엔진 스냅샷/agenda 다시 쓰기
+- migrate-storage: 월별 배열 파일(`YYYY-MM.json`)을 이벤트별 파일(`0001.json`)로 분리
+- stats: 디렉터리/엔진/큐/재색인/보관 상태
+- bench: 저장된 데이터로 질의 지연시간 측정, 또는 `benchmarks.bench_*` 실행
+"""
@@ -0,0 +1,6 @@
+import sys
+
+from moro.cli import main
+
+
+sys.exit(main())
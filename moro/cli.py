@@ -0,0 +1,451 @@
+"""
+`python -m moro <command> [--user-dir Database/[user]]`
+
+    python -m moro stats
+    python -m moro verify --fix
+    python -m moro reindex --version 2
+    python -m moro compact --dedup
+    python -m moro migrate-storage --dry-run
+    python -m moro bench query --queries 200
+    python -m moro bench ann --n 50000
+
+진행 상황은 stderr에, 결과는 stdout에 (`--json`이면 JSON 하나) 출력한다.
+실행 중인 서버가 있으면 파일 변경 후 엔진 스냅샷을 새 세대로 게시해서 서버 워커가 다음 요청 때 바뀐 파일을 다시 읽게 한다.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .progress import Progress, default_workers, parallel_map
+
+
+DEFAULT_USER_DIR = "Database/[user]"
+TMP_MAX_AGE_S = 3600
+ISSUE_LIMIT = 50
+
+
+def _emit(args: argparse.Namespace, report: Dict[str, Any], lines: Sequence[str] = ()) -> None:
+    if args.json or not lines:
+        print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    else:
+        print("\n".join(lines))
+
+
+def _publish(user_dir: str) -> Optional[Dict[str, Any]]:
+    """엔진 스냅샷을 새 세대로 게시 (다른 프로세스의 엔진이 바뀐 파일을 다시 읽게 한다)."""
+    from RAG.engine import SNAPSHOT_ENABLED, get_engine
+
+    if not SNAPSHOT_ENABLED:
+        # 게시할 스냅샷이 없다: 실행 중인 서버는 다음 쿼리 때 저장소 버전(storage_version)을 보고 바뀐 파일만 다시 읽는다
+        print("warning: ENGINE_SNAPSHOT=0, no engine snapshot published; running servers pick up the changed files "
+              "on their next query", file=sys.stderr)
+        return None
+    return get_engine(user_dir).snapshot()
+
+
+def _spec_label(meta: Dict[str, Any]) -> str:
+    return f"{meta['model']}/{meta['dim']}/v{meta.get('version', '1')}"
+
+
+def _embed_and_wait(user_dir: str, items: List[Tuple[Any, str]], timeout: float, show_progress: bool) -> Dict[str, Any]:
+    """(id, 경로)를 임베딩 큐에 넣고 대기/처리 중인 작업이 없을 때까지 기다린다."""
+    from RAG.embedding_queue import get_embedding_queue
+
+    queue = get_embedding_queue(user_dir)
+    queue.put_many(items)
+    if queue.jobs:
+        queue.start()
+    # 실행 중인 서버 워커가 넣은 작업은 그쪽이 처리하므로 이 프로세스의 작업만 기다린다
+    status = queue.status()
+    total = status["pending_here"] + status["in_flight"]
+    progress = Progress("embed", total, enabled=show_progress)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = queue.status()
+        remaining = status["pending_here"] + status["in_flight"]
+        progress.update(total - remaining)
+        if not remaining:
+            break
+        time.sleep(0.2)
+    progress.close()
+    return {
+        "queued": len(items),
+        "remaining": status["pending_here"] + status["in_flight"],
+        "failed": status["failed"],
+        "timed_out": bool(status["pending_here"] + status["in_flight"]),
+    }
+
+
+# ------------------------------------------------------------------ stats
+def cmd_stats(args: argparse.Namespace) -> int:
+    from eventmanager import find_missing_ids, list_existing_ids
+    from RAG.agenda import get_agenda
+    from RAG.embedding_queue import embedding_queue_status
+    from RAG.engine import get_engine
+    from RAG.reindex import reindex_status
+    from RAG.snapshot import list_event_files
+
+    user_dir = args.user_dir
+    files = list(list_event_files(user_dir))
+    ids = list_existing_ids(user_dir)
+    queue = embedding_queue_status(user_dir)
+    queue.pop("jobs", None)
+    report = {
+        "storage": {
+            "files": len(files),
+            "bytes": sum(st.st_size for _, _, st in files),
+            "id_range": [min(ids), max(ids)] if ids else None,
+            "id_gaps": len(find_missing_ids(user_dir)),
+        },
+        "engine": get_engine(user_dir).stats(),
+        "agenda": get_agenda(user_dir).stats(),
+        "embedding_queue": queue,
+        "reindex": reindex_status(user_dir),
+    }
+    _emit(args, report)
+    return 0
+
+
+# ---------------------------------------------------------------- verify
+def cmd_verify(args: argparse.Namespace) -> int:
+    from .verify import verify
+
+    report, reembed = verify(args.user_dir, args.workers, not args.quiet)
+    if args.fix and reembed:
+        report["fix"] = _embed_and_wait(args.user_dir, reembed, args.timeout, not args.quiet)
+    emb = report["embeddings"]
+    lines = [
+        f"{report['files']} files (single {report['layouts']['single']}, list {report['layouts']['list']}, "
+        f"invalid {report['layouts']['invalid']}), {report['events']} events in {report['elapsed_s']}s",
+        f"embeddings [{_spec_label(report['spec'])}]: ok {emb['ok']}, missing {emb['missing']}, stale {emb['stale']} (queued {emb['queued']})",
+        f"id gaps: {report['id_gaps']['count']}" + (f" e.g. {report['id_gaps']['sample']}" if report["id_gaps"]["count"] else ""),
+        f"errors {report['errors']}, warnings {report['warnings']}" + (f" {report['counts']}" if report["counts"] else ""),
+    ]
+    for issue in report["issues"][:args.limit]:
+        lines.append(f"  {issue['level']:<8}{issue['code']:<20}{issue['file']:<16}id={issue['id']} {issue['message']}")
+    if len(report["issues"]) > args.limit:
+        lines.append(f"  ... {len(report['issues']) - args.limit} more (--limit, --json)")
+    if "fix" in report:
+        fix = report["fix"]
+        lines.append(f"fix: re-embedded {fix['queued'] - fix['remaining']}/{fix['queued']}, failed {fix['failed']}" + (" (timed out)" if fix["timed_out"] else ""))
+    elif reembed:
+        lines.append("run with --fix to embed missing/stale vectors")
+    _emit(args, report, lines)
+    return 1 if report["errors"] else 0
+
+
+# --------------------------------------------------------------- reindex
+def cmd_reindex(args: argparse.Namespace) -> int:
+    from RAG.embedding_spec import active_spec, configured_spec
+    from RAG.reindex import reindex_status, start_reindex
+    from .verify import verify
+
+    user_dir = args.user_dir
+    show = not args.quiet
+    active, target = active_spec(user_dir), configured_spec()
+    report: Dict[str, Any] = {"active": active.to_meta(), "target": target.to_meta()}
+    lines = []
+    if active != target and not args.missing_only:
+        print(f"reindex: {_spec_label(active.to_meta())} -> {_spec_label(target.to_meta())}", file=sys.stderr)
+        job = start_reindex(user_dir, target)
+        progress = Progress("reindex", enabled=show)
+        while job.is_alive():
+            status = reindex_status(user_dir)
+            progress.update(status.get("embedded", 0), status.get("pending") or None)
+            job.join(0.2)
+        elapsed = progress.close()
+        status = reindex_status(user_dir)
+        report["reindex"] = {k: status.get(k) for k in ("state", "embedded", "pending", "promoted")}
+        lines.append(f"reindex {status.get('state')}: {status.get('embedded', 0)} embedded, {status.get('promoted', 0)} promoted in {elapsed:.1f}s")
+        if status.get("state") != "done":
+            _emit(args, report, lines)
+            return 1
+    elif active != target:
+        lines.append(f"skipping migration to {_spec_label(target.to_meta())} (--missing-only)")
+    else:
+        lines.append(f"vector space {_spec_label(active.to_meta())} is up to date")
+
+    # 활성 공간에서 빠지거나 텍스트가 바뀌어 낡은 벡터
+    scan, reembed = verify(user_dir, args.workers, show)
+    report["missing"] = scan["embeddings"]
+    if reembed:
+        report["embed"] = _embed_and_wait(user_dir, reembed, args.timeout, show)
+        lines.append(f"re-embedded {report['embed']['queued'] - report['embed']['remaining']}/{len(reembed)} missing/stale vectors, failed {report['embed']['failed']}")
+    else:
+        lines.append("no missing or stale vectors")
+    if "reindex" in report or reembed:
+        report["snapshot"] = _publish(user_dir)
+    _emit(args, report, lines)
+    return 1 if report.get("embed", {}).get("remaining") else 0
+
+
+# --------------------------------------------------------------- compact
+def _compact_vectors(path: str, keep: Tuple[Any, ...]) -> Tuple[int, int]:
+    """keep 공간이 아닌 벡터 필드를 지우고 active 공간의 embedding_next를 승격. (지운 벡터 수, 줄어든 바이트).
+
+    서버의 수정과 섞이지 않도록 파일 잠금 안에서 읽고 쓰며, 바뀐 이벤트는 잠금 안에서 알린다 (ANN 변경 로그 등).
+    """
+    from RAG.embedding_spec import vector_spec
+    from RAG.index_hooks import notify_mutation
+    from RAG.state import atomic_write_json, event_file_lock
+
+    with event_file_lock(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0, 0
+        dropped, changed = 0, []
+        for event in data if isinstance(data, list) else [data]:
+            if not isinstance(event, dict):
+                continue
+            before = dropped
+            for field in ("embedding", "embedding_next"):
+                if event.get(field) and vector_spec(event, field) not in keep:
+                    event.pop(field, None)
+                    event.pop(f"{field}_meta", None)
+                    dropped += 1
+            promote = not event.get("embedding") and vector_spec(event, "embedding_next") == keep[0]
+            if promote:
+                event["embedding"] = event.pop("embedding_next")
+                event["embedding_meta"] = event.pop("embedding_next_meta")
+            if promote or dropped != before:
+                changed.append(event)
+        if not changed:
+            return 0, 0
+        size = os.path.getsize(path)
+        atomic_write_json(path, data)
+        for event in changed:
+            if event.get("id") is not None:
+                notify_mutation(os.path.dirname(path), "update", event["id"], event)
+        return dropped, size - os.path.getsize(path)
+
+
+def _remove_stale_tmp(user_dir: str) -> int:
+    # atomic_open이 중간에 죽어 남긴 임시 파일 (.<이름>.<임의>.tmp)
+    removed = 0
+    cutoff = time.time() - TMP_MAX_AGE_S
+    for directory in (Path(user_dir), Path(user_dir) / ".moro"):
+        if not directory.is_dir():
+            continue
+        for path in directory.rglob(".*.tmp"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+    return removed
+
+
+def cmd_compact(args: argparse.Namespace) -> int:
+    from RAG.agenda import get_agenda
+    from RAG.ann_index import _paths as ann_paths, compact_ann_index
+    from RAG.embedding_spec import active_spec, target_spec
+    from RAG.snapshot import list_event_files
+
+    user_dir = args.user_dir
+    report: Dict[str, Any] = {}
+    lines = []
+    if args.dedup:
+        from RAG.dedup import dedup_events
+
+        dedup = dedup_events(user_dir, merge=True)
+        report["dedup"] = {k: dedup[k] for k in ("events", "duplicates", "merged", "ms")}
+        lines.append(f"dedup: merged {dedup['merged']} duplicates of {dedup['events']} events")
+    if args.archive_days:
+        from RAG.archive import archive_events
+
+        archived = archive_events(user_dir, args.archive_days)
+        report["archive"] = {k: archived.get(k) for k in ("archived", "partitions")}
+        lines.append(f"archive: {archived['archived']} events older than {args.archive_days} days")
+
+    # 재색인 중이 아니면 active 공간 벡터만 남긴다 (중단된 이전 재색인이 남긴 벡터 등)
+    keep = tuple(dict.fromkeys((active_spec(user_dir), target_spec(user_dir))))
+    paths = [path for _, path, _ in list_event_files(user_dir)]
+    progress = Progress("vectors", len(paths), enabled=not args.quiet)
+    results = parallel_map(lambda path: _compact_vectors(path, keep), paths, args.workers, progress)
+    progress.close()
+    report["vectors"] = {"dropped": sum(r[0] for r in results), "files": sum(1 for r in results if r[0]), "bytes_saved": sum(r[1] for r in results)}
+    lines.append(f"vectors: dropped {report['vectors']['dropped']} old-space vectors in {report['vectors']['files']} files ({report['vectors']['bytes_saved']:,} bytes)")
+
+    if ann_paths(user_dir)[0].exists():
+        started = time.perf_counter()
+        compact_ann_index(user_dir)
+        report["ann"] = {"ms": round((time.perf_counter() - started) * 1000, 1)}
+        lines.append(f"ann: compacted in {report['ann']['ms']}ms")
+    get_agenda(user_dir).persist()
+    report["snapshot"] = _publish(user_dir)
+    if report["snapshot"]:
+        lines.append(f"snapshot: v{report['snapshot']['version']} {report['snapshot']['bytes']:,} bytes in {report['snapshot']['ms']}ms")
+    report["tmp_removed"] = _remove_stale_tmp(user_dir)
+    if report["tmp_removed"]:
+        lines.append(f"removed {report['tmp_removed']} stale temp files")
+    _emit(args, report, lines)
+    return 0
+
+
+# ------------------------------------------------------- migrate-storage
+def cmd_migrate_storage(args: argparse.Namespace) -> int:
+    from .migrate import migrate_storage
+
+    summary = migrate_storage(args.user_dir, args.zero_pad, args.dry_run, args.workers, not args.quiet)
+    if not args.dry_run and (summary["writes"] or summary["removes"] or summary["rewrites"]):
+        summary["snapshot"] = _publish(args.user_dir)
+    prefix = "would " if args.dry_run else ""
+    lines = [
+        f"{summary['files']} files: {summary['kept']} already per-id, {summary['split_files']} array files split, {summary['renamed']} renamed",
+        f"{prefix}write {summary['writes']} event files, {prefix}remove {summary['removes']}, {prefix}rewrite {summary['rewrites']}",
+        f"reassigned ids: {summary['reassigned_count']}, identical duplicates dropped: {summary['dropped_duplicates']}, left in place: {summary['left_in_place']}",
+    ]
+    lines.extend(f"  {r['file']}: id {r['from']} -> {r['to']}" for r in summary["reassigned"][:ISSUE_LIMIT])
+    lines.extend(f"  error {e}" for e in summary["errors"])
+    _emit(args, summary, lines)
+    return 1 if summary["errors"] else 0
+
+
+# ----------------------------------------------------------------- bench
+def _bench_names() -> List[str]:
+    import pkgutil
+
+    import benchmarks
+
+    return sorted(m.name[len("bench_"):] for m in pkgutil.iter_modules(benchmarks.__path__) if m.name.startswith("bench_"))
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": round(pick(0.5), 2), "p95": round(pick(0.95), 2), "max": round(ordered[-1], 2)}
+
+
+def _bench_query(args: argparse.Namespace) -> int:
+    """저장된 데이터로 엔진 로드와 질의 지연시간(ms)."""
+    from RAG.engine import get_engine
+
+    parser = argparse.ArgumentParser(prog="python -m moro bench query", parents=[_common_parser()])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--mode", nargs="+", default=["vector", "lexical", "hybrid"])
+    parser.add_argument("--seed", type=int, default=0)
+    # 이미 준 공통 옵션(bench 앞의 --user-dir 등)은 namespace에 있는 값을 유지
+    args = parser.parse_args(args.bench_args, namespace=args)
+
+    started = time.perf_counter()
+    engine = get_engine(args.user_dir)
+    events = engine.all_events()
+    report: Dict[str, Any] = {"events": len(events), "load_ms": round((time.perf_counter() - started) * 1000, 1)}
+    if not events:
+        _emit(args, report)
+        return 0
+    rng = random.Random(args.seed)
+    sample = [rng.choice(events) for _ in range(args.queries)]
+    workloads = {
+        "criteria": [({"date": str(e.get("date_start", ""))[:10]}, None) for e in sample],
+        **{mode: [(None, e.get("title") or "회의") for e in sample] for mode in args.mode},
+    }
+    lines = [f"{len(events)} events, engine load {report['load_ms']}ms, {args.queries} queries per workload"]
+    for name, queries in workloads.items():
+        mode = name if name != "criteria" else "vector"
+        progress = Progress(name, len(queries), enabled=not args.quiet)
+        timings = []
+        for criteria, text in queries:
+            t = time.perf_counter()
+            engine.query(criteria, text, args.k, mode)
+            timings.append((time.perf_counter() - t) * 1000)
+            progress.advance()
+        progress.close()
+        report[name] = _percentiles(timings)
+        lines.append(f"{name:<10} p50 {report[name]['p50']:>8}ms  p95 {report[name]['p95']:>8}ms  max {report[name]['max']:>8}ms")
+    _emit(args, report, lines)
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    if args.name == "query":
+        return _bench_query(args)
+    if args.name not in _bench_names():
+        print(f"unknown benchmark {args.name!r} (query, {', '.join(_bench_names())})", file=sys.stderr)
+        return 2
+    from importlib import import_module
+
+    module = import_module(f"benchmarks.bench_{args.name}")
+    sys.argv = [f"benchmarks.bench_{args.name}", *args.bench_args]
+    module.main()
+    return 0
+
+
+# ---------------------------------------------------------------- parser
+def _common_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--user-dir", default=DEFAULT_USER_DIR, help="이벤트 디렉터리 (기본 Database/[user])")
+    common.add_argument("--workers", type=int, default=default_workers(), help="병렬 작업 수")
+    common.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    common.add_argument("--quiet", action="store_true", help="진행 표시 끄기")
+    return common
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = _common_parser()
+    parser = argparse.ArgumentParser(prog="python -m moro", description="Moro 관리 도구")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("reindex", parents=[common], help="설정된 벡터 공간으로 재색인 + 빠진/낡은 임베딩 채우기")
+    p.add_argument("--backend", help="EMBEDDING_BACKEND (openai|local)")
+    p.add_argument("--model", help="EMBEDDING_MODEL")
+    p.add_argument("--dimensions", type=int, help="EMBEDDING_DIMENSIONS")
+    p.add_argument("--version", dest="model_version", help="EMBEDDING_MODEL_VERSION (같은 모델로 전체 재임베딩하려면 올린다)")
+    p.add_argument("--missing-only", action="store_true", help="공간 전환 없이 빠진/낡은 벡터만 채움")
+    p.add_argument("--timeout", type=float, default=3600, help="임베딩 큐 대기 시간(초)")
+    p.set_defaults(func=cmd_reindex)
+
+    p = sub.add_parser("verify", parents=[common], help="파일 무결성/ID 공백/임베딩 점검 (오류가 있으면 종료 코드 1)")
+    p.add_argument("--fix", action="store_true", help="빠진/낡은 임베딩을 큐에 넣고 처리될 때까지 기다림")
+    p.add_argument("--limit", type=int, default=ISSUE_LIMIT, help="출력할 문제 수")
+    p.add_argument("--timeout", type=float, default=3600, help="--fix 대기 시간(초)")
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser("compact", parents=[common], help="이전 공간 벡터 정리, ANN 압축, 스냅샷/agenda 다시 쓰기")
+    p.add_argument("--dedup", action="store_true", help="중복 이벤트 병합 (RAG.dedup)")
+    p.add_argument("--archive-days", type=int, default=0, help="N일 전보다 먼저 끝난 이벤트를 보관 파티션으로")
+    p.set_defaults(func=cmd_compact)
+
+    p = sub.add_parser("migrate-storage", parents=[common], help="월별 배열 파일을 이벤트별 파일(0001.json)로 분리")
+    p.add_argument("--dry-run", action="store_true", help="바꿀 내용만 보고")
+    p.add_argument("--zero-pad", type=int, default=4, help="파일명 자릿수")
+    p.set_defaults(func=cmd_migrate_storage)
+
+    p = sub.add_parser("stats", parents=[common], help="저장소/엔진/임베딩 큐/재색인 상태 (JSON)")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("bench", parents=[common], help="query: 저장된 데이터로 질의 지연시간, 그 외: benchmarks.bench_<name> 실행")
+    p.add_argument("name", help="query 또는 benchmarks 모듈 이름 (ann, ics, import, planner, quantized)")
+    p.add_argument("bench_args", nargs=argparse.REMAINDER, help="query 옵션(--queries --k --mode --seed) 또는 benchmarks 모듈에 넘길 인자")
+    p.set_defaults(func=cmd_bench)
+    return parser
+
+
+_ENV_OVERRIDES = {"backend": "EMBEDDING_BACKEND", "model": "EMBEDDING_MODEL", "dimensions": "EMBEDDING_DIMENSIONS", "model_version": "EMBEDDING_MODEL_VERSION"}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    # 임베딩 설정은 RAG 모듈이 import될 때 읽으므로 명령을 실행하기 전에 환경 변수로 넘긴다
+    for attr, env in _ENV_OVERRIDES.items():
+        if getattr(args, attr, None) is not None:
+            os.environ[env] = str(getattr(args, attr))
+    if not os.path.isdir(args.user_dir):
+        print(f"user dir not found: {args.user_dir}", file=sys.stderr)
+        return 2
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        print("interrupted", file=sys.stderr)
+        return 130
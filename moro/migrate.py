@@ -0,0 +1,162 @@
+"""
+저장소 배치 변환 (`python -m moro migrate-storage`).
+
+예전 형식인 월별 배열 파일(`YYYY-MM.json`, 이벤트 목록)과 zero-pad 되지 않은 이벤트 파일(`12.json`)을
+eventmanager가 쓰는 이벤트별 파일(`0012.json`)로 옮긴다.
+- 이미 `<id>.json` 형식인 단일 이벤트 파일이 먼저 자기 id를 차지하고, 파일명 순서대로 나머지를 배정
+- id가 없거나 이미 차지된 id(내용이 다른 중복)는 새 id를 받는다 (보관된 id는 재사용하지 않음). 내용까지 같은 중복은 하나만 남긴다
+- 정수가 아닌 id(구글 동기화 등)는 파일명으로 쓸 수 없으므로 원래 배열 파일에 남긴다
+- 새 파일을 모두 원자적으로 쓴 뒤 원본을 지우거나 다시 쓰고, 마지막에 "reload"를 알려 인덱스를 다시 만든다
+- 파일마다 event_file_lock 안에서 쓰고 지운다. 계획을 세운 뒤 서버가 고친 원본은 건드리지 않고 errors에 남긴다
+- 파일 이름 기준인 파생 상태(`.moro/ann`, `.moro/agenda.json`)는 지워서 다음 요청 때 파일에서 다시 만든다
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .progress import Progress, parallel_map
+
+
+def _read(item: Tuple[str, str]) -> Tuple[str, str, Any, Optional[str]]:
+    name, path = item
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return name, path, json.load(f), None
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        return name, path, None, str(e)
+
+
+def plan_migration(user_dir: str, zero_pad: int = 4, workers: Optional[int] = None, show_progress: bool = True) -> Dict[str, Any]:
+    """쓸 파일(writes: 파일명 -> 이벤트), 지울 파일, 다시 쓸 파일(남는 이벤트)과 요약."""
+    from eventmanager import _archived_ids, _format_id_filename, _parse_id_from_filename
+    from RAG.snapshot import list_event_files
+
+    stats = {path: (st.st_mtime_ns, st.st_size) for _, path, st in list_event_files(user_dir)}
+    files = [(os.path.basename(path), path) for path in stats]
+    progress = Progress("read", len(files), enabled=show_progress)
+    loaded = parallel_map(_read, files, workers, progress)
+    progress.close()
+
+    plan: Dict[str, Any] = {
+        # sigs: 다시 쓰거나 지울 원본의 (mtime_ns, size) — 그 사이 바뀌었는지 확인용
+        "writes": {}, "remove": [], "rewrite": {}, "sigs": {},
+        "summary": {"files": len(files), "kept": 0, "split_files": 0, "renamed": 0, "moved_events": 0,
+                    "reassigned": [], "dropped_duplicates": 0, "left_in_place": 0, "errors": []},
+    }
+    summary = plan["summary"]
+    claimed: Dict[int, Dict[str, Any]] = {}
+    pending: List[Tuple[str, str, Any]] = []
+    for name, path, data, error in loaded:
+        if error is None and not isinstance(data, (dict, list)):
+            error = f"unexpected {type(data).__name__}"
+        if error is not None:
+            summary["errors"].append(f"{name}: {error}")
+            continue
+        event_id = data.get("id") if isinstance(data, dict) else None
+        if isinstance(event_id, int) and name == _format_id_filename(event_id, zero_pad) and event_id not in claimed:
+            claimed[event_id] = data
+            summary["kept"] += 1
+        else:
+            pending.append((name, path, data))
+
+    used: Set[int] = set(claimed) | _archived_ids(user_dir)
+    next_id = max(used, default=0) + 1
+    for name, path, data in pending:
+        events = data if isinstance(data, list) else [data]
+        leftover = []
+        for event in events:
+            if not isinstance(event, dict):
+                leftover.append(event)
+                continue
+            event_id = event.get("id")
+            if event_id is not None and not isinstance(event_id, int):
+                leftover.append(event)
+                continue
+            if event_id in claimed:
+                if claimed[event_id] == event:
+                    summary["dropped_duplicates"] += 1
+                    continue
+            if event_id is None or event_id in claimed or event_id in used:
+                while next_id in used:
+                    next_id += 1
+                summary["reassigned"].append({"file": name, "from": event_id, "to": next_id})
+                event = dict(event, id=next_id)
+                event_id = next_id
+            claimed[event_id] = event
+            used.add(event_id)
+            plan["writes"][_format_id_filename(event_id, zero_pad)] = event
+            summary["moved_events"] += 1
+        if isinstance(data, list):
+            summary["split_files"] += 1
+        else:
+            summary["renamed"] += 1
+        summary["left_in_place"] += len(leftover)
+        if leftover:
+            plan["rewrite"][path] = leftover
+        elif os.path.basename(path) not in plan["writes"]:
+            plan["remove"].append(path)
+        plan["sigs"][path] = stats[path]
+    summary["reassigned_count"] = len(summary["reassigned"])
+    return plan
+
+
+def migrate_storage(
+    user_dir: str,
+    zero_pad: int = 4,
+    dry_run: bool = False,
+    workers: Optional[int] = None,
+    show_progress: bool = True,
+) -> Dict[str, Any]:
+    from RAG.index_hooks import notify_mutation
+    from RAG.state import atomic_write_json, event_file_lock
+
+    plan = plan_migration(user_dir, zero_pad, workers, show_progress)
+    summary = plan["summary"]
+    summary.update(writes=len(plan["writes"]), removes=len(plan["remove"]), rewrites=len(plan["rewrite"]), dry_run=dry_run)
+    if dry_run or not (plan["writes"] or plan["remove"] or plan["rewrite"]):
+        return summary
+
+    base = Path(user_dir)
+
+    def write(item: Tuple[str, Any]) -> None:
+        with event_file_lock(base / item[0]):
+            atomic_write_json(base / item[0], item[1])
+
+    progress = Progress("write", len(plan["writes"]), enabled=show_progress)
+    # 새 파일을 먼저 모두 쓴다: 중간에 멈춰도 이벤트가 사라지지 않는다 (중복은 verify가 보고)
+    parallel_map(write, plan["writes"].items(), workers, progress)
+    progress.close()
+    for path in list(plan["rewrite"]) + plan["remove"]:
+        with event_file_lock(path):
+            if _sig(path) != plan["sigs"][path]:
+                summary["errors"].append(f"{os.path.basename(path)}: changed during migration, left in place (run verify)")
+            elif path in plan["rewrite"]:
+                atomic_write_json(path, plan["rewrite"][path])
+            else:
+                os.unlink(path)
+    drop_derived_state(user_dir)
+    notify_mutation(user_dir, "reload")
+    return summary
+
+
+def _sig(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def drop_derived_state(user_dir: str) -> None:
+    """파일 이름/id에 묶인 디스크 상태(ANN 베이스 + 변경 로그, agenda 뷰)를 지운다. 다음 요청 때 파일에서 다시 만든다."""
+    from RAG.agenda import agenda_path
+    from RAG.ann_index import _LOCK as ANN_LOCK, _paths as ann_paths
+    from RAG.state import state_lock
+
+    with state_lock(user_dir, ANN_LOCK):
+        for path in ann_paths(user_dir):
+            path.unlink(missing_ok=True)
+    agenda_path(user_dir).unlink(missing_ok=True)
@@ -0,0 +1,108 @@
+"""
+진행 표시와 병렬 실행 도우미.
+
+- Progress: 터미널이면 한 줄을 `\\r`로 갱신하고, 로그 파일 등으로 리디렉션되면 10% 단위로 한 줄씩 출력 (stderr)
+- parallel_map: 항목을 chunk로 나눠 스레드/프로세스 풀에서 실행, 입력 순서대로 결과 반환
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, List, Optional, TextIO
+
+
+def default_workers() -> int:
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+class Progress:
+    def __init__(self, label: str, total: Optional[int] = None, stream: TextIO = sys.stderr, enabled: bool = True, interval: float = 0.2):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.stream = stream
+        self.enabled = enabled
+        self.interval = interval
+        self.tty = bool(getattr(stream, "isatty", lambda: False)())
+        self._started = time.perf_counter()
+        self._last_draw = 0.0
+        self._last_decile = 0
+        self._drawn = False
+
+    def advance(self, n: int = 1) -> None:
+        self.update(self.done + n)
+
+    def update(self, done: int, total: Optional[int] = None) -> None:
+        self.done = done
+        if total is not None:
+            self.total = total
+        if not self.enabled:
+            return
+        if self.tty:
+            now = time.perf_counter()
+            if now - self._last_draw >= self.interval or (self.total and done >= self.total):
+                self._last_draw = now
+                self.stream.write("\r" + self._line() + "\033[K")
+                self.stream.flush()
+                self._drawn = True
+        elif self.total:
+            decile = min(10, done * 10 // self.total)
+            if decile > self._last_decile:
+                self._last_decile = decile
+                self.stream.write(self._line() + "\n")
+                self.stream.flush()
+
+    def _line(self) -> str:
+        elapsed = time.perf_counter() - self._started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        if self.total:
+            return f"{self.label}: {self.done}/{self.total} ({self.done / self.total:.0%}) {rate:,.0f}/s"
+        return f"{self.label}: {self.done} {rate:,.0f}/s"
+
+    def close(self) -> float:
+        """줄을 마무리하고 경과 시간(초)을 반환."""
+        elapsed = time.perf_counter() - self._started
+        if self.enabled and self.tty and (self._drawn or self.done):
+            self.stream.write("\r" + self._line() + f" {elapsed:.1f}s\033[K\n")
+            self.stream.flush()
+        return elapsed
+
+
+def _run_chunk(fn: Callable[[Any], Any], chunk: List[Any]) -> List[Any]:
+    return [fn(item) for item in chunk]
+
+
+def parallel_map(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    workers: Optional[int] = None,
+    progress: Optional[Progress] = None,
+    processes: bool = False,
+    chunksize: int = 64,
+) -> List[Any]:
+    """fn(item) 결과 목록 (입력 순서). processes=True면 fn은 모듈 최상위 함수여야 한다 (pickle)."""
+    items = list(items)
+    workers = workers or default_workers()
+    if progress is not None:
+        progress.update(0, len(items))
+    if workers <= 1 or len(items) <= chunksize:
+        results = []
+        for item in items:
+            results.append(fn(item))
+            if progress is not None:
+                progress.advance()
+        return results
+
+    chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+    out: List[Optional[List[Any]]] = [None] * len(chunks)
+    pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool_cls(max_workers=workers) as pool:
+        futures = {pool.submit(_run_chunk, fn, chunk): i for i, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            i = futures[future]
+            out[i] = future.result()
+            if progress is not None:
+                progress.advance(len(chunks[i]))
+    return [result for chunk in out for result in chunk]
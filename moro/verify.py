@@ -0,0 +1,140 @@
+"""
+이벤트 파일 무결성 점검 (`python -m moro verify`).
+
+파일마다 (프로세스 풀에서 병렬로) 확인:
+- JSON 파싱, 최상위가 이벤트 객체/배열인지
+- id 존재, 이벤트별 파일(`0012.json`)이면 파일명 숫자와 id 일치, 배열 파일은 migrate-storage 대상으로 보고
+- date_start/date_finish 해석 가능, 종료가 시작보다 앞서지 않는지
+- 활성 공간(embedding_spec) 벡터: 없음 / 텍스트가 바뀌어 낡음 / 길이가 차원과 다름
+디렉터리 전체: 중복 id, hot 파일과 보관(archive) 파티션에 동시에 있는 id, ID 공백(find_missing_ids)
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from .progress import Progress, parallel_map
+
+
+ERROR, WARNING = "error", "warning"
+GAP_SAMPLE = 20
+
+
+def scan_file(item: Tuple[str, str, Dict[str, Any]]) -> Dict[str, Any]:
+    """(파일명, 경로, 활성 spec 메타) -> 파일 점검 결과. 프로세스 풀 워커에서 실행된다."""
+    from eventmanager import _parse_id_from_filename
+    from RAG.embedding_spec import EmbeddingSpec, event_vector, vector_is_stale
+    from RAG.parsing_with_criteria import _event_window
+
+    name, path, spec_meta = item
+    spec = EmbeddingSpec.from_meta(spec_meta)
+    result: Dict[str, Any] = {"name": name, "path": path, "layout": "invalid", "ids": [], "issues": [], "missing": [], "stale": []}
+    issues = result["issues"]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        issues.append((ERROR, "invalid_json", None, str(e)))
+        return result
+    if isinstance(data, dict):
+        result["layout"], events = "single", [data]
+    elif isinstance(data, list):
+        result["layout"], events = "list", data
+        issues.append((WARNING, "list_file", None, f"{len(data)} events in one file (migrate-storage)"))
+    else:
+        issues.append((ERROR, "invalid_root", None, type(data).__name__))
+        return result
+
+    file_id = _parse_id_from_filename(name)
+    for event in events:
+        if not isinstance(event, dict):
+            issues.append((ERROR, "invalid_event", None, type(event).__name__))
+            continue
+        event_id = event.get("id")
+        if event_id is None:
+            issues.append((ERROR, "missing_id", None, str(event.get("title", ""))[:40]))
+        else:
+            result["ids"].append(event_id)
+            if result["layout"] == "single" and file_id is not None and event_id != file_id:
+                issues.append((ERROR, "id_mismatch", event_id, f"file id {file_id}"))
+        try:
+            start, finish = _event_window(event)
+            if finish < start:
+                issues.append((WARNING, "negative_duration", event_id, f"{event['date_start']} > {event.get('date_finish')}"))
+        except (KeyError, TypeError, ValueError) as e:
+            issues.append((ERROR, "bad_date", event_id, f"{type(e).__name__}: {e}"))
+        if spec is None or event_id is None:
+            continue
+        vec = event_vector(event, spec)
+        if vec is None:
+            result["missing"].append(event_id)
+        elif len(vec) != spec.dim:
+            issues.append((ERROR, "bad_vector", event_id, f"len {len(vec)} != dim {spec.dim}"))
+            result["stale"].append(event_id)
+        elif vector_is_stale(event):
+            result["stale"].append(event_id)
+    return result
+
+
+def verify(user_dir: str, workers: Optional[int] = None, show_progress: bool = True) -> Tuple[Dict[str, Any], List[Tuple[Any, str]]]:
+    """(보고서, 다시 임베딩할 (id, 경로) 목록)."""
+    from eventmanager import find_missing_ids
+    from RAG.archive import archive_dir, get_archive
+    from RAG.embedding_queue import pending_embedding_ids
+    from RAG.embedding_spec import active_spec
+    from RAG.snapshot import list_event_files
+
+    spec = active_spec(user_dir)
+    files = [(name, path, spec.to_meta()) for name, path, _ in list_event_files(user_dir)]
+    progress = Progress("verify", len(files), enabled=show_progress)
+    # JSON 파싱 + 텍스트 해시는 CPU 작업이므로 프로세스 풀
+    results = parallel_map(scan_file, files, workers, progress, processes=True)
+    elapsed = progress.close()
+
+    issues: List[Dict[str, Any]] = []
+    seen: Dict[Any, str] = {}
+    layouts = {"single": 0, "list": 0, "invalid": 0}
+    missing, stale = [], []
+    for result in results:
+        layouts[result["layout"]] += 1
+        missing.extend(result["missing"])
+        stale.extend(result["stale"])
+        for level, code, event_id, message in result["issues"]:
+            issues.append({"level": level, "code": code, "file": result["name"], "id": event_id, "message": message})
+        for event_id in result["ids"]:
+            if event_id in seen:
+                issues.append({"level": ERROR, "code": "duplicate_id", "file": result["name"], "id": event_id, "message": f"also in {seen[event_id]}"})
+            else:
+                seen[event_id] = result["name"]
+
+    if archive_dir(user_dir).exists():
+        for event_id in sorted(set(get_archive(user_dir).ids()) & set(seen), key=str):
+            issues.append({"level": WARNING, "code": "archived_duplicate", "file": seen[event_id], "id": event_id, "message": "also in archive"})
+
+    queued = pending_embedding_ids(user_dir)
+    gaps = find_missing_ids(user_dir)
+    counts: Dict[str, int] = {}
+    for issue in issues:
+        counts[issue["code"]] = counts.get(issue["code"], 0) + 1
+    report = {
+        "user_dir": user_dir,
+        "files": len(files),
+        "layouts": layouts,
+        "events": len(seen),
+        "spec": spec.to_meta(),
+        "embeddings": {
+            "ok": len(seen) - len(set(missing) | set(stale)),
+            "missing": len(missing),
+            "stale": len(stale),
+            "queued": len(queued & (set(missing) | set(stale))),
+        },
+        "errors": sum(1 for issue in issues if issue["level"] == ERROR),
+        "warnings": sum(1 for issue in issues if issue["level"] == WARNING),
+        "counts": counts,
+        "issues": issues,
+        "id_gaps": {"count": len(gaps), "sample": gaps[:GAP_SAMPLE]},
+        "elapsed_s": round(elapsed, 2),
+    }
+    reembed = [(event_id, os.path.join(user_dir, seen[event_id])) for event_id in missing + stale if event_id in seen]
+    return report, reembed
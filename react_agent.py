@@ -1,13 +1,7 @@
 """
 ReAct Agent with tools.json 도구들
 """
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferWindowMemory
-from langchain.prompts import PromptTemplate
-from langchain.tools import Tool
-from RAG.parsing_with_criteria import parse_with_criteria
-from RAG.parsing_with_content import parse_with_content, embed_event
+from RAG.manifest import reconcile_embeddings
 from eventmanager import delete_event_in_user, update_event_in_user, add_event_in_user
 import os
 import json
@@ -16,6 +10,12 @@ from datetime import datetime, timezone, timedelta
 class ReactAgent:
     def __init__(self):
         """ReAct Agent 초기화"""
+        # langchain은 import 비용이 커서 에이전트를 실제로 만들 때 불러온다
+        from langchain.agents import AgentExecutor, create_react_agent
+        from langchain_openai import ChatOpenAI
+        from langchain.memory import ConversationBufferWindowMemory
+        from langchain.prompts import PromptTemplate
+
         # OpenAI 모델 초기화
         self.llm = ChatOpenAI(
             model="gpt-4o-mini",
@@ -25,6 +25,10 @@ class ReactAgent:
         )
         
         # 도구들 정의
+        # 이벤트/인덱스/캐시를 app.py, Agent와 공유하는 사용자별 엔진
+        from RAG.engine import get_engine
+
+        self.rag = get_engine("Database/[user]")
         self.tools = self._create_tools()
         
         # 메모리 설정 (최근 10개 대화 기억)
@@ -86,6 +90,8 @@ SIMPLE TASKS (single tool):
 - Month search: "10월 일정 보여줘" → Thought: Need to search October events → Action: parse_with_criteria → Action Input: month filter → Observation: [results] → Thought: I have the results → Final Answer: 10월 일정은...
 - Weekday search: "금요일 일정 보여줘" → Thought: Need to search Friday events → Action: parse_with_criteria → Action Input: weekday filter → Observation: [results] → Thought: I have the results → Final Answer: 금요일 일정은...
 - Content search: "회의 일정 보여줘" → Thought: Need to search for meeting events → Action: parse_with_content → Action Input: query text → Observation: [results] → Thought: I have the results → Final Answer: 회의 일정은...
+- Statistics: "이번 달 회의에 몇 시간 썼어?" → Thought: Need total hours of this month's meetings → Action: aggregate_events → Action Input: {{"criteria": {{"year": 2025, "month": 10, "title": "회의"}}, "metrics": ["total_hours"]}} → Observation: [totals] → Thought: I have the totals → Final Answer: 이번 달 회의는 총 ...시간입니다.
+- Statistics: "누구를 가장 자주 만나?" → Action: aggregate_events → Action Input: {{"group_by": ["member"], "limit": 5}} → Final Answer: 가장 자주 만나는 사람은...
 only day search: parse_with_criteria
 day search + content search: parse_with_content
 
@@ -96,11 +102,12 @@ GUARDRAIL EXAMPLES (NO TOOLS):
 STOP CONDITIONS:
 - If you get results from parse_with_criteria: STOP and provide Final Answer
 - If you get results from parse_with_content: STOP and provide Final Answer
+- If you get results from aggregate_events: STOP and provide Final Answer
 - Do NOT search again if you already have results
 
 COMPLEX TASKS (multiple tools):
-- Delete task: "풋살 일정 삭제해줘" → Thought: Need to find the football event first → Action: parse_with_criteria → Action Input: title filter → Observation: [found event with ID] → Thought: Found the event, now delete it → Action: delete_event_in_user → Action Input: event_id → Observation: [deletion result] → Thought: Task completed → Final Answer: 풋살 일정이 삭제되었습니다.
-- Modify task: "회의 시간을 3시로 바꿔줘" → Thought: Need to find the meeting first → Action: parse_with_criteria → Action Input: title filter → Observation: [found event with ID] → Thought: Found the event, now update the time → Action: update_event_in_user → Action Input: "123|{{date_start: 2025-10-02T15:00:00+09:00}}" → Observation: [update result] → Thought: Task completed → Final Answer: 회의 시간이 3시로 변경되었습니다.
+- Delete task: "풋살 일정 삭제해줘" → Thought: Need to find the football event first → Action: parse_with_criteria → Action Input: {{"title": "풋살"}} → Observation: [found event with ID] → Thought: Found the event, now delete it → Action: delete_event_in_user → Action Input: event_id → Observation: [deletion result] → Thought: Task completed → Final Answer: 풋살 일정이 삭제되었습니다.
+- Modify task: "회의 시간을 3시로 바꿔줘" → Thought: Need to find the meeting first → Action: parse_with_criteria → Action Input: {{"title": "회의"}} → Observation: [found event with ID] → Thought: Found the event, now update the time → Action: update_event_in_user → Action Input: "123|{{date_start: 2025-10-02T15:00:00+09:00}}" → Observation: [update result] → Thought: Task completed → Final Answer: 회의 시간이 3시로 변경되었습니다.
 
 Begin!
 
@@ -127,26 +134,21 @@ Thought: {agent_scratchpad}""",
             max_execution_time=60
         )
         
-        # Database 폴더의 모든 파일에 대해 embedding 필드 생성
-        self._update_all_embeddings()
+        # 매니페스트로 바뀐 파일만 확인하고, 빠진 embedding은 백그라운드 임베딩 큐에 맡긴다
+        reconcile_embeddings("Database/[user]")
 
     def _create_tools(self):
         """tools.json의 도구들을 LangChain Tool로 변환"""
+        from langchain.tools import Tool
+
         tools = []
         
         # parse_with_criteria 도구
         def parse_with_criteria_wrapper(criteria_str):
             try:
                 criteria = json.loads(criteria_str) if criteria_str else None
-                result = parse_with_criteria(criteria=criteria)
+                result = self.rag.query(criteria)
                 if result:
-                    # embedding 필드가 없으면 생성
-                    for event in result:
-                        if 'embedding' not in event:
-                            try:
-                                event = embed_event(event)
-                            except:
-                                pass
                     return self._format_events(result)
                 return "일정을 찾을 수 없습니다."
             except Exception as e:
@@ -154,7 +156,7 @@ Thought: {agent_scratchpad}""",
         
         tools.append(Tool(
             name="parse_with_criteria",
-            description="기존 일정을 검색합니다. 특정 날짜, 요일, 시간, 연도, 월에 있는 일정을 찾아줍니다. criteria는 JSON 문자열로 전달하세요. 지원하는 필터: date(YYYY-MM-DD), weekday(0-6 또는 '월'~'일'), hour(HH 또는 HH:MM), year(2025), month(1-12 또는 '1월', 'January' 등).",
+            description="기존 일정을 검색합니다. 특정 날짜, 요일, 시간, 연도, 월에 있는 일정을 찾아줍니다. criteria는 JSON 문자열로 전달하세요. 지원하는 필터: date(YYYY-MM-DD), weekday(0-6 또는 '월'~'일'), hour(HH 또는 HH:MM), year(2025), month(1-12 또는 '1월', 'January' 등). member(이름 또는 목록), location(장소 이름), member_prefix/location_prefix(이름 접두어, 예: location_prefix 본사). title(제목 퍼지 검색, 오타 허용, 유사도순). and/or(하위 criteria 목록), not(하위 criteria)으로 조합 가능. 예: {{or: [{{weekday: 월}}, {{weekday: 수}}], not: {{month: 10}}}}",
             func=parse_with_criteria_wrapper
         ))
         
@@ -162,15 +164,9 @@ Thought: {agent_scratchpad}""",
         def parse_with_content_wrapper(query, criteria_str=None, k=10):
             try:
                 criteria = json.loads(criteria_str) if criteria_str else None
-                result = parse_with_content(query=query, criteria=criteria, k=k)
+                # 제목/이름 같은 정확한 토큰도 잘 잡히도록 BM25 + 벡터 하이브리드 검색
+                result = self.rag.query(criteria, query, int(k), mode="hybrid")
                 if result:
-                    # embedding 필드가 없으면 생성
-                    for event in result:
-                        if 'embedding' not in event:
-                            try:
-                                event = embed_event(event)
-                            except:
-                                pass
                     return self._format_events(result)
                 return "일정을 찾을 수 없습니다."
             except Exception as e:
@@ -178,10 +174,27 @@ Thought: {agent_scratchpad}""",
         
         tools.append(Tool(
             name="parse_with_content",
-            description="텍스트 내용으로 이벤트를 검색합니다. query는 필수, criteria는 JSON 문자열로 전달하세요. 지원하는 필터: date(YYYY-MM-DD), weekday(0-6 또는 '월'~'일'), hour(HH 또는 HH:MM), year(2025), month(1-12 또는 '1월', 'January' 등).",
+            description="텍스트 내용으로 이벤트를 검색합니다. query는 필수, criteria는 JSON 문자열로 전달하세요. 지원하는 필터: date(YYYY-MM-DD), weekday(0-6 또는 '월'~'일'), hour(HH 또는 HH:MM), year(2025), month(1-12 또는 '1월', 'January' 등). member(이름 또는 목록), location(장소 이름), member_prefix/location_prefix(이름 접두어, 예: location_prefix 본사). title(제목 퍼지 검색, 오타 허용, 유사도순). and/or(하위 criteria 목록), not(하위 criteria)으로 조합 가능. 예: {{or: [{{weekday: 월}}, {{weekday: 수}}], not: {{month: 10}}}}",
             func=parse_with_content_wrapper
         ))
         
+        # aggregate_events 도구
+        def aggregate_events_wrapper(input_str):
+            try:
+                args = json.loads(input_str) if input_str else {}
+                result = self.rag.aggregate(
+                    args.get("criteria"), args.get("group_by"), args.get("metrics"), args.get("limit"),
+                )
+                return json.dumps(result, ensure_ascii=False)
+            except Exception as e:
+                return f"집계 중 오류가 발생했습니다: {str(e)}"
+        
+        tools.append(Tool(
+            name="aggregate_events",
+            description="일정 통계를 집계합니다 (일정을 직접 세지 말고 이 도구를 사용). 입력은 JSON 문자열: criteria(parse_with_criteria와 같은 필터), group_by(week, weekday, month, member, location 중 목록), metrics(count, total_hours 중 목록), limit(최대 그룹 수). 예: {{criteria: {{month: 10, title: 회의}}, metrics: [total_hours]}}, {{group_by: [member], limit: 5}}",
+            func=aggregate_events_wrapper
+        ))
+        
         # delete_event_in_user 도구
         def delete_event_wrapper(event_id):
             try:
@@ -339,69 +352,6 @@ Thought: {agent_scratchpad}""",
         return "\n".join(formatted)
 
 
-    def _update_all_embeddings(self, user_dir="Database/[user]"):
-        """Database 폴더의 모든 JSON 파일에 대해 embedding 필드를 생성합니다."""
-        if not os.path.exists(user_dir):
-            print(f"❌ {user_dir} 폴더가 존재하지 않습니다.")
-            return
-        
-        # 모든 JSON 파일 확인
-        json_files = [f for f in os.listdir(user_dir) if f.endswith('.json')]
-        print(f"📁 {len(json_files)}개의 JSON 파일을 확인합니다...")
-        
-        updated_files = []
-        error_files = []
-        
-        for filename in json_files:
-            filepath = os.path.join(user_dir, filename)
-            
-            try:
-                # JSON 파일 읽기
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    event = json.load(f)
-                
-                # embedding 필드가 있는지 확인
-                if 'embedding' not in event or not event['embedding']:
-                    print(f"🔄 {filename}: embedding 생성 중...")
-                    
-                    # 임베딩 생성
-                    try:
-                        event_with_embedding = embed_event(event)
-                        
-                        # 파일에 저장
-                        with open(filepath, 'w', encoding='utf-8') as f:
-                            json.dump(event_with_embedding, f, ensure_ascii=False, indent=2)
-                        
-                        updated_files.append(filename)
-                        print(f"✅ {filename}: embedding 생성 완료")
-                        
-                    except Exception as e:
-                        print(f"❌ {filename}: embedding 생성 실패 - {str(e)}")
-                        error_files.append((filename, str(e)))
-                else:
-                    print(f"✓ {filename}: embedding 이미 존재")
-                    
-            except Exception as e:
-                print(f"❌ {filename}: 파일 읽기/쓰기 오류 - {str(e)}")
-                error_files.append((filename, str(e)))
-        
-        # 결과 요약
-        if updated_files or error_files:
-            print("\n" + "="*50)
-            print("📊 Database Embedding 업데이트 결과")
-            print("="*50)
-            print(f"✅ 성공적으로 업데이트된 파일: {len(updated_files)}개")
-            if updated_files:
-                for filename in updated_files:
-                    print(f"   - {filename}")
-            
-            print(f"❌ 오류가 발생한 파일: {len(error_files)}개")
-            if error_files:
-                for filename, error in error_files:
-                    print(f"   - {filename}: {error}")
-            
-            print(f"📁 총 처리된 파일: {len(json_files)}개")
-
     def __call__(self, query: str) -> str:
         """사용자 쿼리를 처리하고 응답을 반환합니다."""
         try:
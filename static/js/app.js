@@ -20,6 +20,8 @@ document.addEventListener('DOMContentLoaded', function() {
     loadEvents();
     // 주기적 폴링으로 DB 변경 반영 (10초)
     setInterval(loadEvents, 10000);
+    // 일정 알림은 서버 push (SSE)
+    startReminderStream();
 });
 
 function initializeApp() {
@@ -32,11 +34,13 @@ function setupEventListeners() {
     document.getElementById('prevMonth').addEventListener('click', () => {
         currentDate.setMonth(currentDate.getMonth() - 1);
         renderCalendar();
+        loadEvents();
     });
     
     document.getElementById('nextMonth').addEventListener('click', () => {
         currentDate.setMonth(currentDate.getMonth() + 1);
         renderCalendar();
+        loadEvents();
     });
 
     // 헤더 버튼들
@@ -172,15 +176,34 @@ function renderCalendar() {
     }
 }
 
-// 특정 날짜의 이벤트 가져오기
+// 특정 날짜의 이벤트 가져오기 (여러 날에 걸친 일정은 걸친 모든 날짜에 표시)
 function getEventsForDate(date) {
+    const dayStart = new Date(date.getFullYear(), date.getMonth(), date.getDate());
+    const dayEnd = new Date(dayStart);
+    dayEnd.setDate(dayEnd.getDate() + 1);
     return events.filter(event => {
         if (!event.date_start) return false;
-        const eventDate = new Date(event.date_start);
-        return eventDate.toDateString() === date.toDateString();
+        const start = new Date(event.date_start);
+        const finish = event.date_finish ? new Date(event.date_finish) : start;
+        return start < dayEnd && (start >= dayStart || finish > dayStart);
     });
 }
 
+// 달력에 보이는 6주(42일) 범위
+function visibleRange() {
+    const firstDay = new Date(currentDate.getFullYear(), currentDate.getMonth(), 1);
+    const start = new Date(firstDay);
+    start.setDate(start.getDate() - firstDay.getDay());
+    const end = new Date(start);
+    end.setDate(start.getDate() + 41);
+    return { start, end };
+}
+
+function toDateKey(date) {
+    const pad = n => String(n).padStart(2, '0');
+    return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}`;
+}
+
 // 이벤트 목록 업데이트
 function updateEventsList() {
     const targetDate = selectedDate || new Date();
@@ -236,7 +259,17 @@ function formatEventTime(event) {
 // 이벤트 로드
 async function loadEvents() {
     try {
-        const response = await fetch('/api/events');
+        // 전체 이벤트 대신 보이는 달력 범위(+ 목록에 표시할 날짜)의 날짜 버킷만 조회
+        let { start, end } = visibleRange();
+        const target = selectedDate || new Date();
+        const from = target < start ? target : start;
+        const to = target > end ? target : end;
+        if ((to - from) / 86400000 <= 400) {
+            start = from;
+            end = to;
+        }
+        const response = await fetch(`/api/events/range?start=${toDateKey(start)}&end=${toDateKey(end)}`);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
         events = await response.json();
         renderCalendar();
         updateEventsList();
@@ -282,6 +315,7 @@ function fillEventForm(event) {
     document.getElementById('eventDescription').value = event.description || '';
     document.getElementById('eventLocation').value = event.location || '';
     document.getElementById('eventMembers').value = Array.isArray(event.member) ? event.member.join(', ') : '';
+    document.getElementById('eventReminders').value = formatReminders(event.reminders);
     
     if (event.date_start) {
         const startDate = new Date(event.date_start);
@@ -317,6 +351,10 @@ async function handleEventSubmit(e) {
         date_start: `${document.getElementById('eventStartDate').value}T${document.getElementById('eventStartTime').value}:00+09:00`,
         date_finish: `${document.getElementById('eventEndDate').value}T${document.getElementById('eventEndTime').value}:00+09:00`
     };
+    const reminders = parseReminders(document.getElementById('eventReminders').value);
+    if (reminders !== null) {
+        eventData.reminders = reminders;
+    }
     
     try {
         let response;
@@ -788,6 +826,38 @@ function formatPlanMessage(content) {
     return content;
 }
 
+// 일정 알림 입력값 ("10, 60" → [10, 60], "없음" → [], 빈 값 → null = 기본 알림)
+function parseReminders(value) {
+    const text = value.trim();
+    if (!text) return null;
+    if (text === '없음') return [];
+    return text.split(',').map(v => parseInt(v.trim(), 10)).filter(v => !isNaN(v) && v >= 0);
+}
+
+function formatReminders(reminders) {
+    if (reminders === undefined || reminders === null) return '';
+    if (Array.isArray(reminders) && reminders.length === 0) return '없음';
+    return [].concat(reminders).join(', ');
+}
+
+// 일정 알림 수신 (서버가 heap 스케줄러에서 만기된 알림만 push, 연결이 끊기면 EventSource가 자동 재접속)
+function startReminderStream() {
+    if (!window.EventSource) return;
+    if (window.Notification && Notification.permission === 'default') {
+        Notification.requestPermission();
+    }
+    const source = new EventSource('/api/reminders/stream');
+    source.addEventListener('reminder', (e) => {
+        const reminder = JSON.parse(e.data);
+        const when = reminder.minutes_before > 0 ? `${reminder.minutes_before}분 후 시작` : '지금 시작';
+        const message = `⏰ ${reminder.title} — ${when}${reminder.location ? ` (${reminder.location})` : ''}`;
+        showNotification(message, 'info');
+        if (window.Notification && Notification.permission === 'granted') {
+            new Notification(reminder.title || '일정 알림', { body: when, tag: `moro-${reminder.event_id}-${reminder.minutes_before}` });
+        }
+    });
+}
+
 // 알림 표시
 function showNotification(message, type = 'info') {
     // 간단한 알림 구현 (실제로는 더 정교한 알림 시스템을 사용할 수 있음)
@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# 테스트는 API 키 없이 돌도록 로컬 임베딩과 스냅샷 없는 엔진을 쓴다
+os.environ.setdefault("EMBEDDING_BACKEND", "local")
+os.environ.setdefault("ENGINE_SNAPSHOT", "0")
+
+
+def make_event(event_id, day="2025-06-02", title=None, **fields):
+    event = {
+        "id": event_id,
+        "title": title if title is not None else f"일정 {event_id}",
+        "date_start": f"{day}T10:00:00+09:00",
+        "date_finish": f"{day}T11:00:00+09:00",
+        "description": "",
+        "location": "",
+        "member": [],
+    }
+    event.update(fields)
+    return event
+
+
+def write_events(user_dir, events):
+    os.makedirs(user_dir, exist_ok=True)
+    for event in events:
+        with open(os.path.join(user_dir, f"{event['id']:04d}.json"), "w", encoding="utf-8") as f:
+            json.dump(event, f, ensure_ascii=False)
+
+
+# 다른 프로세스에서 eventmanager로 일정 하나를 추가하는 코드 (run_other_process용)
+ADD_EVENT = """
+import eventmanager
+eventmanager.add_event_in_user({event}, user_dir={user_dir}, recompute_embedding=False)
+"""
+
+
+def titles(events):
+    return {event["title"] for event in events}
+
+
+def run_other_process(code, **values):
+    """code를 별도 인터프리터에서 실행 (다른 서버 워커/CLI가 저장소를 바꾸는 경우)."""
+    source = textwrap.dedent(code).format(**{k: repr(v) for k, v in values.items()})
+    subprocess.run([sys.executable, "-c", source], cwd=ROOT, env=dict(os.environ, PYTHONPATH=ROOT), check=True, timeout=120)
+
+
+@pytest.fixture
+def user_dir(tmp_path):
+    path = tmp_path / "user"
+    path.mkdir()
+    return str(path)
@@ -0,0 +1,77 @@
+from datetime import date
+
+import pytest
+
+from conftest import make_event, write_events
+
+
+@pytest.fixture(autouse=True)
+def no_background_persist(monkeypatch):
+    from RAG.agenda import AgendaView
+
+    monkeypatch.setattr(AgendaView, "_schedule_persist", lambda self: None)
+
+
+def _span(event_id, start, finish, **fields):
+    return make_event(event_id, date_start=start, date_finish=finish, **fields)
+
+
+def test_event_days_and_iso_weeks():
+    from RAG.agenda import event_days, week_key
+
+    assert event_days(make_event(1)) == [date(2025, 6, 2)]
+    three_days = _span(1, "2025-06-02T22:00:00+09:00", "2025-06-04T09:00:00+09:00")
+    assert event_days(three_days) == [date(2025, 6, 2), date(2025, 6, 3), date(2025, 6, 4)]
+    # 자정에 끝나는 이벤트는 끝나는 날에 넣지 않는다
+    assert event_days(_span(1, "2025-06-02T20:00:00+09:00", "2025-06-03T00:00:00+09:00")) == [date(2025, 6, 2)]
+    # 날짜는 KST 기준
+    assert event_days(_span(1, "2025-06-02T16:00:00+00:00", "2025-06-02T17:00:00+00:00")) == [date(2025, 6, 3)]
+    assert week_key(date(2024, 12, 30)) == "2025-W01"
+
+
+def test_buckets_follow_mutations(user_dir):
+    from RAG.agenda import get_agenda
+    from RAG.index_hooks import notify_mutation
+
+    write_events(user_dir, [
+        make_event(1, day="2025-06-03"),
+        _span(2, "2025-06-01T09:00:00+09:00", "2025-06-03T09:00:00+09:00"),
+        make_event(3, day="2025-06-10"),
+    ])
+    view = get_agenda(user_dir)
+    assert view.day_ids(date(2025, 6, 3)) == [2, 1]
+    assert view.week_ids(2025, 23) == [2, 1]
+    assert view.week_ids(2025, 22) == [2]
+    assert view.range_ids(date(2025, 6, 1), date(2025, 6, 30)) == [2, 1, 3]
+    with pytest.raises(ValueError):
+        view.week_ids(2025, 54)
+
+    moved = make_event(1, day="2025-06-10")
+    write_events(user_dir, [moved])
+    notify_mutation(user_dir, "update", 1, moved)
+    notify_mutation(user_dir, "delete", 2)
+    assert view.day_ids(date(2025, 6, 3)) == []
+    assert view.week_ids(2025, 24) == [1, 3]
+    assert view.stats() == {"events": 2, "days": 1, "weeks": 1}
+
+
+def test_saved_view_rereads_only_changed_files(user_dir, monkeypatch):
+    from RAG import agenda
+
+    write_events(user_dir, [make_event(1), make_event(2, day="2025-06-03")])
+    agenda.AgendaView(user_dir).load()
+    assert agenda.agenda_path(user_dir).exists()
+
+    # 알림 없이 파일이 바뀌고 생긴 경우
+    write_events(user_dir, [make_event(2, day="2025-06-04"), make_event(3, day="2025-06-04")])
+    read = []
+    real = agenda.read_event_file
+    monkeypatch.setattr(agenda, "read_event_file", lambda path: read.append(path[-9:]) or real(path))
+    view = agenda.AgendaView(user_dir)
+    view.load()
+    assert sorted(read) == ["0002.json", "0003.json"]
+    assert view.day_ids(date(2025, 6, 4)) == [2, 3]
+    assert view.day_ids(date(2025, 6, 3)) == []
+
+    write_events(user_dir, [make_event(4, day="2025-06-04")])
+    assert view.day_ids(date(2025, 6, 4)) == [2, 3, 4]
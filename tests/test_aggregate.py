@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from conftest import make_event, write_events
+
+
+def _event(event_id, start, hours, **fields):
+    day, hour = start.split(" ")
+    finish = int(hour) + hours
+    return make_event(
+        event_id,
+        day=day,
+        date_start=f"{day}T{int(hour):02d}:00:00+09:00",
+        date_finish=f"{day}T{finish:02d}:00:00+09:00",
+        **fields,
+    )
+
+
+EVENTS = [
+    _event(1, "2025-09-29 10", 1, member=["철수", "영희"], location="본사"),   # 월, 2025-W40
+    _event(2, "2025-10-01 14", 2, member=["철수"], location="판교"),           # 수, 2025-W40
+    _event(3, "2025-10-06 09", 3, member=["영희"], location="본사"),           # 월, 2025-W41
+    _event(4, "2025-10-07 18", 1, member=[]),                                  # 화, 2025-W41
+]
+
+
+def _index():
+    from RAG.event_index import EventIndex
+
+    return EventIndex.from_events(EVENTS)
+
+
+def test_totals_and_time_groups():
+    result = _index().aggregate(None, "week", ["count", "total_hours"])
+    assert result["total"] == {"count": 4, "total_hours": 7.0}
+    assert result["groups"] == [
+        {"week": "2025-W40", "count": 2, "total_hours": 3.0},
+        {"week": "2025-W41", "count": 2, "total_hours": 4.0},
+    ]
+    months = _index().aggregate(None, "month")["groups"]
+    assert months == [{"month": "2025-09", "count": 1}, {"month": "2025-10", "count": 3}]
+    weekdays = _index().aggregate(None, "weekday")["groups"]
+    assert weekdays == [{"weekday": "월", "count": 2}, {"weekday": "화", "count": 1}, {"weekday": "수", "count": 1}]
+
+
+def test_members_count_once_per_attendee_and_rank_by_metric():
+    result = _index().aggregate(None, "member", "total_hours")
+    assert result["total"] == {"total_hours": 7.0}
+    assert result["groups"] == [{"member": "영희", "total_hours": 4.0}, {"member": "철수", "total_hours": 3.0}]
+
+
+def test_combined_groups_ids_and_limit():
+    index = _index()
+    result = index.aggregate([1, 2, 3], ["week", "location"], limit=2)
+    assert result["group_count"] == 3
+    assert result["groups"] == [
+        {"week": "2025-W40", "location": "본사", "count": 1},
+        {"week": "2025-W40", "location": "판교", "count": 1},
+    ]
+
+
+def test_unknown_group_or_metric_is_rejected():
+    with pytest.raises(ValueError, match="group_by"):
+        _index().aggregate(None, "colour")
+    with pytest.raises(ValueError, match="metric"):
+        _index().aggregate(None, "week", "median")
+
+
+def test_engine_aggregate_applies_criteria_and_follows_deletes(user_dir):
+    from RAG.engine import RAG
+    from RAG.index_hooks import notify_mutation
+
+    write_events(user_dir, EVENTS)
+    engine = RAG(user_dir)
+    assert engine.aggregate({"member": "철수"}, "week")["groups"] == [{"week": "2025-W40", "count": 2}]
+    os.remove(os.path.join(user_dir, "0002.json"))
+    notify_mutation(user_dir, "delete", 2)
+    assert engine.aggregate({"month": 10}, "location")["groups"] == [{"location": "본사", "count": 1}]
@@ -0,0 +1,160 @@
+import numpy as np
+
+from conftest import make_event, run_other_process, write_events
+
+
+ADD_EVENT_WITH_VECTOR = """
+import eventmanager
+from RAG.embedding_spec import active_spec, set_event_vector
+event = {event}
+spec = active_spec({user_dir})
+set_event_vector(event, [{value}] * spec.dim, spec)
+eventmanager.add_event_in_user(event, user_dir={user_dir}, recompute_embedding=False)
+"""
+
+
+def _vector_events(user_dir, count):
+    from RAG.embedding_spec import active_spec, set_event_vector
+
+    spec = active_spec(user_dir)
+    rng = np.random.default_rng(0)
+    events = []
+    for i in range(1, count + 1):
+        event = make_event(i)
+        set_event_vector(event, rng.normal(size=spec.dim).tolist(), spec)
+        events.append(event)
+    return events
+
+
+def test_loaded_ann_index_replays_other_process_delta(user_dir):
+    from RAG import ann_index
+
+    write_events(user_dir, _vector_events(user_dir, 20))
+    index = ann_index.get_ann_index(user_dir)
+    assert len(index) == 20
+
+    new = make_event(None, title="다른 워커")
+    del new["id"]
+    run_other_process(ADD_EVENT_WITH_VECTOR, event=new, user_dir=user_dir, value=0.5)
+
+    index = ann_index.get_ann_index(user_dir)
+    assert len(index) == 21
+    assert 21 in index.location
+
+
+def test_cold_ann_load_uses_delta_log_without_rebuild(user_dir, capsys):
+    from RAG import ann_index
+    from RAG.index_hooks import user_key
+
+    write_events(user_dir, _vector_events(user_dir, 20))
+    ann_index.get_ann_index(user_dir)
+
+    new = make_event(None, title="다른 워커")
+    del new["id"]
+    run_other_process(ADD_EVENT_WITH_VECTOR, event=new, user_dir=user_dir, value=0.5)
+
+    # 이 프로세스에서 처음 여는 것처럼: 베이스 + 변경 로그에서 읽는다
+    ann_index._indexes.pop(user_key(user_dir), None)
+    capsys.readouterr()
+    index = ann_index.get_ann_index(user_dir)
+    assert 21 in index.location
+    assert "rebuilding" not in capsys.readouterr().out
+
+
+def test_cold_ann_load_rebuilds_after_unlogged_file_change(user_dir, capsys):
+    from RAG import ann_index
+    from RAG.index_hooks import user_key
+
+    events = _vector_events(user_dir, 20)
+    write_events(user_dir, events)
+    ann_index.get_ann_index(user_dir)
+
+    # eventmanager를 거치지 않고 만든 파일: 변경 로그에 없으므로 다시 만들어야 한다
+    extra = dict(events[0], id=99)
+    write_events(user_dir, [extra])
+    ann_index._indexes.pop(user_key(user_dir), None)
+    index = ann_index.get_ann_index(user_dir)
+    assert 99 in index.location
+    assert "rebuilding" in capsys.readouterr().out
+
+
+def _clustered(n=600, dim=16, clusters=8, seed=1):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(clusters, size=n)
+    return centers[labels] + rng.normal(scale=0.1, size=(n, dim)), labels
+
+
+def _exact(vectors, ids, query, k, allowed=None):
+    norm = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = norm @ (query / np.linalg.norm(query))
+    order = [ids[i] for i in np.argsort(-scores) if allowed is None or ids[i] in allowed]
+    return order[:k]
+
+
+def test_ivf_search_matches_exact_search_on_clustered_vectors():
+    from RAG.ann_index import IVFFlatIndex
+
+    vectors, _ = _clustered()
+    ids = list(range(1, len(vectors) + 1))
+    index = IVFFlatIndex.build(ids, vectors, nlist=8, nprobe=3, min_train_size=100)
+    assert index.trained and index.nlist == 8
+    query = vectors[10]
+    found = [doc_id for doc_id, _ in index.search(query, 10)]
+    assert len(set(found) & set(_exact(vectors, ids, query, 10))) >= 9
+
+
+def test_ivf_allow_set_widens_probe_until_k_candidates():
+    from RAG.ann_index import IVFFlatIndex
+
+    vectors, labels = _clustered()
+    ids = list(range(1, len(vectors) + 1))
+    index = IVFFlatIndex.build(ids, vectors, nlist=8, nprobe=1, min_train_size=100)
+    # 질의와 다른 클러스터의 항목만 허용: 처음 probe한 리스트에는 후보가 없다
+    allowed = {doc_id for doc_id, label in zip(ids, labels) if label != labels[10]}
+    found = [doc_id for doc_id, _ in index.search(vectors[10], 50, allowed_ids=allowed)]
+    assert len(found) == 50 and set(found) <= allowed
+    # 허용 집합이 작으면 그 집합만 정확하게 채점
+    small = set(list(allowed)[:5])
+    assert [doc_id for doc_id, _ in index.search(vectors[10], 3, allowed_ids=small)] == _exact(vectors, ids, vectors[10], 3, small)
+
+
+def test_ivf_tombstones_and_save_load_round_trip(tmp_path):
+    from RAG.ann_index import IVFFlatIndex
+
+    vectors, _ = _clustered(n=200)
+    ids = list(range(1, 201))
+    index = IVFFlatIndex.build(ids, vectors, nlist=4, min_train_size=50)
+    index.remove(1)
+    index.add(2, vectors[100])
+    assert index.tombstones == 2 and len(index) == 199
+    assert 1 not in {doc_id for doc_id, _ in index.search(vectors[0], 5)}
+
+    path = tmp_path / "ivf.npz"
+    index.save(path)
+    loaded = IVFFlatIndex.load(path)
+    assert len(loaded) == 199 and loaded.tombstones == 0
+    assert loaded.search(vectors[50], 5) == index.search(vectors[50], 5)
+
+
+def test_replay_delta_applies_complete_lines_only(tmp_path):
+    import json
+
+    from RAG.ann_index import IVFFlatIndex, _replay_delta
+
+    index = IVFFlatIndex.build([1, 2], np.eye(2, dtype=np.float32))
+    delta = tmp_path / "delta.jsonl"
+    lines = [
+        json.dumps({"op": "add", "id": 3, "vector": [1.0, 1.0], "v": 5, "m": 7}) + "\n",
+        json.dumps({"op": "delete", "id": 1, "v": 6, "m": 7}) + "\n",
+    ]
+    # 다른 프로세스가 쓰는 중인 마지막 줄은 건너뛰고 다음에 이어서 읽는다
+    delta.write_text("".join(lines) + '{"op": "add", "id"', encoding="utf-8")
+    count, offset = _replay_delta(index, delta)
+    assert count == 2 and offset == len("".join(lines).encode("utf-8"))
+    assert sorted(index.location) == [2, 3]
+    assert index.storage == (6, 7)
+    with open(delta, "a", encoding="utf-8") as f:
+        f.write(': 4, "vector": [0.0, 1.0], "v": 7, "m": 8}\n')
+    count, _ = _replay_delta(index, delta, offset)
+    assert count == 1 and 4 in index.location
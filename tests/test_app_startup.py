@@ -0,0 +1,44 @@
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+
+def _maintenance_threads():
+    return [t for t in threading.enumerate() if t.name == "startup-maintenance"]
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    import app
+
+    started = []
+    monkeypatch.setattr(app, "_startup_maintenance", lambda user_dir: started.append((os.getpid(), user_dir)))
+    monkeypatch.setattr(app, "_started_pid", None)
+    app.started = started
+    return app
+
+
+def test_import_starts_no_background_threads(app_module):
+    assert not _maintenance_threads()
+    assert app_module._started_pid is None
+
+
+def test_background_tasks_start_once_per_process_on_first_request(app_module):
+    client = app_module.app.test_client()
+    client.get("/")
+    client.get("/")
+    for thread in _maintenance_threads():
+        thread.join(5)
+    assert app_module.started == [(os.getpid(), "Database/[user]")]
+    assert app_module.start_background_tasks() is False
+
+
+def test_forked_worker_starts_its_own_tasks(app_module, monkeypatch):
+    assert app_module.start_background_tasks() is True
+    # fork 후 워커: pid가 바뀌면 그 프로세스에서 다시 시작한다
+    monkeypatch.setattr(app_module, "_started_pid", -1)
+    assert app_module.start_background_tasks() is True
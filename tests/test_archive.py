@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from conftest import make_event, write_events
+
+
+NOW = datetime.fromisoformat("2025-06-01T00:00:00+09:00")
+
+
+def _setup(user_dir):
+    # 1~3: 1년도 더 지난 일정, 4: 최근 일정
+    events = [make_event(i, day=f"2024-01-0{i}") for i in range(1, 4)] + [make_event(4, day="2025-05-30")]
+    write_events(user_dir, events)
+
+
+def test_archive_moves_old_events_out_of_hot_files(user_dir):
+    from RAG.archive import get_archive
+
+    _setup(user_dir)
+    summary = get_archive(user_dir).archive(365, NOW)
+    assert summary["archived"] == 3
+    assert sorted(os.listdir(user_dir)) == [".moro", "0004.json"]
+    assert get_archive(user_dir).ids() == {1, 2, 3}
+
+
+def test_export_and_functional_criteria_include_archived(user_dir):
+    from eventmanager import iter_events_in_user
+    from RAG.archive import get_archive
+    from RAG.parsing_with_criteria import parse_with_criteria
+
+    _setup(user_dir)
+    get_archive(user_dir).archive(365, NOW)
+    assert sorted(e["id"] for e in iter_events_in_user(user_dir)) == [1, 2, 3, 4]
+    assert sorted(e["id"] for e in iter_events_in_user(user_dir, include_archived=False)) == [4]
+    assert sorted(e["id"] for e in parse_with_criteria(user_dir, {"year": 2024})) == [1, 2, 3]
+
+
+def test_update_during_archive_is_kept_hot(user_dir):
+    import eventmanager
+    from RAG.archive import get_archive
+
+    _setup(user_dir)
+    archive = get_archive(user_dir)
+    write_index = archive._write_index
+    done = []
+
+    def write_index_then_update():
+        # 파티션을 쓴 뒤 hot 파일을 지우기 전에 다른 스레드가 수정한다
+        write_index()
+        if not done:
+            done.append(True)
+            worker = threading.Thread(target=eventmanager.update_event_file, args=(user_dir, 2, {"title": "수정됨"}),
+                                      kwargs={"recompute_embedding": False})
+            worker.start()
+            worker.join()
+
+    archive._write_index = write_index_then_update
+    summary = archive.archive(365, NOW)
+    del archive._write_index
+
+    assert summary["archived"] == 2
+    with open(os.path.join(user_dir, "0002.json"), encoding="utf-8") as f:
+        assert json.load(f)["title"] == "수정됨"
+    assert archive.ids() == {1, 3}
+
+
+def test_update_of_archived_event_restores_it(user_dir):
+    import eventmanager
+    from RAG.archive import get_archive
+
+    _setup(user_dir)
+    get_archive(user_dir).archive(365, NOW)
+    assert eventmanager.update_event_file(user_dir, 1, {"title": "다시 꺼냄"}, recompute_embedding=False)
+    with open(os.path.join(user_dir, "0001.json"), encoding="utf-8") as f:
+        assert json.load(f)["title"] == "다시 꺼냄"
+    assert 1 not in get_archive(user_dir).ids()
@@ -0,0 +1,72 @@
+from conftest import ADD_EVENT, make_event, run_other_process, titles, write_events
+
+
+def test_criteria_cache_sees_write_by_other_process(user_dir):
+    from RAG.parsing_with_criteria import parse_with_criteria
+
+    write_events(user_dir, [make_event(1), make_event(2, day="2024-03-01")])
+    assert [e["id"] for e in parse_with_criteria(user_dir, {"year": 2025})] == [1]
+    # 같은 criteria는 캐시에서
+    assert [e["id"] for e in parse_with_criteria(user_dir, {"year": 2025})] == [1]
+
+    new = make_event(None, day="2025-07-01", title="다른 워커")
+    del new["id"]
+    run_other_process(ADD_EVENT, event=new, user_dir=user_dir)
+
+    assert "다른 워커" in titles(parse_with_criteria(user_dir, {"year": 2025}))
+
+
+def _no_file_reads(monkeypatch):
+    from RAG import parsing_with_criteria
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cache hit should not read event files")
+
+    monkeypatch.setattr(parsing_with_criteria, "load_events", fail)
+    monkeypatch.setattr(parsing_with_criteria, "load_events_by_id", fail)
+
+
+def test_hit_returns_cached_rows_without_reading_files(user_dir, monkeypatch):
+    from RAG.parsing_with_criteria import criteria_cache_stats, parse_with_criteria
+
+    write_events(user_dir, [make_event(1, member=["철수"]), make_event(2, day="2024-03-01")])
+    first = parse_with_criteria(user_dir, {"year": 2025})
+    expression = parse_with_criteria(user_dir, {"member": "철수"})
+    hits = criteria_cache_stats()["hits"]
+
+    first[0]["title"] = "호출 측이 고친 사본"
+    _no_file_reads(monkeypatch)
+    assert [e["title"] for e in parse_with_criteria(user_dir, {"year": "2025"})] == ["일정 1"]
+    assert parse_with_criteria(user_dir, {"member": "철수"}) == expression
+    assert criteria_cache_stats()["hits"] == hits + 2
+
+
+def test_storage_version_change_is_a_miss(user_dir):
+    from RAG.index_hooks import notify_mutation
+    from RAG.parsing_with_criteria import criteria_cache_stats, parse_with_criteria
+
+    write_events(user_dir, [make_event(1), make_event(2)])
+    assert len(parse_with_criteria(user_dir, {"month": 6})) == 2
+
+    # eventmanager처럼 알림과 함께 수정
+    write_events(user_dir, [make_event(2, day="2025-07-01")])
+    notify_mutation(user_dir, "update", 2, make_event(2, day="2025-07-01"))
+    misses = criteria_cache_stats()["misses"]
+    assert [e["id"] for e in parse_with_criteria(user_dir, {"month": 6})] == [1]
+    assert criteria_cache_stats()["misses"] == misses + 1
+
+    # 파일을 직접 만든 경우는 디렉터리 mtime으로 버전이 바뀐다
+    write_events(user_dir, [make_event(3)])
+    assert [e["id"] for e in parse_with_criteria(user_dir, {"month": 6})] == [1, 3]
+
+
+def test_lru_evicts_oldest_entry():
+    from RAG.parsing_with_criteria import CriteriaCache
+
+    cache = CriteriaCache(maxsize=2)
+    cache.put(("a",), [1])
+    cache.put(("b",), [2])
+    assert cache.get(("a",)) == (1,)
+    cache.put(("c",), [3])
+    assert cache.get(("b",)) is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["size"] == 2
@@ -0,0 +1,15 @@
+from conftest import ADD_EVENT, make_event, run_other_process, titles, write_events
+
+
+def test_criteria_expression_sees_write_by_other_process(user_dir):
+    from RAG.parsing_with_criteria import parse_with_criteria
+
+    write_events(user_dir, [make_event(1, member=["철수"]), make_event(2, member=["영희"])])
+    criteria = {"or": [{"member": "철수"}, {"member": "민수"}]}
+    assert [e["id"] for e in parse_with_criteria(user_dir, criteria)] == [1]
+
+    new = make_event(None, title="민수 일정", member=["민수"])
+    del new["id"]
+    run_other_process(ADD_EVENT, event=new, user_dir=user_dir)
+
+    assert "민수 일정" in titles(parse_with_criteria(user_dir, criteria))
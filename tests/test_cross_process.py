@@ -0,0 +1,35 @@
+"""다른 프로세스(서버 워커/CLI)가 쓴 변경이 이 프로세스의 엔진에 보이는지."""
+from conftest import ADD_EVENT, make_event, run_other_process, titles, write_events
+
+
+def test_engine_sees_event_added_by_other_process(user_dir):
+    from RAG.engine import get_engine
+
+    write_events(user_dir, [make_event(i) for i in range(1, 4)])
+    engine = get_engine(user_dir)
+    assert len(engine.query({})) == 3
+
+    new = make_event(None, title="다른 워커")
+    del new["id"]
+    run_other_process(ADD_EVENT, event=new, user_dir=user_dir)
+
+    assert "다른 워커" in titles(engine.query({}))
+    assert engine.stats()["events"] == 4
+
+
+def test_engine_sees_update_and_delete_by_other_process(user_dir):
+    from RAG.engine import get_engine
+
+    write_events(user_dir, [make_event(i) for i in range(1, 4)])
+    engine = get_engine(user_dir)
+    engine.query({})
+
+    run_other_process("""
+import eventmanager
+eventmanager.update_event_in_user(1, {{"title": "바뀐 제목"}}, user_dir={user_dir}, recompute_embedding=False)
+eventmanager.delete_event_in_user(2, user_dir={user_dir})
+""", user_dir=user_dir)
+
+    seen = titles(engine.query({}))
+    assert "바뀐 제목" in seen
+    assert "일정 2" not in seen
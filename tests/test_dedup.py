@@ -0,0 +1,59 @@
+import os
+
+from conftest import make_event, write_events
+
+
+def test_merge_event_normalises_str_member():
+    from RAG.dedup import merge_event
+
+    keep = make_event(1, member="철수")
+    dup = make_event(2, member=["영희", "철수"], location="3층")
+    merged = merge_event(keep, [dup])
+    assert merged["member"] == ["철수", "영희"]
+    assert merged["location"] == "3층"
+    assert merged["id"] == 1
+
+
+def test_merge_event_str_member_on_duplicate():
+    from RAG.dedup import merge_event
+
+    merged = merge_event(make_event(1, member=["철수"]), [make_event(2, member="영희")])
+    assert merged["member"] == ["철수", "영희"]
+
+
+def test_dedup_merge_keeps_smallest_id_and_removes_duplicate(user_dir):
+    from RAG.dedup import dedup_events
+    from RAG.snapshot import read_event_file
+
+    write_events(user_dir, [
+        make_event(1, title="팀 회의", member="철수"),
+        make_event(2, title="팀 회의", member=["영희"], location="3층"),
+        make_event(3, day="2025-06-09", title="점심"),
+    ])
+    report = dedup_events(user_dir, merge=True, threshold=0.5)
+    assert report["duplicates"] == 1
+    assert report["merged"] == 1
+    assert sorted(os.listdir(user_dir)) == [".moro", "0001.json", "0003.json"]
+    kept = read_event_file(os.path.join(user_dir, "0001.json"))[0]
+    assert kept["member"] == ["철수", "영희"]
+    assert kept["location"] == "3층"
+
+
+def test_dedup_report_only_leaves_files(user_dir):
+    from RAG.dedup import dedup_events
+
+    write_events(user_dir, [make_event(1, title="팀 회의"), make_event(2, title="팀 회의")])
+    report = dedup_events(user_dir, merge=False, threshold=0.5)
+    assert report["duplicates"] == 1
+    assert report["merged"] == 0
+    assert {"0001.json", "0002.json"} <= set(os.listdir(user_dir))
+
+
+def test_import_dedup_defaults_to_report(user_dir):
+    from RAG import dedup
+
+    assert dedup.DEDUP_ON_IMPORT == "report"
+    write_events(user_dir, [make_event(1, title="팀 회의"), make_event(2, title="팀 회의")])
+    report = dedup.dedup_after_import(user_dir, [2])
+    assert report["merged"] == 0
+    assert {"0001.json", "0002.json"} <= set(os.listdir(user_dir))
@@ -0,0 +1,37 @@
+def test_hashing_backend_is_deterministic_and_normalised():
+    from RAG.embedding_backend import HashingEmbeddingBackend
+
+    backend = HashingEmbeddingBackend(dim=64)
+    first, second = backend.embed_documents(["주간 회의", "주간 회의"])
+    assert first == second == backend.embed_query("주간 회의")
+    assert abs(sum(v * v for v in first) - 1.0) < 1e-9
+    assert backend.model == "hash-ngram-1-3" and backend.dimensions == 64
+
+
+def test_large_batches_reuse_one_process_pool():
+    from RAG.embedding_backend import HashingEmbeddingBackend
+
+    backend = HashingEmbeddingBackend(dim=32, processes=2, parallel_threshold=8, chunk_size=4)
+    texts = [f"일정 {i}" for i in range(20)]
+    try:
+        parallel = backend.embed_documents(texts)
+        pool = backend._pool
+        assert pool is not None
+        assert backend.embed_documents(texts) == parallel
+        assert backend._pool is pool
+    finally:
+        backend.close()
+    assert backend._pool is None
+    assert parallel == HashingEmbeddingBackend(dim=32).embed_documents(texts)
+
+
+def test_create_backend_by_name_and_dimensions():
+    import pytest
+
+    from RAG.embedding_backend import HashingEmbeddingBackend, backend_for, create_embedding_backend
+
+    backend = create_embedding_backend("local", dimensions=48)
+    assert isinstance(backend, HashingEmbeddingBackend) and backend.dimensions == 48
+    assert backend_for("hash-ngram-1-3", 48).dimensions == 48
+    with pytest.raises(ValueError):
+        create_embedding_backend("nope")
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+
+import pytest
+
+from conftest import make_event, write_events
+
+
+def _executor(fn, **kwargs):
+    from RAG.embedding_pool import EmbeddingExecutor
+
+    return EmbeddingExecutor(fn, rpm=None, tpm=None, backoff_base=0.001, **kwargs)
+
+
+def test_embed_texts_batches_and_keeps_order():
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    texts = ["a" * i for i in range(1, 11)]
+    vectors = _executor(embed, batch_size=3).embed_texts(texts)
+    assert vectors == [[float(i)] for i in range(1, 11)]
+    assert sorted(len(batch) for batch in calls) == [1, 3, 3, 3]
+
+
+def test_short_backend_result_fails_every_future():
+    executor = _executor(lambda texts: [[0.0]] * (len(texts) - 1), batch_size=4)
+    futures = executor.submit_texts(["a", "b", "c"])
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+
+
+def test_retryable_errors_are_retried():
+    class RateLimited(Exception):
+        status_code = 429
+
+    attempts = []
+
+    def embed(texts):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimited("slow down")
+        return [[1.0] for _ in texts]
+
+    assert _executor(embed).embed_texts(["a"]) == [[1.0]]
+    assert len(attempts) == 3
+
+    def bad_request(texts):
+        err = Exception("bad input")
+        err.status_code = 400
+        raise err
+
+    with pytest.raises(Exception, match="bad input"):
+        _executor(bad_request).embed_texts(["a"])
+
+
+def test_in_flight_text_is_embedded_once():
+    release = threading.Event()
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        release.wait(5)
+        return [[1.0] for _ in texts]
+
+    executor = _executor(embed)
+    first = executor.submit_texts(["같은 텍스트"])
+    second = executor.submit_texts(["같은 텍스트"])
+    assert first[0] is second[0]
+    release.set()
+    assert first[0].result(timeout=5) == [1.0]
+    assert calls == [["같은 텍스트"]]
+
+
+def test_embed_events_writes_vectors_and_notifies(user_dir):
+    from RAG.embedding_spec import active_spec, event_vector
+    from RAG.index_hooks import register_mutation_listener, storage_version, unregister_mutation_listener
+    from RAG.parsing_with_content import embed_events
+
+    events = [make_event(1), make_event(2)]
+    write_events(user_dir, events)
+    # 임베딩하는 동안 2번 파일이 수정된 경우: 옛 텍스트의 벡터를 쓰지 않는다
+    write_events(user_dir, [make_event(2, title="바뀐 제목")])
+
+    seen = []
+
+    def listener(key, op, event_id, event):
+        seen.append((op, event_id))
+
+    register_mutation_listener(listener)
+    try:
+        before = storage_version(user_dir)
+        embed_events(events, vector_dir=user_dir)
+    finally:
+        unregister_mutation_listener(listener)
+
+    spec = active_spec(user_dir)
+    with open(os.path.join(user_dir, "0001.json"), encoding="utf-8") as f:
+        assert event_vector(json.load(f), spec) is not None
+    with open(os.path.join(user_dir, "0002.json"), encoding="utf-8") as f:
+        assert event_vector(json.load(f), spec) is None
+    assert seen == [("update", 1)]
+    assert storage_version(user_dir)[0] == before[0] + 1
@@ -0,0 +1,106 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from conftest import ROOT, make_event, run_other_process, write_events
+
+
+# 다른 프로세스(서버 워커/CLI)가 작업만 넣고 처리하지 못한 채 끝나는 경우
+PUT_AND_EXIT = """
+from RAG.embedding_queue import EmbeddingQueue
+EmbeddingQueue.start = lambda self: None
+EmbeddingQueue({user_dir}).put_many({items})
+"""
+
+
+def _disk_jobs(user_dir):
+    with open(os.path.join(user_dir, ".moro", "embed_queue.json"), encoding="utf-8") as f:
+        return json.load(f)["jobs"]
+
+
+def _wait_empty(queue, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with queue._cond:
+            if not queue.jobs and not queue.in_flight:
+                return True
+        time.sleep(0.02)
+    return False
+
+
+def _embedded(user_dir, event_id):
+    from RAG.embedding_spec import active_spec, event_vector
+
+    with open(os.path.join(user_dir, f"{event_id:04d}.json"), encoding="utf-8") as f:
+        return event_vector(json.load(f), active_spec(user_dir)) is not None
+
+
+def test_jobs_from_several_processes_are_merged(user_dir):
+    from RAG.embedding_queue import EmbeddingQueue
+
+    write_events(user_dir, [make_event(i) for i in range(1, 4)])
+    queue = EmbeddingQueue(user_dir)
+    queue.start = lambda: None
+    queue.put_many([(1, None)])
+    run_other_process(PUT_AND_EXIT, user_dir=user_dir, items=[(2, None), (3, None)])
+    # 다른 프로세스가 쓴 뒤에 이 프로세스가 써도 그쪽 작업을 지우지 않는다
+    queue.discard(1)
+    assert sorted(_disk_jobs(user_dir)) == ["2", "3"]
+    assert queue.pending_ids() == {2, 3}
+
+
+def test_orphaned_jobs_are_adopted_and_processed(user_dir):
+    from RAG.embedding_queue import EmbeddingQueue
+
+    write_events(user_dir, [make_event(i) for i in range(1, 3)])
+    run_other_process(PUT_AND_EXIT, user_dir=user_dir, items=[(1, None), (2, None)])
+    queue = EmbeddingQueue(user_dir)
+    assert {job["owner"] for job in queue.jobs.values()} == {os.getpid()}
+    queue.start()
+    assert _wait_empty(queue)
+    assert _embedded(user_dir, 1) and _embedded(user_dir, 2)
+    assert _disk_jobs(user_dir) == {}
+
+
+def test_jobs_of_a_live_process_are_left_to_it(user_dir):
+    from RAG.embedding_queue import EmbeddingQueue
+
+    write_events(user_dir, [make_event(1)])
+    other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"], cwd=ROOT)
+    try:
+        os.makedirs(os.path.join(user_dir, ".moro"), exist_ok=True)
+        with open(os.path.join(user_dir, ".moro", "embed_queue.json"), "w", encoding="utf-8") as f:
+            json.dump({"jobs": {"1": {
+                "id": 1, "path": None, "state": "pending", "attempts": 0, "seq": 1,
+                "enqueued_at": 0, "next_attempt_at": 0, "last_error": None, "owner": other.pid,
+            }}}, f)
+        queue = EmbeddingQueue(user_dir)
+        assert queue.pending_ids() == {1}
+        assert queue._take_due() == ([], None)
+        assert queue.status()["pending_here"] == 0
+    finally:
+        other.kill()
+        other.wait()
+
+
+def test_batch_results_are_written_once(user_dir, monkeypatch):
+    from RAG import embedding_queue
+
+    write_events(user_dir, [make_event(i) for i in range(1, 21)])
+    queue = embedding_queue.EmbeddingQueue(user_dir)
+    writes = []
+    original = embedding_queue.atomic_write_json
+
+    def counting(path, data):
+        if path == queue.path:
+            writes.append(len(data["jobs"]))
+        original(path, data)
+
+    monkeypatch.setattr(embedding_queue, "atomic_write_json", counting)
+    queue.put_many([(i, None) for i in range(1, 21)])
+    assert _wait_empty(queue)
+    # 등록 한 번 + 배치 결과 한 번 (작업마다 큐 전체를 다시 쓰지 않는다)
+    assert writes == [20, 0]
+    assert queue.stats["processed"] == 20
@@ -0,0 +1,117 @@
+import gc
+import os
+import threading
+import warnings
+
+import pytest
+
+from conftest import make_event, write_events
+
+
+def _vector_events(user_dir, count=5):
+    from RAG.embedding_spec import active_spec, set_event_vector
+    from RAG.parsing_with_content import _concat_event_fields
+
+    spec = active_spec(user_dir)
+    events = []
+    for i in range(1, count + 1):
+        event = make_event(i, title=f"회의 {i}" if i % 2 else f"운동 {i}")
+        set_event_vector(event, spec.backend().embed_query(_concat_event_fields(event)), spec)
+        events.append(event)
+    write_events(user_dir, events)
+    return events
+
+
+def _listeners():
+    from RAG import index_hooks
+
+    return list(index_hooks._listeners)
+
+
+def test_query_by_criteria_text_and_mode(user_dir):
+    from RAG.engine import get_engine
+
+    _vector_events(user_dir)
+    engine = get_engine(user_dir)
+    assert get_engine(user_dir) is engine
+    assert len(engine.query({"month": 6})) == 5
+    assert engine.query({"month": 7}) == []
+    assert engine.query(text="운동 2", k=1)[0]["id"] == 2
+    assert engine.query(text="운동", k=5, mode="lexical")[0]["title"].startswith("운동")
+    assert "embedding" not in engine.query({})[0]
+    with pytest.raises(ValueError):
+        engine.query(text="x", mode="fuzzy")
+
+
+def test_collected_engine_stops_listening(user_dir):
+    from RAG.engine import RAG
+
+    write_events(user_dir, [make_event(1)])
+    engine = RAG(user_dir)
+    engine.query({})
+    listener = engine._listener
+    assert listener in _listeners()
+    del engine
+    gc.collect()
+    assert listener not in _listeners()
+
+
+def test_close_unregisters_and_drops_shared_engine(user_dir):
+    from RAG.engine import get_engine, peek_engine
+
+    write_events(user_dir, [make_event(1)])
+    engine = get_engine(user_dir)
+    assert engine._listener in _listeners()
+    engine.close()
+    assert engine._listener not in _listeners()
+    assert peek_engine(user_dir) is None
+
+
+def test_deprecated_events_constructor_cleans_up():
+    from RAG.engine import RAG
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        engine = RAG([make_event(1, title="풋살"), make_event(1, title="회의")])
+    assert any(issubclass(w.category, DeprecationWarning) for w in caught)
+    assert sorted(e["title"] for e in engine.query({})) == ["풋살", "회의"]
+    tmp, listener = engine.user_dir, engine._listener
+    del engine
+    gc.collect()
+    assert not os.path.exists(tmp)
+    assert listener not in _listeners()
+
+
+def test_query_re_embeds_outside_the_lock_after_cut_over(user_dir):
+    from RAG.embedding_spec import EmbeddingSpec
+    from RAG.engine import RAG
+
+    _vector_events(user_dir)
+    engine = RAG(user_dir)
+    engine.query({})
+    real = engine._embed_query
+    lock_free_during_re_embed = []
+
+    def probe_lock():
+        acquired = engine._lock.acquire(timeout=2)
+        if acquired:
+            engine._lock.release()
+        lock_free_during_re_embed.append(acquired)
+
+    def embed(text):
+        vec, spec = real(text)
+        if not embed.calls:
+            embed.calls.append(text)
+            # 임베딩하는 사이 cut-over가 끝난 것처럼: 이전 공간의 벡터
+            return vec, EmbeddingSpec(model="old-model", dim=spec.dim)
+        # 다시 임베딩하는 동안 엔진 잠금은 풀려 있어야 한다 (다른 스레드가 잡을 수 있다)
+        thread = threading.Thread(target=probe_lock)
+        thread.start()
+        thread.join()
+        return vec, spec
+
+    embed.calls = []
+    engine._embed_query = embed
+    results = engine.query(text="운동 2", k=1)
+    assert lock_free_during_re_embed == [True]
+    assert results[0]["id"] == 2
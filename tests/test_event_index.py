@@ -0,0 +1,126 @@
+import random
+
+import numpy as np
+import pytest
+
+from conftest import make_event
+
+CRITERIA = [
+    {},
+    {"month": 6},
+    {"weekday": "월"},
+    {"hour": 10},
+    {"date": "2025-06-03"},
+    {"member": "철수"},
+    {"member_prefix": "철"},
+    {"location": "강남"},
+    {"title": "풋살"},
+    {"or": [{"member": "철수"}, {"hour": 18}], "not": {"month": 7}},
+    {"and": [{"location": "강남"}, {"weekday": "화"}]},
+    {"time_window_hours": 72, "reference_time": "2025-06-05T12:00:00+09:00"},
+    {"nearest_n": 3, "reference_time": "2025-06-10T00:00:00+09:00"},
+]
+
+
+def _random_event(rng, event_id):
+    day = f"2025-{rng.choice([6, 7]):02d}-{rng.randint(1, 28):02d}"
+    hour = rng.choice([10, 18])
+    return make_event(
+        event_id,
+        day=day,
+        title=rng.choice(["풋살", "회의", "점심 약속"]),
+        date_start=f"{day}T{hour}:00:00+09:00",
+        date_finish=f"{day}T{hour + 1}:00:00+09:00",
+        member=rng.sample(["철수", "철민", "영희"], rng.randint(0, 2)),
+        location=rng.choice(["", "강남", "판교"]),
+    )
+
+
+def _warm(index):
+    # 캐시(bitmap/히스토그램/집계 쌍)를 먼저 만들어 두어야 제자리 갱신 경로를 탄다
+    for criteria in CRITERIA:
+        index.match(criteria)
+        index.estimate(criteria)
+    index.aggregate(None, ["month", "member"])
+
+
+def _assert_same(index, events):
+    rebuilt = type(index).from_events(events.values())
+    assert len(index) == len(rebuilt)
+    for criteria in CRITERIA:
+        assert index.match(criteria) == rebuilt.match(criteria), criteria
+        assert index.estimate(criteria) == pytest.approx(rebuilt.estimate(criteria)), criteria
+    assert index.aggregate(None, ["month", "member"], ["count", "total_hours"]) == rebuilt.aggregate(
+        None, ["month", "member"], ["count", "total_hours"]
+    )
+    assert index.histograms() == rebuilt.histograms()
+    for name, column in rebuilt.arrays().items():
+        assert np.array_equal(index.arrays()[name], column), name
+
+
+@pytest.mark.parametrize("compact_min_dead", [1, 10_000])
+def test_in_place_updates_match_a_rebuild(monkeypatch, compact_min_dead):
+    from RAG import event_index
+    from RAG.event_index import EventIndex
+
+    monkeypatch.setattr(event_index, "COMPACT_MIN_DEAD", compact_min_dead)
+    rng = random.Random(7)
+    events = {i: _random_event(rng, i) for i in range(1, 41)}
+    index = EventIndex.from_events(events.values())
+    _warm(index)
+    for step in range(120):
+        event_id = rng.randint(1, 60)
+        if rng.random() < 0.3:
+            events.pop(event_id, None)
+            index.remove(event_id)
+        else:
+            events[event_id] = _random_event(rng, event_id)
+            index.upsert(events[event_id])
+        if step % 20 == 0:
+            _assert_same(index, events)
+    _assert_same(index, events)
+
+
+def test_update_patches_cached_bitmaps_instead_of_dropping_them():
+    from RAG.event_index import EventIndex
+
+    index = EventIndex.from_events([make_event(i, member=["철수"]) for i in range(1, 6)])
+    assert index.match({"or": [{"member": "철수"}, {"month": 7}]}) == [1, 2, 3, 4, 5]
+    assert index.match({"or": [{"member": "영희"}, {"month": 6}]}) == [1, 2, 3, 4, 5]
+    cached = set(index._bitmaps)
+
+    index.upsert(make_event(3, day="2025-07-01", member=["영희"]))
+    index.remove(4)
+    assert set(index._bitmaps) == cached
+    assert index.match({"or": [{"member": "철수"}, {"month": 7}]}) == [1, 2, 3, 5]
+    assert index.match({"not": {"month": 6}}) == [3]
+    assert index.match({"member": "영희"}) == [3]
+
+
+def test_tombstones_are_compacted(monkeypatch):
+    from RAG import event_index
+    from RAG.event_index import EventIndex
+
+    monkeypatch.setattr(event_index, "COMPACT_MIN_DEAD", 2)
+    index = EventIndex.from_events([make_event(i) for i in range(1, 11)])
+    index.match({"month": 6, "or": [{"hour": 10}]})
+    index.remove(2)
+    index.remove(5)
+    assert index._dead == 2 and index._bitmaps
+    index.remove(7)
+    assert index._dead == 0 and index._size == 7 and not index._bitmaps
+    assert index.match({"month": 6}) == [1, 3, 4, 6, 8, 9, 10]
+
+
+def test_snapshot_columns_are_copied_on_first_write():
+    from RAG.event_index import EventIndex
+
+    source = EventIndex.from_events([make_event(i) for i in range(1, 4)])
+    columns = source.arrays()
+    for column in columns.values():
+        column.setflags(write=False)
+    index = EventIndex.from_columns(columns, [make_event(i) for i in range(1, 4)])
+    index.upsert(make_event(2, day="2025-07-01"))
+    index.upsert(make_event(4))
+    assert index.match({"month": 6}) == [1, 3, 4]
+    assert columns["month"].tolist() == [6, 6, 6]
@@ -0,0 +1,126 @@
+import io
+import json
+import os
+
+from conftest import make_event
+
+FEED = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:weekly@example.com\r\n"
+    "DTSTART;TZID=Asia/Seoul:20251006T100000\r\n"
+    "DURATION:PT1H30M\r\n"
+    "SUMMARY:주간 회의\\, 3층\r\n"
+    "DESCRIPTION:안건\\n1. 일정\r\n"
+    " 공유\r\n"
+    "ATTENDEE;CN=\"철수\":mailto:chulsoo@example.com\r\n"
+    "X-MORO-MEMBER:영희\r\n"
+    "RRULE:FREQ=WEEKLY;BYDAY=MO\r\n"
+    "BEGIN:VALARM\r\n"
+    "DESCRIPTION:알림\r\n"
+    "END:VALARM\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:weekly@example.com\r\n"
+    "RECURRENCE-ID:20251013T010000Z\r\n"
+    "DTSTART:20251013T050000Z\r\n"
+    "DTEND:20251013T060000Z\r\n"
+    "SUMMARY:주간 회의 (오후로 변경)\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:holiday@example.com\r\n"
+    "DTSTART;VALUE=DATE:20251009\r\n"
+    "SUMMARY:한글날\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:broken@example.com\r\n"
+    "SUMMARY:시작 시각 없음\r\n"
+    "END:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+
+def _read_dir(user_dir):
+    events = {}
+    for name in sorted(os.listdir(user_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(user_dir, name), encoding="utf-8") as f:
+                event = json.load(f)
+            events[event["id"]] = event
+    return events
+
+
+def test_parse_feed():
+    from RAG.ics import iter_ics_events
+
+    errors = []
+    weekly, moved, holiday = list(iter_ics_events(io.StringIO(FEED, newline=""), errors))
+    assert weekly["title"] == "주간 회의, 3층"
+    assert weekly["description"] == "안건\n1. 일정공유"
+    assert weekly["member"] == ["철수", "영희"]
+    assert (weekly["date_start"], weekly["date_finish"]) == ("2025-10-06T10:00:00+09:00", "2025-10-06T11:30:00+09:00")
+    assert weekly["rrule"] == "FREQ=WEEKLY;BYDAY=MO" and "ics_recurrence_id" not in weekly
+    assert moved["ics_uid"] == weekly["ics_uid"] and moved["ics_recurrence_id"] == "2025-10-13T10:00:00+09:00"
+    assert moved["date_start"] == "2025-10-13T14:00:00+09:00"
+    assert (holiday["date_start"], holiday["date_finish"]) == ("2025-10-09T00:00:00+09:00", "2025-10-10T00:00:00+09:00")
+    assert errors == ["broken@example.com: DTSTART 없음"]
+
+
+def test_write_then_parse_round_trips_fields():
+    from RAG.ics import iter_ics_events, write_ics
+
+    events = [
+        make_event(1, title="아주 긴 제목 " * 10, description="줄1\n줄2; 세미콜론, 쉼표", location="본사 \\ 3층",
+                   member=["철수", "younghee@example.com"]),
+        make_event(2, day="2025-06-03", ics_uid="keep@example.com", rrule="FREQ=DAILY"),
+        {"id": 3, "title": "날짜 없음"},
+    ]
+    out = io.StringIO(newline="")
+    assert write_ics(events, out) == 2
+    text = out.getvalue()
+    assert all(len(line.encode("utf-8")) <= 75 for line in text.split("\r\n"))
+    parsed = list(iter_ics_events(io.StringIO(text, newline="")))
+    for original, back in zip(events, parsed):
+        for field in ("title", "description", "location", "member"):
+            assert back[field] == original[field], field
+        assert back["date_start"] == original["date_start"]
+        assert back["date_finish"] == original["date_finish"]
+    assert parsed[0]["ics_uid"] == "moro-1@moro"
+    assert parsed[1]["ics_uid"] == "keep@example.com" and parsed[1]["rrule"] == "FREQ=DAILY"
+
+
+def test_reimport_upserts_by_uid(user_dir):
+    import eventmanager
+
+    first = eventmanager.import_ics_in_user(io.StringIO(FEED, newline=""), user_dir, dedup=False)
+    assert (first["imported"], first["updated"], first["skipped"]) == (3, 0, 1)
+    ids = sorted(_read_dir(user_dir))
+
+    changed = FEED.replace("SUMMARY:한글날", "SUMMARY:한글날 (휴일)")
+    again = eventmanager.import_ics_in_user(io.StringIO(changed, newline=""), user_dir, dedup=False)
+    assert (again["imported"], again["updated"]) == (3, 3)
+    events = _read_dir(user_dir)
+    assert sorted(events) == ids
+    assert "한글날 (휴일)" in {e["title"] for e in events.values()}
+    # 같은 UID라도 RECURRENCE-ID가 다른 예외 일정은 따로 남는다
+    assert sum(e.get("ics_uid") == "weekly@example.com" for e in events.values()) == 2
+    assert all(e.get("embedding") for e in events.values())
+
+
+def test_export_import_round_trip(user_dir, tmp_path):
+    import eventmanager
+
+    eventmanager.import_ics_in_user(io.StringIO(FEED, newline=""), user_dir, dedup=False)
+    before = _read_dir(user_dir)
+    path = tmp_path / "out.ics"
+    assert eventmanager.export_ics_in_user(str(path), user_dir) == 3
+    assert "embedding" not in path.read_text(encoding="utf-8")
+
+    report = eventmanager.import_ics_in_user(str(path), user_dir, dedup=False)
+    assert (report["imported"], report["updated"]) == (3, 3)
+    after = _read_dir(user_dir)
+    assert sorted(after) == sorted(before)
+    for event_id, event in before.items():
+        for field in ("title", "description", "location", "member", "date_start", "date_finish", "rrule"):
+            assert after[event_id].get(field) == event.get(field), field
@@ -0,0 +1,60 @@
+import pytest
+
+from conftest import make_event, write_events
+
+
+def test_tokenize_splits_hangul_into_bigrams():
+    from RAG.lexical_index import tokenize
+
+    assert tokenize("주간회의 Standup 3") == ["주간", "간회", "회의", "standup", "3"]
+    assert tokenize("풋살") == ["풋살"]
+
+
+def test_bm25_ranks_exact_term_and_updates_incrementally():
+    from RAG.lexical_index import LexicalIndex
+
+    index = LexicalIndex.from_texts([(1, "풋살 경기"), (2, "주간 회의"), (3, "회의록 정리 회의")])
+    assert [doc_id for doc_id, _ in index.search("풋살")] == [1]
+    assert [doc_id for doc_id, _ in index.search("회의")][:1] == [3]
+    assert index.search("회의", allowed_ids={2}) == [(2, pytest.approx(index.search("회의")[1][1]))]
+
+    index.remove(1)
+    assert index.search("풋살") == []
+    index.add(2, "풋살 연습")
+    assert [doc_id for doc_id, _ in index.search("풋살")] == [2]
+    assert [doc_id for doc_id, _ in index.search("회의")] == [3]
+    assert len(index) == 2
+
+
+def test_snapshot_terms_restore_the_same_scores():
+    from RAG.lexical_index import LexicalIndex
+
+    index = LexicalIndex.from_texts([(1, "풋살 경기"), (2, "주간 회의"), (3, "회의록 정리")])
+    restored = LexicalIndex.from_terms((doc_id, dict(terms)) for doc_id, terms in index.doc_terms.items())
+    assert restored.search("회의 풋살") == index.search("회의 풋살")
+
+
+def test_lexical_and_hybrid_modes(user_dir):
+    from RAG.parsing_with_content import parse_with_content
+
+    write_events(user_dir, [
+        make_event(1, title="풋살"),
+        make_event(2, title="주간 회의", location="본사"),
+        make_event(3, title="저녁 약속"),
+    ])
+    lexical = parse_with_content("풋살", k=2, vector_dir=user_dir, mode="lexical")
+    assert [e["id"] for e in lexical] == [1]
+    # 임베딩이 아직 없는 이벤트도 lexical 순위로 합쳐져서 hybrid 결과에 나온다
+    hybrid = parse_with_content("풋살", k=2, vector_dir=user_dir, mode="hybrid")
+    assert hybrid[0]["id"] == 1
+    with pytest.raises(ValueError):
+        parse_with_content("풋살", vector_dir=user_dir, mode="fuzzy")
+
+
+def test_reciprocal_rank_fusion_prefers_items_ranked_high_in_both():
+    from RAG.parsing_with_content import _reciprocal_rank_fusion
+
+    a, b, c = {"id": 1}, {"id": 2}, {"id": 3}
+    fused = _reciprocal_rank_fusion([[a, b, c], [b, a]], k=3)
+    assert [e["id"] for e in fused][:2] in ([1, 2], [2, 1])
+    assert fused[-1]["id"] == 3
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from conftest import make_event, write_events
+
+
+@pytest.fixture
+def queue_paused(monkeypatch):
+    # 워커가 파일을 바꾸지 않도록 큐에 넣기만 한다
+    from RAG.embedding_queue import EmbeddingQueue
+
+    monkeypatch.setattr(EmbeddingQueue, "start", lambda self: None)
+
+
+def _setup(user_dir):
+    from RAG.embedding_spec import active_spec, set_event_vector
+
+    spec = active_spec(user_dir)
+    events = [make_event(i) for i in range(1, 4)]
+    for event in events[:2]:
+        set_event_vector(event, [0.1] * spec.dim, spec)
+    write_events(user_dir, events)
+    return events
+
+
+def _queued(user_dir):
+    from RAG.embedding_queue import get_embedding_queue
+
+    return get_embedding_queue(user_dir).pending_ids()
+
+
+def test_reconcile_queues_unembedded_events_once(user_dir, queue_paused):
+    from RAG.manifest import load_manifest, reconcile_embeddings
+
+    _setup(user_dir)
+    summary = reconcile_embeddings(user_dir, verbose=False)
+    assert (summary["files"], summary["scanned"], summary["queued"]) == (3, 3, 1)
+    assert _queued(user_dir) == {3}
+    assert sorted(load_manifest(user_dir)["files"]) == ["0001.json", "0002.json", "0003.json"]
+
+    # 바뀐 파일이 없으면 stat만 하고 이미 큐에 있는 작업은 다시 넣지 않는다
+    summary = reconcile_embeddings(user_dir, verbose=False)
+    assert (summary["unchanged"], summary["scanned"], summary["queued"]) == (3, 0, 0)
+
+
+def test_reconcile_rescans_changed_files_and_requeues_stale_vectors(user_dir, queue_paused):
+    from RAG.manifest import reconcile_embeddings
+
+    events = _setup(user_dir)
+    reconcile_embeddings(user_dir, verbose=False)
+
+    # eventmanager를 거치지 않은 직접 편집: 벡터는 남아 있지만 텍스트 해시가 달라 낡은 벡터
+    write_events(user_dir, [dict(events[0], title="직접 고친 제목")])
+    os.remove(os.path.join(user_dir, "0002.json"))
+    summary = reconcile_embeddings(user_dir, verbose=False)
+    assert (summary["scanned"], summary["unchanged"], summary["removed"], summary["queued"]) == (1, 1, 1, 1)
+    assert _queued(user_dir) == {1, 3}
+
+
+def test_reconcile_requeues_from_manifest_after_queue_loss(user_dir, queue_paused):
+    from RAG import embedding_queue
+    from RAG.index_hooks import user_key
+    from RAG.manifest import reconcile_embeddings
+
+    _setup(user_dir)
+    reconcile_embeddings(user_dir, verbose=False)
+    # 큐 파일이 지워진 채 재시작: 파일은 그대로라 읽지 않지만 매니페스트의 embedded=False 이벤트는 다시 넣는다
+    os.remove(os.path.join(user_dir, ".moro", "embed_queue.json"))
+    embedding_queue._queues.pop(user_key(user_dir), None)
+    summary = reconcile_embeddings(user_dir, verbose=False)
+    assert (summary["scanned"], summary["queued"]) == (0, 1)
+    assert _queued(user_dir) == {3}
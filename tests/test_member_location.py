@@ -0,0 +1,66 @@
+import pytest
+
+from conftest import make_event, write_events
+
+EVENTS = [
+    make_event(1, member=["철수", " Alice "], location="본사 3층"),
+    make_event(2, member=["철민"], location="본사 1층"),
+    make_event(3, member="영희", location="판교"),
+    make_event(4, member=[], location=None),
+]
+
+
+@pytest.mark.parametrize("criteria,expected", [
+    ({"member": "철수"}, [1]),
+    ({"member": "alice"}, [1]),
+    ({"member": ["철수", "ALICE"]}, [1]),
+    ({"member": ["철수", "영희"]}, []),
+    ({"member": "영희"}, [3]),
+    ({"member_prefix": "철"}, [1, 2]),
+    ({"location": " 판교 "}, [3]),
+    ({"location": "본사"}, []),
+    ({"location_prefix": "본사"}, [1, 2]),
+    ({"member_prefix": "철", "location": "본사 1층"}, [2]),
+])
+def test_index_matches_the_filter_semantics(criteria, expected):
+    from RAG.event_index import EventIndex
+    from RAG.parsing_with_criteria import filter_out_by_criteria
+
+    assert EventIndex.from_events(EVENTS).match(criteria) == expected
+    excluded = {e["id"] for e in filter_out_by_criteria(EVENTS, **criteria)}
+    assert [e["id"] for e in EVENTS if e["id"] not in excluded] == expected
+
+
+def test_postings_follow_upsert_and_remove():
+    from RAG.event_index import EventIndex
+
+    index = EventIndex.from_events(EVENTS)
+    assert index.tag_ids("member", "철수") == {1}
+    assert index.tag_ids("member", "철", prefix=True) == {1, 2}
+
+    index.upsert(make_event(1, member=["철호"], location="판교"))
+    assert index.tag_ids("member", "철수") == set()
+    assert index.tag_ids("member", "철", prefix=True) == {1, 2}
+    assert index.tag_ids("location", "판교") == {1, 3}
+    assert "철수" not in index._tag_ids["member"]
+
+    index.remove(2)
+    assert index.tag_ids("member", "철", prefix=True) == {1}
+    assert index.match({"location_prefix": "본사"}) == []
+
+
+def test_member_criteria_through_the_engine_and_functional_api(user_dir):
+    from RAG.engine import RAG
+    from RAG.index_hooks import notify_mutation
+    from RAG.parsing_with_criteria import parse_with_criteria
+
+    write_events(user_dir, EVENTS)
+    engine = RAG(user_dir)
+    assert [e["id"] for e in engine.query({"member": "철수"})] == [1]
+    assert [e["id"] for e in parse_with_criteria(user_dir, {"location_prefix": "본사"})] == [1, 2]
+
+    moved = make_event(3, member=["영희", "철수"], location="본사 2층")
+    write_events(user_dir, [moved])
+    notify_mutation(user_dir, "update", 3, moved)
+    assert [e["id"] for e in engine.query({"member": "철수"})] == [1, 3]
+    assert [e["id"] for e in parse_with_criteria(user_dir, {"location_prefix": "본사"})] == [1, 2, 3]
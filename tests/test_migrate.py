@@ -0,0 +1,66 @@
+import json
+from datetime import date
+import os
+
+from conftest import make_event
+
+
+def _write(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def test_migrate_splits_array_files_and_renames(user_dir):
+    from moro.migrate import migrate_storage
+
+    _write(os.path.join(user_dir, "2025-06.json"), [make_event(1), make_event(2)])
+    _write(os.path.join(user_dir, "2025-07.json"), [make_event(2, title="다른 2번"), {**make_event(0), "id": "g-abc"}])
+    _write(os.path.join(user_dir, "4.json"), make_event(4))
+
+    summary = migrate_storage(user_dir, show_progress=False)
+    assert summary["errors"] == []
+    assert summary["reassigned_count"] == 1
+    assert sorted(os.listdir(user_dir)) == [".moro", "0001.json", "0002.json", "0003.json", "0004.json", "2025-07.json"]
+    with open(os.path.join(user_dir, "2025-07.json"), encoding="utf-8") as f:
+        assert [e["id"] for e in json.load(f)] == ["g-abc"]
+    # 내용이 다른 중복 id는 새 id를 받는다
+    with open(os.path.join(user_dir, "0003.json"), encoding="utf-8") as f:
+        assert json.load(f)["title"] == "다른 2번"
+
+
+def test_migrate_drops_derived_state(user_dir):
+    from moro.migrate import migrate_storage
+    from RAG.agenda import agenda_path, get_agenda
+    from RAG.ann_index import _paths as ann_paths
+
+    _write(os.path.join(user_dir, "2025-06.json"), [make_event(1), make_event(2)])
+    get_agenda(user_dir).persist()
+    base, delta = ann_paths(user_dir)
+    base.write_bytes(b"stale")
+    delta.write_text("")
+
+    migrate_storage(user_dir, show_progress=False)
+    assert not agenda_path(user_dir).exists()
+    assert not base.exists() and not delta.exists()
+    assert get_agenda(user_dir).day_ids(date(2025, 6, 2)) == [1, 2]
+
+
+def test_migrate_leaves_source_changed_after_planning(user_dir, monkeypatch):
+    from moro import migrate
+
+    source = os.path.join(user_dir, "2025-06.json")
+    _write(source, [make_event(1), make_event(2)])
+    plan_migration = migrate.plan_migration
+
+    def plan_then_edit(*args, **kwargs):
+        plan = plan_migration(*args, **kwargs)
+        # 계획을 세운 뒤 서버가 원본을 고친다
+        _write(source, [make_event(1), make_event(2, title="수정됨"), make_event(3)])
+        os.utime(source, ns=(1, 1))
+        return plan
+
+    monkeypatch.setattr(migrate, "plan_migration", plan_then_edit)
+    summary = migrate.migrate_storage(user_dir, show_progress=False)
+    assert summary["errors"] and "2025-06.json" in summary["errors"][0]
+    with open(source, encoding="utf-8") as f:
+        assert len(json.load(f)) == 3
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+
+def _vectors(n=50, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    return {i: rng.normal(size=dim).astype(np.float32) for i in range(1, n + 1)}
+
+
+def _exact_top(vectors, query, k):
+    q = query / np.linalg.norm(query)
+    scores = {i: float(v @ q / np.linalg.norm(v)) for i, v in vectors.items()}
+    return sorted(scores, key=lambda i: -scores[i])[:k]
+
+
+@pytest.mark.parametrize("dtype", ["int8", "float16", "float32"])
+def test_quantized_round_trip_and_rescored_search(dtype):
+    from RAG.quantized_store import QuantizedVectorStore
+
+    vectors = _vectors()
+    store = QuantizedVectorStore(dtype=dtype)
+    for doc_id, vec in vectors.items():
+        assert store.add(doc_id, vec.tolist())
+    assert len(store) == 50
+
+    ids, matrix = store.export()
+    assert ids == list(vectors)
+    for doc_id, row in zip(ids, matrix):
+        expected = vectors[doc_id] / np.linalg.norm(vectors[doc_id])
+        assert np.allclose(row, expected, atol=0.02)
+
+    query = vectors[7] + 0.1
+    hits = store.search(query, 5, full_vectors=lambda ids: {i: vectors[i] for i in ids})
+    assert [doc_id for doc_id, _ in hits] == _exact_top(vectors, query, 5)
+    allowed = {1, 2, 3}
+    hits = store.search(query, 2, full_vectors=lambda ids: {i: vectors[i] for i in ids}, allowed_ids=allowed)
+    assert [doc_id for doc_id, _ in hits] == _exact_top({i: vectors[i] for i in allowed}, query, 2)
+
+
+def test_add_rejects_other_dimension_and_remove_compacts():
+    from RAG.quantized_store import QuantizedVectorStore
+
+    vectors = _vectors(n=10)
+    store = QuantizedVectorStore(dtype="int8")
+    for doc_id, vec in vectors.items():
+        store.add(doc_id, vec)
+    assert not store.add(99, [1.0, 2.0])
+    for doc_id in range(1, 7):
+        store.remove(doc_id)
+    assert len(store) == 4 and store._size == 4
+    assert {doc_id for doc_id, _ in store.coarse_search(vectors[8], 10)} == {7, 8, 9, 10}
+
+
+def test_shared_base_gets_private_overlay_without_copy():
+    from RAG.quantized_store import QuantizedVectorStore
+
+    vectors = _vectors(n=6)
+    base = np.stack([vectors[i] / np.linalg.norm(vectors[i]) for i in range(1, 5)]).astype(np.float32)
+    base.setflags(write=False)
+    store = QuantizedVectorStore.from_matrix([1, 2, 3, 4], base)
+    assert store.shared_nbytes == base.nbytes
+
+    # 추가/수정은 private overlay 행에만 쓴다
+    store.add(5, vectors[5])
+    store.add(2, vectors[6])
+    assert store._base is base
+    assert store.coarse_search(vectors[6], 1)[0][0] == 2
+    assert store.coarse_search(vectors[5], 1)[0][0] == 5
+    ids, matrix = store.export()
+    assert sorted(ids) == [1, 2, 3, 4, 5]
+
+    # 절반 넘게 지우면 살아 있는 행만 private 행렬로 옮기고 base를 놓는다
+    for doc_id in (1, 3, 4):
+        store.remove(doc_id)
+    assert store._base is None
+    assert sorted(doc_id for doc_id, _ in store.coarse_search(vectors[5], 5)) == [2, 5]
+
+
+def test_unsupported_dtype():
+    from RAG.quantized_store import QuantizedVectorStore
+
+    with pytest.raises(ValueError):
+        QuantizedVectorStore(dtype="int4")
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from conftest import make_event, write_events
+
+
+QUERY = "주간 회의"
+
+
+@pytest.fixture
+def planner_dir(user_dir, monkeypatch):
+    """6월 일정 20개는 질의에서 먼 벡터, 7월 일정 40개는 가까운 벡터."""
+    from RAG import query_planner
+    from RAG.embedding_spec import active_spec, set_event_vector
+
+    monkeypatch.setattr(query_planner, "FILTER_FIRST_MAX_ROWS", 5)
+    spec = active_spec(user_dir)
+    query_vec = np.asarray(spec.backend().embed_query(QUERY), dtype=np.float32)
+    rng = np.random.default_rng(0)
+    events = []
+    for i in range(1, 61):
+        june = i <= 20
+        event = make_event(i, day=f"2025-06-{i:02d}" if june else f"2025-07-{(i - 20) % 28 + 1:02d}")
+        direction = -query_vec if june else query_vec
+        set_event_vector(event, (direction + rng.normal(scale=0.01, size=spec.dim)).tolist(), spec)
+        events.append(event)
+    write_events(user_dir, events)
+    return user_dir
+
+
+def test_selective_criteria_choose_filter_first(planner_dir):
+    from RAG.query_planner import planned_search
+
+    results, explain = planned_search(QUERY, {"date": "2025-06-03"}, k=3, vector_dir=planner_dir)
+    assert explain["plan"] == "filter_first"
+    assert explain["estimated_matches"] == 1
+    assert explain["matched"] == 1
+    assert [e["id"] for e in results] == [3]
+
+
+def test_broad_criteria_choose_vector_first_and_refetch(planner_dir):
+    from RAG.query_planner import planned_search
+
+    results, explain = planned_search(QUERY, {"month": 6}, k=1, vector_dir=planner_dir)
+    assert explain["plan"] == "vector_first"
+    assert explain["estimated_matches"] == 20
+    # 첫 fetch(4 / 0.333333 * 2 -> 25)는 모두 기준에 맞지 않는 7월 일정이라 걸러지고, 두 배로 늘려 다시 찾는다
+    assert explain["rounds"] == 2
+    assert explain["fetch"] == 50
+    assert explain["candidates_scored"] == 10
+    assert len(results) == 1 and results[0]["id"] <= 20
+
+
+def test_vector_first_matches_filter_first(planner_dir):
+    from RAG.query_planner import planned_search
+
+    forced, explain = planned_search(QUERY, {"month": 6}, k=3, vector_dir=planner_dir, plan="filter_first")
+    assert explain["plan"] == "filter_first" and explain["reason"] == "forced"
+    auto, _ = planned_search(QUERY, {"month": 6}, k=3, vector_dir=planner_dir)
+    assert [e["id"] for e in auto] == [e["id"] for e in forced]
+
+
+def test_non_vector_mode_falls_back_to_filter_first(planner_dir):
+    from RAG.query_planner import planned_search
+
+    _, explain = planned_search(QUERY, {"month": 6}, k=1, vector_dir=planner_dir, mode="lexical", plan="vector_first")
+    assert explain["plan"] == "filter_first"
+    assert "vector mode" in explain["reason"]
+
+
+def test_unindexed_criteria_choose_scan(planner_dir):
+    from RAG.query_planner import choose_plan, planned_search
+
+    explain = choose_plan({"colour": "red", "month": 6}, 3, planner_dir)
+    assert explain == {"plan": "scan", "reason": "criteria not indexed: colour"}
+
+    # scan 강제 실행은 전체 스캔 경로로 같은 결과
+    scanned, explain = planned_search(QUERY, {"month": 6}, k=3, vector_dir=planner_dir, plan="scan")
+    assert explain["plan"] == "scan"
+    assert explain["matched"] == 20
+    auto, _ = planned_search(QUERY, {"month": 6}, k=3, vector_dir=planner_dir)
+    assert [e["id"] for e in scanned] == [e["id"] for e in auto]
+
+
+def test_explain_reports_stages(planner_dir):
+    from RAG.query_planner import planned_search
+
+    _, explain = planned_search(QUERY, {"month": 6}, k=1, vector_dir=planner_dir)
+    assert explain["total_events"] == 60
+    assert explain["estimated_selectivity"] == pytest.approx(20 / 60, abs=1e-6)
+    assert explain["returned"] == 1
+    timings = explain["timings_ms"]
+    assert {"plan", "filter", "embed", "vector_search", "rescore", "total"} <= set(timings)
+    assert timings["total"] == pytest.approx(sum(v for name, v in timings.items() if name != "total"), abs=0.01)
+
+
+def test_unknown_plan_is_rejected(planner_dir):
+    from RAG.query_planner import planned_search
+
+    with pytest.raises(ValueError):
+        planned_search(QUERY, {}, vector_dir=planner_dir, plan="index_only")
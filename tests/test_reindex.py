@@ -0,0 +1,89 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from conftest import ROOT, make_event, write_events
+
+
+HOLD_LOCK = """
+import sys, time
+from pathlib import Path
+from RAG.state import try_state_lock
+user_dir, ready, release = sys.argv[1:]
+with try_state_lock(user_dir, "reindex") as acquired:
+    assert acquired
+    Path(ready).touch()
+    while not Path(release).exists():
+        time.sleep(0.02)
+"""
+
+
+def _read(user_dir, event_id):
+    with open(os.path.join(user_dir, f"{event_id:04d}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _setup(user_dir):
+    from RAG.embedding_spec import active_spec, set_event_vector
+    from RAG.parsing_with_content import _concat_event_fields
+
+    events = [make_event(i) for i in range(1, 6)]
+    spec = active_spec(user_dir)
+    for event in events:
+        set_event_vector(event, spec.backend().embed_query(_concat_event_fields(event)), spec)
+    write_events(user_dir, events)
+    return spec
+
+
+def test_reindex_moves_every_event_to_the_target_space(user_dir):
+    from RAG.embedding_spec import EmbeddingSpec, active_spec, event_vector, target_spec
+    from RAG.reindex import reindex
+
+    active = _setup(user_dir)
+    target = EmbeddingSpec(model=active.model, dim=64)
+    progress = reindex(user_dir, target)
+    assert progress["state"] == "done"
+    assert progress["embedded"] == 5 and progress["promoted"] == 5
+    assert active_spec(user_dir) == target == target_spec(user_dir)
+    for event_id in range(1, 6):
+        event = _read(user_dir, event_id)
+        assert len(event_vector(event, target)) == 64
+        assert "embedding_next" not in event
+
+
+def test_reindex_runs_in_one_process_only(user_dir, tmp_path):
+    from RAG.embedding_spec import EmbeddingSpec, active_spec
+    from RAG.reindex import reindex
+
+    active = _setup(user_dir)
+    ready, release = tmp_path / "ready", tmp_path / "release"
+    holder = subprocess.Popen(
+        [sys.executable, "-c", HOLD_LOCK, user_dir, str(ready), str(release)],
+        cwd=ROOT, env=dict(os.environ, PYTHONPATH=ROOT),
+    )
+    try:
+        deadline = time.time() + 30
+        while not ready.exists():
+            assert time.time() < deadline and holder.poll() is None
+            time.sleep(0.02)
+        # 다른 워커가 재색인 중: 기다리지 않고 그대로 돌아오며 파일/상태를 건드리지 않는다
+        progress = reindex(user_dir, EmbeddingSpec(model=active.model, dim=64))
+        assert progress["state"] == "running_elsewhere"
+        assert active_spec(user_dir) == active
+        assert len(_read(user_dir, 1)["embedding"]) == active.dim
+    finally:
+        release.touch()
+        holder.wait(30)
+    assert holder.returncode == 0
+
+    assert reindex(user_dir, EmbeddingSpec(model=active.model, dim=64))["state"] == "done"
+
+
+def test_try_state_lock_is_reentrant_in_one_thread(user_dir):
+    from RAG.state import try_state_lock
+
+    with try_state_lock(user_dir, "reindex") as outer:
+        with try_state_lock(user_dir, "reindex") as inner:
+            assert outer and inner
@@ -0,0 +1,83 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import ADD_EVENT, make_event, run_other_process, write_events
+
+
+@pytest.fixture(autouse=True)
+def no_background_persist(monkeypatch):
+    from RAG.agenda import AgendaView
+
+    monkeypatch.setattr(AgendaView, "_schedule_persist", lambda self: None)
+
+
+def _at(event_id, start, **fields):
+    """start(timestamp)에 시작하는 한 시간짜리 이벤트."""
+    from RAG.parsing_with_criteria import KST
+
+    begin = datetime.fromtimestamp(start, KST).replace(microsecond=0)
+    return make_event(
+        event_id,
+        date_start=begin.isoformat(),
+        date_finish=(begin + timedelta(hours=1)).isoformat(),
+        **fields,
+    )
+
+
+def _pending(scheduler):
+    return sorted((item["event_id"], item["minutes_before"]) for item in scheduler.upcoming())
+
+
+def test_event_offsets():
+    from RAG.reminders import REMINDER_MAX_OFFSET_MINUTES, event_offsets
+
+    assert event_offsets({}) == [10]
+    assert event_offsets({"reminders": []}) == []
+    assert event_offsets({"reminders": "30"}) == [30]
+    assert event_offsets({"reminders": [60, "10", 10, -5, "x", REMINDER_MAX_OFFSET_MINUTES + 1]}) == [10, 60]
+
+
+def test_window_follows_local_mutations_without_reloading(user_dir):
+    from RAG.index_hooks import notify_mutation
+    from RAG.reminders import get_reminder_scheduler
+
+    now = time.time()
+    write_events(user_dir, [_at(1, now + 3600, reminders=[10, 30]), _at(2, now + 7200)])
+    scheduler = get_reminder_scheduler(user_dir)
+    scheduler._extend_window(now)
+    assert _pending(scheduler) == [(1, 10), (1, 30), (2, 10)]
+
+    moved = _at(2, now + 7200, reminders=[60])
+    write_events(user_dir, [moved])
+    notify_mutation(user_dir, "update", 2, moved)
+    notify_mutation(user_dir, "delete", 1)
+    assert _pending(scheduler) == [(2, 60)]
+
+    # 이 프로세스의 변경은 이미 반영했으므로 창을 다시 읽지 않는다
+    scheduler._resync()
+    assert scheduler.stats["resyncs"] == 0 and scheduler.stats["window_loads"] == 1
+
+
+def test_window_reloads_after_another_process_changes_storage(user_dir):
+    from RAG.reminders import get_reminder_scheduler
+
+    now = time.time()
+    # 2시간 뒤 시작, 121분 전 알림 → 1분 전에 만기
+    write_events(user_dir, [_at(1, now + 7200, reminders=[121])])
+    scheduler = get_reminder_scheduler(user_dir)
+    scheduler._extend_window(now)
+    assert [doc_id for doc_id, _, _ in scheduler._pop_due(now)] == [1]
+
+    new = _at(None, now + 3600, title="다른 워커", reminders=[20])
+    del new["id"]
+    run_other_process(ADD_EVENT, event=new, user_dir=user_dir)
+
+    scheduler._resync()
+    assert scheduler.stats["resyncs"] == 1
+    scheduler._extend_window(time.time())
+    assert scheduler.stats["window_loads"] == 2
+    assert [item["minutes_before"] for item in scheduler.upcoming()] == [20]
+    # 창을 다시 읽어도 이미 보낸 알림은 다시 보내지 않는다
+    assert scheduler._pop_due(time.time()) == []
@@ -0,0 +1,89 @@
+import os
+
+from conftest import make_event, write_events
+
+
+def _setup(user_dir, ids):
+    """active 공간 벡터와, target 공간 벡터(embedding_next)를 모두 가진 이벤트를 쓴다."""
+    from RAG.embedding_spec import EmbeddingSpec, active_spec
+
+    active = active_spec(user_dir)
+    target = EmbeddingSpec(model=active.model, dim=64)
+    write_events(user_dir, [_embedded(make_event(i), active, target) for i in ids])
+    return target
+
+
+def _embedded(event, active, target=None):
+    from RAG.embedding_spec import set_event_vector
+    from RAG.parsing_with_content import _concat_event_fields
+
+    text = _concat_event_fields(event)
+    set_event_vector(event, active.backend().embed_query(text), active)
+    if target is not None:
+        set_event_vector(event, target.backend().embed_query(text), target, field="embedding_next")
+    return event
+
+
+def _add(user_dir, event_id, target, **fields):
+    from RAG.embedding_spec import active_spec
+    from RAG.index_hooks import notify_mutation
+
+    event = _embedded(make_event(event_id, **fields), active_spec(user_dir), target)
+    write_events(user_dir, [event])
+    notify_mutation(user_dir, "add", event_id, event)
+
+
+def test_mutations_during_the_shadow_build_are_applied(user_dir, monkeypatch):
+    from RAG.engine import RAG
+    from RAG.index_hooks import notify_mutation
+    from RAG.quantized_store import get_quantized_store
+
+    target = _setup(user_dir, range(1, 5))
+    engine = RAG(user_dir)
+    assert len(engine.query({})) == 4
+
+    real = engine._iter_file_events
+
+    def racing():
+        # 잠금 밖에서 파일을 읽는 도중에 다른 요청이 추가/삭제한다
+        for i, event in enumerate(real()):
+            if i == 1:
+                _add(user_dir, 5, target, title="새 일정")
+                os.remove(os.path.join(user_dir, "0002.json"))
+                notify_mutation(user_dir, "delete", 2)
+            yield event
+
+    monkeypatch.setattr(engine, "_iter_file_events", racing)
+    engine.begin_shadow(target)
+    assert set(engine._shadow.id_to_row) == {1, 3, 4, 5}
+
+    # shadow가 설치된 뒤의 변경은 shadow에 바로 반영된다
+    os.remove(os.path.join(user_dir, "0003.json"))
+    notify_mutation(user_dir, "delete", 3)
+    assert engine.cut_over(target)
+    assert engine._spec == target and engine.stats()["cut_overs"] == 1
+    assert set(get_quantized_store(user_dir, "float32").id_to_row) == {1, 4, 5}
+    assert engine.query(text="새 일정", k=1)[0]["id"] == 5
+
+
+def test_mutations_during_the_ann_build_are_applied(user_dir, monkeypatch):
+    from RAG.ann_index import IVFFlatIndex, get_ann_index
+    from RAG.engine import RAG
+
+    target = _setup(user_dir, range(1, 5))
+    engine = RAG(user_dir, ann_min_events=1)
+    assert len(engine.query({})) == 4
+
+    real = IVFFlatIndex.build
+
+    def racing(cls, ids, vectors, **kwargs):
+        # IVF 학습은 엔진 잠금 밖에서 돈다
+        _add(user_dir, 6, target, title="학습 중 추가")
+        return real(ids, vectors, **kwargs)
+
+    monkeypatch.setattr(IVFFlatIndex, "build", classmethod(racing))
+    assert engine.cut_over(target)
+    index = get_ann_index(user_dir)
+    assert set(index.location) == {1, 2, 3, 4, 6}
+    assert index.spec == target
+    assert engine.query(text="학습 중 추가", k=1)[0]["id"] == 6
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from conftest import make_event, write_events
+
+
+@pytest.fixture
+def snapshots(monkeypatch):
+    """스냅샷을 켜고, 예약 스냅샷 대신 테스트가 직접 snapshot()을 부른다."""
+    from RAG import engine
+
+    monkeypatch.setattr(engine, "SNAPSHOT_ENABLED", True)
+    monkeypatch.setattr(engine.RAG, "_schedule_snapshot", lambda self, delay: None)
+    return engine
+
+
+def _embedded(user_dir, events):
+    from RAG.embedding_spec import active_spec, set_event_vector
+    from RAG.parsing_with_content import _concat_event_fields
+
+    spec = active_spec(user_dir)
+    for event in events:
+        set_event_vector(event, spec.backend().embed_query(_concat_event_fields(event)), spec)
+    return events
+
+
+def _no_file_reads(monkeypatch, engine):
+    def fail(path):
+        raise AssertionError(f"warm start read {path}")
+
+    monkeypatch.setattr(engine, "read_event_file", fail)
+
+
+def test_write_and_load_round_trip(user_dir):
+    from RAG.snapshot import load_snapshot, write_snapshot
+
+    matrix = np.arange(12, dtype=np.float32).reshape(3, 4)
+    size = write_snapshot(user_dir, 7, {"model": "m"}, {"0001.json": [1, 2, [1]]}, {"vectors.matrix": matrix}, {"events": [{"id": 1}]})
+    snap = load_snapshot(user_dir, {"model": "m"})
+    assert snap.version == 7 and snap.size == size
+    assert snap.files == {"0001.json": [1, 2, [1]]}
+    assert np.array_equal(snap.arrays["vectors.matrix"], matrix)
+    assert not snap.arrays["vectors.matrix"].flags.writeable
+    assert snap.blob("events") == [{"id": 1}]
+    # 다른 임베딩 공간으로 쓴 스냅샷은 쓰지 않는다
+    assert load_snapshot(user_dir, {"model": "other"}) is None
+
+
+def test_new_engine_warm_starts_from_snapshot(user_dir, snapshots, monkeypatch):
+    write_events(user_dir, _embedded(user_dir, [make_event(1, title="풋살"), make_event(2, day="2025-07-01", title="회의")]))
+    first = snapshots.RAG(user_dir)
+    assert first.query({"month": 6})[0]["title"] == "풋살"
+    # 스냅샷이 없던 첫 엔진은 파일을 읽어 세대 1로 게시하고 거기에 붙는다
+    assert first.stats()["snapshot"]["published"] == 1
+
+    _no_file_reads(monkeypatch, snapshots)
+    second = snapshots.RAG(user_dir)
+    assert second.query(text="풋살", k=1)[0]["id"] == 1
+    assert second.query({"month": 7})[0]["title"] == "회의"
+    stats = second.stats()
+    assert stats["snapshot"]["loaded_from"] == "snapshot" and stats["snapshot"]["delta_files"] == 0
+    assert stats["vector_shared_bytes"] > 0
+
+
+def test_warm_start_reads_only_files_changed_since_the_snapshot(user_dir, snapshots):
+    write_events(user_dir, _embedded(user_dir, [make_event(1), make_event(2)]))
+    snapshots.RAG(user_dir).query({})
+
+    write_events(user_dir, _embedded(user_dir, [make_event(2, title="바뀐 제목"), make_event(3, title="새 일정")]))
+    engine = snapshots.RAG(user_dir)
+    assert sorted(e["title"] for e in engine.query({})) == ["바뀐 제목", "새 일정", "일정 1"]
+    assert engine.stats()["snapshot"]["delta_files"] == 2
+
+
+def test_other_engine_swaps_to_a_newer_generation(user_dir, snapshots, monkeypatch):
+    write_events(user_dir, _embedded(user_dir, [make_event(1), make_event(2)]))
+    writer = snapshots.RAG(user_dir)
+    reader = snapshots.RAG(user_dir)
+    assert len(writer.query({})) == len(reader.query({})) == 2
+    assert reader.stats()["snapshot"]["version"] == 1
+
+    # 다른 워커가 (알림 없이 생긴) 파일을 반영하고 새 세대를 게시
+    write_events(user_dir, _embedded(user_dir, [make_event(3, title="새 일정")]))
+    writer.refresh()
+    assert writer.snapshot()["version"] == 2
+
+    _no_file_reads(monkeypatch, snapshots)
+    assert "새 일정" in {e["title"] for e in reader.query({})}
+    stats = reader.stats()
+    assert stats["generation_swaps"] == 1
+    assert stats["snapshot"]["version"] == stats["snapshot"]["generation"] == 2
+    assert stats["snapshot"]["delta_files"] == 0
@@ -0,0 +1,42 @@
+import pytest
+
+from RAG.title_index import TITLE_MATCH_THRESHOLD, TitleIndex, title_similarity
+
+
+@pytest.mark.parametrize("query,title", [("회의", "회식"), ("회의", "회계 마감")])
+def test_first_syllable_only_is_not_a_match(query, title):
+    assert title_similarity(query, title) < TITLE_MATCH_THRESHOLD
+
+
+@pytest.mark.parametrize("query,title", [("회의", "아침 회의"), ("회의", "회의실 예약"), ("스터드", "알고리즘 스터디")])
+def test_real_matches_pass(query, title):
+    assert title_similarity(query, title) >= TITLE_MATCH_THRESHOLD
+
+
+def test_search_drops_leading_gram_only_candidates():
+    index = TitleIndex()
+    for event_id, title in enumerate(["회식", "회계 마감", "아침 회의", "회의실 예약"], 1):
+        index.add(event_id, title)
+    ids = [event_id for event_id, _ in index.search("회의")]
+    assert set(ids) == {3, 4}
+
+
+@pytest.mark.parametrize("query,title", [("풋쌀", "풋살"), ("풋쌀", "주말 풋살 경기"), ("스터듸", "스터디")])
+def test_short_query_typo_falls_back_to_jamo_edit_distance(query, title):
+    assert title_similarity(query, title) >= TITLE_MATCH_THRESHOLD
+
+
+@pytest.mark.parametrize("query,title", [("회의", "회식"), ("회의", "회계"), ("gym", "gum"), ("풋쌀", "축구")])
+def test_jamo_fallback_needs_a_single_edit(query, title):
+    assert title_similarity(query, title) < TITLE_MATCH_THRESHOLD
+
+
+def test_search_finds_short_typo_and_ranks_exact_first():
+    index = TitleIndex()
+    for event_id, title in enumerate(["풋살", "회식", "풋살장 예약", "축구"], 1):
+        index.add(event_id, title)
+    assert [event_id for event_id, _ in index.search("풋쌀")] == [1, 3]
+    assert [event_id for event_id, _ in index.search("풋살")][0] == 1
+    assert [event_id for event_id, _ in index.search("회의")] == []
+    index.remove(1)
+    assert [event_id for event_id, _ in index.search("풋쌀")] == [3]